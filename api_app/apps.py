@@ -114,8 +114,14 @@ class ApiAppConfig(AppConfig):
              'roles': ['Administrador', 'Gerente', 'Supervisor', 'Agente']},
             {'nombre': 'api_call_record_url',
              'roles': ['Administrador', 'Gerente', 'Supervisor', 'Agente']},
+            {'nombre': 'api_trabajo_segundo_plano_detalle',
+             'roles': ['Administrador', 'Gerente', 'Supervisor', 'Agente']},
+            {'nombre': 'api_trabajo_segundo_plano_cancelar',
+             'roles': ['Administrador', 'Gerente', 'Supervisor', 'Agente']},
             {'nombre': 'api_contactos_asignados_campana_preview',
              'roles': ['Administrador', 'Gerente', 'Supervisor']},
+            {'nombre': 'api_sincronizacion_lista_campana',
+             'roles': ['Administrador', 'Gerente', 'Supervisor']},
             {'nombre': 'api_evento_hold',
              'roles': ['Agente', ]},
             {'nombre': 'api_agent_call_transfer_options',
@@ -184,6 +190,8 @@ class ApiAppConfig(AppConfig):
              'roles': ['Administrador', 'Gerente', 'Supervisor']},
             {'nombre': 'api_external_sites_show',
              'roles': ['Administrador', 'Gerente', 'Supervisor']},
+            {'nombre': 'api_external_sites_interactions_list',
+             'roles': ['Administrador', 'Gerente', 'Supervisor']},
             {'nombre': 'api_call_dispositions_list',
              'roles': ['Administrador', 'Gerente', 'Supervisor']},
             {'nombre': 'api_call_dispositions_create',
@@ -404,6 +412,15 @@ class ApiAppConfig(AppConfig):
         'api_call_record_url':
             {'descripcion': _('Retorna URL del archivos de grabación asociado al callid'),
              'version': '1.25.0'},
+        'api_trabajo_segundo_plano_detalle':
+            {'descripcion': _('Estado y progreso de una exportación en segundo plano'),
+             'version': '1.29.0'},
+        'api_trabajo_segundo_plano_cancelar':
+            {'descripcion': _('Cancela una exportación en segundo plano'),
+             'version': '1.29.0'},
+        'api_sincronizacion_lista_campana':
+            {'descripcion': _('Estado y progreso del envío de la lista de una campaña a Wombat'),
+             'version': '1.29.0'},
         'api_contactos_asignados_campana_preview':
             {'descripcion': _('Devuelve los contactos asignados de una campaña preview'),
              'version': '1.8.0'},
@@ -509,6 +526,9 @@ class ApiAppConfig(AppConfig):
         'api_external_sites_show':
             {'descripcion': _('Desoculta un sitio externo'),
              'version': '1.23.0'},
+        'api_external_sites_interactions_list':
+            {'descripcion': _('Lista el estado de las interacciones con sitios externos'),
+             'version': '1.29.0'},
         'api_call_dispositions_list':
             {'descripcion': _('Lista las calificaciones'),
              'version': '1.23.0'},
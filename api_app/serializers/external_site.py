@@ -16,7 +16,7 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 from rest_framework import serializers
-from ominicontacto_app.models import SitioExterno
+from ominicontacto_app.models import SitioExterno, InteraccionSitioExterno
 
 
 class SitioExternoSerializer(serializers.ModelSerializer):
@@ -63,3 +63,12 @@ class SitioExternoSerializer(serializers.ModelSerializer):
     class Meta:
         model = SitioExterno
         fields = '__all__'
+
+
+class InteraccionSitioExternoSerializer(serializers.ModelSerializer):
+    estado = serializers.CharField(source='get_estado_display')
+
+    class Meta:
+        model = InteraccionSitioExterno
+        fields = ('id', 'sitio_externo', 'campana', 'agente', 'contacto', 'calificacion',
+                  'estado', 'intentos', 'creada', 'enviada', 'codigo_respuesta', 'error')
@@ -17,16 +17,14 @@
 #
 from __future__ import unicode_literals
 
-import json
-
 from django.utils.translation import gettext as _
 
 from ominicontacto_app.services.base_de_datos_contactos import \
-    CreacionBaseDatosServiceIdExternoError, PredictorMetadataService
+    CreacionBaseDatosServiceIdExternoError, ImportadorContactosEnLotes, PredictorMetadataService
 from ominicontacto_app.parser import ParserCsv
 from ominicontacto_app.errors import OmlArchivoImportacionInvalidoError, \
     OmlError, OmlParserCsvImportacionError, OmlParserMaxRowError, OmlParserRepeatedColumnsError
-from ominicontacto_app.models import BaseDatosContacto, Contacto
+from ominicontacto_app.models import BaseDatosContacto
 
 from api_app.utils.contactos.base_datos_contacto_archivo_parser \
     import BaseDatosContactoArchivoCSVParser
@@ -86,50 +84,20 @@ class BaseDatosContactoService(object):
                 (BaseDatosContacto.ESTADO_EN_DEFINICION,
                  BaseDatosContacto.ESTADO_DEFINIDA_ACTUALIZADA))
 
-        ids_externos = base_datos_contacto.contactos.values_list('id_externo', flat=True)
-        ids_externos = set(ids_externos)
-        ids_nuevos_contactos = []
         try:
-            estructura_archivo = self.legacy_parser.get_estructura_archivo(base_datos_contacto)
-            posicion_primer_telefono = estructura_archivo[0].index(campos_telefonicos[0])
-            cantidad_contactos = 0
-            if base_datos_contacto.cantidad_contactos:
-                cantidad_contactos = base_datos_contacto.cantidad_contactos
-            numero_fila = 0
-            for lista_dato in estructura_archivo[1:]:
-                numero_fila += 1
-                telefono, datos, id_externo = self._obtener_telefono_y_datos(
-                    lista_dato, posicion_primer_telefono, columna_id_externo)
-                cantidad_contactos += 1
-                if id_externo is not None and id_externo != '':
-                    # El id_externo no puede estar repetido
-                    if id_externo in ids_externos:
-                        base_datos_contacto.contactos.filter(id__in=ids_nuevos_contactos).delete()
-                        raise CreacionBaseDatosServiceIdExternoError(numero_fila,
-                                                                     columna_id_externo,
-                                                                     lista_dato,
-                                                                     id_externo)
-                    else:
-                        ids_externos.add(id_externo)
-
-                contacto = Contacto.objects.create(
-                    telefono=telefono,
-                    datos=datos,
-                    bd_contacto=base_datos_contacto,
-                    id_externo=id_externo
-                )
-                ids_nuevos_contactos.append(contacto.id)
+            importador = ImportadorContactosEnLotes(base_datos_contacto)
+            cantidad_importados = importador.importar(campos_telefonicos, columna_id_externo)
         except CreacionBaseDatosServiceIdExternoError as e:
             raise e
 
         except OmlParserMaxRowError:
-            base_datos_contacto.contactos.filter(id__in=ids_nuevos_contactos).delete()
             raise OmlError(_("Archivo excede máximo de filas permitidas"))
 
         except OmlParserCsvImportacionError:
-            base_datos_contacto.contactos.filter(id__in=ids_nuevos_contactos).delete()
             raise OmlError(_("Error al parsear el archivo csv"))
 
+        cantidad_contactos = base_datos_contacto.cantidad_contactos or 0
+        cantidad_contactos += cantidad_importados
         base_datos_contacto.cantidad_contactos = cantidad_contactos
 
         base_datos_contacto.save()
@@ -139,24 +107,5 @@ class BaseDatosContactoService(object):
     def _existe_bd_contactos(self, nombre) -> bool:
         return BaseDatosContacto.objects.filter(nombre=nombre).exists()
 
-    def _obtener_telefono_y_datos(self, lista_dato, posicion_primer_telefono,
-                                  columna_id_externo) -> any:
-        id_externo = None
-        if len(lista_dato) > 1:
-            item = []
-            for i, valor in enumerate(lista_dato):
-                if i == posicion_primer_telefono:
-                    telefono = valor
-                elif i == columna_id_externo:
-                    id_externo = valor
-                else:
-                    item.append(valor)
-        else:
-            telefono = lista_dato[0]
-            item = ['']
-
-        datos = json.dumps(item)
-        return telefono, datos, id_externo
-
     def remove_db(self, id):
         BaseDatosContacto.objects.filter(id=id).delete()
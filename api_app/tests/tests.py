@@ -32,7 +32,11 @@ from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
 from api_app.views.base import login
+from api_app.views.supervisor import DashboardSupervision
+from notification_app.notification import RedisStreamNotifier
 from ominicontacto_app.services.asterisk.agent_activity import AgentActivityAmiManager
+from ominicontacto_app.services.asterisk.redis_database import RegistroAgentes
+from ominicontacto_app.services.sincronizacion_lista_wombat import SincronizacionListaWombat
 from ominicontacto_app.models import Campana, User, Contacto
 from ominicontacto_app.tests.utiles import OMLBaseTest, PASSWORD
 from ominicontacto_app.tests.factories import (CampanaFactory, SistemaExternoFactory,
@@ -250,7 +254,12 @@ class APITest(OMLBaseTest):
     def set_redis_mock_return_values(self, redis_mock_class, keys, values):
 
         redis_fake_dict = dict(zip(keys, values))
-        redis_mock_class.return_value.keys.return_value = keys
+        ids_agentes = [key.split(':')[-1] for key in keys if key.startswith('OML:AGENT:')]
+        redis_mock_class.return_value.smembers.return_value = set(ids_agentes)
+        pipeline = redis_mock_class.return_value.pipeline.return_value
+        pipeline.execute.return_value = [
+            redis_fake_dict['OML:AGENT:{0}'.format(id_agente)]
+            for id_agente in sorted(ids_agentes, key=int)]
 
         def hgetall_fake(key):
             return redis_fake_dict[key]
@@ -380,6 +389,16 @@ class APITest(OMLBaseTest):
         response_json = response.json()
         self.assertEqual(len(response_json), 0)
 
+    @patch.object(RedisStreamNotifier, 'send')
+    @patch.object(RegistroAgentes, 'contar_por_status')
+    def test_dashboard_supervision_cuenta_agentes_por_estado(self, contar_por_status, send):
+        contar_por_status.return_value = {
+            'READY': 2, 'PAUSE-ACW': 1, 'PAUSE-Supervision': 2, 'ONCALL': 3, 'RINGING': 1,
+            'OFFLINE': 4}
+        data = DashboardSupervision()._get_agentes_estados()
+        self.assertEqual(data, {'ready': 2, 'oncall': 3, 'pause': 3})
+        send.assert_called_with('auth_event', 9)
+
     def test_api_login_devuelve_token_asociado_al_usuario_password(self):
         url = 'https://{0}{1}'.format(settings.OML_OMNILEADS_HOSTNAME, reverse('api_login'))
         user = self.supervisor_admin.user
@@ -719,3 +738,19 @@ class APITest(OMLBaseTest):
         response = self.client.post(url, post_data)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['status'], 'ERROR')
+
+    def test_api_sincronizacion_lista_campana_devuelve_el_progreso(self):
+        campana = CampanaFactory.create(type=Campana.TYPE_DIALER)
+        sincronizacion = SincronizacionListaWombat(campana.pk)
+        self.addCleanup(sincronizacion.redis_connection.delete,
+                        sincronizacion.key, sincronizacion.key_lock)
+        sincronizacion.iniciar()
+        sincronizacion.actualizar_total(10)
+        sincronizacion.actualizar_progreso(4)
+        self.client.login(username=self.supervisor_admin.user.username, password=PASSWORD)
+        url = reverse('api_sincronizacion_lista_campana', args=[campana.pk])
+        response = self.client.get(url)
+        datos = response.json()
+        self.assertTrue(datos['en_curso'])
+        self.assertEqual(datos['estado'], SincronizacionListaWombat.EN_CURSO)
+        self.assertEqual((datos['total'], datos['enviados']), (10, 4))
@@ -23,7 +23,8 @@ from django.urls import reverse
 from ominicontacto_app.tests.utiles import OMLBaseTest, PASSWORD
 from ominicontacto_app.tests.factories import (
     AutenticacionSitioExternoFactory, CampanaFactory, SitioExternoFactory)
-from ominicontacto_app.models import Campana, SitioExterno, User
+from ominicontacto_app.models import (
+    Campana, InteraccionSitioExterno, SitioExterno, User)
 
 
 class APITest(OMLBaseTest):
@@ -51,6 +52,7 @@ class APITest(OMLBaseTest):
             'ExternalSitesDelete': 'api_external_sites_delete',
             'ExternalSitesHide': 'api_external_sites_hide',
             'ExternalSitesShow': 'api_external_sites_show',
+            'ExternalSitesInteractionsList': 'api_external_sites_interactions_list',
         }
 
 
@@ -260,3 +262,26 @@ class SitiosExternosTest(APITest):
         self.assertEqual(sitio.nombre, data['nombre'])
         self.assertEqual(sitio.url, data['url'])
         self.assertEqual(sitio.autenticacion, data['autenticacion'])
+
+    def test_lista_interacciones_sitios_externos_filtradas(self):
+        InteraccionSitioExterno.objects.create(
+            sitio_externo=self.sitio_externo, campana=self.campana, parametros='{}')
+        fallida = InteraccionSitioExterno.objects.create(
+            sitio_externo=self.sitio_externo, campana=self.campana, parametros='{}',
+            estado=InteraccionSitioExterno.FALLIDA, intentos=5, codigo_respuesta=503)
+        URL = reverse(self.urls_api['ExternalSitesInteractionsList'])
+        response = self.client.get(URL, {'campaign': self.campana.pk,
+                                         'status': InteraccionSitioExterno.FALLIDA})
+        response_json = json.loads(response.content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response_json['status'], 'SUCCESS')
+        self.assertEqual(len(response_json['interactions']), 1)
+        interaccion = response_json['interactions'][0]
+        self.assertEqual(interaccion['id'], fallida.pk)
+        self.assertEqual(interaccion['estado'], fallida.get_estado_display())
+        self.assertEqual(interaccion['codigo_respuesta'], 503)
+
+    def test_lista_interacciones_sitios_externos_filtro_invalido(self):
+        URL = reverse(self.urls_api['ExternalSitesInteractionsList'])
+        response = self.client.get(URL, {'campaign': 'x'})
+        self.assertEqual(response.status_code, 400)
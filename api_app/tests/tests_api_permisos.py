@@ -17,6 +17,7 @@
 #
 from __future__ import unicode_literals
 import json
+from mock import patch
 from django.contrib.auth.models import Group
 from django.utils.translation import gettext as _
 from django.urls import reverse
@@ -78,6 +79,28 @@ class RolesYPermisosAPITest(OMLBaseTest):
         ids_asignados = list(rol.permissions.values_list('id', flat=True))
         self.assertEqual(set(id_permisos), set(ids_asignados))
 
+    def test_asignar_permisos_a_rol_actualiza_permisos_de_sus_usuarios(self):
+        rol = Group.objects.create(name='Rol_1')
+        rol.permissions.set(PermisoOML.objects.filter(codename='api_new_role'))
+        usuario = User.objects.create_user(username='usuario_rol_1', password=PASSWORD)
+        usuario.groups.add(rol)
+        self.assertTrue(usuario.tiene_permiso_oml('api_new_role'))
+        self.assertFalse(usuario.tiene_permiso_oml('api_update_role_permissions'))
+
+        id_permisos = list(PermisoOML.objects.filter(
+            codename='api_update_role_permissions').values_list('id', flat=True))
+        url = reverse('api_update_role_permissions')
+        post_data = json.dumps({'role_id': rol.id, 'permissions': id_permisos})
+        # Dentro del TestCase no se ejecutan los callbacks de on_commit
+        with patch('api_app.views.administrador.transaction.on_commit',
+                   side_effect=lambda callback: callback()) as on_commit:
+            self.client.post(url, post_data, format='json', content_type='application/json')
+        on_commit.assert_called_once()
+
+        usuario = User.objects.get(pk=usuario.pk)
+        self.assertFalse(usuario.tiene_permiso_oml('api_new_role'))
+        self.assertTrue(usuario.tiene_permiso_oml('api_update_role_permissions'))
+
     def test_api_asignar_permisos_valida_parametros(self):
         nombre_rol = 'Rol_1'
         self.assertFalse(Group.objects.filter(name=nombre_rol).exists())
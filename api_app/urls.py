@@ -35,6 +35,7 @@ from api_app.views.supervisor import (
     ReasignarAgendaContactoView, DataAgendaContactoView,
     ExportarCSVContactados, ExportarCSVCalificados, ExportarCSVNoAtendidos,
     StatusCampanasEntrantesView, ContactosAsignadosCampanaPreviewView,
+    SincronizacionListaCampanaView,
     ExportarCSVCalificacionesCampana, ExportarCSVFormularioGestionCampana,
     ExportarCSVResultadosBaseContactados, DashboardSupervision, AuditSupervisor)
 from api_app.views.campaigns.add_agents_to_campaign import (
@@ -46,7 +47,7 @@ from api_app.views.pause_set import (
 from api_app.views.external_site import (
     SitioExternoCreate, SitioExternoDelete, SitioExternoDesocultar,
     SitioExternoDetalle, SitioExternoList, SitioExternoOcultar,
-    SitioExternoUpdate)
+    SitioExternoUpdate, InteraccionSitioExternoList)
 from api_app.views.external_site_authentication import (
     ExternalSiteAuthenticationCreate,
     ExternalSiteAuthenticationDelete,
@@ -93,6 +94,7 @@ from api_app.views.grabaciones import (
     ObtenerArchivoGrabacionView, ObtenerArchivosGrabacionView, ObtenerUrlGrabacionView
 )
 from api_app.views.auditoria import ObtenerArchivoAuditoriaView
+from api_app.views.trabajos import TrabajoSegundoPlanoCancelar, TrabajoSegundoPlanoDetalle
 from api_app.views.audios import ListadoAudiosView
 from api_app.views.wombat_dialer import ReiniciarWombat, WombatState
 from api_app.views.system import AsteriskQueuesData
@@ -198,6 +200,9 @@ urlpatterns = [
     re_path(r'api/vi/supervision/contactos_asignados_preview/(?P<pk_campana>\d+)/$',
             ContactosAsignadosCampanaPreviewView.as_view(),
             name='api_contactos_asignados_campana_preview'),
+    path('api/v1/campaign/<int:pk_campana>/list_sync/',
+         SincronizacionListaCampanaView.as_view(),
+         name='api_sincronizacion_lista_campana'),
     re_path(r'api/v1/exportar_csv_calificaciones_campana/$',
             ExportarCSVCalificacionesCampana.as_view(),
             name='api_exportar_csv_calificaciones_campana'),
@@ -273,6 +278,9 @@ urlpatterns = [
     re_path(r'api/v1/external_sites/(?P<pk>\d+)/show/$',
             SitioExternoDesocultar.as_view(),
             name='api_external_sites_show'),
+    re_path(r'api/v1/external_sites/interactions/$',
+            InteraccionSitioExternoList.as_view(),
+            name='api_external_sites_interactions_list'),
     # ===================================
     # Autenticacion de Sitios Externos
     # ===================================
@@ -514,6 +522,11 @@ urlpatterns = [
             ObtenerArchivosGrabacionView.as_view(), name='api_grabacion_descarga_masiva'),
     path('api/v1/call_record/<str:callid>/',
          ObtenerUrlGrabacionView.as_view(), name='api_call_record_url'),
+    # ###########  TRABAJOS EN SEGUNDO PLANO  ############ #
+    path('api/v1/jobs/<int:pk>/',
+         TrabajoSegundoPlanoDetalle.as_view(), name='api_trabajo_segundo_plano_detalle'),
+    path('api/v1/jobs/<int:pk>/cancel/',
+         TrabajoSegundoPlanoCancelar.as_view(), name='api_trabajo_segundo_plano_cancelar'),
     # ###########  AUDIOS ASTERISK    ############ #
     path('api/v1/audio/list/',
          ListadoAudiosView.as_view({'get': 'list'}), name='api_audios_listado'),
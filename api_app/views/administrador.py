@@ -22,6 +22,7 @@ import requests
 
 from django.utils.translation import gettext as _
 from django.contrib.auth.models import Group
+from django.db import transaction
 from django.forms import ValidationError
 
 from constance import config as config_constance
@@ -37,7 +38,7 @@ from api_app.serializers.base import AgenteProfileIDSerializer
 from api_app.views.permissions import TienePermisoOML
 from api_app.services.base_datos_contacto_service import BaseDatosContactoService
 from ominicontacto_app.models import AgenteProfile, User
-from ominicontacto_app.permisos import PermisoOML
+from ominicontacto_app.permisos import PermisoOML, cache_permisos_oml
 from ominicontacto_app.errors import OmlArchivoImportacionInvalidoError, OmlError, \
     OmlParserRepeatedColumnsError
 from django.utils.encoding import smart_text
@@ -123,6 +124,7 @@ class ActualizarPermisosDeRolView(APIView):
                                   'message': _('Lista de permisos incorrecta')})
 
         rol.permissions.set(permisos_en_base)
+        transaction.on_commit(cache_permisos_oml.invalidar)
         return Response(data={'status': 'OK'})
 
 
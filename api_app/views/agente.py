@@ -20,6 +20,8 @@ from __future__ import unicode_literals
 
 from django.utils.translation import gettext as _
 from django.contrib.auth import logout
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.views.generic import View
@@ -142,38 +144,53 @@ class API_ObtenerContactosCampanaView(APIView):
     authentication_classes = (
         SessionAuthentication, ExpiringTokenAuthentication)
 
-    def _get_qualified_contacts(self, campana):
-        return list(
-            campana.obtener_calificaciones().values_list(
-                'contacto__pk', flat=True))
+    # Segundos durante los que se reutilizan los totales sin filtro de búsqueda
+    TIEMPO_CACHE_TOTALES = 60
+
+    def _excluir_contactos_calificados(self, campana, contactos):
+        # NOT EXISTS para que la base resuelva la exclusión con un anti-join
+        calificaciones = campana.obtener_calificaciones().filter(contacto_id=OuterRef('pk'))
+        return contactos.annotate(calificado=Exists(calificaciones)).filter(calificado=False)
 
     def _procesar_api(self, request, campana):
         search = request.GET['search[value]']
-        contactos_calificados_ids = self._get_qualified_contacts(campana)
         if search != '':
             contactos = Contacto.objects.contactos_by_filtro_bd_contacto(
                 campana.bd_contacto, filtro=search)
-            contactos = contactos.exclude(pk__in=contactos_calificados_ids)
         else:
-            contactos = campana.bd_contacto.contactos.exclude(
-                pk__in=contactos_calificados_ids)
-
-        return contactos
+            contactos = campana.bd_contacto.contactos.all()
+
+        return self._excluir_contactos_calificados(campana, contactos).order_by('pk')
+
+    def _obtener_totales(self, request, campana, contactos_filtrados):
+        """
+        Devuelve la cantidad de contactos de la base y la de contactos filtrados. Sin filtro de
+        búsqueda ambas se guardan en cache por campaña, ya que no cambian entre páginas.
+        """
+        if request.GET['search[value]'] != '':
+            return campana.bd_contacto.contactos.count(), contactos_filtrados.count()
+        key = 'OML:CONTACTOS_CAMPANA:{0}:{1}'.format(campana.pk, campana.bd_contacto_id)
+        totales = cache.get(key)
+        if totales is None:
+            totales = (campana.bd_contacto.contactos.count(), contactos_filtrados.count())
+            cache.set(key, totales, self.TIEMPO_CACHE_TOTALES)
+        return totales
 
     def _procesar_contactos_salida(
         self, request, campana, contactos_filtrados
     ):
-        total_contactos = campana.bd_contacto.contactos.count()
-        total_contactos_filtrados = contactos_filtrados.count()
+        total_contactos, total_contactos_filtrados = self._obtener_totales(
+            request, campana, contactos_filtrados)
         start = int(request.GET['start'])
         length = int(request.GET['length'])
         draw = int(request.GET['draw'])
+        bd_metadata = campana.bd_contacto.get_metadata()
         data = []
-        for contact in contactos_filtrados:
+        for contact in contactos_filtrados[start:(start + length)]:
             contact_data = []
             contact_data.append(contact.pk)
             contact_data.append(contact.telefono)
-            for (k, v) in contact.obtener_datos().items():
+            for (k, v) in contact.obtener_datos(bd_metadata).items():
                 if k != 'telefono':
                     if v:
                         contact_data.append(v)
@@ -185,7 +202,7 @@ class API_ObtenerContactosCampanaView(APIView):
             'draw': draw,
             'recordsTotal': total_contactos,
             'recordsFiltered': total_contactos_filtrados,
-            'data': data[start:(start + length)],
+            'data': data,
         }
         return result_dict
 
@@ -19,7 +19,6 @@
 from __future__ import unicode_literals
 
 import logging as _logging
-import threading
 import json
 import redis
 
@@ -38,6 +37,8 @@ from api_app.views.permissions import TienePermisoOML
 from api_app.authentication import ExpiringTokenAuthentication
 from ominicontacto_app.services.reporte_auditoria_csv import ExportacionArchivoCSV
 from ominicontacto_app.models import CalificacionCliente
+from ominicontacto_app.services.progreso_tareas import ProgresoTarea
+from ominicontacto_app.services.trabajos_segundo_plano import encolar_trabajo
 
 logger = _logging.getLogger(__name__)
 
@@ -60,17 +61,12 @@ class ReporteCalificacionesCampanaCSV(ReporteCSV):
             'opcion_calificacion', 'contacto').prefetch_related(
                 'contacto__bd_contacto', 'agente__user').filter(
             id__in=calificaciones_id)
-        cant_calificaciones = calificaciones.count()
-        if cant_calificaciones == 0:
-            porcentaje_inicial = 100
-        else:
-            porcentaje_inicial = 0
+        progreso = ProgresoTarea(key_task, calificaciones.count(), self.redis_connection)
         calificaciones_analizadas = set()
-        self.redis_connection.publish(key_task, porcentaje_inicial)
+        progreso.iniciar()
         self._escribir_encabezado()
-        for i, calificacion in enumerate(calificaciones, start=1):
-            percentage = int((i / cant_calificaciones) * 100)
-            self.redis_connection.publish(key_task, percentage)
+        for calificacion in calificaciones:
+            progreso.avanzar()
             if calificacion and (calificacion.pk not in calificaciones_analizadas):
                 self._escribir_linea_calificacion(calificacion, calificacion)
                 calificaciones_analizadas.add(calificacion.pk)
@@ -117,15 +113,6 @@ class ObtenerArchivoAuditoriaView(APIView):
     authentication_classes = (SessionAuthentication, ExpiringTokenAuthentication, )
     http_method_names = ['post', 'get']
 
-    def generar_csv_calificaciones(
-            self, key_task, supervisor_id, calificaciones_id, mostrar_detalles):
-        reporte_calificados_csv =\
-            ReporteCalificacionesCampanaCSV(key_task, calificaciones_id, mostrar_detalles)
-        datos_calificados = reporte_calificados_csv.datos
-        nombre_reporte = "auditoria_{}".format(supervisor_id)
-        service_csv = ExportacionArchivoCSV(nombre_reporte)
-        service_csv.exportar_reportes_csv(datos=datos_calificados)
-
     def post(self, request):
         params = request.POST
         calificaciones_id = json.loads(params.get('calificaciones_id'))
@@ -134,16 +121,15 @@ class ObtenerArchivoAuditoriaView(APIView):
         TASK_ID = 'csv'
         key_task = 'OML:STATUS_DOWNLOAD_AUDITORIA:DISPOSITIONED:{0}:{1}'.format(supervisor_id,
                                                                                 TASK_ID)
-        thread_exportacion = threading.Thread(
-            target=self.generar_csv_calificaciones,
-            args=[key_task, supervisor_id, calificaciones_id, mostrar_detalles])
-        thread_exportacion.setDaemon(True)
-        thread_exportacion.start()
+        trabajo = encolar_trabajo(
+            'AUDITORIA', key_task, usuario=request.user, usuario_id=supervisor_id,
+            calificaciones_id=calificaciones_id, mostrar_detalles=mostrar_detalles)
 
         return Response(data={
             'status': 'OK',
             'msg': _('Exportación de auditoria a .csv en proceso'),
             'id': TASK_ID,
+            'trabajo_id': trabajo.pk,
         })
 
     def get(self, request):
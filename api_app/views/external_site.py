@@ -26,8 +26,9 @@ from rest_framework.views import APIView
 from rest_framework.authentication import SessionAuthentication
 from api_app.authentication import ExpiringTokenAuthentication
 from api_app.views.permissions import TienePermisoOML
-from api_app.serializers.external_site import SitioExternoSerializer
-from ominicontacto_app.models import SitioExterno
+from api_app.serializers.external_site import (
+    SitioExternoSerializer, InteraccionSitioExternoSerializer)
+from ominicontacto_app.models import SitioExterno, InteraccionSitioExterno
 
 
 class SitioExternoList(APIView):
@@ -230,3 +231,39 @@ class SitioExternoDesocultar(APIView):
             data['message'] = _('Error al desocultar el sitio externo')
             return Response(
                 data=data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class InteraccionSitioExternoList(APIView):
+    """ Estado de las últimas interacciones con los sitios externos """
+    permission_classes = (TienePermisoOML, )
+    authentication_classes = (
+        SessionAuthentication, ExpiringTokenAuthentication, )
+    renderer_classes = (JSONRenderer, )
+    http_method_names = ['get']
+
+    CANTIDAD_MAXIMA = 100
+    FILTROS = {
+        'external_site': 'sitio_externo_id',
+        'campaign': 'campana_id',
+        'disposition': 'calificacion_id',
+        'status': 'estado',
+    }
+
+    def get(self, request):
+        filtros = {}
+        for parametro, campo in self.FILTROS.items():
+            valor = request.query_params.get(parametro)
+            if valor is None:
+                continue
+            if not valor.isdigit():
+                data = {'status': 'ERROR',
+                        'message': _('Parámetro inválido: {0}').format(parametro)}
+                return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
+            filtros[campo] = int(valor)
+        interacciones = InteraccionSitioExterno.objects.filter(**filtros).order_by(
+            '-id')[:self.CANTIDAD_MAXIMA]
+        data = {
+            'status': 'SUCCESS',
+            'message': _('Se obtuvieron las interacciones con sitios externos'),
+            'interactions': InteraccionSitioExternoSerializer(interacciones, many=True).data}
+        return Response(data=data, status=status.HTTP_200_OK)
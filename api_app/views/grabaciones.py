@@ -19,7 +19,6 @@
 from __future__ import unicode_literals
 
 import os
-import threading
 import json
 
 from django.conf import settings
@@ -37,8 +36,7 @@ from rest_framework import status
 from api_app.services.storage_service import StorageService
 from api_app.views.permissions import TienePermisoOML
 from api_app.authentication import ExpiringTokenAuthentication
-from ominicontacto_app.services.grabaciones.generacion_zip_grabaciones \
-    import GeneracionZipGrabaciones
+from ominicontacto_app.services.trabajos_segundo_plano import encolar_trabajo
 
 
 class ObtenerArchivoGrabacionView(APIView):
@@ -66,13 +64,6 @@ class ObtenerArchivosGrabacionView(APIView):
     authentication_classes = (SessionAuthentication, ExpiringTokenAuthentication, )
     http_method_names = ['post']
 
-    def _generar_zip(self, listado_archivos, username, key_task, mostrar_datos_contacto):
-
-        zip_path = os.path.join(settings.SENDFILE_ROOT, 'zip')
-        zip_grabaciones = GeneracionZipGrabaciones(listado_archivos, zip_path, key_task,
-                                                   username, mostrar_datos_contacto)
-        zip_grabaciones.genera_zip()
-
     def post(self, request):
         params = request.POST
         supervisor_id = request.user.id
@@ -81,17 +72,14 @@ class ObtenerArchivosGrabacionView(APIView):
         mostrar_datos_contacto = params.get('mostrar_datos_contacto') == 'true'
         key_task = 'OML:STATUS_DOWNLOAD:RECORDINGS:{0}:{1}'.format(supervisor_id, TASK_ID)
 
-        thread_zip = threading.Thread(
-            target=self._generar_zip, args=[listado_archivos,
-                                            request.user.username,
-                                            key_task,
-                                            mostrar_datos_contacto])
-        thread_zip.setDaemon(True)
-        thread_zip.start()
+        trabajo = encolar_trabajo(
+            'ZIP_GRABACIONES', key_task, usuario=request.user, archivos=listado_archivos,
+            username=request.user.username, mostrar_datos_contacto=mostrar_datos_contacto)
 
         return Response(data={
             'status': 'OK',
             'msg': _('Exportación de grabaciones Zip en proceso'),
+            'trabajo_id': trabajo.pk,
         })
 
 
@@ -23,7 +23,6 @@ import logging as _logging
 
 import datetime
 import json
-import threading
 
 import redis
 
@@ -32,6 +31,7 @@ from django.views.generic import View
 from django.utils.translation import gettext as _
 from django.utils.timezone import now
 from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
 from django.db.models import Count
 from django.conf import settings
 from django.utils import timezone
@@ -52,25 +52,16 @@ from api_app.serializers.base import (
     AuditSupervisorRequestEventSerializer)
 from ominicontacto_app.models import (
     Campana, CalificacionCliente, AgenteProfile, AgendaContacto, AgenteEnContacto)
+from ominicontacto_app.services.asterisk.redis_database import RegistroAgentes
 from ominicontacto_app.services.asterisk.supervisor_activity import (
     SupervisorActivityAmiManager)
 from reportes_app.models import LlamadaLog
 from reportes_app.reportes.reporte_llamadas_supervision import (
     ReporteDeLLamadasEntrantesDeSupervision, )
 from reportes_app.reportes.reporte_llamadas import ReporteTipoDeLlamadasDeCampana
-from reportes_app.reportes.reporte_llamados_contactados_csv import (
-    ExportacionCampanaCSV, ReporteCalificadosCSV, ReporteContactadosCSV, ReporteNoAtendidosCSV)
-from ominicontacto_app.services.reporte_resultados_de_base_csv import (
-    ExportacionReporteCSV
-)
-from ominicontacto_app.services.reporte_resultados_de_base import (
-    ReporteContactacionesCSV
-)
 from reportes_app.reportes.reporte_llamadas_salientes import ReporteLlamadasSalienteFamily
-from ominicontacto_app.services.reporte_respuestas_formulario import (
-    ReporteFormularioGestionCampanaCSV)
-from ominicontacto_app.services.reporte_campana_calificacion import ReporteCalificacionesCampanaCSV
-from ominicontacto_app.services.reporte_campana_csv import ExportacionArchivoCampanaCSV
+from ominicontacto_app.services.sincronizacion_lista_wombat import SincronizacionListaWombat
+from ominicontacto_app.services.trabajos_segundo_plano import encolar_trabajo
 from ominicontacto_app.utiles import (
     datetime_hora_minima_dia, datetime_hora_maxima_dia, convert_fecha_datetime)
 from notification_app.notification import RedisStreamNotifier
@@ -446,31 +437,25 @@ class ExportarCSVMixin:
             "Date filter: from {0} to {1}".format(fecha_hasta, fecha_desde)
         logger.info(cadena_inicio_exportacion_info)
 
+    def obtener_rango_fechas(self, request):
+        fecha_desde = convert_fecha_datetime(request.data.get('desde'))
+        fecha_hasta = convert_fecha_datetime(request.data.get('hasta'))
+        fecha_desde = datetime.datetime.combine(fecha_desde, datetime.time.min)
+        fecha_hasta = datetime.datetime.combine(fecha_hasta, datetime.time.max)
+        return fecha_desde, fecha_hasta
+
+    def encolar_exportacion(self, request, tipo, key_task, campana, fecha_desde, fecha_hasta):
+        """ Registra la exportación para que la genere el procesador de trabajos """
+        return encolar_trabajo(
+            tipo, key_task, usuario=request.user, campana=campana, campana_id=campana.pk,
+            desde=fecha_desde.isoformat(), hasta=fecha_hasta.isoformat())
+
 
 class ExportarCSVResultadosBaseContactados(ExportarCSVMixin, APIView):
     permission_classes = (TienePermisoOML, )
     renderer_classes = (JSONRenderer, )
     http_method_names = ['post', ]
 
-    def generar_csv(self, key_task, campana, all_data):
-        reporte_csv = ReporteContactacionesCSV(
-            campana,
-            key_task,
-            all_data
-        )
-        datos_reporte = reporte_csv.datos
-        service_csv = ExportacionReporteCSV()
-        if all_data:
-            service_csv.exportar_reportes_csv(
-                campana,
-                datos_contactaciones_todos=datos_reporte
-            )
-        else:
-            service_csv.exportar_reportes_csv(
-                campana,
-                datos_contactaciones=datos_reporte
-            )
-
     def post(self, request):
         campana_id = request.data.get('campana_id')
         task_id = request.data.get('task_id')
@@ -483,17 +468,9 @@ class ExportarCSVResultadosBaseContactados(ExportarCSVMixin, APIView):
             task_id
         )
 
-        # Hilo para generación de reporte
-        thread_exportacion = threading.Thread(
-            target=self.generar_csv,
-            args=[
-                key_task,
-                campana,
-                all_data
-            ]
-        )
-        thread_exportacion.setDaemon(True)
-        thread_exportacion.start()
+        trabajo = encolar_trabajo(
+            'RESULTADOS_BASE', key_task, usuario=request.user, campana=campana,
+            campana_id=campana.pk, all_data=all_data)
 
         if all_data:
             log_info = 'resultados_de_base_contactaciones_todos'
@@ -512,6 +489,7 @@ class ExportarCSVResultadosBaseContactados(ExportarCSVMixin, APIView):
                 'status': 'OK',
                 'msg': _('Exportación de CSV en proceso'),
                 'id': task_id,
+                'trabajo_id': trabajo.pk,
             }
         )
 
@@ -521,36 +499,15 @@ class ExportarCSVContactados(ExportarCSVMixin, APIView):
     renderer_classes = (JSONRenderer, )
     http_method_names = ['post', ]
 
-    def generar_csv_contactados(self, key_task, campana, desde, hasta):
-
-        reporte_contactados_csv = ReporteContactadosCSV(
-            campana, key_task, desde, hasta)
-        datos_contactados = reporte_contactados_csv.datos
-        service_csv = ExportacionCampanaCSV()
-        service_csv.exportar_reportes_csv(campana, datos_contactados=datos_contactados)
-
     def post(self, request):
         campana_id = request.data.get('campana_id')
         task_id = request.data.get('task_id')
-        desde = request.data.get('desde')
-        hasta = request.data.get('hasta')
-        fecha_desde = convert_fecha_datetime(desde)
-        fecha_hasta = convert_fecha_datetime(hasta)
-        fecha_desde = datetime.datetime.combine(fecha_desde, datetime.time.min)
-        fecha_hasta = datetime.datetime.combine(fecha_hasta, datetime.time.max)
+        fecha_desde, fecha_hasta = self.obtener_rango_fechas(request)
         campana = Campana.objects.get(pk=campana_id)
 
-        # generar id para la operacion de acuerdo a (timestamp, campana, supervisor)
-        # obtener de request
-
         key_task = 'OML:STATUS_CSV_REPORT:CONTACTED:{0}:{1}'.format(campana_id, task_id)
-        # chequear si el supervisor esta asignado a la campaña
-        # chequear si la campaña existe
-
-        thread_exportacion = threading.Thread(
-            target=self.generar_csv_contactados, args=[key_task, campana, fecha_desde, fecha_hasta])
-        thread_exportacion.setDaemon(True)
-        thread_exportacion.start()
+        trabajo = self.encolar_exportacion(
+            request, 'CONTACTADOS', key_task, campana, fecha_desde, fecha_hasta)
 
         self.loguear_inicio_exportacion(
             'contactados', campana_id, request.user.username, fecha_hasta.strftime("%m/%d/%Y"),
@@ -560,6 +517,7 @@ class ExportarCSVContactados(ExportarCSVMixin, APIView):
             'status': 'OK',
             'msg': _('Exportación de contactados a .csv en proceso'),
             'id': task_id,
+            'trabajo_id': trabajo.pk,
         })
 
 
@@ -568,36 +526,15 @@ class ExportarCSVCalificados(ExportarCSVMixin, APIView):
     renderer_classes = (JSONRenderer, )
     http_method_names = ['post', ]
 
-    def generar_csv_calificados(self, key_task, campana, desde, hasta):
-
-        reporte_calificados_csv = ReporteCalificadosCSV(
-            campana, key_task, desde, hasta)
-        datos_calificados = reporte_calificados_csv.datos
-        service_csv = ExportacionCampanaCSV()
-        service_csv.exportar_reportes_csv(campana, datos_calificados=datos_calificados)
-
     def post(self, request):
         campana_id = request.data.get('campana_id')
         task_id = request.data.get('task_id')
-        desde = request.data.get('desde')
-        hasta = request.data.get('hasta')
-        fecha_desde = convert_fecha_datetime(desde)
-        fecha_hasta = convert_fecha_datetime(hasta)
-        fecha_desde = datetime.datetime.combine(fecha_desde, datetime.time.min)
-        fecha_hasta = datetime.datetime.combine(fecha_hasta, datetime.time.max)
+        fecha_desde, fecha_hasta = self.obtener_rango_fechas(request)
         campana = Campana.objects.get(pk=campana_id)
-        # generar id para la operacion de acuerdo a (timestamp, campana, supervisor)
-        # obtener de request
 
         key_task = 'OML:STATUS_CSV_REPORT:DISPOSITIONED:{0}:{1}'.format(campana_id, task_id)
-
-        # chequear si el supervisor esta asignado a la campaña
-        # chequear si la campaña existe
-
-        thread_exportacion = threading.Thread(
-            target=self.generar_csv_calificados, args=[key_task, campana, fecha_desde, fecha_hasta])
-        thread_exportacion.setDaemon(True)
-        thread_exportacion.start()
+        trabajo = self.encolar_exportacion(
+            request, 'CALIFICADOS', key_task, campana, fecha_desde, fecha_hasta)
 
         self.loguear_inicio_exportacion(
             'calificados', campana_id, request.user.username, fecha_hasta.strftime("%m/%d/%Y"),
@@ -607,6 +544,7 @@ class ExportarCSVCalificados(ExportarCSVMixin, APIView):
             'status': 'OK',
             'msg': _('Exportación de calificados a .csv en proceso'),
             'id': task_id,
+            'trabajo_id': trabajo.pk,
         })
 
 
@@ -615,37 +553,16 @@ class ExportarCSVNoAtendidos(ExportarCSVMixin, APIView):
     renderer_classes = (JSONRenderer, )
     http_method_names = ['post', ]
 
-    def generar_csv_no_atendidos(self, key_task, campana, desde, hasta):
-
-        reporte_no_atendidos_csv = ReporteNoAtendidosCSV(
-            campana, key_task, desde, hasta)
-        datos_no_atendidos = reporte_no_atendidos_csv.datos
-        service_csv = ExportacionCampanaCSV()
-        service_csv.exportar_reportes_csv(campana, datos_no_atendidos=datos_no_atendidos)
-
     def post(self, request):
         campana_id = request.data.get('campana_id')
         task_id = request.data.get('task_id')
-        desde = request.data.get('desde')
-        hasta = request.data.get('hasta')
-        fecha_desde = convert_fecha_datetime(desde)
-        fecha_hasta = convert_fecha_datetime(hasta)
-        fecha_desde = datetime.datetime.combine(fecha_desde, datetime.time.min)
-        fecha_hasta = datetime.datetime.combine(fecha_hasta, datetime.time.max)
+        fecha_desde, fecha_hasta = self.obtener_rango_fechas(request)
         campana = Campana.objects.get(pk=campana_id)
-        # generar id para la operacion de acuerdo a (timestamp, campana, supervisor)
-        # obtener de request
 
         key_task = 'OML:STATUS_CSV_REPORT:NOT_ATTENDED:{0}:{1}'.format(campana_id, task_id)
+        trabajo = self.encolar_exportacion(
+            request, 'NO_ATENDIDOS', key_task, campana, fecha_desde, fecha_hasta)
 
-        # chequear si el supervisor esta asignado a la campaña
-        # chequear si la campaña existe
-
-        thread_exportacion = threading.Thread(
-            target=self.generar_csv_no_atendidos,
-            args=[key_task, campana, fecha_desde, fecha_hasta])
-        thread_exportacion.setDaemon(True)
-        thread_exportacion.start()
         self.loguear_inicio_exportacion(
             'no atendidos', campana_id, request.user.username, fecha_hasta.strftime("%m/%d/%Y"),
             fecha_desde.strftime("%m/%d/%Y"))
@@ -654,6 +571,7 @@ class ExportarCSVNoAtendidos(ExportarCSVMixin, APIView):
             'status': 'OK',
             'msg': _('Exportación de no atendidos a .csv en proceso'),
             'id': task_id,
+            'trabajo_id': trabajo.pk,
         })
 
 
@@ -710,41 +628,43 @@ class ContactosAsignadosCampanaPreviewView(APIView):
         return Response(data=data_contacto)
 
 
+class SincronizacionListaCampanaView(APIView):
+    """ Devuelve el estado y el progreso de la última sincronización de la lista de contactos
+    de una campaña dialer con Wombat """
+    permission_classes = (TienePermisoOML, )
+    authentication_classes = (SessionAuthentication, ExpiringTokenAuthentication, )
+    renderer_classes = (JSONRenderer, )
+    http_method_names = ['get', ]
+
+    def get(self, request, pk_campana):
+        campana = get_object_or_404(Campana, pk=pk_campana, type=Campana.TYPE_DIALER)
+        sincronizacion = SincronizacionListaWombat(campana.pk)
+        estado = sincronizacion.obtener_estado()
+        return Response(data={
+            'status': 'OK',
+            'en_curso': sincronizacion.en_curso(),
+            'estado': estado.get('ESTADO'),
+            'total': int(estado.get('TOTAL', 0)),
+            'enviados': int(estado.get('ENVIADOS', 0)),
+            'error': estado.get('ERROR', ''),
+            'timestamp': int(estado['TIMESTAMP']) if 'TIMESTAMP' in estado else None,
+        })
+
+
 class ExportarCSVCalificacionesCampana(ExportarCSVMixin, APIView):
     permission_classes = (TienePermisoOML, )
     renderer_classes = (JSONRenderer, )
     http_method_names = ['post', ]
 
-    def generar_csv_calificaciones(sself, key_task, campana, desde, hasta):
-        reporte_calificados_csv = ReporteCalificacionesCampanaCSV(
-            campana, key_task, desde, hasta)
-        datos_calificados = reporte_calificados_csv.datos
-        service_csv = ExportacionArchivoCampanaCSV(campana, "calificados")
-        service_csv.exportar_reportes_csv(datos=datos_calificados)
-
     def post(self, request):
         campana_id = request.data.get('campana_id')
         task_id = request.data.get('task_id')
-        desde = request.data.get('desde')
-        hasta = request.data.get('hasta')
-        fecha_desde = convert_fecha_datetime(desde)
-        fecha_hasta = convert_fecha_datetime(hasta)
-        fecha_desde = datetime.datetime.combine(fecha_desde, datetime.time.min)
-        fecha_hasta = datetime.datetime.combine(fecha_hasta, datetime.time.max)
+        fecha_desde, fecha_hasta = self.obtener_rango_fechas(request)
         campana = Campana.objects.get(pk=campana_id)
-        # generar id para la operacion de acuerdo a (timestamp, campana, supervisor)
-        # obtener de request
 
         key_task = 'OML:STATUS_CSV_REPORT:DISPOSITIONED:{0}:{1}'.format(campana_id, task_id)
-
-        # chequear si el supervisor esta asignado a la campaña
-        # chequear si la campaña existe
-
-        thread_exportacion = threading.Thread(
-            target=self.generar_csv_calificaciones, args=[key_task, campana,
-                                                          fecha_desde, fecha_hasta])
-        thread_exportacion.setDaemon(True)
-        thread_exportacion.start()
+        trabajo = self.encolar_exportacion(
+            request, 'CALIFICACIONES', key_task, campana, fecha_desde, fecha_hasta)
 
         self.loguear_inicio_exportacion(
             'calificaciones', campana_id, request.user.username, fecha_hasta.strftime("%m/%d/%Y"),
@@ -754,6 +674,7 @@ class ExportarCSVCalificacionesCampana(ExportarCSVMixin, APIView):
             'status': 'OK',
             'msg': _('Exportación de calificaciones a .csv en proceso'),
             'id': task_id,
+            'trabajo_id': trabajo.pk,
         })
 
 
@@ -762,34 +683,15 @@ class ExportarCSVFormularioGestionCampana(ExportarCSVMixin, APIView):
     renderer_classes = (JSONRenderer, )
     http_method_names = ['post', ]
 
-    def generar_csv_gestion(sself, key_task, campana, desde, hasta):
-        reporte_gestion_csv = ReporteFormularioGestionCampanaCSV(
-            campana, key_task, desde, hasta)
-        datos_formulario_gestion = reporte_gestion_csv.datos
-        service_csv = ExportacionArchivoCampanaCSV(campana, "formulario_gestion")
-        service_csv.exportar_reportes_csv(datos=datos_formulario_gestion)
-
     def post(self, request):
         campana_id = request.data.get('campana_id')
         task_id = request.data.get('task_id')
-        desde = request.data.get('desde')
-        hasta = request.data.get('hasta')
-        fecha_desde = convert_fecha_datetime(desde)
-        fecha_hasta = convert_fecha_datetime(hasta)
-        fecha_desde = datetime.datetime.combine(fecha_desde, datetime.time.min)
-        fecha_hasta = datetime.datetime.combine(fecha_hasta, datetime.time.max)
+        fecha_desde, fecha_hasta = self.obtener_rango_fechas(request)
         campana = Campana.objects.get(pk=campana_id)
-        # generar id para la operacion de acuerdo a (timestamp, campana, supervisor)
-        # obtener de request
-        key_task = 'OML:STATUS_CSV_REPORT:ENGAGED_DISPOSITIONS:{0}:{1}'.format(campana_id, task_id)
-
-        # chequear si el supervisor esta asignado a la campaña
-        # chequear si la campaña existe
 
-        thread_exportacion = threading.Thread(
-            target=self.generar_csv_gestion, args=[key_task, campana, fecha_desde, fecha_hasta])
-        thread_exportacion.setDaemon(True)
-        thread_exportacion.start()
+        key_task = 'OML:STATUS_CSV_REPORT:ENGAGED_DISPOSITIONS:{0}:{1}'.format(campana_id, task_id)
+        trabajo = self.encolar_exportacion(
+            request, 'FORMULARIO_GESTION', key_task, campana, fecha_desde, fecha_hasta)
 
         self.loguear_inicio_exportacion(
             'gestion_calificaciones', campana_id, request.user.username,
@@ -799,6 +701,7 @@ class ExportarCSVFormularioGestionCampana(ExportarCSVMixin, APIView):
             'status': 'OK',
             'msg': _('Exportación de Formularios de Gestiones a .csv en proceso'),
             'id': task_id,
+            'trabajo_id': trabajo.pk,
         })
 
 
@@ -829,24 +732,19 @@ class DashboardSupervision(APIView):
 
     def _get_agentes_estados(self):
         data = dict.fromkeys(['ready', 'oncall', 'pause'], 0)
-        redis_connection = redis.Redis(
-            host=settings.REDIS_HOSTNAME, port=settings.CONSTANCE_REDIS_CONNECTION['port'],
-            decode_responses=True)
-        keys_agentes = redis_connection.keys('OML:AGENT*')
         cant_agentes_actives = 0
-        for key in keys_agentes:
-            agente_info = redis_connection.hgetall(key)
-            if agente_info['STATUS'].startswith('PAUSE'):
-                data['pause'] += 1
-                cant_agentes_actives += 1
-            if agente_info['STATUS'] == 'ONCALL':
-                data['oncall'] += 1
-                cant_agentes_actives += 1
-            if agente_info['STATUS'] == 'READY':
-                data['ready'] += 1
-                cant_agentes_actives += 1
-            if agente_info['STATUS'] == 'RINGING':
-                cant_agentes_actives += 1
+        for status, cantidad in RegistroAgentes().contar_por_status().items():
+            if status.startswith('PAUSE'):
+                data['pause'] += cantidad
+                cant_agentes_actives += cantidad
+            if status == 'ONCALL':
+                data['oncall'] += cantidad
+                cant_agentes_actives += cantidad
+            if status == 'READY':
+                data['ready'] += cantidad
+                cant_agentes_actives += cantidad
+            if status == 'RINGING':
+                cant_agentes_actives += cantidad
         redis_stream_notifier = RedisStreamNotifier()
         redis_stream_notifier.send('auth_event', cant_agentes_actives)
         return data
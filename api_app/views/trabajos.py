@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from __future__ import unicode_literals
+
+from django.shortcuts import get_object_or_404
+from django.utils.translation import gettext as _
+
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api_app.authentication import ExpiringTokenAuthentication
+from api_app.views.permissions import TienePermisoOML
+from ominicontacto_app.models import TrabajoSegundoPlano
+from ominicontacto_app.services.progreso_tareas import obtener_estado_progreso
+from ominicontacto_app.services.trabajos_segundo_plano import CANAL_PROGRESO, cancelar_trabajo
+
+
+class TrabajoSegundoPlanoMixin(object):
+    permission_classes = (TienePermisoOML, )
+    authentication_classes = (SessionAuthentication, ExpiringTokenAuthentication, )
+    renderer_classes = (JSONRenderer, )
+
+    def obtener_trabajo(self, request, pk):
+        """ Los usuarios de gestión acceden a todos los trabajos, el resto sólo a los propios """
+        trabajos = TrabajoSegundoPlano.objects.all()
+        if not request.user.get_tiene_permiso_administracion():
+            trabajos = trabajos.filter(usuario=request.user)
+        return get_object_or_404(trabajos, pk=pk)
+
+
+class TrabajoSegundoPlanoDetalle(TrabajoSegundoPlanoMixin, APIView):
+    """ Devuelve el estado y el progreso de un trabajo en segundo plano """
+    http_method_names = ['get']
+
+    def get(self, request, pk):
+        trabajo = self.obtener_trabajo(request, pk)
+        progreso = obtener_estado_progreso(CANAL_PROGRESO.format(trabajo.pk)) or {}
+        if trabajo.estado == TrabajoSegundoPlano.FINALIZADO:
+            progreso['porcentaje'] = 100
+        return Response(data={
+            'status': 'OK',
+            'id': trabajo.pk,
+            'tipo': trabajo.tipo,
+            'estado': trabajo.estado,
+            'estado_display': trabajo.get_estado_display(),
+            'progreso': progreso.get('porcentaje', 0),
+            'procesados': progreso.get('procesados'),
+            'total': progreso.get('total'),
+            'filas_por_segundo': progreso.get('filas_por_segundo'),
+            'eta': progreso.get('eta'),
+            'creado': trabajo.creado,
+            'finalizado': trabajo.finalizado,
+            'error': trabajo.error,
+        })
+
+
+class TrabajoSegundoPlanoCancelar(TrabajoSegundoPlanoMixin, APIView):
+    """ Cancela un trabajo pendiente o en curso """
+    http_method_names = ['post']
+
+    def post(self, request, pk):
+        trabajo = self.obtener_trabajo(request, pk)
+        if not cancelar_trabajo(trabajo):
+            return Response(data={
+                'status': 'ERROR',
+                'message': _('El trabajo ya no está pendiente ni en curso'),
+            })
+        return Response(data={
+            'status': 'OK',
+            'message': _('Trabajo cancelado'),
+        })
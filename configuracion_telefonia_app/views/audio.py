@@ -22,7 +22,6 @@ import logging
 import os
 import requests
 import tempfile
-import base64
 import json
 
 from django.urls import reverse
@@ -37,8 +36,8 @@ from configuracion_telefonia_app.models import AudiosAsteriskConf, MusicaDeEsper
 
 from ominicontacto_app.services.asterisk.playlist import PlaylistDirectoryManager
 from ominicontacto_app.views_archivo_de_audio import ArchivoDeAudioMixin
-from ominicontacto_app.asterisk_config import AudioConfigFile, PlaylistsConfigCreator
-from pathlib import Path
+from ominicontacto_app.asterisk_config import (
+    AudioConfigFile, PlaylistsConfigCreator, contenido_archivo_para_stream)
 from ominicontacto_app.services.redis.redis_streams import RedisStreams
 
 from utiles_globales import obtener_paginas
@@ -75,17 +74,15 @@ class AdicionarAudioAsteriskView(FormView):
             filename_full_path = self._download_asterisk_sound(language)
 
             __, nombre_archivo = os.path.split(filename_full_path)
-            sound_tar_data = Path(filename_full_path).read_bytes()
-            res = base64.b64encode(sound_tar_data)
-            res = res.decode('utf-8')
             redis_stream = RedisStreams()
             content = {
                 'archivo': nombre_archivo,
                 'type': 'ASTERISK_SOUNDS',
                 'action': 'COPY',
                 'language': language,
-                'content': res
             }
+            content.update(
+                contenido_archivo_para_stream(filename_full_path, redis_stream.connection))
             try:
                 audio_asterisk_conf = AudiosAsteriskConf \
                     .objects \
@@ -62,10 +62,9 @@ AWS_DEFAULT_REGION=us-east-1
 GOOGLE_MAPS_API_KEY={{ google_maps_api_key }}
 GOOGLE_MAPS_CENTER='{{ google_maps_center }}'
 {% endif %}
-# SQL logging variables
+# SQL profiler variables
 OML_LOGGING_SLOWSQL_ENABLED=
-OML_LOGGING_SLOWSQL_OUTPUT="-"
-OML_LOGGING_SLOWSQL_DURATION=1
+OML_PROFILER_SQL_TASA_MUESTREO=0.01
 # SMTP envars
 {% if email_backend is defined %}
 EMAIL_BACKEND={{ email_backend }}
@@ -225,6 +225,12 @@ SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 OML_DUMP_HTTP_AMI_RESPONSES = False
 
+OML_AMI_POOL_SIZE = 4
+"""Cantidad máxima de conexiones AMI logueadas que mantiene abiertas cada proceso"""
+
+OML_AMI_POOL_TIMEOUT = 10
+"""Segundos que se espera a que se libere una conexión AMI del pool"""
+
 # ==============================================================================
 # Settings de DEPLOY (para ser customizados en distintos deploys)
 #     Nota: Los settings que siguen, pueden (y algunos DEBEN) ser modificados
@@ -363,6 +369,151 @@ Ejemplo:
 OML_WOMBAT_TIMEOUT es el tiempo de timeout de la request hacia Wombat API
 """
 
+OML_WOMBAT_POOL_SIZE = 4
+"""Cantidad máxima de conexiones HTTP keep-alive hacia Wombat que mantiene cada proceso"""
+
+OML_WOMBAT_CONNECT_TIMEOUT = 5
+"""Segundos que se espera para establecer una conexión con la API de Wombat"""
+
+OML_WOMBAT_READ_TIMEOUT = 30
+"""Segundos que se espera la respuesta de la API de Wombat (salvo la carga de listas, que
+utiliza OML_WOMBAT_TIMEOUT)"""
+
+OML_WOMBAT_RETRIES = 2
+"""Reintentos ante errores al conectar con la API de Wombat. No se reintentan los pedidos que
+llegaron a enviarse, ya que las operaciones de Wombat no son idempotentes"""
+
+OML_WOMBAT_LISTA_LOTE = 10000
+"""Cantidad de contactos que se envían a Wombat en cada pedido al cargar la lista de una
+campaña"""
+
+OML_WOMBAT_ESPERA_REMOCION = 30
+"""Segundos máximos que se espera a que Wombat termine de remover una campaña antes de
+cambiar su lista de contactos"""
+
+# ==============================================================================
+# Interacciones con Sitios Externos
+# ==============================================================================
+
+OML_SITIO_EXTERNO_CONNECT_TIMEOUT = 5
+"""Segundos que se espera para establecer la conexión con un Sitio Externo"""
+
+OML_SITIO_EXTERNO_READ_TIMEOUT = 15
+"""Segundos que se espera la respuesta de un Sitio Externo"""
+
+OML_SITIO_EXTERNO_MAX_INTENTOS = 5
+"""Cantidad de intentos de envío de una interacción antes de marcarla como fallida"""
+
+OML_SITIO_EXTERNO_ESPERA_REINTENTO = 10
+"""Segundos de espera antes del primer reintento; se duplica en cada reintento"""
+
+OML_SITIO_EXTERNO_CONCURRENCIA = 4
+"""Cantidad máxima de pedidos simultáneos a un mismo Sitio Externo"""
+
+OML_SITIO_EXTERNO_HILOS = 16
+"""Cantidad de threads con que el comando procesar_interacciones_sitio_externo envía las
+interacciones"""
+
+OML_SITIO_EXTERNO_FALLAS_CIRCUITO = 5
+"""Fallas consecutivas de un Sitio Externo luego de las cuales se suspenden sus envíos"""
+
+OML_SITIO_EXTERNO_PAUSA_CIRCUITO = 60
+"""Segundos durante los cuales se suspenden los envíos a un Sitio Externo que falla"""
+
+# ==============================================================================
+# Planificador de tareas (comando planificador_tareas)
+# ==============================================================================
+
+OML_PLANIFICADOR_INTERVALOS = {
+    'logout_unavailable_agents': 120,
+    'actualizar_reportes_llamadas_entrantes': 60,
+    'actualizar_reportes_llamadas_salientes': 60,
+    'actualizar_reportes_llamadas_dialers': 60,
+    'actualizar_reporte_supervisores': 300,
+    'actualizar_reporte_dia_actual_agentes': 60,
+    'actualizar_resumenes_llamadas': 600,
+    'calcular_datos_wallboards': 60,
+}
+"""Segundos entre ejecuciones de cada comando periódico. Un intervalo vacío o 0 deshabilita
+la tarea"""
+
+OML_PLANIFICADOR_ESPERA_DETENCION = 60
+"""Segundos que se espera a que terminen las tareas en curso al detener el planificador"""
+
+# ==============================================================================
+# Profiler SQL (engine slowsql.postgresql)
+# ==============================================================================
+
+OML_PROFILER_SQL_TASA_MUESTREO = 0.01
+"""Fracción de las consultas SQL que mide el profiler"""
+
+OML_PROFILER_SQL_INTERVALO = 60
+"""Segundos entre cada envío a Redis de las mediciones acumuladas por un proceso"""
+
+OML_PROFILER_SQL_MUESTRAS = 500
+"""Cantidad máxima de duraciones que se guardan por consulta para calcular percentiles"""
+
+# ==============================================================================
+# Distribución de configuración y archivos a Asterisk (stream asterisk_conf_updater)
+# ==============================================================================
+
+OML_ASTERISK_CONF_UPDATER_DELTAS = False
+"""
+Si es True, los archivos de configuración se publican como mensajes CONF_DELTA y los audios
+por referencia a Redis. Requiere un consumidor del stream que entienda esos mensajes; si es
+False se publican los mensajes CONF_FILE completos y los audios en base64.
+"""
+
+OML_ASTERISK_ARCHIVOS_TAMANO_PARTE = 512 * 1024
+"""Tamaño en bytes de las partes en que se guardan en Redis los audios enviados a Asterisk"""
+
+OML_ASTERISK_ARCHIVOS_EXPIRACION = 24 * 60 * 60
+"""Segundos que se conservan en Redis los audios enviados a Asterisk"""
+
+# ==============================================================================
+# Trabajos en segundo plano (comando procesar_trabajos)
+# ==============================================================================
+
+OML_TRABAJOS_CONCURRENCIA = 2
+"""Cantidad de trabajos que ejecuta a la vez cada procesador de trabajos"""
+
+OML_TRABAJOS_TTL_RESULTADO = 5 * 60
+"""Segundos durante los que se reutiliza el resultado de un trabajo para pedidos iguales"""
+
+OML_TRABAJOS_DURACION_MAXIMA = 2 * 60 * 60
+"""Segundos luego de los cuales se interrumpe un trabajo en curso"""
+
+OML_TRABAJOS_VENCIMIENTO_LATIDO = 2 * 60
+"""Segundos sin novedades del procesador luego de los cuales un trabajo en curso se reencola"""
+
+OML_TRABAJOS_MAX_INTENTOS = 3
+"""Cantidad máxima de veces que se reencola un trabajo abandonado"""
+
+OML_PROGRESO_INTERVALO = 1
+"""Segundos luego de los cuales se publica el progreso de una tarea aunque avance poco"""
+
+OML_PROGRESO_PASO = 5
+"""Puntos porcentuales de avance a partir de los cuales se publica el progreso de una tarea"""
+
+# ==============================================================================
+# Ingesta de queue_log (comando ingestar_queue_log)
+# ==============================================================================
+
+OML_INGESTA_QUEUE_LOG_LOTE = 5000
+"""Cantidad máxima de queue_log que se procesan por transacción"""
+
+OML_INGESTA_QUEUE_LOG_ESPERA = 1
+"""Segundos que se espera a que lleguen nuevos queue_log luego de procesar los pendientes"""
+
+OML_INGESTA_QUEUE_LOG_ESPERA_HUECO = 5
+"""Segundos que se espera por un id de queue_log faltante (insert aún no confirmado)"""
+
+OML_INGESTA_QUEUE_LOG_MAXLEN = 100000
+"""Cantidad aproximada de eventos que se mantienen en el stream de Redis de queue_log"""
+
+OML_SUPERVISION_ESPERA_HUECO = 10
+"""Segundos que la supervisión incremental espera por un id de LlamadaLog faltante"""
+
 CALIFICACION_REAGENDA = None
 
 # configuración de Django Rest Framework
@@ -54,6 +54,9 @@ try:
 except ImportError:
     raise Exception("No se pudo importar oml_settings_local")
 
+if LOGGING_SLOWSQL_ENABLED:
+    MIDDLEWARE_PREPPEND.append('slowsql.middleware.ProfilerSQLMiddleware')
+
 (MIDDLEWARE_PREPPEND, MIDDLEWARE_APPEND, MIDDLEWARE_CLASSES,
  TEMPLATES_CONTEXT_PROCESORS_APPEND, TEMPLATES) = process_middleware_settings(
      MIDDLEWARE_PREPPEND, MIDDLEWARE_APPEND, MIDDLEWARE_CLASSES,
@@ -116,10 +116,8 @@ assert os.path.split(_logging_output_file)[0] == "",\
     "La variable de entorno OML_LOGFILE solo debe contener " +\
     "el nombre del archivo, SIN directorios."
 
-LOGGING_SLOWSQL_OUTPUT = os.getenv("OML_LOGGING_SLOWSQL_OUTPUT", "-")
-LOGGING_SLOWSQL_DURATION = float(os.getenv("OML_LOGGING_SLOWSQL_DURATION", "1"))
 LOGGING_SLOWSQL_ENABLED = bool(os.getenv("OML_LOGGING_SLOWSQL_ENABLED", False))
-LOGGING_SLOWSQL_FORMAT = os.getenv("OML_LOGGING_SLOWSQL_FORMAT", "text")
+OML_PROFILER_SQL_TASA_MUESTREO = float(os.getenv("OML_PROFILER_SQL_TASA_MUESTREO", "0.01"))
 
 if LOGGING_SLOWSQL_ENABLED:
     for backend in DATABASES:
@@ -129,21 +127,11 @@ LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
-        'slowsql': {
-            '()': 'slowsql.LoggingFormatter',
-            'format': LOGGING_SLOWSQL_FORMAT,
-        },
         'verbose': {
             'format': ('%(asctime)-15s [%(levelname)7s] '
                        '%(name)20s - %(message)s')
         },
     },
-    'filters': {
-        'slowsql': {
-            '()': 'slowsql.LoggingFilter',
-            'duration': LOGGING_SLOWSQL_DURATION,
-        },
-    },
     'handlers': {
         'null': {
             'level': 'DEBUG',
@@ -160,23 +148,8 @@ LOGGING = {
             'filename': '{0}/log/{1}'.format(INSTALL_PREFIX, _logging_output_file),
             'formatter': 'verbose'
         },
-        'slowsql': {
-            'class': 'logging.StreamHandler',
-            'filters': ['slowsql'],
-            'formatter': 'slowsql',
-        } if LOGGING_SLOWSQL_OUTPUT == '-' else {
-            'class': 'logging.FileHandler',
-            'filename': '{0}/log/{1}.slowsql'.format(INSTALL_PREFIX, LOGGING_SLOWSQL_OUTPUT),
-            'filters': ['slowsql'],
-            'formatter': 'slowsql',
-        },
     },
     'loggers': {
-        'django.db.backends': {
-            'handlers': ['slowsql'],
-            'level': "DEBUG" if LOGGING_SLOWSQL_ENABLED else "NOTSET",
-            'propagate': False,
-        },
         '': {
             'handlers': ['console', 'file'],
             'level': 'INFO',
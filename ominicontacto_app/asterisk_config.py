@@ -22,14 +22,15 @@ Genera archivos de configuración para Asterisk: dialplan y queues.
 
 from __future__ import unicode_literals
 
+import base64
 import datetime
 import os
-import tempfile
 import traceback
 import time
 import json
-import base64
-from pathlib import Path
+import hashlib
+import uuid
+from collections import OrderedDict
 
 from django.conf import settings
 from django.utils.translation import gettext as _
@@ -141,7 +142,7 @@ class SipConfigCreator(object):
                         param_failed)
                 config_chunk = generador_failed.generar_pedazo()
 
-            sip.append(config_chunk)
+            sip.append(('agente-{0}'.format(agente.pk), config_chunk))
 
         supervisores = self._obtener_supervisores_para_generar_config_sip()
 
@@ -175,7 +176,7 @@ class SipConfigCreator(object):
                     self._generador_factory.crear_generador_para_failed(
                         param_failed)
                 config_chunk = generador_failed.generar_pedazo()
-            sip.append(config_chunk)
+            sip.append(('supervisor-{0}'.format(supervisor.pk), config_chunk))
 
         clientes = ClienteWebPhoneProfile.objects.all()
         for cliente in clientes:
@@ -208,7 +209,7 @@ class SipConfigCreator(object):
                     self._generador_factory.crear_generador_para_failed(
                         param_failed)
                 config_chunk = generador_failed.generar_pedazo()
-            sip.append(config_chunk)
+            sip.append(('cliente-{0}'.format(cliente.pk), config_chunk))
 
         self._sip_config_file.write(sip)
 
@@ -385,7 +386,7 @@ class QueuesCreator(object):
                         param_failed)
                 config_chunk = generador_failed.generar_pedazo()
 
-            dialplan.append(config_chunk)
+            dialplan.append(('campana-{0}'.format(campana.pk), config_chunk))
         campanas_entrantes = self._obtener_todas_entrante_para_generar_dialplan()
         for campana in campanas_entrantes:
             logger.info(_("Creando dialplan para queue {0}".format(campana.nombre)))
@@ -415,7 +416,7 @@ class QueuesCreator(object):
                         param_failed)
                 config_chunk = generador_failed.generar_pedazo()
 
-            dialplan.append(config_chunk)
+            dialplan.append(('campana-{0}'.format(campana.pk), config_chunk))
 
         self._queues_config_file.write(dialplan)
 
@@ -756,76 +757,168 @@ class AsteriskMOHConfigReloader(object):
 
 
 class ConfigFile(object):
+    """
+    Archivo de configuración que se envía a Asterisk por el stream asterisk_conf_updater.
+
+    El archivo se genera por partes (un agente, una campaña, etc.), identificadas por una
+    clave. Las partes vigentes, su orden y el hash de su contenido se guardan en Redis, y en
+    el stream sólo se publica un mensaje CONF_DELTA con las partes que cambiaron:
+
+        {'archivo': nombre del archivo, 'type': 'CONF_DELTA', 'modulo': módulo a recargar,
+         'version': versión del archivo, 'partes': {clave: contenido},
+         'eliminadas': [claves], 'orden': [claves] (sólo si cambió)}
+
+    Si el consumidor recibe una versión que no es la siguiente a la que aplicó (por ejemplo
+    porque el stream se recortó), reconstruye el archivo a partir de las keys de Redis.
+
+    Mientras OML_ASTERISK_CONF_UPDATER_DELTAS sea False se publica el archivo completo en un
+    mensaje CONF_FILE: {'archivo': nombre del archivo, 'content': texto, 'type': 'CONF_FILE'}
+    """
+
+    KEY_PARTES = 'OML:ASTERISK_CONF:{0}:PARTES'
+    KEY_HASHES = 'OML:ASTERISK_CONF:{0}:HASHES'
+    KEY_ORDEN = 'OML:ASTERISK_CONF:{0}:ORDEN'
+    KEY_VERSION = 'OML:ASTERISK_CONF:{0}:VERSION'
+    STREAM = 'asterisk_conf_updater'
+    MODULO = None
+
     def __init__(self, filename):
         self._filename = filename
+        __, self.nombre_archivo = os.path.split(filename)
+
+    def _obtener_partes(self, contenidos):
+        """ Los contenidos son textos o tuplas (clave, texto). Las claves por defecto son
+        la posición del texto en el archivo """
+        partes = OrderedDict()
+        for posicion, contenido in enumerate(contenidos):
+            if isinstance(contenido, tuple):
+                clave, contenido = contenido
+            else:
+                clave = str(posicion)
+            assert isinstance(contenido, str), \
+                _("Objeto NO es unicode: {0}".format(type(contenido)))
+            partes[clave] = contenido
+        return partes
 
     def write(self, contenidos):
-        tmp_fd, tmp_filename = tempfile.mkstemp()
-        try:
-            tmp_file_obj = os.fdopen(tmp_fd, 'w', encoding='utf-8')
-            contenidos_str = ''
-            for contenido in contenidos:
-                assert isinstance(contenido, str), \
-                    _("Objeto NO es unicode: {0}".format(type(contenido)))
-                tmp_file_obj.write(contenido)
-                contenidos_str += contenido
-
-            tmp_file_obj.close()
-
-            redis_stream = RedisStreams()
-            __, nombre_archivo = os.path.split(self._filename)
-            content = {
-                'archivo': nombre_archivo,
-                'content': contenidos_str,
-                'type': 'CONF_FILE'
+        """ Publica los cambios del archivo y devuelve True si hubo alguno """
+        partes = self._obtener_partes(contenidos)
+        if not settings.OML_ASTERISK_CONF_UPDATER_DELTAS:
+            return self._publicar_archivo_completo(partes)
+        hashes = {clave: hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+                  for clave, contenido in partes.items()}
+        orden = list(partes)
+        key_hashes = self.KEY_HASHES.format(self.nombre_archivo)
+        key_orden = self.KEY_ORDEN.format(self.nombre_archivo)
+        key_version = self.KEY_VERSION.format(self.nombre_archivo)
+
+        def publicar_cambios(pipeline):
+            hashes_anteriores = pipeline.hgetall(key_hashes)
+            orden_anterior = pipeline.get(key_orden)
+            version = int(pipeline.get(key_version) or 0) + 1
+            cambios = {clave: partes[clave] for clave in orden
+                       if hashes_anteriores.get(clave) != hashes[clave]}
+            eliminadas = [clave for clave in hashes_anteriores if clave not in partes]
+            cambio_orden = orden_anterior is None or json.loads(orden_anterior) != orden
+            if not cambios and not eliminadas and not cambio_orden:
+                return False
+            mensaje = {
+                'archivo': self.nombre_archivo,
+                'type': 'CONF_DELTA',
+                'modulo': self.MODULO,
+                'version': version,
+                'partes': cambios,
+                'eliminadas': eliminadas,
             }
-            redis_stream.write_stream('asterisk_conf_updater', json.dumps(content))
-
-        finally:
-            try:
-                os.remove(tmp_filename)
-            except Exception as e:
-                logger.exception(_("Error {0} al intentar borrar temporal {1}".format(
-                    e, tmp_filename)))
+            if cambio_orden:
+                mensaje['orden'] = orden
+            pipeline.multi()
+            key_partes = self.KEY_PARTES.format(self.nombre_archivo)
+            if cambios:
+                pipeline.hset(key_partes, mapping=cambios)
+                pipeline.hset(key_hashes, mapping={clave: hashes[clave] for clave in cambios})
+            if eliminadas:
+                pipeline.hdel(key_partes, *eliminadas)
+                pipeline.hdel(key_hashes, *eliminadas)
+            pipeline.set(key_orden, json.dumps(orden))
+            pipeline.set(key_version, version)
+            # El mensaje se agrega en la misma transacción para que las versiones lleguen en orden
+            pipeline.execute_command('XADD', self.STREAM, 'MAXLEN', '~', 100, '*',
+                                     'value', json.dumps(mensaje))
+            return True
+
+        redis_stream = RedisStreams()
+        return redis_stream.connection.transaction(
+            publicar_cambios, key_hashes, key_orden, key_version, value_from_callable=True)
+
+    def _publicar_archivo_completo(self, partes):
+        redis_stream = RedisStreams()
+        # Sin las partes guardadas, el primer CONF_DELTA al habilitar los deltas lleva todo el
+        # archivo. La versión se conserva para que el consumidor no la tome como repetida.
+        redis_stream.connection.delete(
+            self.KEY_PARTES.format(self.nombre_archivo),
+            self.KEY_HASHES.format(self.nombre_archivo),
+            self.KEY_ORDEN.format(self.nombre_archivo))
+        content = {
+            'archivo': self.nombre_archivo,
+            'content': ''.join(partes.values()),
+            'type': 'CONF_FILE'
+        }
+        redis_stream.write_stream(self.STREAM, json.dumps(content))
+        return True
 
 
 class SipConfigFile(ConfigFile):
+    MODULO = AsteriskConfigReloader.AGENTS_SIP_MODULE
+
     def __init__(self):
         filename = settings.OML_SIP_FILENAME.strip()
         super(SipConfigFile, self).__init__(filename)
 
 
 class QueuesConfigFile(ConfigFile):
+    MODULO = 'app_queue.so'
+
     def __init__(self):
         filename = settings.OML_QUEUES_FILENAME.strip()
         super(QueuesConfigFile, self).__init__(filename)
 
 
 class RutasSalientesConfigFile(ConfigFile):
+    MODULO = AsteriskConfigReloader.OUT_ROUTE_MODULE
+
     def __init__(self):
         filename = settings.OML_RUTAS_SALIENTES_FILENAME.strip()
         super(RutasSalientesConfigFile, self).__init__(filename)
 
 
 class ChanSipTrunksConfigFile(ConfigFile):
+    MODULO = 'chan_sip.so'
+
     def __init__(self):
         filename = "oml_sip_trunks.conf"
         super(ChanSipTrunksConfigFile, self).__init__(filename)
 
 
 class PJSipTrunksConfigFile(ConfigFile):
+    MODULO = AsteriskConfigReloader.SIP_TRUNKS_MODULE
+
     def __init__(self):
         filename = "oml_pjsip_trunks.conf"
         super(PJSipTrunksConfigFile, self).__init__(filename)
 
 
 class SipRegistrationsConfigFile(ConfigFile):
+    MODULO = 'chan_sip.so'
+
     def __init__(self):
         filename = "oml_sip_registrations.conf"
         super(SipRegistrationsConfigFile, self).__init__(filename)
 
 
 class PlaylistsConfigFile(ConfigFile):
+    MODULO = AsteriskConfigReloader.MOH_MODULE
+
     def __init__(self):
         filename = "oml_moh.conf"
         super(PlaylistsConfigFile, self).__init__(filename)
@@ -854,8 +947,9 @@ class AudioConfigFile(object):
             'archivo': self.nombre_archivo,
             'type': 'AUDIO_CUSTOM',
             'action': 'COPY',
-            'content': self._encode_audio_base64_str()
         }
+        content.update(contenido_archivo_para_stream(
+            self._obtener_archivo_local(), self.redis_stream.connection))
         self.redis_stream.write_stream('asterisk_conf_updater', json.dumps(content))
 
     def delete_asterisk(self):
@@ -868,12 +962,63 @@ class AudioConfigFile(object):
         }
         self.redis_stream.write_stream('asterisk_conf_updater', json.dumps(content))
 
-    def _encode_audio_base64_str(self):
+    def _obtener_archivo_local(self):
         media_root = settings.MEDIA_ROOT.replace('//', '/')
         if os.getenv('S3_STORAGE_ENABLED'):
             s3_handler = StorageService()
             s3_handler.download_file(self.file_name, media_root, 'media_root')
-
-        data = Path(self._filename).read_bytes()
-        res = base64.b64encode(data)
-        return res.decode('utf-8')
+        return self._filename
+
+
+KEY_ARCHIVO = 'OML:ASTERISK_ARCHIVO:{0}'
+
+
+def _leer_partes(ruta, tamano_parte):
+    with open(ruta, 'rb') as archivo:
+        for parte in iter(lambda: archivo.read(tamano_parte), b''):
+            yield parte
+
+
+def guardar_archivo_en_redis(ruta, redis_connection):
+    """
+    Guarda el archivo en Redis como una lista de partes de OML_ASTERISK_ARCHIVOS_TAMANO_PARTE
+    bytes, para que el stream asterisk_conf_updater sólo lleve la referencia. Devuelve la key
+    ('referencia'), la cantidad de partes, el sha1 y el tamaño del archivo.
+    La key depende del contenido, de modo que un archivo ya guardado no se vuelve a copiar.
+    """
+    tamano_parte = settings.OML_ASTERISK_ARCHIVOS_TAMANO_PARTE
+    expiracion = settings.OML_ASTERISK_ARCHIVOS_EXPIRACION
+    sha1 = hashlib.sha1()
+    tamano = 0
+    for parte in _leer_partes(ruta, tamano_parte):
+        sha1.update(parte)
+        tamano += len(parte)
+    key = KEY_ARCHIVO.format(sha1.hexdigest())
+    if tamano and not redis_connection.expire(key, expiracion):
+        # Se copia en una key temporal y se renombra, para que nunca se lea un archivo a medias
+        key_temporal = '{0}:{1}'.format(key, uuid.uuid4().hex)
+        for numero, parte in enumerate(_leer_partes(ruta, tamano_parte)):
+            redis_connection.rpush(key_temporal, parte)
+            if numero == 0:
+                redis_connection.expire(key_temporal, expiracion)
+        redis_connection.rename(key_temporal, key)
+    return {
+        'referencia': key,
+        'partes': -(-tamano // tamano_parte),
+        'sha1': sha1.hexdigest(),
+        'tamano': tamano,
+    }
+
+
+def contenido_archivo_para_stream(ruta, redis_connection):
+    """
+    Devuelve los campos con el contenido del archivo para un mensaje del stream
+    asterisk_conf_updater: el archivo en base64 en 'content' o, si está habilitado
+    OML_ASTERISK_CONF_UPDATER_DELTAS, 'content' vacío y la referencia a Redis.
+    """
+    if not settings.OML_ASTERISK_CONF_UPDATER_DELTAS:
+        with open(ruta, 'rb') as archivo:
+            return {'content': base64.b64encode(archivo.read()).decode('utf-8')}
+    campos = {'content': ''}
+    campos.update(guardar_archivo_en_redis(ruta, redis_connection))
+    return campos
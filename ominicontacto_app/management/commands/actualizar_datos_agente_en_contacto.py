@@ -19,7 +19,6 @@ from __future__ import unicode_literals
 
 import logging
 import json
-from ast import literal_eval
 
 from django.core.management.base import BaseCommand
 from django.utils.translation import gettext as _
@@ -56,8 +55,7 @@ class Command(BaseCommand):
         modificados = 0
         creados = 0
         for contacto in bd_contacto.contactos.all():
-            datos_contacto = literal_eval(contacto.datos)
-            datos_contacto = dict(zip(campos_contacto, literal_eval(contacto.datos)))
+            datos_contacto = dict(zip(campos_contacto, contacto.lista_de_datos()))
             datos_contacto_json = json.dumps(datos_contacto)
             defaults = {
                 'agente_id': -1,
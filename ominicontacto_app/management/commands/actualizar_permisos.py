@@ -19,11 +19,12 @@ from __future__ import unicode_literals
 from django.utils.translation import gettext as _
 from django.apps import apps
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from django.contrib.auth.models import Group
 from ominicontacto_app.errors import OmlError
 from ominicontacto_app.models import User
-from ominicontacto_app.permisos import PermisoOML, DESCRIPCIONES
+from ominicontacto_app.permisos import PermisoOML, DESCRIPCIONES, cache_permisos_oml
 
 
 class Command(BaseCommand):
@@ -52,6 +53,7 @@ class Command(BaseCommand):
         # Se persisten así al final los permisos para cada grupo para que sea más rápido que
         # persistir los grupos de cada permiso por cada permiso gestionado.
         gestor_de_permisos.persistir_permisos()
+        transaction.on_commit(cache_permisos_oml.invalidar)
 
         # TODO: Discutir
         # Borrar permisos viejos que ya no están en nombres_de_permisos.
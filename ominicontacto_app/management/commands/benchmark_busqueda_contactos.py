@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ominicontacto_app.models import BaseDatosContacto, Contacto
+
+
+class RollbackBenchmark(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Mide la latencia de las búsquedas de contactos por teléfono y por datos sobre bases de
+    contactos simuladas. Los contactos se crean dentro de una transacción que se descarta al
+    finalizar, por lo que la base de datos queda sin cambios.
+    """
+
+    help = u'Mide la latencia de búsqueda de contactos con distintas cantidades de contactos'
+
+    TELEFONO_INICIAL = 3510000000
+    LOTE_INSERCION = 1000000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contactos', nargs='+', type=int,
+                            default=[1000000, 10000000, 50000000],
+                            help=u'Cantidades de contactos a simular (acumulativas)')
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def _insertar_contactos(self, bd_contacto, desde, hasta):
+        with connection.cursor() as cursor:
+            for inicio in range(desde, hasta + 1, self.LOTE_INSERCION):
+                fin = min(inicio + self.LOTE_INSERCION - 1, hasta)
+                cursor.execute(
+                    "INSERT INTO ominicontacto_app_contacto "
+                    "(telefono, datos, bd_contacto_id, es_originario) "
+                    "SELECT (%s + i)::text, "
+                    "json_build_array('Nombre ' || i, 'Cliente ' || md5(i::text))::text, %s, true "
+                    "FROM generate_series(%s, %s) AS i",
+                    [self.TELEFONO_INICIAL, bd_contacto.pk, inicio, fin])
+            cursor.execute('ANALYZE ominicontacto_app_contacto')
+
+    def _medir(self, funcion, repeticiones):
+        tiempos = []
+        for i in range(repeticiones):
+            inicio = perf_counter()
+            funcion()
+            tiempos.append(perf_counter() - inicio)
+        return min(tiempos) * 1000
+
+    def _buscar(self, contactos):
+        # Igual que la API de contactos del agente: total filtrado y una página
+        contactos.count()
+        list(contactos.order_by('pk')[:10])
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        self.stdout.write(u'contactos | telefono (ms) | datos (ms)')
+        try:
+            with transaction.atomic():
+                bd_contacto = BaseDatosContacto.objects.create(
+                    nombre='benchmark_busqueda_contactos', estado=BaseDatosContacto.ESTADO_DEFINIDA)
+                cantidad_actual = 0
+                for cantidad in sorted(options['contactos']):
+                    self._insertar_contactos(bd_contacto, cantidad_actual + 1, cantidad)
+                    cantidad_actual = cantidad
+                    muestra = cantidad // 2
+                    telefono = str(self.TELEFONO_INICIAL + muestra)[-7:]
+                    dato = 'Nombre {0}'.format(muestra)
+                    tiempo_telefono = self._medir(
+                        lambda: self._buscar(Contacto.objects.contactos_by_telefono(telefono)),
+                        repeticiones)
+                    tiempo_datos = self._medir(
+                        lambda: self._buscar(Contacto.objects.contactos_by_filtro_bd_contacto(
+                            bd_contacto, dato)),
+                        repeticiones)
+                    self.stdout.write(u'{0} | {1:.1f} | {2:.1f}'.format(
+                        cantidad, tiempo_telefono, tiempo_datos))
+                raise RollbackBenchmark()
+        except RollbackBenchmark:
+            pass
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from time import perf_counter, time
+
+import redis
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ominicontacto_app.services.asterisk.redis_database import RegistroAgentes
+
+
+class Command(BaseCommand):
+    """
+    Compara la lectura del estado de los agentes recorriendo las keys OML:AGENT* contra la
+    lectura a partir del registro de agentes, con families de agentes simuladas.
+    """
+
+    help = u'Mide la lectura de estados de agentes con KEYS y con el registro de agentes'
+
+    STATUS = ['READY', 'ONCALL', 'PAUSE-ACW', 'PAUSE-Almuerzo', 'RINGING', 'OFFLINE']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agentes', nargs='+', type=int, default=[1000, 5000, 10000],
+                            help=u'Cantidades de agentes a simular')
+        parser.add_argument('--db', type=int, default=15,
+                            help=u'Base de Redis (vacía) donde crear los datos simulados')
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def _crear_agentes(self, redis_connection, cantidad):
+        pipeline = redis_connection.pipeline(transaction=False)
+        timestamp = str(int(time()))
+        for id_agente in range(1, cantidad + 1):
+            pipeline.hset('OML:AGENT:{0}'.format(id_agente), mapping={
+                'NAME': 'Agente {0}'.format(id_agente),
+                'SIP': 1000 + id_agente,
+                'STATUS': self.STATUS[id_agente % len(self.STATUS)],
+                'TIMESTAMP': timestamp})
+            pipeline.sadd(RegistroAgentes.KEY, id_agente)
+        pipeline.execute()
+
+    def _leer_con_keys(self, redis_connection):
+        return [redis_connection.hgetall(key) for key in redis_connection.keys('OML:AGENT*')]
+
+    def _medir(self, funcion, repeticiones):
+        tiempos = []
+        for i in range(repeticiones):
+            inicio = perf_counter()
+            funcion()
+            tiempos.append(perf_counter() - inicio)
+        return min(tiempos) * 1000
+
+    def handle(self, *args, **options):
+        redis_connection = redis.Redis(
+            host=settings.REDIS_HOSTNAME, port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+            db=options['db'], decode_responses=True)
+        if redis_connection.dbsize() > 0:
+            raise CommandError(u'La base {0} de Redis no está vacía'.format(options['db']))
+
+        registro = RegistroAgentes(redis_connection)
+        repeticiones = options['repeticiones']
+        self.stdout.write(u'agentes | KEYS + HGETALL (ms) | registro pipeline (ms) | '
+                          u'conteo por status lua (ms)')
+        try:
+            for cantidad in options['agentes']:
+                redis_connection.flushdb()
+                self._crear_agentes(redis_connection, cantidad)
+                tiempo_keys = self._medir(
+                    lambda: self._leer_con_keys(redis_connection), repeticiones)
+                tiempo_registro = self._medir(registro.obtener_datos_agentes, repeticiones)
+                tiempo_conteo = self._medir(registro.contar_por_status, repeticiones)
+                self.stdout.write(u'{0} | {1:.1f} | {2:.1f} | {3:.1f}'.format(
+                    cantidad, tiempo_keys, tiempo_registro, tiempo_conteo))
+        finally:
+            redis_connection.flushdb()
@@ -73,7 +73,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         try:
-            # TODO: Estas 2 funciones generan conexiones distintas a asterisk AMIManagerConnector.
+            # Ambas funciones reutilizan la misma conexión AMI del pool
             self.logout_expired_sessions()
             self.set_agent_unavailable_state_redis()
         except Exception as e:
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import logging
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ominicontacto_app.services.planificador_tareas import (
+    PlanificadorTareas, obtener_tareas_programadas)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Ejecuta las tareas periódicas de OMniLeads hasta recibir SIGTERM o SIGINT.
+    """
+
+    help = u"Ejecuta las tareas periódicas de OMniLeads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estado', action='store_true', dest='estado',
+                            help=u"Muestra las métricas de las tareas y termina")
+
+    def handle(self, *args, **options):
+        planificador = PlanificadorTareas(obtener_tareas_programadas())
+        if options['estado']:
+            for nombre, metricas in sorted(planificador.obtener_metricas().items()):
+                self.stdout.write('{0}: {1}'.format(nombre, metricas))
+            return
+
+        def detener(signum, frame):
+            logger.info('Deteniendo el planificador de tareas')
+            planificador.detener()
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+        planificador.iniciar()
+        logger.info('Planificador de tareas iniciado: {0}'.format(
+            ', '.join(tarea.nombre for tarea in planificador.tareas)))
+        # signal.pause() permite que el thread principal atienda las señales
+        while not planificador.detenido():
+            signal.pause()
+        planificador.esperar(settings.OML_PLANIFICADOR_ESPERA_DETENCION)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ominicontacto_app.services.sistema_externo.procesador_interacciones import (
+    ProcesadorInteraccionesSitioExterno)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Envía las interacciones con Sitios Externos registradas por las vistas del agente.
+    """
+
+    help = u"Envía las interacciones pendientes con Sitios Externos."
+
+    ESPERA = 1
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', dest='una_vez',
+                            help=u"Procesa las interacciones pendientes y termina")
+
+    def handle(self, *args, **options):
+        procesador = ProcesadorInteraccionesSitioExterno()
+        while True:
+            close_old_connections()
+            try:
+                cantidad = procesador.procesar_pendientes()
+            except Exception as e:
+                logger.exception(
+                    'Error procesando interacciones con sitios externos: {0}'.format(e))
+                cantidad = 0
+            if options['una_vez']:
+                break
+            if not cantidad:
+                time.sleep(self.ESPERA)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ominicontacto_app.services.procesador_trabajos import ProcesadorTrabajos
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Ejecuta los trabajos en segundo plano (exportaciones, zip de grabaciones) hasta recibir
+    SIGTERM o SIGINT. Los trabajos en curso al detenerse quedan pendientes.
+    """
+
+    help = u"Ejecuta los trabajos en segundo plano pendientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, dest='concurrencia',
+                            help=u"Cantidad de trabajos que se ejecutan a la vez")
+
+    def handle(self, *args, **options):
+        procesador = ProcesadorTrabajos(concurrencia=options['concurrencia'])
+        detenido = []
+
+        def detener(signum, frame):
+            logger.info('Deteniendo el procesador de trabajos')
+            detenido.append(signum)
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+        try:
+            while not detenido:
+                close_old_connections()
+                try:
+                    procesador.procesar()
+                except Exception as e:
+                    logger.exception('Error procesando trabajos: {0}'.format(e))
+                    time.sleep(ProcesadorTrabajos.ESPERA)
+        finally:
+            procesador.detener()
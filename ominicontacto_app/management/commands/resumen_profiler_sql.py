@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from django.core.management.base import BaseCommand
+
+from slowsql.profiler import obtener_resumen, reiniciar
+
+
+class Command(BaseCommand):
+    """
+    Muestra las consultas SQL que más tiempo consumen según el profiler SQL
+    (engine slowsql.postgresql).
+    """
+
+    help = u"Muestra el resumen del profiler SQL por URL / comando y consulta."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contexto', dest='contexto',
+                            help=u"Sólo consultas de un contexto, ej: url:api_agent_contacts")
+        parser.add_argument('--cantidad', dest='cantidad', type=int, default=20,
+                            help=u"Cantidad de consultas a mostrar")
+        parser.add_argument('--reiniciar', action='store_true', dest='reiniciar',
+                            help=u"Borra los datos acumulados")
+
+    def handle(self, *args, **options):
+        if options['reiniciar']:
+            reiniciar()
+            return
+        for consulta in obtener_resumen(contexto=options['contexto'])[:options['cantidad']]:
+            self.stdout.write(
+                '{contexto}\ttiempo={tiempo:.3f}s\tcantidad={cantidad:.0f}\tp95={p95:.4f}s\t'
+                'muestras={muestras}\n{sql}\n'.format(**consulta))
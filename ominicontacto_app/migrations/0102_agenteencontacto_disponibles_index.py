@@ -0,0 +1,18 @@
+# Generated by Django 2.2.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ominicontacto_app', '0101_historicalcalificacioncliente_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agenteencontacto',
+            index=models.Index(condition=models.Q(estado=0), fields=['campana_id', 'orden'],
+                               name='agenteencontacto_disp_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.7 on 2026-10-18 11:00
+
+import json
+
+from django.db import migrations, models
+
+
+def calcular_desactivados(apps, schema_editor):
+    AgenteEnContacto = apps.get_model('ominicontacto_app', 'AgenteEnContacto')
+    Campana = apps.get_model('ominicontacto_app', 'Campana')
+    campanas = Campana.objects.exclude(campo_desactivacion__isnull=True).exclude(
+        campo_desactivacion='').values_list('id', 'campo_desactivacion')
+    for campana_id, campo_desactivacion in campanas:
+        filtro_desactivados = models.Q()
+        for valor in ('FALSE', '0'):
+            filtro_desactivados |= models.Q(
+                datos_contacto__contains=json.dumps({campo_desactivacion: valor})[1:-1])
+        AgenteEnContacto.objects.filter(campana_id=campana_id).filter(
+            filtro_desactivados).update(desactivado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ominicontacto_app', '0102_agenteencontacto_disponibles_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agenteencontacto',
+            name='desactivado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(calcular_desactivados, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='agenteencontacto',
+            name='agenteencontacto_disp_idx',
+        ),
+        migrations.AddIndex(
+            model_name='agenteencontacto',
+            index=models.Index(condition=models.Q(desactivado=False, estado=0),
+                               fields=['campana_id', 'orden'],
+                               name='agenteencontacto_activos_idx'),
+        ),
+    ]
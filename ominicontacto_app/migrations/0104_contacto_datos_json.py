@@ -0,0 +1,51 @@
+# Generated by Django 2.2.7 on 2026-10-18 12:00
+
+import json
+from ast import literal_eval
+
+from django.db import migrations, models
+
+TAMANO_LOTE = 5000
+
+
+def normalizar_datos_contactos(apps, schema_editor):
+    """
+    Reescribe en formato json los datos de contactos guardados con formato de lista de python,
+    para que puedan decodificarse siempre con json.loads
+    """
+    Contacto = apps.get_model('ominicontacto_app', 'Contacto')
+    # json.dumps nunca genera None/True/False y solo usa comillas simples dentro de los valores
+    candidatos = Contacto.objects.filter(
+        models.Q(datos__contains="'") | models.Q(datos__contains='None') |
+        models.Q(datos__contains='True') | models.Q(datos__contains='False')).order_by('id')
+    ultimo_id = 0
+    while True:
+        lote = list(candidatos.filter(id__gt=ultimo_id).only('id', 'datos')[:TAMANO_LOTE])
+        if not lote:
+            break
+        ultimo_id = lote[-1].id
+        modificados = []
+        for contacto in lote:
+            try:
+                json.loads(contacto.datos)
+                continue
+            except ValueError:
+                pass
+            try:
+                contacto.datos = json.dumps(literal_eval(contacto.datos))
+            except (ValueError, SyntaxError):
+                # datos corruptos, se dejan como estaban
+                continue
+            modificados.append(contacto)
+        Contacto.objects.bulk_update(modificados, ['datos'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ominicontacto_app', '0103_agenteencontacto_desactivado'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_datos_contactos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.7 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Los índices son sobre UPPER(...) para que los utilicen los filtros icontains, que Django
+# traduce a UPPER(columna::text) LIKE UPPER(%valor%)
+INDICES = (
+    ('contacto_telefono_trgm_idx', 'telefono'),
+    ('contacto_datos_trgm_idx', 'datos'),
+)
+
+
+def crear_indice(nombre, columna):
+    return migrations.RunSQL(
+        sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS {0} ON ominicontacto_app_contacto '
+            'USING gin (UPPER({1}::text) gin_trgm_ops);'.format(nombre, columna),
+        reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS {0};'.format(nombre))
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción, y evita
+    # bloquear la escritura de contactos mientras se construyen los índices
+    atomic = False
+
+    dependencies = [
+        ('ominicontacto_app', '0104_contacto_datos_json'),
+    ]
+
+    operations = [TrigramExtension()] + [
+        crear_indice(nombre, columna) for nombre, columna in INDICES]
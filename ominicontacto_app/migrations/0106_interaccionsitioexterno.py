@@ -0,0 +1,55 @@
+# Generated by Django 2.2.7 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ominicontacto_app', '0105_contacto_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InteraccionSitioExterno',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False,
+                                        verbose_name='ID')),
+                ('parametros', models.TextField()),
+                ('estado', models.PositiveIntegerField(
+                    choices=[(1, 'Pendiente'), (2, 'Enviada'), (3, 'Fallida')], default=1)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('enviada', models.DateTimeField(null=True)),
+                ('codigo_respuesta', models.PositiveIntegerField(null=True)),
+                ('error', models.TextField(blank=True)),
+                ('agente', models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.SET_NULL,
+                    related_name='interacciones_sitio_externo',
+                    to='ominicontacto_app.AgenteProfile')),
+                ('calificacion', models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.SET_NULL,
+                    related_name='interacciones_sitio_externo',
+                    to='ominicontacto_app.CalificacionCliente')),
+                ('campana', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='interacciones_sitio_externo',
+                    to='ominicontacto_app.Campana')),
+                ('contacto', models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.SET_NULL,
+                    related_name='interacciones_sitio_externo',
+                    to='ominicontacto_app.Contacto')),
+                ('sitio_externo', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='interacciones', to='ominicontacto_app.SitioExterno')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='interaccionsitioexterno',
+            index=models.Index(condition=models.Q(estado=1), fields=['proximo_intento'],
+                               name='interaccion_pendientes_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.7 on 2026-10-18 16:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ominicontacto_app', '0106_interaccionsitioexterno'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoSegundoPlano',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False,
+                                        verbose_name='ID')),
+                ('tipo', models.CharField(max_length=64)),
+                ('clave', models.CharField(max_length=255)),
+                ('salida', models.CharField(max_length=255)),
+                ('parametros', models.TextField()),
+                ('estado', models.PositiveIntegerField(
+                    choices=[(1, 'Pendiente'), (2, 'En curso'), (3, 'Finalizado'),
+                             (4, 'Fallido'), (5, 'Cancelado')], default=1)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(null=True)),
+                ('actualizado', models.DateTimeField(null=True)),
+                ('finalizado', models.DateTimeField(null=True)),
+                ('expiracion', models.DateTimeField(null=True)),
+                ('error', models.TextField(blank=True)),
+                ('campana', models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.CASCADE,
+                    related_name='trabajos_segundo_plano', to='ominicontacto_app.Campana')),
+                ('usuario', models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.SET_NULL,
+                    related_name='trabajos_segundo_plano', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trabajosegundoplano',
+            index=models.Index(fields=['salida', '-id'], name='trabajo_salida_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trabajosegundoplano',
+            constraint=models.UniqueConstraint(condition=models.Q(estado__in=[1, 2]),
+                                               fields=('clave',), name='trabajo_activo_unico'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.7 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ominicontacto_app', '0107_trabajosegundoplano'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='agenteencontacto',
+            name='agenteencontacto_activos_idx',
+        ),
+        migrations.AddIndex(
+            model_name='agenteencontacto',
+            index=models.Index(condition=models.Q(desactivado=False, estado=0),
+                               fields=['campana_id', 'orden', 'id'],
+                               name='agenteencontacto_activos_idx'),
+        ),
+    ]
@@ -29,14 +29,12 @@ import datetime
 
 from ast import literal_eval
 
-from django.contrib.auth.models import AbstractUser, _user_has_perm
+from django.contrib.auth.models import AbstractUser
 from django.contrib.sessions.models import Session
-from django.db import (models,
-                       # connection
-                       )
+from django.db import models, transaction, connection
 
 from django.apps import apps
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Count, Sum, Min, Max
 from django.db.utils import DatabaseError
 from django.conf import settings
 from django.core.exceptions import ValidationError, SuspiciousOperation, ObjectDoesNotExist
@@ -54,7 +52,7 @@ from simple_history.utils import update_change_reason
 from ominicontacto_app.utiles import (
     ValidadorDeNombreDeCampoExtra, fecha_local, datetime_hora_maxima_dia,
     datetime_hora_minima_dia, reemplazar_no_alfanumericos_por_guion, dividir_lista)
-from ominicontacto_app.permisos import PermisoOML
+from ominicontacto_app.permisos import PermisoOML, cache_permisos_oml
 PermisoOML
 
 logger = logging.getLogger(__name__)
@@ -167,9 +165,13 @@ class User(AbstractUser):
         return False
 
     def tiene_permiso_oml(self, nombre_permiso):
-        if PermisoOML.objects.filter(codename=nombre_permiso).exists():
-            full_name = 'permiso_oml.{0}'.format(nombre_permiso)
-            return _user_has_perm(self, full_name, None)
+        if cache_permisos_oml.es_permiso_restringido(nombre_permiso):
+            # Mismo criterio que ModelBackend para usuarios inactivos y superusuarios
+            if not self.is_active:
+                return False
+            if self.is_superuser:
+                return True
+            return nombre_permiso in cache_permisos_oml.obtener_permisos_usuario(self)
         # Si no existe el permiso la vista no esta restringida
         return True
 
@@ -1072,6 +1074,9 @@ class Campana(models.Model):
 
     objects = CampanaManager()
 
+    # Cantidad de AgenteEnContacto que se insertan por consulta al iniciar una campaña preview
+    TAMANO_LOTE_AGENTE_EN_CONTACTO = 5000
+
     ESTADO_ACTIVA = 2
     """La campaña esta activa, o sea, EN_CURSO o PROGRAMADA
     A nivel de modelos, solo queremos registrar si está ACTIVA, y no nos
@@ -1302,12 +1307,12 @@ class Campana(models.Model):
         self.save()
 
     def _crear_agente_en_contacto(self, contacto, agente_id, campos_contacto, estado, orden):
-        datos_contacto = literal_eval(contacto.datos)
-        datos_contacto = dict(zip(campos_contacto, datos_contacto))
+        datos_contacto = dict(zip(campos_contacto, contacto.lista_de_datos()))
         datos_contacto_json = json.dumps(datos_contacto)
         agente_en_contacto = AgenteEnContacto(
             agente_id=agente_id, contacto_id=contacto.pk, datos_contacto=datos_contacto_json,
-            telefono_contacto=contacto.telefono, campana_id=self.pk, estado=estado, orden=orden)
+            telefono_contacto=contacto.telefono, campana_id=self.pk, estado=estado, orden=orden,
+            desactivado=AgenteEnContacto.es_desactivado(datos_contacto, self.campo_desactivacion))
         return agente_en_contacto
 
     def establecer_valores_iniciales_agente_contacto(
@@ -1317,47 +1322,37 @@ class Campana(models.Model):
         en relación con los agentes
         """
         # obtenemos todos los contactos de la campaña
-        campana_contactos = list(self.bd_contacto.contactos.all())
+        campana_contactos = self.bd_contacto.contactos.only('id', 'telefono', 'datos')
 
         # obtenemos los campos de la BD del contacto
         metadata = self.bd_contacto.get_metadata()
         campos_contacto = metadata.nombres_de_columnas_de_datos
 
-        # creamos los objetos del modelo AgenteEnContacto a crear
-        agente_en_contacto_list = []
-
         orden = AgenteEnContacto.ultimo_id() + 1
-        if asignacion_proporcional and asignacion_aleatoria:
-            random.shuffle(campana_contactos)
-            agentes_campana = self.obtener_agentes()
-            n_agentes_campana = agentes_campana.count()
-            for agente, grupo_contactos in zip(agentes_campana,
-                                               dividir_lista(campana_contactos, n_agentes_campana)):
-                for contacto in grupo_contactos:
-                    agente_en_contacto = self._crear_agente_en_contacto(
-                        contacto, agente.pk, campos_contacto, AgenteEnContacto.ESTADO_INICIAL,
-                        orden=orden)
-                    orden += 1
-                    agente_en_contacto_list.append(agente_en_contacto)
-        elif asignacion_proporcional:
+        if asignacion_proporcional:
+            campana_contactos = list(campana_contactos)
+            if asignacion_aleatoria:
+                random.shuffle(campana_contactos)
             agentes_campana = self.obtener_agentes()
             n_agentes_campana = agentes_campana.count()
-            for agente, grupo_contactos in zip(agentes_campana,
-                                               dividir_lista(campana_contactos, n_agentes_campana)):
-                for contacto in grupo_contactos:
-                    agente_en_contacto = self._crear_agente_en_contacto(
-                        contacto, agente.pk, campos_contacto, AgenteEnContacto.ESTADO_INICIAL,
-                        orden=orden)
-                    orden += 1
-                    agente_en_contacto_list.append(agente_en_contacto)
+            contactos_por_agente = (
+                (agente.pk, contacto)
+                for agente, grupo_contactos in zip(
+                    agentes_campana, dividir_lista(campana_contactos, n_agentes_campana))
+                for contacto in grupo_contactos)
         else:
-            for contacto in campana_contactos:
-                agente_en_contacto = self._crear_agente_en_contacto(
-                    contacto, -1, campos_contacto, AgenteEnContacto.ESTADO_INICIAL, orden=orden)
-                orden += 1
-                agente_en_contacto_list.append(agente_en_contacto)
+            contactos_por_agente = ((-1, contacto) for contacto in campana_contactos.iterator())
 
-        # insertamos las instancias en la BD
+        # insertamos las instancias en la BD de a lotes
+        agente_en_contacto_list = []
+        for agente_id, contacto in contactos_por_agente:
+            agente_en_contacto_list.append(self._crear_agente_en_contacto(
+                contacto, agente_id, campos_contacto, AgenteEnContacto.ESTADO_INICIAL,
+                orden=orden))
+            orden += 1
+            if len(agente_en_contacto_list) == self.TAMANO_LOTE_AGENTE_EN_CONTACTO:
+                AgenteEnContacto.objects.bulk_create(agente_en_contacto_list)
+                agente_en_contacto_list = []
         AgenteEnContacto.objects.bulk_create(agente_en_contacto_list)
 
     def gestionar_finalizacion_relacion_agente_contacto(self, calificacion_cliente):
@@ -1408,8 +1403,7 @@ class Campana(models.Model):
         """
         metadata = self.bd_contacto.get_metadata()
         campos_contacto = metadata.nombres_de_columnas_de_datos
-        datos_contacto = literal_eval(contacto.datos)
-        datos_contacto = dict(zip(campos_contacto, datos_contacto))
+        datos_contacto = dict(zip(campos_contacto, contacto.lista_de_datos()))
         datos_contacto_json = json.dumps(datos_contacto)
         orden = AgenteEnContacto.ultimo_id() + 1
         return AgenteEnContacto.objects.create(
@@ -2342,6 +2336,9 @@ class BaseDatosContacto(models.Model):
         (ESTADO_DEFINIDA_ACTUALIZADA, _('Definida en actualizacion'))
     )
 
+    # Cantidad de ids de contacto que abarca cada INSERT de copiar_contactos
+    TAMANO_LOTE_COPIA_CONTACTOS = 50000
+
     nombre = models.CharField(
         max_length=128, unique=True, verbose_name=_('Nombre')
     )
@@ -2516,12 +2513,44 @@ class BaseDatosContacto(models.Model):
             )
         self.cantidad_contactos = len(lista_contactos)
 
+    def copiar_contactos(self, contactos, progreso=None):
+        """
+        Copia a esta base los contactos del queryset `contactos` con INSERT ... SELECT, sin
+        traerlos a memoria. Se copian en lotes por rango de id para poder informar el
+        avance en `progreso` (ProgresoTarea).
+        Devuelve la cantidad de contactos copiados.
+        """
+        rango = contactos.aggregate(desde=Min('id'), hasta=Max('id'))
+        tabla = Contacto._meta.db_table
+        copiados = 0
+        desde = rango['desde']
+        while desde is not None and desde <= rango['hasta']:
+            hasta = desde + self.TAMANO_LOTE_COPIA_CONTACTOS - 1
+            lote = contactos.filter(id__range=(desde, hasta)).values('id')
+            sql_lote, params_lote = lote.query.sql_with_params()
+            sql = (
+                "INSERT INTO {0} (telefono, datos, bd_contacto_id, id_externo, es_originario) "
+                "SELECT telefono, datos, %s, id_externo, true FROM {0} "
+                "WHERE id IN ({1}) ORDER BY id").format(tabla, sql_lote)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [self.pk] + list(params_lote))
+                copiados += cursor.rowcount
+                if progreso is not None:
+                    progreso.avanzar(cursor.rowcount)
+            desde = hasta + 1
+        self.cantidad_contactos = copiados
+        self.save(update_fields=['cantidad_contactos'])
+        return copiados
+
 
 class ContactoManager(models.Manager):
 
+    # Las búsquedas por subcadena de teléfono y datos utilizan icontains porque los índices
+    # trigram de Contacto están definidos sobre UPPER(telefono) y UPPER(datos)
+
     def contactos_by_telefono(self, telefono):
         try:
-            return self.filter(telefono__contains=telefono)
+            return self.filter(telefono__icontains=telefono)
         except Contacto.DoesNotExist:
             raise (SuspiciousOperation("No se encontro contactos con este "
                                        "número télefonico"))
@@ -2588,12 +2617,16 @@ class Contacto(models.Model):
     id_externo = models.CharField(max_length=128, null=True)
     es_originario = models.BooleanField(default=True)
 
-    def obtener_datos(self):
-        """ Devuelve un diccionario con todos los datos, incluido el telefono """
+    def obtener_datos(self, bd_metadata=None):
+        """
+        Devuelve un diccionario con todos los datos, incluido el telefono.
+        Se puede pasar la metadata de la base para no leerla en cada contacto.
+        """
         if not hasattr(self, 'datos_contacto'):
-            bd_metadata = self.bd_contacto.get_metadata()
+            if bd_metadata is None:
+                bd_metadata = self.bd_contacto.get_metadata()
             columnas = bd_metadata.nombres_de_columnas
-            datos = self.lista_de_datos_completa()
+            datos = self.lista_de_datos_completa(bd_metadata)
 
             self.datos_contacto = dict(zip(columnas, datos))
         return self.datos_contacto
@@ -2604,11 +2637,20 @@ class Contacto(models.Model):
         campos_contacto = metadata.nombres_de_columnas_de_datos
 
         # y los hacemos en estructura json para AgenteEnContacto
-        datos_contacto = literal_eval(self.datos)
-        datos_contacto = dict(zip(campos_contacto, datos_contacto))
+        datos_contacto = dict(zip(campos_contacto, self.lista_de_datos()))
         datos_contacto_json = json.dumps(datos_contacto)
-        AgenteEnContacto.objects.filter(contacto_id=self.pk).update(
-            telefono_contacto=self.telefono, datos_contacto=datos_contacto_json)
+        agentes_en_contacto = AgenteEnContacto.objects.filter(contacto_id=self.pk)
+        agentes_en_contacto.update(
+            telefono_contacto=self.telefono, datos_contacto=datos_contacto_json,
+            desactivado=False)
+
+        # se marcan desactivados de acuerdo al campo de desactivacion de cada campaña
+        campos_desactivacion = Campana.objects.filter(
+            pk__in=agentes_en_contacto.values('campana_id')).exclude(
+                campo_desactivacion__isnull=True).values_list('id', 'campo_desactivacion')
+        for campana_id, campo_desactivacion in campos_desactivacion:
+            if AgenteEnContacto.es_desactivado(datos_contacto, campo_desactivacion):
+                agentes_en_contacto.filter(campana_id=campana_id).update(desactivado=True)
 
     def save(self, *args, **kwargs):
         if self.pk is not None:
@@ -2616,12 +2658,24 @@ class Contacto(models.Model):
         super(Contacto, self).save()
 
     def lista_de_datos(self):
-        return json.loads(self.datos)
+        return self.decodificar_datos(self.datos)
 
-    def lista_de_datos_completa(self):
+    @staticmethod
+    def decodificar_datos(datos):
+        """
+        Devuelve la lista de datos guardada en 'datos'. Algunas versiones anteriores los
+        guardaban con formato de lista de python en lugar de json.
+        """
+        try:
+            return json.loads(datos)
+        except ValueError:
+            return literal_eval(datos)
+
+    def lista_de_datos_completa(self, bd_metadata=None):
         """ Devuelve un diccionario con todos los datos, incluido el telefono """
         if not hasattr(self, 'lista_datos_contacto'):
-            bd_metadata = self.bd_contacto.get_metadata()
+            if bd_metadata is None:
+                bd_metadata = self.bd_contacto.get_metadata()
             datos = self.lista_de_datos()
             pos_primer_telefono = bd_metadata.columnas_con_telefono[0]
             if bd_metadata.columna_id_externo is not None:
@@ -3294,6 +3348,118 @@ class SitioExterno(models.Model):
         }
 
 
+class InteraccionSitioExterno(models.Model):
+    """
+    Interacción del servidor con un Sitio Externo. Se registra como pendiente y la envía el
+    comando procesar_interacciones_sitio_externo, para no demorar la respuesta al agente.
+    """
+    PENDIENTE = 1
+    ENVIADA = 2
+    FALLIDA = 3
+
+    ESTADOS = (
+        (PENDIENTE, _('Pendiente')),
+        (ENVIADA, _('Enviada')),
+        (FALLIDA, _('Fallida')),
+    )
+
+    sitio_externo = models.ForeignKey(
+        SitioExterno, related_name='interacciones', on_delete=models.CASCADE)
+    campana = models.ForeignKey(
+        Campana, related_name='interacciones_sitio_externo', on_delete=models.CASCADE)
+    agente = models.ForeignKey(
+        AgenteProfile, related_name='interacciones_sitio_externo', null=True,
+        on_delete=models.SET_NULL)
+    contacto = models.ForeignKey(
+        Contacto, related_name='interacciones_sitio_externo', null=True,
+        on_delete=models.SET_NULL)
+    calificacion = models.ForeignKey(
+        CalificacionCliente, related_name='interacciones_sitio_externo', null=True,
+        on_delete=models.SET_NULL)
+    # Parámetros calculados al registrar la interacción, en json
+    parametros = models.TextField()
+    estado = models.PositiveIntegerField(choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=now)
+    creada = models.DateTimeField(auto_now_add=True)
+    enviada = models.DateTimeField(null=True)
+    codigo_respuesta = models.PositiveIntegerField(null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['proximo_intento'], name='interaccion_pendientes_idx',
+                         condition=Q(estado=1)),  # PENDIENTE
+        ]
+
+    def __str__(self):
+        return "Interacción {0} con {1}: {2}".format(
+            self.pk, self.sitio_externo_id, self.get_estado_display())
+
+    def get_parametros(self):
+        return json.loads(self.parametros)
+
+
+class TrabajoSegundoPlano(models.Model):
+    """
+    Trabajo pesado (exportaciones de reportes, zip de grabaciones) que ejecuta el comando
+    procesar_trabajos fuera de los workers de uwsgi.
+    Los trabajos con la misma `clave` (tipo y parámetros) se comparten entre quienes los piden,
+    y `salida` identifica el archivo generado, que no pueden escribir dos trabajos a la vez.
+    """
+    PENDIENTE = 1
+    EN_CURSO = 2
+    FINALIZADO = 3
+    FALLIDO = 4
+    CANCELADO = 5
+
+    ESTADOS = (
+        (PENDIENTE, _('Pendiente')),
+        (EN_CURSO, _('En curso')),
+        (FINALIZADO, _('Finalizado')),
+        (FALLIDO, _('Fallido')),
+        (CANCELADO, _('Cancelado')),
+    )
+    ESTADOS_ACTIVOS = (PENDIENTE, EN_CURSO)
+
+    tipo = models.CharField(max_length=64)
+    clave = models.CharField(max_length=255)
+    salida = models.CharField(max_length=255)
+    parametros = models.TextField()
+    usuario = models.ForeignKey(
+        User, related_name='trabajos_segundo_plano', null=True, on_delete=models.SET_NULL)
+    campana = models.ForeignKey(
+        Campana, related_name='trabajos_segundo_plano', null=True, on_delete=models.CASCADE)
+    estado = models.PositiveIntegerField(choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True)
+    # Lo actualiza periódicamente el procesador mientras el trabajo está en curso
+    actualizado = models.DateTimeField(null=True)
+    finalizado = models.DateTimeField(null=True)
+    # Hasta cuándo se reutiliza el resultado para pedidos con la misma clave
+    expiracion = models.DateTimeField(null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['clave'], name='trabajo_activo_unico',
+                                    condition=Q(estado__in=[1, 2])),  # PENDIENTE, EN_CURSO
+        ]
+        indexes = [
+            models.Index(fields=['salida', '-id'], name='trabajo_salida_idx'),
+        ]
+
+    def __str__(self):
+        return "Trabajo {0} {1}: {2}".format(self.pk, self.tipo, self.get_estado_display())
+
+    def get_parametros(self):
+        return json.loads(self.parametros)
+
+    def esta_activo(self):
+        return self.estado in self.ESTADOS_ACTIVOS
+
+
 class SistemaExterno(models.Model):
     """Representa un sistema externo que se comunica con OML a través de sus CRMs
     y la API de OML
@@ -3460,6 +3626,14 @@ class AgenteEnContactoManager(models.Manager):
             agente_id=agente_id,
             campana_id=campana_id)
 
+    def disponibles_para_agente(self, campana_id, agente_id):
+        # Devuelve los contactos activos que pueden ser entregados al agente, en el orden de
+        # entrega. El índice parcial sobre (campana_id, orden, id) de los no entregados ya
+        # devuelve las filas en ese orden, sin ordenar todos los disponibles de la campaña.
+        return self.activos(campana_id).filter(
+            estado=AgenteEnContacto.ESTADO_INICIAL, agente_id__in=[-1, agente_id]
+        ).order_by('orden', 'id')
+
     def esta_asignado_o_entregado_a_agente(self, contacto_id, campana_id, agente_id):
         # Devuelve si el agente tiene ese contacto asignado o entregado
         return self.contacto_asignado(agente_id, campana_id).filter(
@@ -3468,16 +3642,24 @@ class AgenteEnContactoManager(models.Manager):
     def activos(self, campana_id):
         # Devuelve los que estan activos de acuerdo al campo de desactivacion definido en la
         # campaña
-        campana = Campana.objects.get(pk=campana_id)
+        return self.filter(campana_id=campana_id, desactivado=False)
+
+    def actualizar_desactivados(self, campana):
+        """
+        Recalcula el campo 'desactivado' de los contactos de la campaña, para cuando cambia
+        su campo de desactivación
+        """
+        contactos = self.filter(campana_id=campana.pk)
+        contactos.update(desactivado=False)
         campo_desactivacion = campana.campo_desactivacion
-        desactivacion_booleana = {campo_desactivacion: "FALSE"}
-        desactivacion_numerica = {campo_desactivacion: "0"}
-        # deberiamos tener algo como "desactivado: FALSE" o  "desactivado: 0", sin llaves
-        desactivacion_booleana_str = json.dumps(desactivacion_booleana)[1:-1]
-        desactivacion_numerica_str = json.dumps(desactivacion_numerica)[1:-1]
-        return self.filter(campana_id=campana_id).exclude(
-            Q(datos_contacto__contains=desactivacion_booleana_str) |
-            Q(datos_contacto__contains=desactivacion_numerica_str))
+        if not campo_desactivacion:
+            return
+        # deberiamos tener algo como "desactivado": "FALSE" o  "desactivado": "0", sin llaves
+        filtro_desactivados = Q()
+        for valor in AgenteEnContacto.VALORES_DESACTIVACION:
+            filtro_desactivados |= Q(
+                datos_contacto__contains=json.dumps({campo_desactivacion: valor})[1:-1])
+        contactos.filter(filtro_desactivados).update(desactivado=True)
 
 
 class AgenteEnContacto(models.Model):
@@ -3509,14 +3691,46 @@ class AgenteEnContacto(models.Model):
     modificado = models.DateTimeField(auto_now=True, null=True)
     es_originario = models.BooleanField(default=True)
     orden = models.IntegerField(default=1)
+    # Indica si el valor del campo de desactivación de la campaña desactiva al contacto
+    desactivado = models.BooleanField(default=False)
+
+    VALORES_DESACTIVACION = ('FALSE', '0')
 
     class Meta:
         ordering = ['orden']
+        indexes = [
+            models.Index(fields=['campana_id', 'orden', 'id'],
+                         name='agenteencontacto_activos_idx',
+                         condition=Q(estado=0, desactivado=False)),  # ESTADO_INICIAL
+        ]
 
     def __str__(self):
         return "Agente de id={0} relacionado con contacto de id={1} con el estado {2}".format(
             self.agente_id, self.contacto_id, self.estado)
 
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None:
+            self.desactivado = self._calcular_desactivado()
+        super(AgenteEnContacto, self).save(*args, **kwargs)
+
+    @classmethod
+    def es_desactivado(cls, datos_contacto, campo_desactivacion):
+        """ Indica si los datos del contacto lo desactivan según el campo de desactivación """
+        if not campo_desactivacion or not isinstance(datos_contacto, dict):
+            return False
+        return datos_contacto.get(campo_desactivacion) in cls.VALORES_DESACTIVACION
+
+    def _calcular_desactivado(self):
+        campo_desactivacion = Campana.objects.filter(pk=self.campana_id).values_list(
+            'campo_desactivacion', flat=True).first()
+        if not campo_desactivacion:
+            return False
+        try:
+            datos_contacto = json.loads(self.datos_contacto)
+        except (TypeError, ValueError):
+            return False
+        return self.es_desactivado(datos_contacto, campo_desactivacion)
+
     @classmethod
     def asignar_contacto(cls, contacto_id, campana_id, agente):
         try:
@@ -3536,13 +3750,12 @@ class AgenteEnContacto(models.Model):
         # Si ya tiene un contacto ASIGNADO solo puede llamar a ese.
         contacto_asignado = AgenteEnContacto.objects.filter(agente_id=agente.id,
                                                             estado=AgenteEnContacto.ESTADO_ASIGNADO,
-                                                            campana_id=campana_id)
+                                                            campana_id=campana_id).first()
         campana = Campana.objects.get(pk=campana_id)
         campos_ocultos = campana.get_campos_ocultos()
-        if contacto_asignado.exists():
-            agente_en_contacto = contacto_asignado[0]
-            data = model_to_dict(agente_en_contacto)
-            datos_contacto = literal_eval(data['datos_contacto'])
+        if contacto_asignado is not None:
+            data = model_to_dict(contacto_asignado)
+            datos_contacto = json.loads(data['datos_contacto'])
             data['datos_contacto'] = \
                 {x: datos_contacto[x] for x in datos_contacto if x not in campos_ocultos}
             data['result'] = 'OK'
@@ -3555,52 +3768,40 @@ class AgenteEnContacto(models.Model):
         # que pueda ser entregado a otros agentes de la campaña
         __, orden = cls.liberar_contacto(agente.id, campana_id)
 
-        # obtiene el orden de la ultimo asignacion entregada al agente
-        # (-1 si no tenía ninguno asignado y le asigna consecutivamente
-        # a partir los numeros de orden superiores o iguales a este
-        numero_agentes_contacto = AgenteEnContacto.objects.filter(campana_id=campana_id).count()
-        orden = (orden + 1) % (numero_agentes_contacto + 1)
+        # Se entrega el siguiente contacto disponible a partir del orden del último entregado
+        # al agente (-1 si no tenía ninguno), volviendo al principio al llegar al final.
+        # Cada búsqueda es un recorrido del índice de contactos disponibles que saltea los
+        # que están siendo tomados por otros agentes, sin esperar a que se liberen.
         try:
-            qs_agentes_contactos_no_orden = cls.objects.activos(
-                campana_id=campana_id).filter(
-                    agente_id__in=[-1, agente.pk], estado=AgenteEnContacto.ESTADO_INICIAL)
-
-            # encuentra y devuelve el contacto a asignar al
-            # de acuerdo al orden definido en el atributo 'orden'
-            # desde la lista de los contactos disponibles para el agente
-            qs_agentes_contactos = qs_agentes_contactos_no_orden \
-                .filter(orden__gte=orden) \
-                .select_for_update(skip_locked=True) \
-                .first()
-
-            if not qs_agentes_contactos:
-                qs_agentes_contactos = qs_agentes_contactos_no_orden \
-                    .select_for_update(skip_locked=True) \
-                    .first()
+            with transaction.atomic():
+                disponibles = cls.objects.disponibles_para_agente(campana_id, agente.pk) \
+                    .select_for_update(skip_locked=True)
+                agente_en_contacto = disponibles.filter(orden__gt=orden).first()
+                if agente_en_contacto is None:
+                    agente_en_contacto = disponibles.first()
+
+                if agente_en_contacto is not None:
+                    agente_en_contacto.estado = AgenteEnContacto.ESTADO_ENTREGADO
+                    agente_en_contacto.agente_id = agente.id
+                    agente_en_contacto.save(update_fields=['estado', 'agente_id', 'modificado'])
         except DatabaseError:
             return {'result': 'Error',
                     'code': 'error-concurrencia',
                     'data': 'Contacto siendo accedido por más de un agente'}
 
-        if qs_agentes_contactos:
-
-            agente_en_contacto = qs_agentes_contactos
-            agente_en_contacto.estado = AgenteEnContacto.ESTADO_ENTREGADO
-            agente_en_contacto.agente_id = agente.id
-            agente_en_contacto.save()
-            data = model_to_dict(agente_en_contacto)
-            datos_contacto = literal_eval(data['datos_contacto'])
-            data['datos_contacto'] = \
-                {x: datos_contacto[x] for x in datos_contacto if x not in campos_ocultos}
-            data['result'] = 'OK'
-            data['code'] = 'contacto-entregado'
-            return data
-
-        else:
+        if agente_en_contacto is None:
             return {'result': 'Error',
                     'code': 'error-no-contactos',
                     'data': 'No hay contactos para asignar en esta campaña'}
 
+        data = model_to_dict(agente_en_contacto)
+        datos_contacto = json.loads(data['datos_contacto'])
+        data['datos_contacto'] = \
+            {x: datos_contacto[x] for x in datos_contacto if x not in campos_ocultos}
+        data['result'] = 'OK'
+        data['code'] = 'contacto-entregado'
+        return data
+
     @classmethod
     def liberar_contacto(cls, agente_id, campana_id):
         qs_agente_en_contacto = cls.objects.contacto_asignado(agente_id, campana_id)
@@ -121,7 +121,7 @@ class ParserCsv(object):
         cantidad_importados = 0
         for i, curr_row in enumerate(workbook):
             if len(curr_row) == 0:
-                logger.info(_("Ignorando fila vacia {0}".format(i)))
+                logger.info(_("Ignorando fila vacia {0}").format(i))
                 self.vacias += 1
                 continue
 
@@ -178,8 +178,8 @@ class ParserCsv(object):
             if len(curr_row) != metadata.cantidad_de_columnas:
                 mensaje = _("N/A - la BD esta definida con {0} columnas, "
                             "pero el archivo posee esta fila con {1} columnas"
-                            "".format(metadata.cantidad_de_columnas,
-                                      len(curr_row)))
+                            "").format(metadata.cantidad_de_columnas,
+                                       len(curr_row))
                 raise OmlParserCsvImportacionError(
                     numero_fila=i,
                     numero_columna=0,
@@ -189,8 +189,8 @@ class ParserCsv(object):
             cantidad_importados += 1
             yield curr_row
 
-        logger.info(_("{0} contactos importados - {1} valores ignorados.".format(
-            cantidad_importados, self.vacias)))
+        logger.info(_("{0} contactos importados - {1} valores ignorados.").format(
+            cantidad_importados, self.vacias))
 
     def _sanear_nombre_de_columna(self, nombre):
         """Realiza saneamiento básico del nombre de la columna. Con basico
@@ -229,6 +229,29 @@ class ParserCsv(object):
         """
         return self._get_contenido_de_archivo(base_datos_contactos)
 
+    def itera_estructura_archivo(self, base_datos_contactos):
+        """
+        Lee un archivo CSV fila a fila, sin cargarlo completo en memoria.
+        La primera fila devuelta es el encabezado con los nombres saneados.
+        """
+        file_obj = base_datos_contactos.archivo_importacion.file
+        file_obj_str = codecs.iterdecode(file_obj, 'utf-8', errors='ignore')
+        workbook = csv.reader(file_obj_str, skipinitialspace=True)
+        filas = (row for row in workbook if row)
+
+        encabezado = next(filas, None)
+        primer_fila = next(filas, None)
+        if primer_fila is None:
+            logger.warn(_("El archivo CSV seleccionado posee menos de 2 "
+                          "filas."))
+            raise OmlParserMinRowError(_("El archivo CSV posee menos de "
+                                         "2 filas"))
+
+        yield self._sanear_nombres_de_columnas(encabezado)
+        yield primer_fila
+        for row in filas:
+            yield row
+
     def _get_contenido_de_archivo(self, base_datos_contactos, previsualizacion=False):
         """
         Lee un archivo CSV y devuelve contenidos de
@@ -16,12 +16,21 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
-from collections import ChainMap
+import logging
+import threading
+import time
+from collections import ChainMap, OrderedDict
+
+import redis
+
 from django.apps import apps
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import Permission
 from django.db import models
 
+logger = logging.getLogger(__name__)
+
 
 class PermisoOMLManager(models.Manager):
     def get_queryset(self):
@@ -80,3 +89,94 @@ def cargar_descripciones_y_versiones():
 
 
 DESCRIPCIONES, VERSIONES = cargar_descripciones_y_versiones()
+
+
+class CachePermisosOML(object):
+    """
+    Cache en memoria de cada proceso de los codenames de PermisoOML existentes y de los
+    permisos OML de los últimos usuarios consultados, para no consultar la base de datos en
+    cada verificación de permisos.
+    Para invalidarla en todos los procesos se incrementa una versión guardada en Redis, que
+    cada proceso verifica como máximo una vez cada INTERVALO_VERIFICACION segundos.
+    """
+
+    KEY_VERSION = 'OML:PERMISOS_OML:VERSION'
+    MAXIMO_USUARIOS = 5000
+    INTERVALO_VERIFICACION = 1
+
+    redis_connection = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limpiar(None)
+
+    def get_redis_connection(self):
+        if self.redis_connection is None:
+            self.redis_connection = redis.Redis(
+                host=settings.REDIS_HOSTNAME,
+                port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+                decode_responses=True)
+        return self.redis_connection
+
+    def _limpiar(self, version):
+        self._version = version
+        self._ultima_verificacion = time.monotonic()
+        self._codenames = None
+        self._permisos_por_usuario = OrderedDict()
+
+    def _verificar_version(self):
+        """ Devuelve False si no se puede utilizar la cache """
+        if self._version is not None and \
+                time.monotonic() - self._ultima_verificacion < self.INTERVALO_VERIFICACION:
+            return True
+        try:
+            version = self.get_redis_connection().get(self.KEY_VERSION) or '0'
+        except redis.exceptions.RedisError:
+            logger.exception('No se pudo verificar la version de la cache de permisos')
+            self._limpiar(None)
+            return False
+        if version != self._version:
+            self._limpiar(version)
+        self._ultima_verificacion = time.monotonic()
+        return True
+
+    def _calcular_permisos_usuario(self, user):
+        prefijo = PermisoOML._meta.app_label + '.'
+        return frozenset(permiso[len(prefijo):] for permiso in user.get_all_permissions()
+                         if permiso.startswith(prefijo))
+
+    def es_permiso_restringido(self, nombre_permiso):
+        with self._lock:
+            if not self._verificar_version():
+                return PermisoOML.objects.filter(codename=nombre_permiso).exists()
+            if self._codenames is None:
+                self._codenames = frozenset(
+                    PermisoOML.objects.values_list('codename', flat=True))
+            return nombre_permiso in self._codenames
+
+    def obtener_permisos_usuario(self, user):
+        """ Devuelve los codenames de los PermisoOML asignados al usuario o a su rol """
+        with self._lock:
+            if not self._verificar_version():
+                return self._calcular_permisos_usuario(user)
+            permisos = self._permisos_por_usuario.get(user.pk)
+            if permisos is not None:
+                self._permisos_por_usuario.move_to_end(user.pk)
+                return permisos
+            permisos = self._calcular_permisos_usuario(user)
+            self._permisos_por_usuario[user.pk] = permisos
+            if len(self._permisos_por_usuario) > self.MAXIMO_USUARIOS:
+                self._permisos_por_usuario.popitem(last=False)
+            return permisos
+
+    def invalidar(self):
+        """ Debe llamarse al modificar permisos, roles o los roles de un usuario """
+        with self._lock:
+            self._limpiar(None)
+        try:
+            self.get_redis_connection().incr(self.KEY_VERSION)
+        except redis.exceptions.RedisError:
+            logger.exception('No se pudo invalidar la cache de permisos en otros procesos')
+
+
+cache_permisos_oml = CachePermisosOML()
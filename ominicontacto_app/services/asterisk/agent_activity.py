@@ -22,7 +22,7 @@ import redis
 from django.conf import settings
 
 from ominicontacto_app.models import QueueMember, Pausa
-from ominicontacto_app.services.asterisk.redis_database import AgenteFamily
+from ominicontacto_app.services.asterisk.redis_database import AgenteFamily, RegistroAgentes
 from ominicontacto_app.services.asterisk.asterisk_ami import AMIManagerConnector
 from notification_app.notification import RedisStreamNotifier, AgentNotifier
 
@@ -182,7 +182,10 @@ class AgentActivityAmiManager(object):
         family = self._get_family(agente_profile)
         redis_connection = self.get_redis_connection()
         try:
-            redis_connection.hset(family, mapping=data)
+            pipeline = redis_connection.pipeline(transaction=True)
+            pipeline.hset(family, mapping=data)
+            RegistroAgentes().registrar(agente_profile.id, client=pipeline)
+            pipeline.execute()
         except redis.exceptions.RedisError:
             error = True
         return error
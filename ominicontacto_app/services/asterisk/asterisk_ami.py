@@ -18,8 +18,13 @@
 from __future__ import unicode_literals
 
 import logging as _logging
+import os
+import queue
+import socket
+import threading
 
-from asterisk.manager import Manager, ManagerSocketException, ManagerAuthException, ManagerException
+from asterisk.manager import (
+    EOL, Manager, ManagerSocketException, ManagerAuthException, ManagerException)
 
 from django.conf import settings
 from ominicontacto_app.errors import OmlError
@@ -27,22 +32,159 @@ from ominicontacto_app.errors import OmlError
 logger = _logging.getLogger(__name__)
 
 
+class ManagerAMI(Manager):
+    """
+    Manager de pyst2 que puede compartirse entre threads y que permite enviar varias
+    acciones juntas, sin esperar la respuesta de cada una para enviar la siguiente.
+    """
+
+    def __init__(self):
+        super(ManagerAMI, self).__init__()
+        self._lock_acciones = threading.Lock()
+
+    def send_action(self, cdict={}, **kwargs):
+        accion = dict(cdict)
+        accion.update(kwargs)
+        return self.send_actions([accion])[0]
+
+    def send_actions(self, acciones):
+        """
+        Envía las acciones en un solo write y devuelve sus respuestas en el mismo orden,
+        correlacionándolas por ActionID.
+        """
+        if not self._connected.isSet():
+            raise ManagerException("Not connected")
+
+        with self._lock_acciones:
+            action_ids = []
+            comandos = []
+            for accion in acciones:
+                accion = dict(accion)
+                if 'ActionID' not in accion:
+                    accion['ActionID'] = '%s-%08x' % (self.hostname, self.next_seq())
+                action_ids.append(accion['ActionID'])
+                comandos.append(self._serializar_accion(accion))
+            try:
+                self._sock.write(''.join(comandos).encode('utf8', 'ignore'))
+                self._sock.flush()
+            except socket.error as e:
+                raise ManagerSocketException(e.errno, e.strerror)
+
+            respuestas = {}
+            # Un lugar por respuesta esperada, para que se nos avise si se corta la conexión
+            esperando = [1] * len(action_ids)
+            self._reswaiting.extend(esperando)
+            try:
+                while len(respuestas) < len(action_ids):
+                    respuesta = self._response_queue.get()
+                    if not respuesta:
+                        raise ManagerSocketException(0, 'Connection Terminated')
+                    action_id = respuesta.get_header('ActionID', None)
+                    if action_id in action_ids:
+                        respuestas[action_id] = respuesta
+                    else:
+                        logger.warning('Respuesta AMI descartada, ActionID: {0}'.format(
+                            action_id))
+            finally:
+                del self._reswaiting[:len(esperando)]
+        return [respuestas[action_id] for action_id in action_ids]
+
+    def _serializar_accion(self, accion):
+        lineas = []
+        for key, value in accion.items():
+            if isinstance(value, list):
+                for item in value:
+                    lineas.append('%s: %s' % (key, item))
+            else:
+                lineas.append('%s: %s' % (key, value))
+        lineas.append(EOL)
+        return EOL.join(lineas)
+
+
+class PoolConexionesAMI(object):
+    """
+    Mantiene conexiones AMI logueadas para reutilizarlas entre pedidos, en lugar de conectar
+    y loguearse en cada operación. Cada conexión es utilizada por un solo AMIManagerConnector
+    a la vez; las que se cortan se descartan y se reemplazan en el siguiente pedido.
+    """
+
+    _pool = None
+    _lock_pool = threading.Lock()
+
+    def __init__(self, tamano):
+        self.tamano = tamano
+        self.pid = os.getpid()
+        self._libres = queue.LifoQueue()
+        self._disponibles = threading.BoundedSemaphore(tamano)
+
+    @classmethod
+    def obtener_pool(cls):
+        """ Devuelve el pool del proceso actual (las conexiones no se comparten con forks) """
+        with cls._lock_pool:
+            if cls._pool is None or cls._pool.pid != os.getpid():
+                cls._pool = cls(settings.OML_AMI_POOL_SIZE)
+            return cls._pool
+
+    def obtener_conexion(self):
+        if not self._disponibles.acquire(timeout=settings.OML_AMI_POOL_TIMEOUT):
+            raise AMIManagerConnectorError('No hay conexiones AMI disponibles')
+        try:
+            while True:
+                try:
+                    manager = self._libres.get_nowait()
+                except queue.Empty:
+                    return self._crear_conexion()
+                if manager.connected():
+                    return manager
+                self._cerrar_conexion(manager)
+        except Exception:
+            self._disponibles.release()
+            raise
+
+    def liberar_conexion(self, manager):
+        if manager.connected():
+            self._libres.put(manager)
+        else:
+            self._cerrar_conexion(manager)
+        self._disponibles.release()
+
+    def _crear_conexion(self):
+        manager = ManagerAMI()
+        try:
+            manager.connect(str(settings.ASTERISK_HOSTNAME))
+            manager.login(settings.ASTERISK['AMI_USERNAME'], settings.ASTERISK['AMI_PASSWORD'])
+            # Las conexiones del pool solo ejecutan acciones, no necesitan recibir eventos
+            manager.send_action({'Action': 'Events', 'EventMask': 'off'})
+        except ManagerException:
+            self._cerrar_conexion(manager)
+            raise
+        return manager
+
+    def _cerrar_conexion(self, manager):
+        try:
+            manager.close()
+        except (ManagerException, socket.error) as e:
+            logger.warning('Error cerrando conexion AMI: {0}'.format(e))
+
+
 class AMIManagerConnector(object):
-    """Establece la conexión AMI utilizando la librería pyst2, para manipular asterisk
+    """Establece la conexión AMI utilizando la librería pyst2, para manipular asterisk.
+    Las conexiones se toman de PoolConexionesAMI, por lo que connect() y disconnect() no
+    implican un login y logoff en Asterisk.
     """
 
     def __init__(self):
         self.manager = Manager()
         self.disconnected = False
+        self._pool = None
 
     def connect(self):
         error = False
-        ami_manager_user = settings.ASTERISK['AMI_USERNAME']
-        ami_manager_pass = settings.ASTERISK['AMI_PASSWORD']
-        ami_manager_host = str(settings.ASTERISK_HOSTNAME)
+        pool = PoolConexionesAMI.obtener_pool()
         try:
-            self.manager.connect(ami_manager_host)
-            self.manager.login(ami_manager_user, ami_manager_pass)
+            self.manager = pool.obtener_conexion()
+            self._pool = pool
+            self.disconnected = False
         except ManagerSocketException as e:
             logger.exception("Error connecting to the manager: {0}".format(e))
             error = True
@@ -52,15 +194,32 @@ class AMIManagerConnector(object):
         except ManagerException as e:
             logger.exception("Error {0}".format(e))
             error = True
+        except AMIManagerConnectorError as e:
+            logger.exception(str(e))
+            error = True
         return error
 
+    def __del__(self):
+        # Si no se llamó a disconnect(), la conexión igualmente debe volver al pool
+        if self._pool is not None:
+            self.disconnect()
+
     def disconnect(self):
-        # Atención: El Manager solo permite una sola conexión
-        self.manager.close()
+        # La conexión vuelve al pool, sigue logueada para el próximo pedido
+        if self._pool is not None:
+            self._pool.liberar_conexion(self.manager)
+            self._pool = None
         self.disconnected = True
 
+    def _send_actions(self, acciones):
+        """ Envía las acciones juntas si el manager lo permite, y devuelve la última respuesta """
+        if isinstance(self.manager, ManagerAMI):
+            return self.manager.send_actions(acciones)[-1]
+        for accion in acciones:
+            data_returned = self.manager.send_action(accion)
+        return data_returned
+
     # TODO: Refactorizar esta clase. Nombres mas descriptivos.
-    #       Permitir ejecutar varios comandos con la misma sesion.
     def _ami_manager(self, action, content):
         if self.disconnected:
             raise OmlError(message='La conexión del Asterisk Manager ya ha sido cerrada')
@@ -83,40 +242,38 @@ class AMIManagerConnector(object):
         return data_returned, error
 
     def _ami_action(self, action, content):
+        acciones = []
         if action == 'command':
             data_returned = self.manager.command(content).data
         elif action == 'QueueAdd':
             event_queuelog = 'ADDMEMBER'
             for i in range(len(content[2])):
-                dict = {
+                acciones.append({
                     'Action': action,
                     'Queue': content[2][i],
                     'Interface': content[4],
                     'Penalty': content[3][i],
                     'Paused': 0,
                     'MemberName': content[1]
-                }
-                data_returned = self.manager.send_action(dict)
+                })
         elif action == 'QueueRemove':
             event_queuelog = 'REMOVEMEMBER'
             for i in range(len(content[2])):
-                dict = {
+                acciones.append({
                     'Action': action,
                     'Queue': content[2][i],
                     'Interface': content[4],
-                }
-                data_returned = self.manager.send_action(dict)
+                })
         elif action == 'QueuePause':
             if content[6] == 'true':
                 event_queuelog = 'PAUSEALL'
             elif content[6] == 'false':
                 event_queuelog = 'UNPAUSEALL'
-            dict = {
+            acciones.append({
                 'Action': action,
                 'Interface': content[4],
                 'Paused': content[6],
-            }
-            data_returned = self.manager.send_action(dict)
+            })
         elif action == 'dbput':
             family = content[0]
             key = content[1]
@@ -125,6 +282,9 @@ class AMIManagerConnector(object):
         elif action == 'originate':
             channel = content[0]
             exten = content[1]
+            # Con Async Asterisk responde al encolar la llamada, de modo que la conexión del
+            # pool no queda retenida mientras suena el canal
+            run_async = content[6] if len(content) > 6 else True
             data_returned = self.manager.originate(
                 channel,
                 exten,
@@ -132,6 +292,7 @@ class AMIManagerConnector(object):
                 caller_id=exten,
                 priority=1,
                 timeout='25000',
+                run_async=run_async,
                 variables=content[3])
         if action == 'QueueAdd' or action == 'QueueRemove' or action == 'QueuePause':
             dict = {
@@ -143,7 +304,9 @@ class AMIManagerConnector(object):
             }
             if action == 'QueuePause':
                 dict['Message'] = content[5]
-            data_returned = self.manager.send_action(dict)
+            acciones.append(dict)
+            # Las acciones sobre las colas y el QueueLog se envían juntas
+            data_returned = self._send_actions(acciones)
         return data_returned
 
 
@@ -162,6 +325,7 @@ class AmiManagerClient(AMIManagerConnector):
         content[3] = variables_de_canal
         content[4] = priority or 1
         content[5] = timeout or '25000'
+        content[6] = is_async
         return self._ami_action('originate', content)
 
     def dbput(self, family, key, val):
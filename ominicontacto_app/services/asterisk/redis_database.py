@@ -20,6 +20,7 @@ from __future__ import unicode_literals
 
 import json
 import sys
+import uuid
 
 from django.conf import settings
 from django.utils.translation import gettext as _
@@ -266,6 +267,83 @@ class CampanaFamily(AbstractRedisFamily):
         redis_connection.hdel(nombre_family, field)
 
 
+# Cuenta los agentes del registro agrupados por el valor de STATUS de su family.
+# Devuelve una lista plana [status_1, cantidad_1, status_2, cantidad_2, ...]
+LUA_CONTAR_AGENTES_POR_STATUS = """
+local cantidades = {}
+for _, id_agente in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    local status = redis.call('HGET', ARGV[1] .. id_agente, 'STATUS')
+    if status then
+        cantidades[status] = (cantidades[status] or 0) + 1
+    end
+end
+local resultado = {}
+for status, cantidad in pairs(cantidades) do
+    table.insert(resultado, status)
+    table.insert(resultado, cantidad)
+end
+return resultado
+"""
+
+
+class RegistroAgentes(object):
+    """
+    Índice con los ids de los agentes que tienen family OML:AGENT en Redis.
+    Permite leer el estado de todos los agentes sin recorrer las keys con KEYS o SCAN.
+    """
+    KEY = 'OML:REGISTRY:AGENTS'
+    PREFIJO_FAMILY = 'OML:AGENT:'
+
+    def __init__(self, redis_connection=None):
+        self.redis_connection = redis_connection
+
+    def get_redis_connection(self):
+        if not self.redis_connection:
+            self.redis_connection = redis.Redis(
+                host=settings.REDIS_HOSTNAME,
+                port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+                decode_responses=True)
+        return self.redis_connection
+
+    def registrar(self, id_agente, client=None):
+        client = client or self.get_redis_connection()
+        client.sadd(self.KEY, id_agente)
+
+    def eliminar(self, id_agente, client=None):
+        client = client or self.get_redis_connection()
+        client.srem(self.KEY, id_agente)
+
+    def vaciar(self, client=None):
+        client = client or self.get_redis_connection()
+        client.delete(self.KEY)
+
+    def obtener_ids(self):
+        return sorted(int(id_agente)
+                      for id_agente in self.get_redis_connection().smembers(self.KEY))
+
+    def obtener_datos_agentes(self):
+        """
+        Devuelve una lista de tuplas (id_agente, datos de la family) leyendo todas las
+        families en un solo pipeline. Se omiten los agentes cuya family ya no existe.
+        """
+        ids_agentes = self.obtener_ids()
+        if not ids_agentes:
+            return []
+        pipeline = self.get_redis_connection().pipeline(transaction=False)
+        for id_agente in ids_agentes:
+            pipeline.hgetall(self.PREFIJO_FAMILY + str(id_agente))
+        datos_agentes = pipeline.execute()
+        return [(id_agente, datos) for id_agente, datos in zip(ids_agentes, datos_agentes)
+                if datos]
+
+    def contar_por_status(self):
+        """ Devuelve un diccionario {status: cantidad de agentes} calculado en Redis """
+        redis_connection = self.get_redis_connection()
+        contar = redis_connection.register_script(LUA_CONTAR_AGENTES_POR_STATUS)
+        resultado = contar(keys=[self.KEY], args=[self.PREFIJO_FAMILY])
+        return {resultado[i]: int(resultado[i + 1]) for i in range(0, len(resultado), 2)}
+
+
 class AgenteFamily(AbstractRedisFamily):
 
     def _create_dict(self, agente, status='', timestamp=''):
@@ -292,7 +370,10 @@ class AgenteFamily(AbstractRedisFamily):
         family = self._get_nombre_family(family_member)
         variables = self._create_dict(family_member, status=status, timestamp=timestamp)
         try:
-            redis_crea_family = redis_connection.hset(family, mapping=variables)
+            pipeline = redis_connection.pipeline(transaction=True)
+            pipeline.hset(family, mapping=variables)
+            RegistroAgentes().registrar(family_member.id, client=pipeline)
+            redis_crea_family = pipeline.execute()[0]
             return redis_crea_family
         except RedisError as e:
             raise e
@@ -300,6 +381,23 @@ class AgenteFamily(AbstractRedisFamily):
             logger.exception(e)
             sys.exit(1)
 
+    def delete_family(self, family_member):
+        redis_connection = self.get_redis_connection()
+        try:
+            pipeline = redis_connection.pipeline(transaction=True)
+            pipeline.delete(self._get_nombre_family(family_member))
+            RegistroAgentes().eliminar(family_member.id, client=pipeline)
+            pipeline.execute()
+        except RedisError as e:
+            raise e
+        except ConnectionError as e:
+            logger.exception(e)
+            sys.exit(1)
+
+    def _delete_tree_family(self):
+        super(AgenteFamily, self)._delete_tree_family()
+        RegistroAgentes(self.get_redis_connection()).vaciar()
+
     def regenerar_family(self, agente, preservar_status=False):
         """Regenera una family de Agente y preserva su status actual en Asterisk"""
         agente_status = ''
@@ -675,6 +773,8 @@ class DestinoPersonalizadoFamily(AbstractRedisFamily):
 
 class BlacklistFamily(object):
     BLACKLIST_KEY = 'OML:BLACKLIST'
+    BLACKLIST_KEY_TEMPORAL = 'OML:BLACKLIST:TMP:{0}'
+    TAMANO_LOTE = 10000
 
     def __init__(self, redis_connection=None):
         self.redis_connection = redis_connection
@@ -693,15 +793,66 @@ class BlacklistFamily(object):
             sys.exit(1)
 
     def regenerar_families(self, blacklist=None):
+        """
+        Carga los teléfonos de a lotes en una key temporal y la renombra como BLACKLIST_KEY,
+        para que Asterisk nunca vea la blacklist vacía o incompleta.
+        """
         self.get_redis_connection()
-        self.redis_connection.delete(self.BLACKLIST_KEY)
-
         if blacklist is None:
             blacklist = Blacklist.objects.first()
             if blacklist is None:
+                self.delete_family()
                 return
-        telefonos = blacklist.contactosblacklist.values_list('telefono', flat=True)
-        self.redis_connection.sadd(self.BLACKLIST_KEY, *telefonos)
+        telefonos = blacklist.contactosblacklist.values_list('telefono', flat=True).iterator(
+            chunk_size=self.TAMANO_LOTE)
+        key_temporal = self.BLACKLIST_KEY_TEMPORAL.format(uuid.uuid4().hex)
+        try:
+            cantidad = self._agregar_de_a_lotes(key_temporal, telefonos, expiracion=60 * 60)
+            if cantidad == 0:
+                self.delete_family()
+                return
+            pipeline = self.redis_connection.pipeline()
+            pipeline.rename(key_temporal, self.BLACKLIST_KEY)
+            # RENAME conserva la expiración de la key temporal
+            pipeline.persist(self.BLACKLIST_KEY)
+            pipeline.execute()
+        finally:
+            self.redis_connection.delete(key_temporal)
+
+    def agregar_telefonos(self, telefonos):
+        """ Agrega teléfonos a la blacklist sin regenerarla """
+        self.get_redis_connection()
+        self._agregar_de_a_lotes(self.BLACKLIST_KEY, telefonos)
+
+    def eliminar_telefonos(self, telefonos):
+        """ Quita teléfonos de la blacklist sin regenerarla """
+        self.get_redis_connection()
+        telefonos = list(telefonos)
+        pipeline = self.redis_connection.pipeline(transaction=False)
+        for i in range(0, len(telefonos), self.TAMANO_LOTE):
+            pipeline.srem(self.BLACKLIST_KEY, *telefonos[i:i + self.TAMANO_LOTE])
+        pipeline.execute()
+
+    def _agregar_de_a_lotes(self, key, telefonos, expiracion=None):
+        """ Agrega los teléfonos al set con un SADD por lote y devuelve la cantidad enviada """
+        cantidad = 0
+        lote = []
+        for telefono in telefonos:
+            lote.append(telefono)
+            if len(lote) == self.TAMANO_LOTE:
+                cantidad += self._agregar_lote(key, lote, expiracion)
+                lote = []
+        if lote:
+            cantidad += self._agregar_lote(key, lote, expiracion)
+        return cantidad
+
+    def _agregar_lote(self, key, lote, expiracion):
+        pipeline = self.redis_connection.pipeline(transaction=False)
+        pipeline.sadd(key, *lote)
+        if expiracion is not None:
+            pipeline.expire(key, expiracion)
+        pipeline.execute()
+        return len(lote)
 
     def delete_family(self):
         self.get_redis_connection()
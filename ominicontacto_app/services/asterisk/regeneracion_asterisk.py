@@ -30,7 +30,6 @@ from ominicontacto_app.services.redis.redis_streams import RedisStreams
 import getpass
 import logging
 import os
-import sys
 
 from crontab import CronTab
 
@@ -39,19 +38,15 @@ from django.utils.translation import gettext as _
 
 from ominicontacto_app.errors import OmlError
 from ominicontacto_app.asterisk_config import AsteriskConfigReloader, AudioConfigFile, \
-    PlaylistsConfigCreator, QueuesCreator, SipConfigCreator
+    PlaylistsConfigCreator, QueuesCreator, SipConfigCreator, contenido_archivo_para_stream
 from configuracion_telefonia_app.models import AudiosAsteriskConf
 from ominicontacto_app.models import ArchivoDeAudio
 import requests
 import tempfile
-import base64
-from pathlib import Path
 import json
 
 logger = logging.getLogger(__name__)
 
-flock_template = 'flock -n /tmp/{}.lock'
-
 
 class RestablecerDialplanError(OmlError):
     """Indica que se produjo un error al crear el dialplan."""
@@ -74,25 +69,20 @@ class RegeneracionAsteriskService(object):
         # Llama al comando que reinicia Asterisk
         self.reload_asterisk_config = AsteriskConfigReloader()
 
-        # parámetros de script que desloguea agentes inactivos
         self.tareas_programadas_ids = [
-            'asterisk_logout_script',                 # [0]
-            'queue_log_clean_job',                    # [1]
-            'actualizar_reportes_de_entrantes_job',   # [2]
-            'actualizar_reporte_supervisores',        # [3]
-            'actualizar_reporte_dia_actual_agentes',  # [4]
-            'actualizar_reportes_salientes',          # [5]
-            'actualizar_reportes_dialers',            # [6]
-            'calcular_datos_wallboards',              # [7]
+            'queue_log_clean_job',
+        ]
+        # Tareas que ejecuta el comando planificador_tareas y ya no se programan en el crontab
+        self.tareas_programadas_reemplazadas_ids = [
+            'asterisk_logout_script',
+            'actualizar_reportes_de_entrantes_job',
+            'actualizar_reporte_supervisores',
+            'actualizar_reporte_dia_actual_agentes',
+            'actualizar_reportes_salientes',
+            'actualizar_reportes_dialers',
+            'calcular_datos_wallboards',
+            'actualizar_resumenes_llamadas',
         ]
-
-        self.TIEMPO_CHEQUEO_CONTACTOS_INACTIVOS = 2
-        self.TIEMPO_ACTUALIZAR_REPORTES_LLAMADAS_ENTRANTES = 1
-        self.TIEMPO_ACTUALIZAR_REPORTE_SUPERVISORES = 5
-        self.TIEMPO_ACTUALIZAR_DASHBOARD_AGENTES = 1
-        self.TIEMPO_ACTUALIZAR_REPORTES_LLAMADAS_SALIENTES = 1
-        self.TIEMPO_ACTUALIZAR_REPORTES_LLAMADAS_DIALERS = 1
-        self.TIEMPO_ACTUALIZAR_REPORTES_WALLBOARD = 1
 
     def _generar_y_recargar_configuracion_asterisk(self):
         proceso_ok = True
@@ -135,30 +125,6 @@ class RegeneracionAsteriskService(object):
             self.asterisk_database.regenerar_asterisk()
             self.reload_asterisk_config.reload_asterisk()
 
-    def _generar_tarea_script_logout_agentes_inactivos(self):
-        """Adiciona una tarea programada que llama al script de que desloguea
-        agentes inactivos
-        """
-        # conectar con cron
-        crontab = CronTab(user=getpass.getuser())
-        ruta_source_envars = 'source /etc/profile.d/omnileads_envars.sh;'
-        id_tarea = self.tareas_programadas_ids[0]
-        flock = flock_template.format(id_tarea)
-        ruta_python_virtualenv = os.path.join(sys.prefix, 'bin/python3')
-        ruta_script_logout = os.path.join(settings.INSTALL_PREFIX,
-                                          'ominicontacto/manage.py logout_unavailable_agents')
-        # adicionar nuevo cron job para esta tarea si no existe anteriormente
-        job = crontab.find_comment(id_tarea)
-        crontab.remove_all(comment=id_tarea)
-        if list(job) == []:
-            job = crontab.new(
-                command='{0} {1} {2} {3}'.format(
-                    ruta_source_envars, flock, ruta_python_virtualenv, ruta_script_logout),
-                comment=id_tarea)
-            # adicionar tiempo de periodicidad al cron job
-            job.minute.every(self.TIEMPO_CHEQUEO_CONTACTOS_INACTIVOS)
-            crontab.write_to_user(user=getpass.getuser())
-
     def _generar_tarea_limpieza_diaria_queuelog(self):
         """Adiciona una tarea programada para limpiar la tabla queue_log
         diariamente
@@ -167,7 +133,7 @@ class RegeneracionAsteriskService(object):
         crontab = CronTab(user=getpass.getuser())
         ruta_psql = os.popen('which psql').read()[:-1]
         # adicionar nuevo cron job para esta tarea si no existe anteriormente
-        id_tarea = self.tareas_programadas_ids[1]
+        id_tarea = self.tareas_programadas_ids[0]
         job = crontab.find_comment(id_tarea)
         crontab.remove_all(comment=id_tarea)
         if list(job) == []:
@@ -175,165 +141,24 @@ class RegeneracionAsteriskService(object):
             postgres_host = settings.POSTGRES_HOST
             postgres_database = settings.POSTGRES_DATABASE
             postgres_password = 'PGPASSWORD={0}'.format(os.getenv('PGPASSWORD'))
+            # Sólo se borran los queue_log ya procesados (ver reportes_app.IngestaQueueLog)
             job = crontab.new(
-                command='{0} {1} -U {2} -h {3} -d {4} -c \'DELETE FROM queue_log\''.format(
+                command='{0} {1} -U {2} -h {3} -d {4} -c \'{5}\''.format(
                     postgres_password, ruta_psql, postgres_user, postgres_host,
-                    postgres_database),
+                    postgres_database,
+                    'DELETE FROM queue_log WHERE id <= '
+                    '(SELECT ultimo_id FROM reportes_app_ingestaqueuelog WHERE id = 1)'),
                 comment=id_tarea)
             # adicionar tiempo de periodicidad al cron job
             job.hour.on(2)
             crontab.write_to_user(user=getpass.getuser())
 
-    def _generar_tarea_script_actualizar_reportes_llamadas_entrantes(self):
-        """Adiciona una tarea programada que llama al script de que calcula reportes de llamadas
-        entrantes
-        """
-        # conectar con cron
-        crontab = CronTab(user=getpass.getuser())
-        ruta_source_envars = 'source /etc/profile.d/omnileads_envars.sh;'
-        id_tarea = self.tareas_programadas_ids[2]
-        flock = flock_template.format(id_tarea)
-        ruta_python_virtualenv = os.path.join(sys.prefix, 'bin/python3')
-        ruta_script_logout = os.path.join(
-            settings.INSTALL_PREFIX,
-            'ominicontacto/manage.py actualizar_reportes_llamadas_entrantes')
-        # adicionar nuevo cron job para esta tarea si no existe anteriormente
-        job = crontab.find_comment(id_tarea)
-        crontab.remove_all(comment=id_tarea)
-        if list(job) == []:
-            job = crontab.new(
-                command='{0} {1} {2} {3}'.format(
-                    ruta_source_envars, flock, ruta_python_virtualenv, ruta_script_logout),
-                comment=id_tarea)
-            # adicionar tiempo de periodicidad al cron job
-            job.minute.every(self.TIEMPO_ACTUALIZAR_REPORTES_LLAMADAS_ENTRANTES)
-            crontab.write_to_user(user=getpass.getuser())
-
-    def _generar_tarea_script_actualizar_reporte_datos_supervisores(self):
-        """Adiciona una tarea programada que llama al script de que calcula el reportes
-        los agentes y campanas asociados a cada supervisor
-        """
-        # conectar con cron
+    def _eliminar_tareas_programadas_reemplazadas(self):
+        """Elimina del crontab las tareas que ahora ejecuta el planificador de tareas"""
         crontab = CronTab(user=getpass.getuser())
-        ruta_source_envars = 'source /etc/profile.d/omnileads_envars.sh;'
-        id_tarea = self.tareas_programadas_ids[3]
-        flock = flock_template.format(id_tarea)
-        ruta_python_virtualenv = os.path.join(sys.prefix, 'bin/python3')
-        ruta_script = os.path.join(
-            settings.INSTALL_PREFIX,
-            'ominicontacto/manage.py actualizar_reporte_supervisores')
-        # adicionar nuevo cron job para esta tarea si no existe anteriormente
-        job = crontab.find_comment(id_tarea)
-        crontab.remove_all(comment=id_tarea)
-        if list(job) == []:
-            job = crontab.new(
-                command='{0} {1} {2} {3}'.format(
-                    ruta_source_envars, flock, ruta_python_virtualenv, ruta_script),
-                comment=id_tarea)
-            # adicionar tiempo de periodicidad al cron job
-            job.minute.every(self.TIEMPO_ACTUALIZAR_REPORTE_SUPERVISORES)
-            crontab.write_to_user(user=getpass.getuser())
-
-    def _generar_tarea_script_actualizar_reporte_agentes_dia_actual(self):
-        """Adiciona una tarea programada que llama al script de que calcula el reportes
-        los agentes y campanas asociados a cada supervisor
-        """
-        # conectar con cron
-        crontab = CronTab(user=getpass.getuser())
-        ruta_source_envars = 'source /etc/profile.d/omnileads_envars.sh;'
-        id_tarea = self.tareas_programadas_ids[4]
-        flock = flock_template.format(id_tarea)
-        ruta_python_virtualenv = os.path.join(sys.prefix, 'bin/python3')
-        ruta_script = os.path.join(
-            settings.INSTALL_PREFIX,
-            'ominicontacto/manage.py actualizar_reporte_dia_actual_agentes')
-        # adicionar nuevo cron job para esta tarea si no existe anteriormente
-        job = crontab.find_comment(id_tarea)
-        crontab.remove_all(comment=id_tarea)
-        if list(job) == []:
-            job = crontab.new(
-                command='{0} {1} {2} {3}'.format(
-                    ruta_source_envars, flock, ruta_python_virtualenv, ruta_script),
-                comment=id_tarea)
-            # adicionar tiempo de periodicidad al cron job
-            job.minute.every(self.TIEMPO_ACTUALIZAR_DASHBOARD_AGENTES)
-            crontab.write_to_user(user=getpass.getuser())
-
-    def _generar_tarea_script_actualizar_reportes_llamadas_salientes(self):
-        """Adiciona una tarea programada que llama al script de que calcula reportes de llamadas
-        salientes
-        """
-        # conectar con cron
-        crontab = CronTab(user=getpass.getuser())
-        ruta_source_envars = 'source /etc/profile.d/omnileads_envars.sh;'
-        id_tarea = self.tareas_programadas_ids[5]
-        flock = flock_template.format(id_tarea)
-        ruta_python_virtualenv = os.path.join(sys.prefix, 'bin/python3')
-        ruta_script_logout = os.path.join(
-            settings.INSTALL_PREFIX,
-            'ominicontacto/manage.py actualizar_reportes_llamadas_salientes')
-
-        # adicionar nuevo cron job para esta tarea si no existe anteriormente
-        job = crontab.find_comment(id_tarea)
-        crontab.remove_all(comment=id_tarea)
-        if list(job) == []:
-            job = crontab.new(
-                command='{0} {1} {2} {3}'.format(
-                    ruta_source_envars, flock, ruta_python_virtualenv, ruta_script_logout),
-                comment=id_tarea)
-            # adicionar tiempo de periodicidad al cron job
-            job.minute.every(self.TIEMPO_ACTUALIZAR_REPORTES_LLAMADAS_SALIENTES)
-            crontab.write_to_user(user=getpass.getuser())
-
-    def _generar_tarea_script_actualizar_reportes_llamadas_dialers(self):
-        """Adiciona una tarea programada que llama al script de que calcula reportes de llamadas
-        dialers
-        """
-        # conectar con cron
-        crontab = CronTab(user=getpass.getuser())
-        ruta_source_envars = 'source /etc/profile.d/omnileads_envars.sh;'
-        id_tarea = self.tareas_programadas_ids[6]
-        flock = flock_template.format(id_tarea)
-        ruta_python_virtualenv = os.path.join(sys.prefix, 'bin/python3')
-        ruta_script_logout = os.path.join(
-            settings.INSTALL_PREFIX,
-            'ominicontacto/manage.py actualizar_reportes_llamadas_dialers')
-
-        # adicionar nuevo cron job para esta tarea si no existe anteriormente
-        job = crontab.find_comment(id_tarea)
-        crontab.remove_all(comment=id_tarea)
-        if list(job) == []:
-            job = crontab.new(
-                command='{0} {1} {2} {3}'.format(
-                    ruta_source_envars, flock, ruta_python_virtualenv, ruta_script_logout),
-                comment=id_tarea)
-            # adicionar tiempo de periodicidad al cron job
-            job.minute.every(self.TIEMPO_ACTUALIZAR_REPORTES_LLAMADAS_DIALERS)
-            crontab.write_to_user(user=getpass.getuser())
-
-    def _generar_tarea_script_calcular_datos_wallboards(self):
-        # conectar con cron
-        crontab = CronTab(user=getpass.getuser())
-        ruta_source_envars = 'source /etc/profile.d/omnileads_envars.sh;'
-        id_tarea = self.tareas_programadas_ids[7]
-        flock = flock_template.format(id_tarea)
-        ruta_python_virtualenv = os.path.join(sys.prefix, 'bin/python3')
-        ruta_script_logout = os.path.join(settings.INSTALL_PREFIX,
-                                          'ominicontacto/manage.py calcular_datos_wallboards')
-        # Eliminar cualquier cron job de la tarea anterior
-        job = crontab.find_comment(id_tarea)
-        crontab.remove_all(comment=id_tarea)
-        # Si está habilitado el addon en Envars
-        if not os.getenv('WALLBOARD_VERSION', '') == '':
-            # adicionar nuevo cron job para esta tarea si no existe anteriormente
-            if list(job) == []:
-                job = crontab.new(
-                    command='{0} {1} {2} {3}'.format(
-                        ruta_source_envars, flock, ruta_python_virtualenv, ruta_script_logout),
-                    comment=id_tarea)
-                # adicionar tiempo de periodicidad al cron job
-                job.minute.every(self.TIEMPO_ACTUALIZAR_REPORTES_WALLBOARD)
-                crontab.write_to_user(user=getpass.getuser())
+        for id_tarea in self.tareas_programadas_reemplazadas_ids:
+            crontab.remove_all(comment=id_tarea)
+        crontab.write_to_user(user=getpass.getuser())
 
     def _reenviar_archivos_playlist_asterisk(self):
         playlists = Playlist.objects.all()
@@ -369,17 +194,15 @@ class RegeneracionAsteriskService(object):
 
             print(f'   {language}...')
             __, nombre_archivo = os.path.split(filename_full_path)
-            sound_tar_data = Path(filename_full_path).read_bytes()
-            res = base64.b64encode(sound_tar_data)
-            res = res.decode('utf-8')
             redis_stream = RedisStreams()
             content = {
                 'archivo': nombre_archivo,
                 'type': 'ASTERISK_SOUNDS',
                 'action': 'COPY',
                 'language': language,
-                'content': res
             }
+            content.update(
+                contenido_archivo_para_stream(filename_full_path, redis_stream.connection))
             redis_stream.write_stream('asterisk_conf_updater', json.dumps(content))
         print('Completada descarga de paquetes de idioma')
 
@@ -388,16 +211,10 @@ class RegeneracionAsteriskService(object):
         self._reenviar_archivos_playlist_asterisk()
         self._reenviar_archivos_audio_asterisk()
         self._reenviar_paquetes_idioma()
-        self._generar_tarea_script_logout_agentes_inactivos()
         self._generar_tarea_limpieza_diaria_queuelog()
-        self._generar_tarea_script_actualizar_reportes_llamadas_entrantes()
-        self._generar_tarea_script_actualizar_reportes_llamadas_salientes()
-        self._generar_tarea_script_actualizar_reportes_llamadas_dialers()
-        self._generar_tarea_script_actualizar_reporte_datos_supervisores()
-        self._generar_tarea_script_actualizar_reporte_agentes_dia_actual()
+        self._eliminar_tareas_programadas_reemplazadas()
         if not os.getenv('WALLBOARD_VERSION', '') == '':
             from wallboard_app.redis_families import WallboardFamily
             from wallboard_app.models import Wallboard
             wallboard_family = WallboardFamily(objects=Wallboard.objects)
             wallboard_family.regenerar_families()
-        self._generar_tarea_script_calcular_datos_wallboards()
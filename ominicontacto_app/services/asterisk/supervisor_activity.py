@@ -27,6 +27,7 @@ from django.utils.translation import gettext as _
 
 from ominicontacto_app.services.asterisk.asterisk_ami import AMIManagerConnector
 from ominicontacto_app.services.asterisk.agent_activity import AgentActivityAmiManager
+from ominicontacto_app.services.asterisk.redis_database import RegistroAgentes
 from ominicontacto_app.models import AgenteProfile
 
 LONGITUD_MINIMA_HEADERS = 4
@@ -49,18 +50,12 @@ class SupervisorActivityAmiManager(object):
         return data_returned
 
     def obtener_agentes_activos(self):
-        agentes_activos = []
         redis_connection = redis.Redis(
             host=settings.REDIS_HOSTNAME, port=settings.CONSTANCE_REDIS_CONNECTION['port'],
             decode_responses=True)
-        # TODO: cambiar a usar el metodo 'scan' que es mas eficiente con datos muy grandes
-        # y realiza una especie de paginación
-        keys_agentes = redis_connection.keys('OML:AGENT*')
         agentes_activos = []
-        for key in keys_agentes:
-            agente_info = redis_connection.hgetall(key)
+        for id_agente, agente_info in RegistroAgentes(redis_connection).obtener_datos_agentes():
             status = agente_info.get('STATUS', '')
-            id_agente = key.split(':')[-1]
             if status != '' and len(agente_info) >= LONGITUD_MINIMA_HEADERS:
                 agente_info['nombre'] = agente_info['NAME']
                 agente_info['status'] = status
@@ -75,7 +70,7 @@ class SupervisorActivityAmiManager(object):
                 del agente_info['STATUS']
                 del agente_info['TIMESTAMP']
                 del agente_info['SIP']
-                agente_info['id'] = int(id_agente)
+                agente_info['id'] = id_agente
                 agentes_activos.append(agente_info)
         return agentes_activos
 
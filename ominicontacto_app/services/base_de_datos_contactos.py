@@ -22,11 +22,13 @@ Servicio encargado de validar y crear las bases de datos.
 
 from __future__ import unicode_literals
 
+import io
 import json
 import logging
 import os
 import re
 
+from django.db import connection, transaction
 from django.utils.encoding import smart_text
 from django.utils.translation import gettext as _
 
@@ -69,30 +71,17 @@ class CreacionBaseDatosService(object):
         filename = base_datos_contacto.nombre_archivo_importacion
         extension = os.path.splitext(filename)[1].lower()
         if extension not in csv_extensions:
-            logger.warn(_("La extension {0} no es CSV. ".format(extension)))
+            logger.warn(_("La extension {0} no es CSV. ").format(extension))
             raise(OmlArchivoImportacionInvalidoError(file_invalid_msg))
         base_datos_contacto.save()
 
     def obtener_telefono_y_datos(self, lista_dato, posicion_primer_telefono,
                                  columna_id_externo):
-        id_externo = None
-        if len(lista_dato) > 1:
-            item = []
-            for i, valor in enumerate(lista_dato):
-                if i == posicion_primer_telefono:
-                    telefono = valor
-                elif i == columna_id_externo:
-                    id_externo = valor
-                else:
-                    item.append(valor)
-        else:
-            telefono = lista_dato[0]
-            item = ['']
-
-        datos = json.dumps(item)
-        return telefono, datos, id_externo
+        return obtener_telefono_y_datos(lista_dato, posicion_primer_telefono,
+                                        columna_id_externo)
 
-    def importa_contactos(self, base_datos_contacto, campos_telefonicos, columna_id_externo):
+    def importa_contactos(self, base_datos_contacto, campos_telefonicos, columna_id_externo,
+                          callback_progreso=None):
         """
         Tercer paso de la creación de una BaseDatosContacto.
         Este método se encarga de generar los objectos Contacto por cada linea
@@ -110,58 +99,12 @@ class CreacionBaseDatosService(object):
         # metadata = base_datos_contacto.get_metadata()
         # metadata.validar_metadatos()
 
-        # Antes que nada, borramos los contactos preexistentes
-        # base_datos_contacto.elimina_contactos()
-
-        parser = ParserCsv()
-
-        ids_externos = base_datos_contacto.contactos.values_list('id_externo', flat=True)
-        ids_externos = set(ids_externos)
-        ids_nuevos_contactos = []
-
-        try:
-            estructura_archivo = parser.get_estructura_archivo(base_datos_contacto)
-            posicion_primer_telefono = estructura_archivo[0].index(
-                str(campos_telefonicos[0]))
-            cantidad_contactos = 0
+        importador = ImportadorContactosEnLotes(base_datos_contacto,
+                                                callback_progreso=callback_progreso)
+        cantidad_importados = importador.importar(campos_telefonicos, columna_id_externo)
 
-            if base_datos_contacto.cantidad_contactos:
-                cantidad_contactos = base_datos_contacto.cantidad_contactos
-            numero_fila = 0
-            for lista_dato in estructura_archivo[1:]:
-                numero_fila += 1
-                telefono, datos, id_externo = self.obtener_telefono_y_datos(
-                    lista_dato, posicion_primer_telefono, columna_id_externo)
-                cantidad_contactos += 1
-
-                if id_externo is not None and id_externo != '':
-                    # El id_externo no puede estar repetido
-                    if id_externo in ids_externos:
-                        base_datos_contacto.contactos.filter(id__in=ids_nuevos_contactos).delete()
-                        raise(CreacionBaseDatosServiceIdExternoError(numero_fila,
-                                                                     columna_id_externo,
-                                                                     lista_dato,
-                                                                     id_externo))
-                    else:
-                        ids_externos.add(id_externo)
-
-                contacto = Contacto.objects.create(
-                    telefono=telefono,
-                    datos=datos,
-                    bd_contacto=base_datos_contacto,
-                    id_externo=id_externo
-                )
-                ids_nuevos_contactos.append(contacto.id)
-
-        except OmlParserMaxRowError:
-            base_datos_contacto.contactos.filter(id__in=ids_nuevos_contactos).delete()
-            raise
-
-        except OmlParserCsvImportacionError:
-            base_datos_contacto.contactos.filter(id__in=ids_nuevos_contactos).delete()
-            raise
-
-        base_datos_contacto.cantidad_contactos = cantidad_contactos
+        cantidad_contactos = base_datos_contacto.cantidad_contactos or 0
+        base_datos_contacto.cantidad_contactos = cantidad_contactos + cantidad_importados
         base_datos_contacto.save()
 
     def define_base_dato_contacto(self, base_datos_contacto):
@@ -247,6 +190,157 @@ class CreacionBaseDatosServiceIdExternoError(OmlParserCsvImportacionError):
     pass
 
 
+def obtener_telefono_y_datos(lista_dato, posicion_primer_telefono, columna_id_externo):
+    """
+    Separa una fila del archivo de importación en el teléfono principal, los datos
+    restantes (serializados en json) y el id externo, tal como se guardan en Contacto.
+    """
+    id_externo = None
+    if len(lista_dato) > 1:
+        item = []
+        for i, valor in enumerate(lista_dato):
+            if i == posicion_primer_telefono:
+                telefono = valor
+            elif i == columna_id_externo:
+                id_externo = valor
+            else:
+                item.append(valor)
+    else:
+        telefono = lista_dato[0]
+        item = ['']
+
+    datos = json.dumps(item)
+    return telefono, datos, id_externo
+
+
+def _valor_csv_copy(valor):
+    """ Serializa un valor para COPY en formato csv. None se envía como NULL """
+    if valor is None:
+        return ''
+    return '"{0}"'.format(str(valor).replace('"', '""'))
+
+
+class ImportadorContactosEnLotes(object):
+    """
+    Importa los contactos del archivo de una BaseDatosContacto leyéndolo fila a fila
+    e insertándolos por lotes (COPY en PostgreSQL, bulk_create en otro caso), por lo que
+    el consumo de memoria no depende del tamaño del archivo.
+    Toda la importación se hace en una transacción: ante un error no queda en la base
+    ninguno de los contactos del archivo.
+    """
+
+    TAMANO_LOTE = 5000
+    CAMPOS_COPY = ('telefono', 'datos', 'bd_contacto', 'id_externo', 'es_originario')
+
+    def __init__(self, base_datos_contacto, tamano_lote=None, callback_progreso=None):
+        """
+        Parametros:
+        - callback_progreso: función que recibe la cantidad de contactos importados
+          hasta el momento. Se invoca al terminar cada lote.
+        """
+        self.base_datos_contacto = base_datos_contacto
+        self.tamano_lote = tamano_lote or self.TAMANO_LOTE
+        self.callback_progreso = callback_progreso
+        self.metadata = base_datos_contacto.get_metadata()
+        self.parser = ParserCsv()
+        self.cantidad_importados = 0
+
+    def importar(self, campos_telefonicos, columna_id_externo):
+        """
+        Importa los contactos del archivo y devuelve la cantidad de filas importadas.
+        :raises: CreacionBaseDatosServiceIdExternoError si hay un id externo repetido.
+        :raises: OmlParserCsvImportacionError si alguna fila no valida.
+        """
+        self.cantidad_importados = 0
+        ids_externos = set(self.base_datos_contacto.contactos.exclude(
+            id_externo__isnull=True).exclude(id_externo='').values_list(
+                'id_externo', flat=True).iterator())
+
+        filas = self.parser.itera_estructura_archivo(self.base_datos_contacto)
+        encabezado = next(filas)
+        posicion_primer_telefono = encabezado.index(str(campos_telefonicos[0]))
+
+        with transaction.atomic():
+            lote = []
+            for numero_fila, lista_dato in enumerate(filas, start=1):
+                self._validar_fila(numero_fila, lista_dato)
+                telefono, datos, id_externo = obtener_telefono_y_datos(
+                    lista_dato, posicion_primer_telefono, columna_id_externo)
+
+                if id_externo is not None and id_externo != '':
+                    # El id_externo no puede estar repetido
+                    if id_externo in ids_externos:
+                        raise CreacionBaseDatosServiceIdExternoError(numero_fila,
+                                                                     columna_id_externo,
+                                                                     lista_dato,
+                                                                     id_externo)
+                    ids_externos.add(id_externo)
+
+                lote.append((telefono, datos, id_externo))
+                if len(lote) >= self.tamano_lote:
+                    self._insertar_lote(lote)
+                    lote = []
+
+            if lote:
+                self._insertar_lote(lote)
+
+        return self.cantidad_importados
+
+    def _validar_fila(self, numero_fila, lista_dato):
+        """
+        Valida las columnas de fecha y hora no vacías según la metadata de la base.
+        Los teléfonos no se vuelven a validar: las columnas se infirieron al subir el archivo,
+        con la regla que corresponde a la base (ver permitir_ext_pbx).
+        """
+        validaciones = ((self.metadata.columnas_con_fecha, validate_fechas),
+                        (self.metadata.columnas_con_hora, validate_horas))
+        for columnas, validar in validaciones:
+            valores = [lista_dato[columna] for columna in columnas
+                       if columna < len(lista_dato) and lista_dato[columna] != '']
+            if valores and not validar(valores):
+                logger.warn(_("Error en la importacion de contactos: No valida la "
+                              "linea {0}").format(numero_fila))
+                raise OmlParserCsvImportacionError(
+                    numero_fila=numero_fila,
+                    numero_columna=columnas,
+                    fila=lista_dato,
+                    valor_celda=valores)
+
+    def _insertar_lote(self, lote):
+        if connection.vendor == 'postgresql':
+            self._copiar_lote(lote)
+        else:
+            Contacto.objects.bulk_create(
+                [Contacto(telefono=telefono, datos=datos, id_externo=id_externo,
+                          bd_contacto=self.base_datos_contacto)
+                 for telefono, datos, id_externo in lote])
+
+        self.cantidad_importados += len(lote)
+        logger.info(_("Base de datos {0}: {1} contactos importados").format(
+            self.base_datos_contacto.pk, self.cantidad_importados))
+        if self.callback_progreso is not None:
+            self.callback_progreso(self.cantidad_importados)
+
+    def _copiar_lote(self, lote):
+        bd_contacto_id = str(self.base_datos_contacto.pk)
+        buffer = io.StringIO()
+        for telefono, datos, id_externo in lote:
+            buffer.write(','.join((_valor_csv_copy(telefono), _valor_csv_copy(datos),
+                                   bd_contacto_id, _valor_csv_copy(id_externo), 't')))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.copy_expert(self._sql_copy(), buffer)
+
+    def _sql_copy(self):
+        opts = Contacto._meta
+        quote_name = connection.ops.quote_name
+        columnas = [quote_name(opts.get_field(campo).column) for campo in self.CAMPOS_COPY]
+        return 'COPY {0} ({1}) FROM STDIN WITH (FORMAT csv)'.format(
+            quote_name(opts.db_table), ', '.join(columnas))
+
+
 DOUBLE_SPACES = re.compile(r' +')
 
 
@@ -309,7 +403,7 @@ class PredictorMetadataService(object):
         logger.debug("inferir_metadata_desde_lineas(): %s", lineas)
 
         if len(lineas) < 2:
-            logger.debug(_("Se deben proveer al menos 2 lineas: {0}".format(lineas)))
+            logger.debug(_("Se deben proveer al menos 2 lineas: {0}").format(lineas))
             raise(NoSePuedeInferirMetadataError(_("Se deben proveer al menos 2 "
                                                   "lineas para poder inferir "
                                                   "los metadatos")))
@@ -348,7 +442,7 @@ class PredictorMetadataService(object):
         columnas_con_telefonos = self._inferir_columnas(
             otras_lineas, validate_telefono if not permitir_ext_pbx else validate_telefono_or_ext)
 
-        logger.debug(_("columnas_con_telefonos: {0}".format(columnas_con_telefonos)))
+        logger.debug(_("columnas_con_telefonos: {0}").format(columnas_con_telefonos))
 
         columnas_con_fechas = self._inferir_columnas(
             otras_lineas, lambda x: validate_fechas([x]))
@@ -366,8 +460,8 @@ class PredictorMetadataService(object):
 
         else:
             # Se detecto 1 o mas columnas con telefono. Usamos la 1ra.
-            logger.debug(_("Se detecto: columnas_con_telefonos: {0}".format(
-                columnas_con_telefonos)))
+            logger.debug(_("Se detecto: columnas_con_telefonos: {0}").format(
+                columnas_con_telefonos))
 
             if columnas_con_telefonos[0] in columnas_con_fechas:
                 logger.warn(_("La columna con telefono tambien esta entre "
@@ -470,7 +564,7 @@ class PredictorMetadataService(object):
         logger.debug("inferir_metadata_desde_lineas(): %s", lineas)
 
         if len(lineas) < 2:
-            logger.debug(_("Se deben proveer al menos 2 lineas: {0}".format(lineas)))
+            logger.debug(_("Se deben proveer al menos 2 lineas: {0}").format(lineas))
             raise(NoSePuedeInferirMetadataError(_("Se deben proveer al menos 2 "
                                                   "lineas para poder inferir "
                                                   "los metadatos")))
@@ -508,7 +602,7 @@ class PredictorMetadataService(object):
             if str(columna_base).capitalize() != str(columna_csv).capitalize():
                 raise (NoSePuedeInferirMetadataErrorEncabezado(
                     _("El nombre de la  columna {0} no coincide con el "
-                      "guardado en la base ".format(columna_base))))
+                      "guardado en la base ").format(columna_base)))
 
         # ======================================================================
         # Primero detectamos columnas de datos
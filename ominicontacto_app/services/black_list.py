@@ -44,6 +44,8 @@ logger = logging.getLogger(__name__)
 
 class CreacionBlacklistService(object):
 
+    TAMANO_LOTE = 5000
+
     def genera_black_list(self, black_list):
         """
         Primer paso de la creación de una Blacklist.
@@ -77,26 +79,28 @@ class CreacionBlacklistService(object):
         Segundo paso de la creación de una Blacklist.
         Este método se encarga de generar los objectos Contacto por cada linea
         del archivo de importación especificado para la base de datos de
-        contactos.
+        contactos. Los teléfonos que ya están en la blacklist se ignoran.
+        Devuelve True si el archivo tenía teléfonos repetidos.
         """
 
         parser = ParserCsv()
 
         try:
-            estructura_archivo = parser.get_estructura_archivo(blacklist)
+            filas = parser.itera_estructura_archivo(blacklist)
+            next(filas)
             cantidad_contactos = 0
-            contactos_repetidos = False
             if blacklist.cantidad_contactos:
                 cantidad_contactos = blacklist.cantidad_contactos
-            for lista_dato in estructura_archivo[1:]:
-                if ContactoBlacklist.objects.filter(telefono=lista_dato[0]).count() == 0:
-                    cantidad_contactos += 1
-                    ContactoBlacklist.objects.create(
-                        telefono=lista_dato[0],
-                        black_list=blacklist,
-                    )
-                else:
-                    contactos_repetidos = True
+            cantidad_filas = 0
+            cantidad_previa = ContactoBlacklist.objects.count()
+            lote = []
+            for lista_dato in filas:
+                lote.append(ContactoBlacklist(telefono=lista_dato[0], black_list=blacklist))
+                if len(lote) >= self.TAMANO_LOTE:
+                    cantidad_filas += self._insertar_lote(lote)
+                    lote = []
+            if lote:
+                cantidad_filas += self._insertar_lote(lote)
         except OmlParserMaxRowError:
             blacklist.elimina_contactos()
             raise
@@ -105,9 +109,15 @@ class CreacionBlacklistService(object):
             blacklist.elimina_contactos()
             raise
 
-        blacklist.cantidad_contactos = cantidad_contactos
+        cantidad_agregados = ContactoBlacklist.objects.count() - cantidad_previa
+        blacklist.cantidad_contactos = cantidad_contactos + cantidad_agregados
         blacklist.save()
-        return contactos_repetidos
+        return cantidad_agregados < cantidad_filas
+
+    def _insertar_lote(self, lote):
+        # Los teléfonos ya existentes (o repetidos en el lote) no se insertan
+        ContactoBlacklist.objects.bulk_create(lote, ignore_conflicts=True)
+        return len(lote)
 
 
 class NoSePuedeInferirMetadataErrorFormatoFilas(OmlError):
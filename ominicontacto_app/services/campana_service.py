@@ -20,6 +20,7 @@
 
 from __future__ import unicode_literals
 
+import logging
 import time
 import unicodedata
 
@@ -35,16 +36,27 @@ from ominicontacto_app.services.wombat_config import (
     CampanaEndPointCreator, CampanaListCreator, CampanaDeleteListCreator,
 )
 from ominicontacto_app.services.exportar_base_datos import SincronizarBaseDatosContactosService
+from ominicontacto_app.services.sincronizacion_lista_wombat import SincronizacionListaWombat
 from ominicontacto_app.errors import OmlError
 
+logger = logging.getLogger(__name__)
+
 
 class WombatDialerError(OmlError):
     """Indica que se produjo un error al interactuar con Wombat Dialer."""
     pass
 
 
+class SincronizacionListaEnCursoError(WombatDialerError):
+    """Indica que ya se está actualizando la lista de contactos de la campaña en Wombat."""
+    pass
+
+
 class CampanaService():
 
+    # Segundos entre consultas a wombat mientras se espera que remueva una campana
+    INTERVALO_ESPERA_REMOCION = 1
+
     def validar_modificacion_bd_contacto(self, campana, base_datos_modificar):
         """
 
@@ -167,10 +179,9 @@ class CampanaService():
         service_wombat = WombatService()
         # crea json de campaign para crear campaign en wombat
         service_wombat_config = CampanaCreator()
-        service_wombat_config.create_json(campana)
+        config_json = service_wombat_config.create_json(campana)
         # crear campaing en wombat
-        salida = service_wombat.update_config_wombat(
-            "newcampaign.json", 'api/edit/campaign/?mode=E')
+        salida = service_wombat.update_config_wombat(config_json, 'api/edit/campaign/?mode=E')
         results = salida['results']
         # obtengo el campaign_id generado por wombat
         campaign_id = results[0]['campaignId']
@@ -188,11 +199,11 @@ class CampanaService():
         service_wombat = WombatService()
         # crea json de trunk para crear trunk en una campana de wombat
         service_wombat_config = TrunkCreator()
-        service_wombat_config.create_json(campana)
+        config_json = service_wombat_config.create_json(campana)
         url_edit = "api/edit/campaign/trunk/?mode=E&parent={0}".format(
             campana.campaign_id_wombat)
         # crea trunk en la campana en wombat
-        service_wombat.update_config_wombat("newcampaign_trunk.json", url_edit)
+        service_wombat.update_config_wombat(config_json, url_edit)
 
     def crear_reschedule_campana_wombat(self, campana, parametros):
         """
@@ -203,11 +214,11 @@ class CampanaService():
         service_wombat = WombatService()
         # crea json para reschedule
         service_wombat_config = RescheduleRuleCreator()
-        service_wombat_config.create_json(campana, parametros)
+        config_json = service_wombat_config.create_json(campana, parametros)
         url_edit = "api/edit/campaign/reschedule/?mode=E&parent={0}".format(
             campana.campaign_id_wombat)
         # crea reschedule wn wombat
-        service_wombat.update_config_wombat("newcampaign_reschedule.json", url_edit)
+        service_wombat.update_config_wombat(config_json, url_edit)
 
     def crear_reschedule_por_calificacion_wombat(self, campana, regla, estado_wombat):
         """
@@ -295,10 +306,10 @@ class CampanaService():
         service_wombat = WombatService()
         # crea json de endpoint para crear endpoint en wombat
         service_wombat_config = EndPointCreator()
-        service_wombat_config.create_json(campana)
+        config_json = service_wombat_config.create_json(campana)
         url_edit = "api/edit/ep/?mode=E"
         # crea o edita endpoint en wombat
-        salida = service_wombat.update_config_wombat("newep.json", url_edit)
+        salida = service_wombat.update_config_wombat(config_json, url_edit)
         results = salida['results']
         # obtengo ep_id del endpoint recientemente creado
         ep_id = results[0]['epId']
@@ -316,23 +327,32 @@ class CampanaService():
         service_wombat = WombatService()
         # crear json de asociacion campana endpoint
         service_wombat_config = CampanaEndPointCreator()
-        service_wombat_config.create_json(campana)
+        config_json = service_wombat_config.create_json(campana)
         url_edit = "api/edit/campaign/ep/?mode=E&parent={0}".format(
             campana.campaign_id_wombat)
         # crea asociacion de enpoint con campaign en wombat
-        service_wombat.update_config_wombat("newcampaign_ep.json", url_edit)
+        service_wombat.update_config_wombat(config_json, url_edit)
 
-    def crear_lista_contactos_wombat(self, campana):
+    def crear_lista_contactos_wombat(self, campana, lista_contactos, sincronizacion=None):
         """
-        Crea lista de contactos en wombat, se crear una lista tomando los contactos de la base de
-        datos de contactos de la campana
+        Crea lista de contactos en wombat, enviando los contactos de a lotes a medida que se
+        generan
         :param campana: campana de la cual se creara la lista
+        :param lista_contactos: ListaContactosWombat con los contactos de la campana
+        :param sincronizacion: SincronizacionListaWombat donde registrar el progreso
         """
         service_wombat = WombatService()
         nombre_lista_ascii = self.obtener_nombre_lista_ascii(campana)
         url_edit = "api/lists/?op=addToList&list={0}".format(nombre_lista_ascii)
+        enviados = 0
         # crea lista de contactos en wombat
-        service_wombat.update_lista_wombat("newcampaign_list_contacto.txt", url_edit)
+        for cantidad, numeros in lista_contactos.generar_lotes(settings.OML_WOMBAT_LISTA_LOTE):
+            if service_wombat.update_lista_wombat(numeros, url_edit) is None:
+                raise WombatDialerError(
+                    _("No se pudo cargar la lista de contactos en Wombat"))
+            enviados += cantidad
+            if sincronizacion is not None:
+                sincronizacion.actualizar_progreso(enviados)
 
     def crear_lista_asociacion_campana_wombat(self, campana):
         """
@@ -349,12 +369,11 @@ class CampanaService():
             list_id = 1
         # crea json de asociacion campana con el id de lista de contactos
         service_wombat_config = CampanaListCreator()
-        service_wombat_config.create_json(list_id)
+        config_json = service_wombat_config.create_json(list_id)
         url_edit = "api/edit/campaign/list/?mode=E&parent={0}".format(
             campana.campaign_id_wombat)
         # asocia lista de contactos con campaign en wombat
-        salida = service_wombat.update_config_wombat(
-            "newcampaign_list.json", url_edit)
+        salida = service_wombat.update_config_wombat(config_json, url_edit)
 
     def _requests_post_wombat(self, url):
         """Realiza el post a wombat por requests"""
@@ -415,12 +434,11 @@ class CampanaService():
             cclId = 0
         # crear json para eliminar lista de contactos de la campana en wombat
         service_wombat_config = CampanaDeleteListCreator()
-        service_wombat_config.create_json(cclId)
+        config_json = service_wombat_config.create_json(cclId)
         url_edit = "api/edit/campaign/list/?mode=D&parent={0}".format(
             campana.campaign_id_wombat)
         # elimina lista de contactos de la campana en wombat
-        salida = service_wombat.update_config_wombat(
-            "deletecampaign_list.json", url_edit)
+        salida = service_wombat.update_config_wombat(config_json, url_edit)
 
     def remove_campana_wombat(self, campana):
         """
@@ -471,8 +489,20 @@ class CampanaService():
         else:
             return None
 
+    def iniciar_sincronizacion_lista(self, campana):
+        """
+        Toma el lock de sincronización de la lista de la campana y devuelve la
+        SincronizacionListaWombat.
+        Lanza SincronizacionListaEnCursoError si ya se está cambiando la lista de la campana
+        """
+        sincronizacion = SincronizacionListaWombat(campana.pk)
+        if not sincronizacion.iniciar():
+            raise SincronizacionListaEnCursoError(
+                _("Ya se está actualizando la lista de contactos de la campaña"))
+        return sincronizacion
+
     def cambiar_base(self, campana, telefonos, evitar_duplicados, evitar_sin_telefono,
-                     prefijo_discador):
+                     prefijo_discador, sincronizacion=None):
         """
         Cambiar base de datos de una campana, lista de contactos en wombat para la campana
         :param campana: campana a la cual desea cambiar la base de datos
@@ -480,27 +510,60 @@ class CampanaService():
         :param evitar_duplicados: si se desea evitar duplicados
         :param evitar_sin_telefono: si se desea evitar los contactos sin telefono
         :param prefijo_discador: el prefijo del discador
-
-        Deuda Tecnica mover a otro servico la creacion del archivo con  la lista
+        :param sincronizacion: SincronizacionListaWombat ya iniciada por quien llama (ver
+            iniciar_sincronizacion_lista), que se libera al terminar
+        Lanza SincronizacionListaEnCursoError si ya se está cambiando la lista de la campana
         """
         # TODO: el parámetro 'telefonos' no se usa, removerlo
-        service_base = SincronizarBaseDatosContactosService()
-        # crea archivo con lista de contactos para crear lista de contactos en wombat
-        service_base.crear_lista(campana, evitar_duplicados, evitar_sin_telefono, prefijo_discador)
-
-        # remueve la campana de las campanas corriendo en wombat
-        resultado = self.remove_campana_wombat(campana)
-        if resultado:
-            campana.remover()
-        else:
-            pass  # TODO: Verificar si se debe seguir con estos pasos o no!
-        time.sleep(30)          # FIXME: por qué este sleep ??
-        # elimina la lista de contactos de la campana en wombat
-        self.desasociacion_campana_wombat(campana)
-        # crea la lista de contactos en wombat
-        self.crear_lista_contactos_wombat(campana)
-        # asocio la lista de contactos a la campana en wombat
-        self.crear_lista_asociacion_campana_wombat(campana)
+        if sincronizacion is None:
+            sincronizacion = self.iniciar_sincronizacion_lista(campana)
+        try:
+            service_base = SincronizarBaseDatosContactosService()
+            lista_contactos = service_base.crear_lista(
+                campana, evitar_duplicados, evitar_sin_telefono, prefijo_discador)
+            sincronizacion.actualizar_total(lista_contactos.cantidad())
+
+            # remueve la campana de las campanas corriendo en wombat
+            resultado = self.remove_campana_wombat(campana)
+            if resultado:
+                campana.remover()
+                self._esperar_remocion_campana_wombat(campana)
+            else:
+                pass  # TODO: Verificar si se debe seguir con estos pasos o no!
+            # elimina la lista de contactos de la campana en wombat
+            self.desasociacion_campana_wombat(campana)
+            # crea la lista de contactos en wombat
+            self.crear_lista_contactos_wombat(campana, lista_contactos, sincronizacion)
+            # asocio la lista de contactos a la campana en wombat
+            self.crear_lista_asociacion_campana_wombat(campana)
+        except Exception as e:
+            sincronizacion.fallar(e)
+            raise
+        sincronizacion.finalizar()
+
+    def _esperar_remocion_campana_wombat(self, campana):
+        """
+        Espera a que la campana deje de figurar entre las campanas corriendo en wombat, hasta
+        OML_WOMBAT_ESPERA_REMOCION segundos.
+        Lanza WombatDialerError si en ese lapso no se pudo consultar a wombat
+        """
+        service_wombat = WombatService()
+        limite = time.monotonic() + settings.OML_WOMBAT_ESPERA_REMOCION
+        consultada = False
+        while time.monotonic() < limite:
+            # A diferencia de obtener_dato_campana_run, un error al consultar a wombat no
+            # se toma como que la campaña ya no corre
+            salida = service_wombat.list_config_wombat("api/live/runs/")
+            if salida is not None:
+                consultada = True
+                if self.obtener_datos_campana_json_de_wombat(salida, campana) is None:
+                    return
+            time.sleep(self.INTERVALO_ESPERA_REMOCION)
+        if not consultada:
+            raise WombatDialerError(_("No se pudo verificar que la campaña {0} dejó de correr "
+                                      "en Wombat").format(campana.pk))
+        logger.warning(_("La campaña {0} sigue corriendo en Wombat luego de removerla").format(
+            campana.pk))
 
     def obtener_calls_live(self):
         """ retorna las llamada e en vivo en este momento"""
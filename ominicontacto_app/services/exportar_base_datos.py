@@ -17,7 +17,7 @@
 #
 
 """
-Servicio para exportar la batos a un csv y para generar la lista en una archivo
+Servicio para exportar la batos a un csv y para generar la lista de contactos
 para insertar en wombat
 """
 
@@ -35,7 +35,6 @@ from django.utils.translation import gettext as _
 from ominicontacto_app.utiles import crear_archivo_en_media_root
 from ominicontacto_app.models import Contacto
 from ominicontacto_app.services.base_de_datos_contactos import BaseDatosService
-from ominicontacto_app.services.wombat_config import CampanaListContactoConfigFile
 
 logger = logging.getLogger(__name__)
 
@@ -124,62 +123,90 @@ class ArchivoDeReporteCsv(object):
         return os.path.exists(self.ruta)
 
 
-class SincronizarBaseDatosContactosService(object):
-
-    def __init__(self):
-        self._campana_list_contacto_config_file = CampanaListContactoConfigFile()
-
-    def crear_lista(self, campana, evitar_duplicados, evitar_sin_telefono, prefijo_discador):
-
-        base_datos = campana.bd_contacto
-
-        # no tiene sentido ya que esto hace un filtro por pk
-        if evitar_duplicados:
-            service_base_datos = BaseDatosService()
-            service_base_datos.eliminar_contactos_duplicados(base_datos)
-
-        contactos = Contacto.objects.contactos_by_bd_contacto(base_datos)
-
-        if evitar_sin_telefono:
-            contactos = contactos.exclude(telefono__isnull=True).exclude(
-                telefono__exact='')
-
-        metadata = base_datos.get_metadata()
+class ListaContactosWombat(object):
+    """
+    Lista de contactos de una campaña para cargar en Wombat. Los contactos se leen con un
+    cursor del lado del servidor y la lista se genera de a lotes a medida que se envía, sin
+    armarla completa en memoria ni en un archivo.
+    """
 
-        lista_contacto = self.escribir_lista(contactos, metadata, campana, prefijo_discador)
-        logger.info(_("Creando archivo para asociacion lista {0} campana".format(campana.nombre)))
+    TAMANO_CHUNK_CURSOR = 2000
 
-        self._campana_list_contacto_config_file.write(lista_contacto)
-        # return lista_contacto
+    def __init__(self, contactos, metadata, campana, prefijo_discador):
+        self.contactos = contactos.order_by('pk')
+        self.metadata = metadata
+        self.campana = campana
+        self.prefijo_discador = prefijo_discador
 
-    def escribir_lista(self, contactos, metadata, campana, prefijo_discador):
+    def cantidad(self):
+        return self.contactos.count()
 
+    def _obtener_multinum(self):
         list_multinum = []
         n_multinum = 0
         # Itero por los otros campos con telefonos (menos el primero que esta en contacto.telefono)
-        indices_telefonos = metadata.columnas_con_telefono[1:]
+        indices_telefonos = self.metadata.columnas_con_telefono[1:]
         for indice in indices_telefonos:
             n_multinum += 1
             # El indice indica cual es la posicion en la lista de "nombres" de las columnas
             # Como en la lista de "datos" no aparece el primer telefono, le resto 1 a la posicion
             posicion_en_datos = indice - 1
-            if metadata.columna_id_externo is not None:
-                if indice > metadata.columna_id_externo:
+            if self.metadata.columna_id_externo is not None:
+                if indice > self.metadata.columna_id_externo:
                     posicion_en_datos -= 1
             list_multinum.append(('MULTINUM' + str((n_multinum)), posicion_en_datos))
-
-        lista_contactos = "numbers="
-        for contacto in contactos:
-            dato_contacto = []
-            # --- Buscamos datos
-            dato_contacto.append(prefijo_discador + contacto.telefono)
-            dato_contacto.append("id_cliente:" + str(contacto.pk))
-            dato_contacto.append("id_campana:" + str(campana.id))
+        return list_multinum
+
+    def generar_numeros(self):
+        """ Genera la entrada de la lista de cada contacto """
+        list_multinum = self._obtener_multinum()
+        id_campana = "id_campana:" + str(self.campana.id)
+        contactos = self.contactos.values_list('pk', 'telefono', 'datos')
+        for pk, telefono, datos in contactos.iterator(chunk_size=self.TAMANO_CHUNK_CURSOR):
+            dato_contacto = [self.prefijo_discador + telefono, "id_cliente:" + str(pk),
+                             id_campana]
             if list_multinum:
-                datos = json.loads(contacto.datos)
+                datos = json.loads(datos)
                 for nombre, posicion_en_datos in list_multinum:
                     dato_contacto.append(nombre + ":" + datos[posicion_en_datos])
+            yield ",".join(dato_contacto)
+
+    def generar_lotes(self, tamano_lote):
+        """
+        Genera el cuerpo del pedido addToList de Wombat para cada lote de hasta
+        `tamano_lote` contactos, junto con la cantidad de contactos del lote.
+        """
+        lote = []
+        for numero in self.generar_numeros():
+            lote.append(numero)
+            if len(lote) == tamano_lote:
+                yield len(lote), self._crear_cuerpo(lote)
+                lote = []
+        if lote:
+            yield len(lote), self._crear_cuerpo(lote)
+
+    def _crear_cuerpo(self, lote):
+        return ("numbers=" + "|".join(lote) + "|").encode('utf-8')
+
+
+class SincronizarBaseDatosContactosService(object):
+
+    def crear_lista(self, campana, evitar_duplicados, evitar_sin_telefono, prefijo_discador):
+        """ Devuelve la ListaContactosWombat con los contactos de la base de la campaña """
 
-            lista_contactos += ",".join(dato_contacto) + "|"
+        base_datos = campana.bd_contacto
 
-        return lista_contactos
+        # no tiene sentido ya que esto hace un filtro por pk
+        if evitar_duplicados:
+            service_base_datos = BaseDatosService()
+            service_base_datos.eliminar_contactos_duplicados(base_datos)
+
+        contactos = Contacto.objects.contactos_by_bd_contacto(base_datos)
+
+        if evitar_sin_telefono:
+            contactos = contactos.exclude(telefono__isnull=True).exclude(
+                telefono__exact='')
+
+        metadata = base_datos.get_metadata()
+        logger.info(_("Creando lista para asociacion lista {0} campana".format(campana.nombre)))
+        return ListaContactosWombat(contactos, metadata, campana, prefijo_discador)
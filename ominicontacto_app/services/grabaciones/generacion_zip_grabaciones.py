@@ -25,13 +25,13 @@ import os
 import zipfile
 from django.conf import settings
 import redis
-from math import ceil
 import io
 import csv
 import logging
 
 from api_app.services.storage_service import StorageService
 from ominicontacto_app.models import Contacto
+from ominicontacto_app.services.progreso_tareas import ProgresoTarea
 
 logger = logging.getLogger(__name__)
 
@@ -64,10 +64,8 @@ class GeneracionZipGrabaciones:
             nombres_columnas.extend(['Agente Username', 'Datos de contacto'])
 
         csv_writer.writerows([nombres_columnas])
-        progreso = 0
-        cantidad_archivos = len(self.listado_archivos)
-        self.redis_connection.publish(self.key_task, progreso)
-        i = 1
+        progreso = ProgresoTarea(self.key_task, len(self.listado_archivos), self.redis_connection)
+        progreso.iniciar()
 
         s3_handler = None
         if (os.getenv('S3_STORAGE_ENABLED') == 'true'):
@@ -85,9 +83,7 @@ class GeneracionZipGrabaciones:
                 logger.error(f'Error guardando en ZIP {e.__str__()}')
                 obs = ' (ERROR EN DESCARGA)'
 
-            progreso = ceil(i / cantidad_archivos * 100)
-            self.redis_connection.publish(self.key_task, progreso)
-            i += 1
+            progreso.avanzar()
             csv_line = [[
                 archivo['fecha'],
                 archivo['tipo_llamada'],
@@ -111,7 +107,7 @@ class GeneracionZipGrabaciones:
         zf.writestr('datos.csv', in_memory_csv.getvalue(), compress_type=compression)
         zf.close()
 
-        self.redis_connection.publish(self.key_task, self._generar_zip_name(self.username))
+        progreso.finalizar(self._generar_zip_name(self.username))
 
     # En un futuro ver si es neesario generar un nombre acorde a un patrón
     def _generar_zip_name(self, username):
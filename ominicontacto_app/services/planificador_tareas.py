@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Planificador de las tareas periódicas de OMniLeads.
+
+Ejecuta los comandos de manage.py que antes se programaban en el crontab dentro de un único
+proceso residente, evitando pagar el arranque de Django en cada ejecución y reutilizando las
+conexiones a la base de datos, Redis y AMI.
+"""
+
+from __future__ import unicode_literals
+
+import logging as _logging
+import os
+import random
+import threading
+import time
+import uuid
+
+import redis
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import close_old_connections
+
+logger = _logging.getLogger(__name__)
+
+
+class TareaProgramada(object):
+    """
+    Tarea que se ejecuta cada `intervalo` segundos, con una demora al azar de hasta `jitter`
+    segundos para que las tareas no coincidan. `duracion_maxima` es la duración del lock que
+    evita que dos planificadores ejecuten la tarea a la vez.
+    """
+
+    def __init__(self, nombre, intervalo, funcion, jitter=None, duracion_maxima=None):
+        self.nombre = nombre
+        self.intervalo = intervalo
+        self.funcion = funcion
+        self.jitter = jitter if jitter is not None else intervalo * 0.1
+        self.duracion_maxima = duracion_maxima or max(10 * intervalo, 10 * 60)
+
+    def demora(self):
+        return random.uniform(0, self.jitter)
+
+
+def ejecutar_comando(nombre_comando):
+    def ejecutar():
+        call_command(nombre_comando)
+    return ejecutar
+
+
+def obtener_tareas_programadas():
+    """ Tareas programadas con sus intervalos en segundos (ver OML_PLANIFICADOR_INTERVALOS) """
+    intervalos = settings.OML_PLANIFICADOR_INTERVALOS
+    comandos = [
+        'logout_unavailable_agents',
+        'actualizar_reportes_llamadas_entrantes',
+        'actualizar_reportes_llamadas_salientes',
+        'actualizar_reportes_llamadas_dialers',
+        'actualizar_reporte_supervisores',
+        'actualizar_reporte_dia_actual_agentes',
+        'actualizar_resumenes_llamadas',
+    ]
+    # Si está habilitado el addon de Wallboards en Envars
+    if not os.getenv('WALLBOARD_VERSION', '') == '':
+        comandos.append('calcular_datos_wallboards')
+    return [TareaProgramada(comando, intervalos[comando], ejecutar_comando(comando))
+            for comando in comandos if intervalos.get(comando)]
+
+
+class PlanificadorTareas(object):
+    """
+    Ejecuta cada tarea en su propio thread, de modo que una tarea lenta no demora a las demás
+    y nunca se superpone consigo misma. Un lock en Redis evita además que la misma tarea corra
+    a la vez en otro planificador. Las métricas de cada tarea se guardan en Redis.
+    """
+
+    KEY_LOCK = 'OML:PLANIFICADOR:LOCK:{0}'
+    KEY_METRICAS = 'OML:PLANIFICADOR:TAREA:{0}'
+
+    # Libera el lock sólo si sigue siendo del planificador que lo tomó
+    SCRIPT_LIBERAR_LOCK = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, tareas, redis_connection=None):
+        self.tareas = tareas
+        if redis_connection is None:
+            redis_connection = redis.Redis(
+                host=settings.REDIS_HOSTNAME,
+                port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+                decode_responses=True)
+        self.redis_connection = redis_connection
+        self.identificador = uuid.uuid4().hex
+        self._liberar_lock = self.redis_connection.register_script(self.SCRIPT_LIBERAR_LOCK)
+        self._detener = threading.Event()
+        self._threads = []
+
+    def iniciar(self):
+        for tarea in self.tareas:
+            thread = threading.Thread(target=self._ciclo, args=(tarea, ),
+                                      name='tarea-{0}'.format(tarea.nombre), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def detener(self):
+        """ No inicia nuevas ejecuciones; las que están en curso terminan normalmente """
+        self._detener.set()
+
+    def detenido(self):
+        return self._detener.is_set()
+
+    def esperar(self, timeout):
+        """ Espera hasta `timeout` segundos a que terminen las ejecuciones en curso """
+        limite = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, limite - time.monotonic()))
+
+    def _ciclo(self, tarea):
+        # La demora inicial reparte los arranques de las tareas dentro de su intervalo
+        proxima_ejecucion = time.monotonic() + random.uniform(0, tarea.intervalo)
+        while not self._detener.wait(max(0, proxima_ejecucion - time.monotonic())):
+            inicio = time.monotonic()
+            try:
+                self.ejecutar(tarea)
+            except Exception:
+                # Un error de Redis (lock o métricas) no debe terminar el ciclo de la tarea
+                logger.exception('Error planificando la tarea {0}'.format(tarea.nombre))
+            proxima_ejecucion = max(inicio + tarea.intervalo, time.monotonic()) + tarea.demora()
+
+    def ejecutar(self, tarea):
+        """ Ejecuta la tarea si no la está ejecutando otro planificador """
+        key_lock = self.KEY_LOCK.format(tarea.nombre)
+        if not self.redis_connection.set(key_lock, self.identificador, nx=True,
+                                         ex=int(tarea.duracion_maxima)):
+            logger.info('Tarea {0} en ejecución en otro planificador'.format(tarea.nombre))
+            return False
+        close_old_connections()
+        inicio = time.monotonic()
+        error = ''
+        try:
+            tarea.funcion()
+        except (Exception, SystemExit) as e:
+            error = str(e) or e.__class__.__name__
+            logger.exception('Error en la tarea {0}: {1}'.format(tarea.nombre, error))
+        finally:
+            duracion = time.monotonic() - inicio
+            close_old_connections()
+            self._liberar_lock(keys=[key_lock], args=[self.identificador])
+        self._registrar_metricas(tarea, duracion, error)
+        return not error
+
+    def _registrar_metricas(self, tarea, duracion, error):
+        key = self.KEY_METRICAS.format(tarea.nombre)
+        metricas = {
+            'ULTIMA_EJECUCION': int(time.time()),
+            'ULTIMA_DURACION': round(duracion, 3),
+            'INTERVALO': tarea.intervalo,
+        }
+        if error:
+            metricas['ULTIMO_ERROR'] = error
+        pipeline = self.redis_connection.pipeline(transaction=False)
+        pipeline.hset(key, mapping=metricas)
+        pipeline.hincrby(key, 'EJECUCIONES', 1)
+        pipeline.hincrbyfloat(key, 'DURACION_TOTAL', duracion)
+        if error:
+            pipeline.hincrby(key, 'ERRORES', 1)
+        pipeline.execute()
+        duracion_maxima = float(self.redis_connection.hget(key, 'DURACION_MAXIMA') or 0)
+        if duracion > duracion_maxima:
+            self.redis_connection.hset(key, 'DURACION_MAXIMA', round(duracion, 3))
+        if duracion > tarea.intervalo:
+            logger.warning('La tarea {0} demoró {1:.1f}s, más que su intervalo de {2}s'.format(
+                tarea.nombre, duracion, tarea.intervalo))
+
+    def obtener_metricas(self):
+        return {tarea.nombre: self.redis_connection.hgetall(self.KEY_METRICAS.format(tarea.nombre))
+                for tarea in self.tareas}
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Ejecución de los TrabajoSegundoPlano pendientes.
+
+Cada trabajo corre en un proceso hijo, de modo que no compite con los workers de uwsgi, se
+puede interrumpir al cancelarlo y un error grave no afecta al procesador. El procesador
+reenvía el progreso que publica cada trabajo a los `key_task` suscriptos.
+"""
+
+from __future__ import unicode_literals
+
+import logging as _logging
+import multiprocessing
+import signal
+import sys
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Q
+from django.utils.timezone import now, timedelta
+
+from ominicontacto_app.models import TrabajoSegundoPlano
+from ominicontacto_app.services.progreso_tareas import obtener_estado_progreso
+from ominicontacto_app.services.trabajos_segundo_plano import (
+    CANAL_PROGRESO, MENSAJE_FALLIDO, ejecutar_trabajo, obtener_redis, publicar_a_suscriptos)
+
+logger = _logging.getLogger(__name__)
+
+
+def _ejecutar_en_proceso_hijo(trabajo_id):
+    # El hijo hereda los handlers del comando, pero debe terminar al recibir SIGTERM
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    close_old_connections()
+    trabajo = TrabajoSegundoPlano.objects.get(pk=trabajo_id)
+    try:
+        ejecutar_trabajo(trabajo)
+    except Exception as e:
+        logger.exception('Error en el trabajo {0}: {1}'.format(trabajo_id, e))
+        TrabajoSegundoPlano.objects.filter(
+            pk=trabajo_id, estado=TrabajoSegundoPlano.EN_CURSO).update(
+                estado=TrabajoSegundoPlano.FALLIDO, finalizado=now(), error=str(e))
+        sys.exit(1)
+    finally:
+        connections.close_all()
+
+
+class ProcesadorTrabajos(object):
+
+    ESPERA = 1
+    # Segundos entre actualizaciones de los trabajos en curso
+    LATIDO = 10
+    PATRON_CANALES = CANAL_PROGRESO.format('*')
+
+    def __init__(self, concurrencia=None, redis_connection=None):
+        self.concurrencia = concurrencia or settings.OML_TRABAJOS_CONCURRENCIA
+        self.redis_connection = redis_connection or obtener_redis()
+        self._contexto = multiprocessing.get_context('fork')
+        self._procesos = {}
+        self._ultimo_latido = 0
+        self._pubsub = self.redis_connection.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(self.PATRON_CANALES)
+
+    def procesar(self):
+        """ Un ciclo del procesador: devuelve la cantidad de trabajos en curso """
+        if time.monotonic() - self._ultimo_latido >= self.LATIDO:
+            self._registrar_latido()
+            self._reencolar_abandonados()
+            self._ultimo_latido = time.monotonic()
+        self._revisar_procesos()
+        while len(self._procesos) < self.concurrencia:
+            trabajo = self._reservar_pendiente()
+            if trabajo is None:
+                break
+            self._iniciar(trabajo)
+        self._reenviar_progreso(self.ESPERA)
+        return len(self._procesos)
+
+    def detener(self):
+        """ Interrumpe los trabajos en curso y los deja pendientes para volver a ejecutarlos """
+        for trabajo_id, proceso in list(self._procesos.items()):
+            proceso.terminate()
+            proceso.join()
+            TrabajoSegundoPlano.objects.filter(
+                pk=trabajo_id, estado=TrabajoSegundoPlano.EN_CURSO).update(
+                    estado=TrabajoSegundoPlano.PENDIENTE)
+        self._procesos = {}
+        self._pubsub.close()
+
+    def _reservar_pendiente(self):
+        """
+        Toma el trabajo pendiente más antiguo cuyo archivo no se esté generando en otro
+        trabajo. Varios procesadores pueden reservar trabajos a la vez.
+        """
+        with transaction.atomic():
+            en_curso = TrabajoSegundoPlano.objects.filter(
+                estado=TrabajoSegundoPlano.EN_CURSO).values('salida')
+            trabajo = TrabajoSegundoPlano.objects.select_for_update(skip_locked=True).filter(
+                estado=TrabajoSegundoPlano.PENDIENTE).exclude(salida__in=en_curso).order_by(
+                    'id').first()
+            if trabajo is None:
+                return None
+            trabajo.estado = TrabajoSegundoPlano.EN_CURSO
+            trabajo.intentos += 1
+            trabajo.iniciado = trabajo.actualizado = now()
+            trabajo.save(update_fields=['estado', 'intentos', 'iniciado', 'actualizado'])
+        return trabajo
+
+    def _iniciar(self, trabajo):
+        # El proceso hijo no debe compartir las conexiones a la base de datos
+        connections.close_all()
+        proceso = self._contexto.Process(
+            target=_ejecutar_en_proceso_hijo, args=(trabajo.pk, ),
+            name='trabajo-{0}'.format(trabajo.pk), daemon=True)
+        proceso.start()
+        self._procesos[trabajo.pk] = proceso
+        logger.info('Trabajo {0} ({1}) iniciado en el proceso {2}'.format(
+            trabajo.pk, trabajo.tipo, proceso.pid))
+
+    def _revisar_procesos(self):
+        if not self._procesos:
+            return
+        limite = now() - timedelta(seconds=settings.OML_TRABAJOS_DURACION_MAXIMA)
+        interrumpidos = dict(TrabajoSegundoPlano.objects.filter(pk__in=list(self._procesos)).filter(
+            Q(estado=TrabajoSegundoPlano.CANCELADO) |
+            Q(estado=TrabajoSegundoPlano.EN_CURSO, iniciado__lt=limite)).values_list(
+                'pk', 'estado'))
+        for trabajo_id, proceso in list(self._procesos.items()):
+            if trabajo_id in interrumpidos:
+                proceso.terminate()
+                proceso.join()
+                del self._procesos[trabajo_id]
+                if interrumpidos[trabajo_id] == TrabajoSegundoPlano.EN_CURSO:
+                    self._fallar(trabajo_id, 'Timeout')
+                logger.info('Trabajo {0} interrumpido'.format(trabajo_id))
+            elif not proceso.is_alive():
+                proceso.join()
+                del self._procesos[trabajo_id]
+                if proceso.exitcode == 0:
+                    self._finalizar(trabajo_id)
+                else:
+                    self._fallar(trabajo_id, 'Exit code {0}'.format(proceso.exitcode))
+
+    def _finalizar(self, trabajo_id):
+        expiracion = now() + timedelta(seconds=settings.OML_TRABAJOS_TTL_RESULTADO)
+        TrabajoSegundoPlano.objects.filter(
+            pk=trabajo_id, estado=TrabajoSegundoPlano.EN_CURSO).update(
+                estado=TrabajoSegundoPlano.FINALIZADO, finalizado=now(), expiracion=expiracion)
+        # Se reenvía lo que publicó el trabajo antes de terminar, que puede incluir un mensaje
+        # final (por ejemplo el nombre del zip) después del cual no se debe publicar otro 100
+        self._reenviar_progreso(0)
+        estado = obtener_estado_progreso(CANAL_PROGRESO.format(trabajo_id), self.redis_connection)
+        if estado is None or estado['porcentaje'] < 100:
+            # Se publica el final aunque el trabajo no lo haya hecho
+            self._publicar(trabajo_id, 100)
+
+    def _fallar(self, trabajo_id, error):
+        logger.warning('Falló el trabajo {0}: {1}'.format(trabajo_id, error))
+        TrabajoSegundoPlano.objects.filter(
+            pk=trabajo_id, estado=TrabajoSegundoPlano.EN_CURSO).update(
+                estado=TrabajoSegundoPlano.FALLIDO, finalizado=now(), error=error)
+        self._reenviar_progreso(0)
+        self._publicar(trabajo_id, MENSAJE_FALLIDO)
+
+    def _registrar_latido(self):
+        if self._procesos:
+            TrabajoSegundoPlano.objects.filter(
+                pk__in=list(self._procesos), estado=TrabajoSegundoPlano.EN_CURSO).update(
+                    actualizado=now())
+
+    def _reencolar_abandonados(self):
+        """ Los trabajos de un procesador que terminó de forma inesperada vuelven a ejecutarse """
+        limite = now() - timedelta(seconds=settings.OML_TRABAJOS_VENCIMIENTO_LATIDO)
+        abandonados = TrabajoSegundoPlano.objects.filter(
+            estado=TrabajoSegundoPlano.EN_CURSO, actualizado__lt=limite).exclude(
+                pk__in=list(self._procesos))
+        abandonados.filter(intentos__lt=settings.OML_TRABAJOS_MAX_INTENTOS).update(
+            estado=TrabajoSegundoPlano.PENDIENTE)
+        fallidos = list(abandonados.values_list('pk', flat=True))
+        abandonados.filter(pk__in=fallidos).update(
+            estado=TrabajoSegundoPlano.FALLIDO, finalizado=now(), error='Abandonado')
+        for trabajo_id in fallidos:
+            self._publicar(trabajo_id, MENSAJE_FALLIDO)
+
+    def _reenviar_progreso(self, timeout):
+        mensaje = self._pubsub.get_message(timeout=timeout)
+        while mensaje is not None:
+            trabajo_id = mensaje['channel'].split(':')[2]
+            self._publicar(trabajo_id, mensaje['data'])
+            mensaje = self._pubsub.get_message()
+
+    def _publicar(self, trabajo_id, progreso):
+        publicar_a_suscriptos(trabajo_id, progreso, self.redis_connection)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Publicación del avance de las tareas largas (exportaciones de reportes, zip de grabaciones).
+
+En el canal `key_task` se sigue publicando sólo el porcentaje, que es lo que espera el
+websocket, pero sin publicar una vez por fila: se publica cuando el porcentaje avanza
+OML_PROGRESO_PASO puntos o cuando pasaron OML_PROGRESO_INTERVALO segundos desde la última
+publicación. El estado completo (filas procesadas, filas por segundo y tiempo restante
+estimado) queda guardado en una key para quienes se suscriben tarde.
+"""
+
+from __future__ import unicode_literals
+
+import json
+import time
+
+import redis
+
+from django.conf import settings
+
+KEY_ESTADO = 'OML:PROGRESO:{0}'
+EXPIRACION_ESTADO = 24 * 60 * 60
+
+
+def obtener_estado_progreso(key_task, redis_connection=None):
+    """ Devuelve el último estado publicado para `key_task`, o None si no hay ninguno """
+    if redis_connection is None:
+        redis_connection = _obtener_redis()
+    estado = redis_connection.get(KEY_ESTADO.format(key_task))
+    if estado is None:
+        return None
+    return json.loads(estado)
+
+
+def _obtener_redis():
+    return redis.Redis(
+        host=settings.REDIS_HOSTNAME,
+        port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+        decode_responses=True)
+
+
+class ProgresoTarea(object):
+
+    def __init__(self, key_task, total, redis_connection=None, intervalo=None, paso=None):
+        self.key_task = key_task
+        self.total = total
+        self.redis_connection = redis_connection or _obtener_redis()
+        self.intervalo = settings.OML_PROGRESO_INTERVALO if intervalo is None else intervalo
+        self.paso = settings.OML_PROGRESO_PASO if paso is None else paso
+        self.procesados = 0
+        self._inicio = time.monotonic()
+        self._ultima_publicacion = None
+        self._ultimo_porcentaje = None
+
+    @property
+    def porcentaje(self):
+        if self.total == 0:
+            return 100
+        return min(100, self.procesados * 100 // self.total)
+
+    def iniciar(self):
+        self._inicio = time.monotonic()
+        self._publicar(self.porcentaje)
+
+    def avanzar(self, cantidad=1):
+        self.procesados += cantidad
+        porcentaje = self.porcentaje
+        if porcentaje == self._ultimo_porcentaje:
+            return
+        if self._ultimo_porcentaje is None or porcentaje == 100 or \
+                porcentaje - self._ultimo_porcentaje >= self.paso or \
+                time.monotonic() - self._ultima_publicacion >= self.intervalo:
+            self._publicar(porcentaje)
+
+    def finalizar(self, mensaje=None):
+        """ Publica el 100% aunque ya se haya publicado, o `mensaje` en su lugar """
+        self._publicar(100, mensaje)
+
+    def obtener_estado(self, porcentaje):
+        duracion = time.monotonic() - self._inicio
+        filas_por_segundo = self.procesados / duracion if duracion > 0 else 0
+        eta = None
+        if porcentaje == 100:
+            eta = 0
+        elif filas_por_segundo > 0:
+            eta = round(max(self.total - self.procesados, 0) / filas_por_segundo)
+        return {
+            'porcentaje': porcentaje,
+            'procesados': self.procesados,
+            'total': self.total,
+            'filas_por_segundo': round(filas_por_segundo, 1),
+            'eta': eta,
+        }
+
+    def _publicar(self, porcentaje, mensaje=None):
+        estado = self.obtener_estado(porcentaje)
+        if mensaje is not None:
+            # Se guarda para reenviarlo a quienes se suscriben cuando la tarea ya terminó
+            estado['mensaje'] = mensaje
+        pipeline = self.redis_connection.pipeline(transaction=False)
+        pipeline.set(KEY_ESTADO.format(self.key_task), json.dumps(estado), ex=EXPIRACION_ESTADO)
+        pipeline.publish(self.key_task, porcentaje if mensaje is None else mensaje)
+        pipeline.execute()
+        self._ultimo_porcentaje = porcentaje
+        self._ultima_publicacion = time.monotonic()
@@ -30,6 +30,7 @@ from django.utils.timezone import localtime
 from django.utils.translation import gettext_lazy as _
 
 from ominicontacto_app.services.reporte_campana_csv import ReporteCSV
+from ominicontacto_app.services.progreso_tareas import ProgresoTarea
 
 logger = logging.getLogger(__name__)
 
@@ -57,17 +58,12 @@ class ReporteCalificacionesCampanaCSV(ReporteCampanaService, ReporteCSV):
         self.datos = []
         self.calificaciones_por_fechas(fecha_desde, fecha_hasta)
         calificaciones = self.historico_calificaciones_qs
-        cant_calificaciones = calificaciones.count()
-        if cant_calificaciones == 0:
-            porcentaje_inicial = 100
-        else:
-            porcentaje_inicial = 0
+        progreso = ProgresoTarea(key_task, calificaciones.count(), self.redis_connection)
         calificaciones_analizadas = set()
-        self.redis_connection.publish(key_task, porcentaje_inicial)
+        progreso.iniciar()
         self._escribir_encabezado()
-        for i, calificacion in enumerate(calificaciones, start=1):
-            percentage = int((i / cant_calificaciones) * 100)
-            self.redis_connection.publish(key_task, percentage)
+        for calificacion in calificaciones:
+            progreso.avanzar()
             if calificacion and (calificacion.pk not in calificaciones_analizadas):
                 self._escribir_linea_calificacion(calificacion, calificacion)
                 calificaciones_analizadas.add(calificacion.pk)
@@ -33,6 +33,7 @@ from ominicontacto_app.models import CalificacionCliente, OpcionCalificacion,\
     RespuestaFormularioGestion
 
 from ominicontacto_app.services.reporte_campana_csv import ReporteCSV
+from ominicontacto_app.services.progreso_tareas import ProgresoTarea
 
 logger = logging.getLogger(__name__)
 
@@ -54,17 +55,12 @@ class ReporteFormularioGestionCampanaCSV(ReporteCSV):
                     'calificacion__agente__user',
                     'calificacion__contacto__bd_contacto',
                     'calificacion__opcion_calificacion')
-        cant_respuestas = respuestas.count()
-        if cant_respuestas == 0:
-            porcentaje_inicial = 100
-        else:
-            porcentaje_inicial = 0
+        progreso = ProgresoTarea(key_task, respuestas.count(), self.redis_connection)
         analizadas = set()
-        self.redis_connection.publish(key_task, porcentaje_inicial)
+        progreso.iniciar()
         self._escribir_encabezado()
-        for i, respuesta in enumerate(respuestas, start=1):
-            percentage = int((i / cant_respuestas) * 100)
-            self.redis_connection.publish(key_task, percentage)
+        for respuesta in respuestas:
+            progreso.avanzar()
             if respuesta and (respuesta.pk not in analizadas):
                 self._escribir_linea_calificacion(respuesta)
                 analizadas.add(respuesta.pk)
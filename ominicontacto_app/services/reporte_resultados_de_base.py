@@ -26,6 +26,7 @@ import logging
 
 from django.utils.encoding import force_text
 from django.utils.translation import gettext_lazy as _
+from ominicontacto_app.services.progreso_tareas import ProgresoTarea
 from ominicontacto_app.services.reporte_resultados_de_base_csv import (
     ReporteCSV
 )
@@ -46,17 +47,11 @@ class ReporteContactacionesCSV(ReporteCSV):
             todos_contactos=todos_contactos
         )
         self.contactaciones = self.reporte.contactaciones.values()
-        cant_contactaciones = len(self.contactaciones)
-
-        if cant_contactaciones == 0:
-            porcentaje_inicial = 100
-        else:
-            porcentaje_inicial = 0
-        self.redis_connection.publish(key_task, porcentaje_inicial)
+        progreso = ProgresoTarea(key_task, len(self.contactaciones), self.redis_connection)
+        progreso.iniciar()
         self._escribir_encabezado()
-        for i, contactacion in enumerate(self.contactaciones, start=1):
-            percentage = int((i / cant_contactaciones) * 100)
-            self.redis_connection.publish(key_task, percentage)
+        for contactacion in self.contactaciones:
+            progreso.avanzar()
             self._escribir_linea_contactacion(contactacion)
 
     def _escribir_encabezado(self):
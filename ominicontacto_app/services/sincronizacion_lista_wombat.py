@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Estado de la sincronización de la lista de contactos de una campaña con Wombat.
+
+Se guarda en Redis para que una sola sincronización por campaña pueda estar en curso y para
+poder consultar su progreso desde cualquier proceso.
+"""
+
+from __future__ import unicode_literals
+
+import logging as _logging
+import time
+
+import redis
+
+from django.conf import settings
+
+logger = _logging.getLogger(__name__)
+
+
+class SincronizacionListaWombat(object):
+    """
+    Estado de la sincronización de la lista de una campaña. La key LOCK expira sola por si el
+    proceso que sincronizaba termina sin liberarla.
+    """
+
+    KEY = 'OML:SINCRONIZACION_LISTA_WOMBAT:{0}'
+    KEY_LOCK = 'OML:SINCRONIZACION_LISTA_WOMBAT:{0}:LOCK'
+    DURACION_LOCK = 60 * 60
+
+    EN_CURSO = 'EN_CURSO'
+    FINALIZADA = 'FINALIZADA'
+    ERROR = 'ERROR'
+
+    def __init__(self, campana_id, redis_connection=None):
+        self.campana_id = campana_id
+        self.key = self.KEY.format(campana_id)
+        self.key_lock = self.KEY_LOCK.format(campana_id)
+        if redis_connection is None:
+            redis_connection = redis.Redis(
+                host=settings.REDIS_HOSTNAME,
+                port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+                decode_responses=True)
+        self.redis_connection = redis_connection
+
+    def iniciar(self):
+        """ Devuelve False si ya hay una sincronización en curso para la campaña """
+        if not self.redis_connection.set(self.key_lock, 1, nx=True, ex=self.DURACION_LOCK):
+            return False
+        self._guardar(ESTADO=self.EN_CURSO, TOTAL=0, ENVIADOS=0, ERROR='')
+        return True
+
+    def en_curso(self):
+        return bool(self.redis_connection.exists(self.key_lock))
+
+    def actualizar_total(self, total):
+        self._guardar(TOTAL=total)
+
+    def actualizar_progreso(self, enviados):
+        self._guardar(ENVIADOS=enviados)
+
+    def finalizar(self):
+        self._guardar(ESTADO=self.FINALIZADA)
+        self.redis_connection.delete(self.key_lock)
+
+    def fallar(self, error):
+        logger.warning('Error sincronizando la lista de la campaña {0} con Wombat: {1}'.format(
+            self.campana_id, error))
+        self._guardar(ESTADO=self.ERROR, ERROR=str(error))
+        self.redis_connection.delete(self.key_lock)
+
+    def obtener_estado(self):
+        """ Devuelve ESTADO, TOTAL, ENVIADOS, ERROR y TIMESTAMP de la última sincronización """
+        return self.redis_connection.hgetall(self.key)
+
+    def _guardar(self, **valores):
+        valores['TIMESTAMP'] = int(time.time())
+        self.redis_connection.hset(self.key, mapping=valores)
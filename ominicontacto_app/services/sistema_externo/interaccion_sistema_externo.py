@@ -16,53 +16,56 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
-"""Parser de XML que devuelve Asterisk"""
+"""Interacciones del servidor con los Sitios Externos"""
 
 from __future__ import unicode_literals
+import json
 import logging
 import requests
 
+from django.conf import settings
 from django.utils.translation import gettext as _
 from django.utils.timezone import now, timedelta
-from ominicontacto_app.models import SitioExterno
+from ominicontacto_app.models import SitioExterno, InteraccionSitioExterno
 
 logger = logging.getLogger(__name__)
 
 
 class InteraccionConSistemaExterno(object):
 
-    def ejecutar_interaccion(self, sitio_externo, agente, campana, contacto, call_data):
-        url = sitio_externo.url
+    def encolar_interaccion(self, sitio_externo, agente, campana, contacto, call_data,
+                            calificacion=None):
+        """
+        Registra la interacción como pendiente. La envía el comando
+        procesar_interacciones_sitio_externo.
+        """
         parametros = sitio_externo.get_parametros(agente, campana, contacto, call_data)
-        err_msg = _('Error al ejecutar InteraccionConSistemaExterno: {0}')
-        headers, error = self.obtener_headers(sitio_externo)
+        return InteraccionSitioExterno.objects.create(
+            sitio_externo=sitio_externo, campana=campana, agente=agente, contacto=contacto,
+            calificacion=calificacion, parametros=json.dumps(parametros))
+
+    def enviar(self, sitio_externo, parametros, headers, session=requests, timeout=None):
+        """ Realiza el pedido al sitio externo y devuelve la respuesta """
+        url = sitio_externo.url
+        headers = dict(headers)
         verify_ssl = True
         if sitio_externo.autenticacion and not sitio_externo.autenticacion.ssl_estricto:
             verify_ssl = False
-        if error:
-            logger.exception(err_msg.format(headers))
-            return headers
-        try:
-            if sitio_externo.metodo == SitioExterno.GET:
-                response = requests.get(url, params=parametros, headers=headers, verify=verify_ssl)
-            elif sitio_externo.formato == SitioExterno.TEXT_PLAIN:
-                headers['content_type'] = 'text/plain'
-                response = requests.post(url, data=parametros, headers=headers, verify=verify_ssl)
-            elif sitio_externo.formato == SitioExterno.WWW_FORM:
-                response = requests.post(url, data=parametros, headers=headers, verify=verify_ssl)
-            elif sitio_externo.formato == SitioExterno.MULTIPART:
-                response = requests.post(url, files=parametros, headers=headers, verify=verify_ssl)
-            elif sitio_externo.formato == SitioExterno.JSON:
-                response = requests.post(url, json=parametros, headers=headers, verify=verify_ssl)
-        except Exception as e:
-            # Si es invalido el token:
-            #     pido token de nuevo y reintento 1 vez
-            #     Si vuelve a fallar log error y aviso al agente.
-            logger.info([url, sitio_externo.get_formato_display(), headers, verify_ssl, parametros])
-            logger.exception(err_msg.format(e))
-            return e
-        logger.info([url, sitio_externo.get_formato_display(), headers, verify_ssl, parametros])
-        logger.info(response.status_code)
+        kwargs = {'headers': headers, 'verify': verify_ssl, 'timeout': timeout}
+        if sitio_externo.metodo == SitioExterno.GET:
+            response = session.get(url, params=parametros, **kwargs)
+        elif sitio_externo.formato == SitioExterno.TEXT_PLAIN:
+            headers['content_type'] = 'text/plain'
+            response = session.post(url, data=parametros, **kwargs)
+        elif sitio_externo.formato == SitioExterno.WWW_FORM:
+            response = session.post(url, data=parametros, **kwargs)
+        elif sitio_externo.formato == SitioExterno.MULTIPART:
+            response = session.post(url, files=parametros, **kwargs)
+        elif sitio_externo.formato == SitioExterno.JSON:
+            response = session.post(url, json=parametros, **kwargs)
+        logger.info([url, sitio_externo.get_formato_display(), verify_ssl, parametros,
+                     response.status_code])
+        return response
 
     def obtener_headers(self, sitio_externo):
         if sitio_externo.autenticacion:
@@ -92,7 +95,9 @@ class InteraccionConSistemaExterno(object):
         verify_ssl = autenticacion.ssl_estricto
         try:
             ahora = now()
-            response = requests.post(autenticacion.url, parametros, verify=verify_ssl)
+            response = requests.post(autenticacion.url, parametros, verify=verify_ssl,
+                                     timeout=(settings.OML_SITIO_EXTERNO_CONNECT_TIMEOUT,
+                                              settings.OML_SITIO_EXTERNO_READ_TIMEOUT))
         except Exception as e:
             return err_msg.format(e), True
 
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Envío de las InteraccionSitioExterno pendientes.
+
+Las interacciones se reservan en la base de datos (varios procesos pueden enviar en paralelo)
+y se envían desde un pool de threads, con una sesión HTTP y un límite de pedidos simultáneos
+por Sitio Externo. Los sitios que fallan varias veces seguidas se suspenden por un tiempo.
+"""
+
+from __future__ import unicode_literals
+
+import logging as _logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now, timedelta
+
+from ominicontacto_app.models import InteraccionSitioExterno
+from ominicontacto_app.services.sistema_externo.interaccion_sistema_externo import (
+    InteraccionConSistemaExterno)
+
+logger = _logging.getLogger(__name__)
+
+
+class CircuitoSitioExterno(object):
+    """ Suspende los envíos a un Sitio Externo luego de varias fallas consecutivas """
+
+    def __init__(self, umbral_fallas, pausa):
+        self.umbral_fallas = umbral_fallas
+        self.pausa = timedelta(seconds=pausa)
+        self.fallas = 0
+        self._abierto_hasta = None
+
+    def abierto_hasta(self):
+        """ Devuelve hasta cuándo están suspendidos los envíos, o None si no lo están """
+        if self._abierto_hasta is not None and self._abierto_hasta > now():
+            return self._abierto_hasta
+        return None
+
+    def registrar_exito(self):
+        self.fallas = 0
+        self._abierto_hasta = None
+
+    def registrar_falla(self):
+        self.fallas += 1
+        if self.fallas >= self.umbral_fallas:
+            self._abierto_hasta = now() + self.pausa
+
+
+class ProcesadorInteraccionesSitioExterno(object):
+
+    LOTE = 200
+
+    def __init__(self):
+        self.servicio = InteraccionConSistemaExterno()
+        self._executor = ThreadPoolExecutor(max_workers=settings.OML_SITIO_EXTERNO_HILOS)
+        self._sesiones = {}
+        self._semaforos = {}
+        self._circuitos = {}
+
+    def procesar_pendientes(self):
+        """ Envía las interacciones pendientes y devuelve la cantidad reservada """
+        interacciones = self._reservar_pendientes()
+        headers_por_sitio = {}
+        envios = []
+        for interaccion in interacciones:
+            sitio_externo = interaccion.sitio_externo
+            circuito = self._obtener_circuito(sitio_externo.pk)
+            abierto_hasta = circuito.abierto_hasta()
+            if abierto_hasta is not None:
+                self._posponer(interaccion, abierto_hasta)
+                continue
+            if sitio_externo.pk not in headers_por_sitio:
+                # El token se obtiene una vez por sitio en cada lote
+                headers_por_sitio[sitio_externo.pk] = self.servicio.obtener_headers(sitio_externo)
+            headers, error = headers_por_sitio[sitio_externo.pk]
+            if error:
+                circuito.registrar_falla()
+                self._reintentar(interaccion, None, headers)
+                continue
+            self._preparar_sitio(sitio_externo.pk)
+            envios.append((interaccion, self._executor.submit(self._enviar, interaccion, headers)))
+
+        for interaccion, envio in envios:
+            try:
+                codigo_respuesta, error = envio.result()
+            except Exception as e:
+                # Un error que no es de la conexión (p.ej. parámetros o configuración del
+                # sitio inválidos) no se resuelve reintentando
+                logger.exception('Error enviando la interacción {0}'.format(interaccion.pk))
+                self._fallar(interaccion, None, str(e))
+                continue
+            self._registrar_resultado(interaccion, codigo_respuesta, error)
+        return len(interacciones)
+
+    def _reservar_pendientes(self):
+        """
+        Reserva las interacciones a enviar postergando su próximo intento, para que no las
+        tome otro proceso. Si el proceso termina sin enviarlas, se reintentan al vencer la
+        reserva.
+        """
+        with transaction.atomic():
+            ids = list(InteraccionSitioExterno.objects.select_for_update(skip_locked=True)
+                       .filter(estado=InteraccionSitioExterno.PENDIENTE,
+                               proximo_intento__lte=now())
+                       .order_by('proximo_intento').values_list('id', flat=True)[:self.LOTE])
+            InteraccionSitioExterno.objects.filter(id__in=ids).update(
+                proximo_intento=now() + self._calcular_reserva(len(ids)))
+        return list(InteraccionSitioExterno.objects.filter(id__in=ids)
+                    .select_related('sitio_externo__autenticacion').order_by('id'))
+
+    def _calcular_reserva(self, cantidad):
+        """
+        Tiempo máximo que puede llevar enviar `cantidad` interacciones, suponiendo que todas
+        son del mismo sitio y todos los pedidos agotan el timeout.
+        """
+        duracion_pedido = (settings.OML_SITIO_EXTERNO_CONNECT_TIMEOUT +
+                           settings.OML_SITIO_EXTERNO_READ_TIMEOUT)
+        simultaneos = max(1, min(settings.OML_SITIO_EXTERNO_HILOS,
+                                 settings.OML_SITIO_EXTERNO_CONCURRENCIA))
+        tandas = -(-cantidad // simultaneos)
+        return timedelta(seconds=(tandas + 2) * duracion_pedido)
+
+    def _enviar(self, interaccion, headers):
+        """ Devuelve (codigo_respuesta, error). Se ejecuta en los threads del pool """
+        sitio_externo = interaccion.sitio_externo
+        with self._semaforos[sitio_externo.pk]:
+            try:
+                response = self.servicio.enviar(
+                    sitio_externo, interaccion.get_parametros(), headers,
+                    session=self._sesiones[sitio_externo.pk],
+                    timeout=(settings.OML_SITIO_EXTERNO_CONNECT_TIMEOUT,
+                             settings.OML_SITIO_EXTERNO_READ_TIMEOUT))
+            except requests.exceptions.RequestException as e:
+                return None, str(e)
+        return response.status_code, ''
+
+    def _registrar_resultado(self, interaccion, codigo_respuesta, error):
+        circuito = self._obtener_circuito(interaccion.sitio_externo_id)
+        if codigo_respuesta is not None and codigo_respuesta < 400:
+            circuito.registrar_exito()
+            interaccion.estado = InteraccionSitioExterno.ENVIADA
+            interaccion.enviada = now()
+            interaccion.intentos += 1
+            interaccion.codigo_respuesta = codigo_respuesta
+            interaccion.error = ''
+            interaccion.save()
+        elif codigo_respuesta == 401 and interaccion.sitio_externo.autenticacion:
+            # Token rechazado: se descarta para pedir uno nuevo en el reintento
+            autenticacion = interaccion.sitio_externo.autenticacion
+            autenticacion.expiracion_token = None
+            autenticacion.save(update_fields=['expiracion_token'])
+            self._reintentar(interaccion, codigo_respuesta, 'Unauthorized')
+        elif codigo_respuesta is None or codigo_respuesta >= 500 or codigo_respuesta == 429:
+            circuito.registrar_falla()
+            self._reintentar(interaccion, codigo_respuesta, error)
+        else:
+            # El sitio rechazó el pedido, reintentarlo no cambiaría la respuesta
+            circuito.registrar_exito()
+            self._fallar(interaccion, codigo_respuesta, error)
+
+    def _reintentar(self, interaccion, codigo_respuesta, error):
+        interaccion.intentos += 1
+        if interaccion.intentos >= settings.OML_SITIO_EXTERNO_MAX_INTENTOS:
+            return self._fallar(interaccion, codigo_respuesta, error, contar_intento=False)
+        espera = settings.OML_SITIO_EXTERNO_ESPERA_REINTENTO * 2 ** (interaccion.intentos - 1)
+        interaccion.proximo_intento = now() + timedelta(seconds=espera)
+        interaccion.codigo_respuesta = codigo_respuesta
+        interaccion.error = error
+        interaccion.save()
+
+    def _fallar(self, interaccion, codigo_respuesta, error, contar_intento=True):
+        logger.warning('Falló la interacción {0} con el sitio externo {1}: {2} {3}'.format(
+            interaccion.pk, interaccion.sitio_externo_id, codigo_respuesta, error))
+        if contar_intento:
+            interaccion.intentos += 1
+        interaccion.estado = InteraccionSitioExterno.FALLIDA
+        interaccion.codigo_respuesta = codigo_respuesta
+        interaccion.error = error
+        interaccion.save()
+
+    def _posponer(self, interaccion, hasta):
+        interaccion.proximo_intento = hasta
+        interaccion.save(update_fields=['proximo_intento'])
+
+    def _obtener_circuito(self, sitio_externo_id):
+        if sitio_externo_id not in self._circuitos:
+            self._circuitos[sitio_externo_id] = CircuitoSitioExterno(
+                settings.OML_SITIO_EXTERNO_FALLAS_CIRCUITO,
+                settings.OML_SITIO_EXTERNO_PAUSA_CIRCUITO)
+        return self._circuitos[sitio_externo_id]
+
+    def _preparar_sitio(self, sitio_externo_id):
+        # Sesión y semáforo se crean desde el thread principal, antes de enviar
+        if sitio_externo_id not in self._sesiones:
+            sesion = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=settings.OML_SITIO_EXTERNO_CONCURRENCIA)
+            sesion.mount('http://', adapter)
+            sesion.mount('https://', adapter)
+            self._sesiones[sitio_externo_id] = sesion
+            self._semaforos[sitio_externo_id] = threading.BoundedSemaphore(
+                settings.OML_SITIO_EXTERNO_CONCURRENCIA)
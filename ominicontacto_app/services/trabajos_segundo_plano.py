@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Trabajos en segundo plano: exportaciones de reportes, zip de grabaciones y reciclado de
+campañas.
+
+Las vistas registran un TrabajoSegundoPlano con `encolar_trabajo` y el comando
+procesar_trabajos lo ejecuta (ver ProcesadorTrabajos). El progreso se publica en el canal del
+trabajo con ProgresoTarea y el procesador lo reenvía a los `key_task` de todos los que pidieron
+el trabajo.
+"""
+
+from __future__ import unicode_literals
+
+import datetime
+import hashlib
+import json
+import logging as _logging
+import os
+
+import redis
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+
+from ominicontacto_app.models import BaseDatosContacto, Campana, TrabajoSegundoPlano
+from ominicontacto_app.services.progreso_tareas import obtener_estado_progreso
+from ominicontacto_app.services.reporte_campana_calificacion import (
+    ReporteCalificacionesCampanaCSV)
+from ominicontacto_app.services.reporte_campana_csv import ExportacionArchivoCampanaCSV
+from ominicontacto_app.services.reporte_respuestas_formulario import (
+    ReporteFormularioGestionCampanaCSV)
+from ominicontacto_app.services.reporte_resultados_de_base import ReporteContactacionesCSV
+from ominicontacto_app.services.reporte_resultados_de_base_csv import ExportacionReporteCSV
+from reciclado_app.resultado_contactacion import RecicladorContactosCampanaDIALER
+from reportes_app.reportes.reporte_llamados_contactados_csv import (
+    ExportacionCampanaCSV, ReporteCalificadosCSV, ReporteContactadosCSV, ReporteNoAtendidosCSV)
+
+logger = _logging.getLogger(__name__)
+
+# Canal en el que publica su progreso el trabajo en ejecución
+CANAL_PROGRESO = 'OML:TRABAJO:{0}:PROGRESO'
+# key_task de quienes esperan el resultado del trabajo
+KEY_CANALES = 'OML:TRABAJO:{0}:CANALES'
+EXPIRACION_KEYS = 24 * 60 * 60
+# Mensajes que reciben los suscriptos cuando el trabajo termina sin resultado
+MENSAJE_FALLIDO = 'ERROR'
+MENSAJE_CANCELADO = 'CANCELADO'
+
+
+def _obtener_rango(desde, hasta):
+    return (datetime.datetime.fromisoformat(desde), datetime.datetime.fromisoformat(hasta))
+
+
+def exportar_contactados(key_task, campana_id, desde, hasta):
+    campana = Campana.objects.get(pk=campana_id)
+    datos = ReporteContactadosCSV(campana, key_task, *_obtener_rango(desde, hasta)).datos
+    ExportacionCampanaCSV().exportar_reportes_csv(campana, datos_contactados=datos)
+
+
+def exportar_calificados(key_task, campana_id, desde, hasta):
+    campana = Campana.objects.get(pk=campana_id)
+    datos = ReporteCalificadosCSV(campana, key_task, *_obtener_rango(desde, hasta)).datos
+    ExportacionCampanaCSV().exportar_reportes_csv(campana, datos_calificados=datos)
+
+
+def exportar_no_atendidos(key_task, campana_id, desde, hasta):
+    campana = Campana.objects.get(pk=campana_id)
+    datos = ReporteNoAtendidosCSV(campana, key_task, *_obtener_rango(desde, hasta)).datos
+    ExportacionCampanaCSV().exportar_reportes_csv(campana, datos_no_atendidos=datos)
+
+
+def exportar_calificaciones(key_task, campana_id, desde, hasta):
+    campana = Campana.objects.get(pk=campana_id)
+    datos = ReporteCalificacionesCampanaCSV(
+        campana, key_task, *_obtener_rango(desde, hasta)).datos
+    ExportacionArchivoCampanaCSV(campana, "calificados").exportar_reportes_csv(datos=datos)
+
+
+def exportar_formulario_gestion(key_task, campana_id, desde, hasta):
+    campana = Campana.objects.get(pk=campana_id)
+    datos = ReporteFormularioGestionCampanaCSV(
+        campana, key_task, *_obtener_rango(desde, hasta)).datos
+    ExportacionArchivoCampanaCSV(campana, "formulario_gestion").exportar_reportes_csv(
+        datos=datos)
+
+
+def exportar_resultados_base(key_task, campana_id, all_data):
+    campana = Campana.objects.get(pk=campana_id)
+    datos = ReporteContactacionesCSV(campana, key_task, all_data).datos
+    if all_data:
+        ExportacionReporteCSV().exportar_reportes_csv(campana, datos_contactaciones_todos=datos)
+    else:
+        ExportacionReporteCSV().exportar_reportes_csv(campana, datos_contactaciones=datos)
+
+
+def exportar_auditoria(key_task, usuario_id, calificaciones_id, mostrar_detalles):
+    from api_app.views.auditoria import ReporteCalificacionesCampanaCSV as ReporteAuditoriaCSV
+    from ominicontacto_app.services.reporte_auditoria_csv import ExportacionArchivoCSV
+    datos = ReporteAuditoriaCSV(key_task, calificaciones_id, mostrar_detalles).datos
+    ExportacionArchivoCSV("auditoria_{}".format(usuario_id)).exportar_reportes_csv(datos=datos)
+
+
+def generar_zip_grabaciones(key_task, archivos, username, mostrar_datos_contacto):
+    from ominicontacto_app.services.grabaciones.generacion_zip_grabaciones import (
+        GeneracionZipGrabaciones)
+    zip_path = os.path.join(settings.SENDFILE_ROOT, 'zip')
+    GeneracionZipGrabaciones(
+        archivos, zip_path, key_task, username, mostrar_datos_contacto).genera_zip()
+
+
+def reciclar_base_contactos(key_task, campana_id, bd_contacto_id, reciclado_calificacion,
+                            reciclado_no_contactacion, reciclado_radio=None):
+    # El tipo de reciclado (reciclado_radio) lo aplica RecicladoEnCursoMixin al terminar
+    campana = Campana.objects.get(pk=campana_id)
+    bd_contacto = BaseDatosContacto.objects.get(pk=bd_contacto_id)
+    if bd_contacto.estado == BaseDatosContacto.ESTADO_DEFINIDA:
+        # Un intento anterior ya completó el reciclado
+        return
+    RecicladorContactosCampanaDIALER().generar_contactos_reciclados(
+        campana, bd_contacto, reciclado_calificacion, reciclado_no_contactacion, key_task)
+
+
+# Tipo de trabajo: (función que lo ejecuta, parámetros que identifican el archivo generado)
+TIPOS_TRABAJO = {
+    'CONTACTADOS': (exportar_contactados, ('campana_id', )),
+    'CALIFICADOS': (exportar_calificados, ('campana_id', )),
+    'NO_ATENDIDOS': (exportar_no_atendidos, ('campana_id', )),
+    'CALIFICACIONES': (exportar_calificaciones, ('campana_id', )),
+    'FORMULARIO_GESTION': (exportar_formulario_gestion, ('campana_id', )),
+    'RESULTADOS_BASE': (exportar_resultados_base, ('campana_id', 'all_data')),
+    'AUDITORIA': (exportar_auditoria, ('usuario_id', )),
+    'ZIP_GRABACIONES': (generar_zip_grabaciones, ('username', )),
+    'RECICLADO': (reciclar_base_contactos, ('bd_contacto_id', )),
+}
+
+
+def obtener_redis():
+    return redis.Redis(
+        host=settings.REDIS_HOSTNAME,
+        port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+        decode_responses=True)
+
+
+def ejecutar_trabajo(trabajo):
+    funcion, __ = TIPOS_TRABAJO[trabajo.tipo]
+    funcion(CANAL_PROGRESO.format(trabajo.pk), **trabajo.get_parametros())
+
+
+def publicar_a_suscriptos(trabajo_id, mensaje, redis_connection):
+    canales = redis_connection.smembers(KEY_CANALES.format(trabajo_id))
+    if canales:
+        pipeline = redis_connection.pipeline(transaction=False)
+        for canal in canales:
+            pipeline.publish(canal, mensaje)
+        pipeline.execute()
+
+
+def _obtener_mensajes_publicados(trabajo_id, redis_connection):
+    """
+    Mensajes para quien se suscribe a un trabajo ya iniciado: el último porcentaje publicado y,
+    si el trabajo ya lo publicó, su mensaje final (por ejemplo el nombre del zip)
+    """
+    estado = obtener_estado_progreso(CANAL_PROGRESO.format(trabajo_id), redis_connection)
+    if estado is None:
+        return []
+    mensajes = [estado['porcentaje']]
+    if 'mensaje' in estado:
+        mensajes.append(estado['mensaje'])
+    return mensajes
+
+
+def _calcular_clave(tipo, parametros, campos):
+    clave = '{0}:{1}'.format(tipo, ':'.join(str(parametros[campo]) for campo in campos))
+    parametros_json = json.dumps(parametros, sort_keys=True)
+    return clave, '{0}:{1}'.format(clave, hashlib.sha1(parametros_json.encode()).hexdigest())
+
+
+def encolar_trabajo(tipo, key_task, usuario=None, campana=None, redis_connection=None,
+                    **parametros):
+    """
+    Registra el trabajo y suscribe `key_task` a su progreso. Si ya hay un trabajo igual
+    pendiente o en curso se suma a él, y si uno igual terminó hace menos de
+    OML_TRABAJOS_TTL_RESULTADO segundos (y su archivo no se regeneró) reutiliza el resultado.
+    """
+    __, campos_salida = TIPOS_TRABAJO[tipo]
+    salida, clave = _calcular_clave(tipo, parametros, campos_salida)
+    if redis_connection is None:
+        redis_connection = obtener_redis()
+
+    ultimo = TrabajoSegundoPlano.objects.filter(salida=salida).exclude(
+        estado=TrabajoSegundoPlano.CANCELADO).order_by('-id').first()
+    if ultimo is not None and ultimo.clave == clave and ultimo.estado == \
+            TrabajoSegundoPlano.FINALIZADO and ultimo.expiracion > now():
+        mensajes = _obtener_mensajes_publicados(ultimo.pk, redis_connection)
+        if not mensajes or mensajes[0] != 100:
+            # El trabajo no publicó su final y lo hizo el procesador
+            mensajes = [100]
+        for mensaje in mensajes:
+            redis_connection.publish(key_task, mensaje)
+        return ultimo
+
+    try:
+        with transaction.atomic():
+            trabajo = TrabajoSegundoPlano.objects.create(
+                tipo=tipo, clave=clave, salida=salida, parametros=json.dumps(parametros),
+                usuario=usuario, campana=campana)
+    except IntegrityError:
+        trabajo = TrabajoSegundoPlano.objects.filter(
+            clave=clave, estado__in=TrabajoSegundoPlano.ESTADOS_ACTIVOS).first()
+        if trabajo is None:
+            # El trabajo igual terminó entre el insert y la consulta: se vuelve a intentar
+            return encolar_trabajo(tipo, key_task, usuario, campana, redis_connection,
+                                   **parametros)
+    key_canales = KEY_CANALES.format(trabajo.pk)
+    pipeline = redis_connection.pipeline()
+    pipeline.sadd(key_canales, key_task)
+    pipeline.expire(key_canales, EXPIRACION_KEYS)
+    pipeline.execute()
+    # Quien se suma a un trabajo en curso recibe lo último que publicó
+    for mensaje in _obtener_mensajes_publicados(trabajo.pk, redis_connection):
+        redis_connection.publish(key_task, mensaje)
+    return trabajo
+
+
+def cancelar_trabajo(trabajo, redis_connection=None):
+    """ Cancela el trabajo si no terminó. El procesador interrumpe los que están en curso """
+    cancelado = TrabajoSegundoPlano.objects.filter(
+        pk=trabajo.pk, estado__in=TrabajoSegundoPlano.ESTADOS_ACTIVOS).update(
+            estado=TrabajoSegundoPlano.CANCELADO, finalizado=now()) > 0
+    if cancelado:
+        publicar_a_suscriptos(trabajo.pk, MENSAJE_CANCELADO, redis_connection or obtener_redis())
+    return cancelado
@@ -20,13 +20,9 @@
 
 from __future__ import unicode_literals
 
-import os
-import shutil
-import tempfile
 import logging
 import json
 
-from django.conf import settings
 from django.utils.translation import gettext as _
 
 logger = logging.getLogger(__name__)
@@ -34,9 +30,6 @@ logger = logging.getLogger(__name__)
 
 class CampanaCreator(object):
 
-    def __init__(self):
-        self._campana_config_file = CampanaConfigFile()
-
     def _generar_json(self, campana):
         """Genera json.
 
@@ -92,18 +85,14 @@ class CampanaCreator(object):
         return json.dumps(dict_campana)
 
     def create_json(self, campana):
-        """Crea el archivo de json para campana
+        """Devuelve el json para campana
         """
         logger.info(_("Creando json para campana {0}".format(campana.nombre)))
-        config_chunk = self._generar_json(campana)
-        self._campana_config_file.write(config_chunk)
+        return self._generar_json(campana)
 
 
 class TrunkCreator(object):
 
-    def __init__(self):
-        self._trunk_config_file = TrunkConfigFile()
-
     def _generar_json(self):
         """Genera json.
         :returns: str -- json para la campana
@@ -118,18 +107,14 @@ class TrunkCreator(object):
         return json.dumps(dict_trunk)
 
     def create_json(self, campana):
-        """Crea el archivo de json para trunk de campana
+        """Devuelve el json para trunk de campana
         """
         logger.info(_("Creando json para trunk  campana {0}".format(campana.nombre)))
-        config_chunk = self._generar_json()
-        self._trunk_config_file.write(config_chunk)
+        return self._generar_json()
 
 
 class RescheduleRuleCreator(object):
 
-    def __init__(self):
-        self._reschedule_config_file = RescheduleRuleConfigFile()
-
     def _generar_json(self, parametros):
         """Genera json.
         :returns: str -- json para la campana
@@ -146,19 +131,15 @@ class RescheduleRuleCreator(object):
         return json.dumps(dict_reschedule)
 
     def create_json(self, campana, parametros):
-        """Crea el archivo de json para trunk de campana
+        """Devuelve el json para trunk de campana
         """
         logger.info(_("Creando json para regla de reschedule para la campana {0}".format(
             campana.nombre)))
-        config_chunk = self._generar_json(parametros)
-        self._reschedule_config_file.write(config_chunk)
+        return self._generar_json(parametros)
 
 
 class EndPointCreator(object):
 
-    def __init__(self):
-        self._endpoint_config_file = EndPointConfigFile()
-
     def _generar_json(self, campana):
         """Genera json.
         :returns: str -- json para la campana
@@ -193,18 +174,14 @@ class EndPointCreator(object):
         return json.dumps(dict_endpoint)
 
     def create_json(self, campana):
-        """Crea el archivo de json para trunk de campana
+        """Devuelve el json para trunk de campana
         """
         logger.info(_("Creando json end point para la campana {0}".format(campana.nombre)))
-        config_chunk = self._generar_json(campana)
-        self._endpoint_config_file.write(config_chunk)
+        return self._generar_json(campana)
 
 
 class CampanaEndPointCreator(object):
 
-    def __init__(self):
-        self._campana_endpoint_config_file = CampanaEndPointConfigFile()
-
     def _generar_json(self, campana):
         """Genera json.
         :returns: str -- json para la campana
@@ -219,19 +196,15 @@ class CampanaEndPointCreator(object):
         return json.dumps(dict_trunk)
 
     def create_json(self, campana):
-        """Crea el archivo de json para endpoint de campana
+        """Devuelve el json para endpoint de campana
         """
         logger.info("Creando json para asociacion campana %s endpoint",
                     campana.nombre)
-        config_chunk = self._generar_json(campana)
-        self._campana_endpoint_config_file.write(config_chunk)
+        return self._generar_json(campana)
 
 
 class CampanaListCreator(object):
 
-    def __init__(self):
-        self._campana_list_config_file = CampanaListConfigFile()
-
     def _generar_json(self, list):
         """Genera json.
         :returns: str -- json para la campana
@@ -246,18 +219,14 @@ class CampanaListCreator(object):
         return json.dumps(dict_trunk)
 
     def create_json(self, list):
-        """Crea el archivo de json para list de campana
+        """Devuelve el json para list de campana
         """
         logger.info(_("Creando json para asociacion lista {0} campana".format(list)))
-        config_chunk = self._generar_json(list)
-        self._campana_list_config_file.write(config_chunk)
+        return self._generar_json(list)
 
 
 class CampanaDeleteListCreator(object):
 
-    def __init__(self):
-        self._campana_list_config_file = CampanaDesListConfigFile()
-
     def _generar_json(self, cclId):
         """Genera json.
         :returns: str -- json para la campana
@@ -270,105 +239,7 @@ class CampanaDeleteListCreator(object):
         return json.dumps(dict_trunk)
 
     def create_json(self, cclId):
-        """Crea el archivo de json para list de campana
+        """Devuelve el json para list de campana
         """
         logger.info(_("Creando json para asociacion lista {0} campana".format(list)))
-        config_chunk = self._generar_json(cclId)
-        self._campana_list_config_file.write(config_chunk)
-
-
-class ConfigFile(object):
-    def __init__(self, filename):
-        self._filename = filename
-
-    def write(self, contenido):
-        tmp_fd, tmp_filename = tempfile.mkstemp()
-        try:
-            tmp_file_obj = os.fdopen(tmp_fd, 'w', encoding='utf-8')
-            # assert isinstance(contenido, json), \
-            #     "Objeto NO es unicode: {0}".format(type(contenido))
-            tmp_file_obj.write(contenido)
-
-            tmp_file_obj.close()
-
-            logger.info(_("Copiando file config a {0}".format(self._filename)))
-            shutil.copy(tmp_filename, self._filename)
-            os.chmod(self._filename, 0o644)
-
-        finally:
-            try:
-                os.remove(tmp_filename)
-            except Exception:
-                logger.exception(_("Error al intentar borrar temporal {0}".format(tmp_filename)))
-
-
-class CampanaConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "newcampaign.json")
-        filename = filename.strip()
-        super(CampanaConfigFile, self).__init__(filename)
-
-
-class TrunkConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "newcampaign_trunk.json")
-        filename = filename.strip()
-        super(TrunkConfigFile, self).__init__(filename)
-
-
-class RescheduleRuleConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "newcampaign_reschedule.json")
-        filename = filename.strip()
-        super(RescheduleRuleConfigFile, self).__init__(filename)
-
-
-class EndPointConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "newep.json")
-        filename = filename.strip()
-        super(EndPointConfigFile, self).__init__(filename)
-
-
-class CampanaEndPointConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "newcampaign_ep.json")
-        filename = filename.strip()
-        super(CampanaEndPointConfigFile, self).__init__(filename)
-
-
-class CampanaListConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "newcampaign_list.json ")
-        filename = filename.strip()
-        super(CampanaListConfigFile, self).__init__(filename)
-
-
-class CampanaListContactoConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "newcampaign_list_contacto.txt ")
-        filename = filename.strip()
-        super(CampanaListContactoConfigFile, self).__init__(filename)
-
-
-class CampanaDesListConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "deletecampaign_list.json ")
-        filename = filename.strip()
-        super(CampanaDesListConfigFile, self).__init__(filename)
-
-
-class CampanaDeleteEndPointConfigFile(ConfigFile):
-    def __init__(self):
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                "deletecampaign_ep.json")
-        filename = filename.strip()
-        super(CampanaDeleteEndPointConfigFile, self).__init__(filename)
+        return self._generar_json(cclId)
@@ -16,16 +16,20 @@
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
 
-"""Servicio para generar los curl hacia wombat"""
+"""Servicio para interactuar con la API de wombat"""
 
 from __future__ import unicode_literals
 
 import logging
-import subprocess
 import os
 import json
+import threading
 import time
 
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
 from django.conf import settings
 from django.utils.translation import gettext as _
 from django.utils.timezone import now, timedelta
@@ -34,126 +38,110 @@ from constance import config as config_constance
 logger = logging.getLogger(__name__)
 
 
+class ClienteWombat(object):
+    """
+    Cliente HTTP de la API de Wombat. Mantiene una sesión con conexiones keep-alive que se
+    reutilizan entre pedidos, en lugar de abrir una conexión (y un proceso curl) por pedido.
+    Solo se reintentan los errores al conectar, ya que los pedidos que llegaron a Wombat
+    pueden haber tenido efecto.
+    """
+
+    _cliente = None
+    _lock_cliente = threading.Lock()
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.session = requests.Session()
+        self.session.auth = (settings.OML_WOMBAT_USER, settings.OML_WOMBAT_PASSWORD)
+        reintentos = Retry(total=settings.OML_WOMBAT_RETRIES,
+                           connect=settings.OML_WOMBAT_RETRIES, read=0, backoff_factor=0.2)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.OML_WOMBAT_POOL_SIZE,
+                              max_retries=reintentos)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def obtener_cliente(cls):
+        """ Devuelve el cliente del proceso actual (las conexiones no se comparten con forks) """
+        with cls._lock_cliente:
+            if cls._cliente is None or cls._cliente.pid != os.getpid():
+                cls._cliente = cls()
+            return cls._cliente
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        """ Realiza un POST a la url (relativa a OML_WOMBAT_URL) y devuelve la respuesta """
+        if timeout is None:
+            timeout = settings.OML_WOMBAT_READ_TIMEOUT
+        response = self.session.post(
+            '/'.join([settings.OML_WOMBAT_URL, url]), data=data, headers=headers,
+            timeout=(settings.OML_WOMBAT_CONNECT_TIMEOUT, timeout))
+        response.raise_for_status()
+        return response
+
+
 class WombatService():
 
     GET_DIALER_STATE_URL = "api/engine/?op=STATE"
     STOP_SERVICE_URL = "api/engine/?op=STOP"
     START_SERVICE_URL = "api/engine/?op=START"
 
-    def update_config_wombat(self, json_file, url_edit):
+    def _post(self, url, data=None, headers=None, timeout=None):
+        """ Devuelve la respuesta de Wombat o None si no se pudo realizar el pedido """
+        try:
+            return ClienteWombat.obtener_cliente().post(url, data, headers, timeout)
+        except requests.exceptions.RequestException as e:
+            logger.warn(_("Error en el pedido a WOMBAT {0}: {1}".format(url, e)))
+
+    def update_config_wombat(self, config_json, url_edit):
         """Realiza un update en la config de wombat
 
-        :returns: json -- exit status de proceso ejecutado.
-                  0 (cero) si fue exitoso, otro valor si se produjo
-                  un error
+        :param config_json: json con la configuración a enviar
+        :returns: json -- respuesta de wombat, o None si se produjo un error
         """
-        filename = os.path.join(settings.OML_WOMBAT_FILENAME,
-                                json_file)
-        try:
-            # subprocess.check_call(settings.FTS_RELOAD_CMD,
-            #                      stdout=stdout_file, stderr=stderr_file)
-            out = subprocess.check_output(['curl', '--user',
-                                           ':'.join([settings.OML_WOMBAT_USER,
-                                                     settings.OML_WOMBAT_PASSWORD]),
-                                           '-X', 'POST', '--data-urlencode',
-                                           '@'.join(['data', filename]),
-                                           '/'.join([settings.OML_WOMBAT_URL,
-                                                     url_edit])])
+        response = self._post(url_edit, data={'data': config_json})
+        if response is not None:
             logger.info(_("actualizacion en WOMBAT OK"))
-            return json.loads(out)
-        except subprocess.CalledProcessError as e:
-            logger.warn(_("Exit status erroneo: {0}".format(e.returncode)))
-            logger.warn(" - Comando ejecutado: {0}".format(e.cmd))
-            print(e)
+            return response.json()
 
-    def update_lista_wombat(self, nombre_archivo, url_edit):
-        """Realiza un update en la config de wombat
+    def update_lista_wombat(self, numeros, url_edit):
+        """Agrega números a una lista de wombat
 
-        :returns: out -- salida del comando ejectuado hacia wombat.
-                  0 (cero) si fue exitoso, otro valor si se produjo
-                  un error
+        :param numeros: cuerpo del pedido addToList ("numbers=...")
+        :returns: out -- respuesta de wombat, o None si se produjo un error
         """
-        try:
-            # subprocess.check_call(settings.FTS_RELOAD_CMD,
-            #                      stdout=stdout_file, stderr=stderr_file)
-            filename_archivo = settings.OML_WOMBAT_FILENAME + nombre_archivo
-            out = subprocess.check_output(['curl', '--user',
-                                           ':'.join([settings.OML_WOMBAT_USER,
-                                                     settings.OML_WOMBAT_PASSWORD]),
-                                           '-m', settings.OML_WOMBAT_TIMEOUT, '-X', 'POST', '-w',
-                                           'string', '-d', "@{0}".format(filename_archivo),
-                                           '/'.join([settings.OML_WOMBAT_URL,
-                                                     url_edit])])
-            return out
-        except subprocess.CalledProcessError as e:
-            logger.warn(_("Exit status erroneo: {0}".format(e.returncode)))
-            logger.warn(_(" - Comando ejecutado: {0}".format(e.cmd)))
-            print(e)
+        response = self._post(
+            url_edit, data=numeros, timeout=float(settings.OML_WOMBAT_TIMEOUT),
+            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        if response is not None:
+            return response.content
 
     def list_config_wombat(self, url_edit):
         # TODO: Renombrar. Impacta en wombat sin parametros (solo url). Devuelve respuesta JSON
         """Realiza un list en la config de wombat
 
-        :returns: json -- exit status de proceso ejecutado.
-                  0 (cero) si fue exitoso, otro valor si se produjo
-                  un error
+        :returns: json -- respuesta de wombat, o None si se produjo un error
         """
-        try:
-            # subprocess.check_call(settings.FTS_RELOAD_CMD,
-            #                      stdout=stdout_file, stderr=stderr_file)
-            out = subprocess.check_output(['curl', '--user',
-                                           ':'.join([settings.OML_WOMBAT_USER,
-                                                     settings.OML_WOMBAT_PASSWORD]),
-                                           '-X', 'POST',
-                                           '/'.join([settings.OML_WOMBAT_URL,
-                                                     url_edit])])
+        response = self._post(url_edit)
+        if response is not None:
             logger.info(_("list en WOMBAT OK"))
-            return json.loads(out)
-        except subprocess.CalledProcessError as e:
-            logger.warn(_("Exit status erroneo: {0}".format(e.returncode)))
-            logger.warn(_(" - Comando ejecutado: {0}".format(e.cmd)))
-            print(e)
+            return response.json()
 
     def set_call_ext_status(self, url_set_status):
-        try:
-            # subprocess.check_call(settings.FTS_RELOAD_CMD,
-            #                      stdout=stdout_file, stderr=stderr_file)
-            out = subprocess.check_output(['curl', '--user',
-                                           ':'.join([settings.OML_WOMBAT_USER,
-                                                     settings.OML_WOMBAT_PASSWORD]),
-                                           '-X', 'POST',
-                                           '/'.join([settings.OML_WOMBAT_URL,
-                                                     url_set_status])])
-            if 'Event CALLSTATUS queued' in str(out):
+        response = self._post(url_set_status)
+        if response is not None:
+            if 'Event CALLSTATUS queued' in response.text:
                 logger.info(_("Set extStatus en WOMBAT OK"))
             return True
-        except subprocess.CalledProcessError as e:
-            logger.warn(_("Exit status erroneo: {0}".format(e.returncode)))
-            logger.warn(_(" - Comando ejecutado: {0}".format(e.cmd)))
-            print(e)
 
     def post_json(self, url, object):
-        """Realiza un POST a wombat enviando el json de un objeto usando data-urlencode
+        """Realiza un POST a wombat enviando el json de un objeto en el parametro data
 
-        :returns: json -- exit status de proceso ejecutado.
-                  otro valor si se produjo un error
+        :returns: json -- respuesta de wombat, o None si se produjo un error
         """
-        try:
-            # subprocess.check_call(settings.FTS_RELOAD_CMD,
-            #                      stdout=stdout_file, stderr=stderr_file)
-            out = subprocess.check_output(['curl', '--user',
-                                           ':'.join([settings.OML_WOMBAT_USER,
-                                                     settings.OML_WOMBAT_PASSWORD]),
-                                           '-X', 'POST', '--data-urlencode',
-                                           "data={0}".format(json.dumps(object)),
-                                           '/'.join([settings.OML_WOMBAT_URL,
-                                                     url])])
+        response = self._post(url, data={'data': json.dumps(object)})
+        if response is not None:
             logger.info(_("POST en WOMBAT OK"))
-            return json.loads(out)
-        except subprocess.CalledProcessError as e:
-            logger.warn(_("Exit status erroneo: {0}".format(e.returncode)))
-            logger.warn(_(" - Comando ejecutado: {0}".format(e.cmd)))
-            print(e)
+            return response.json()
 
     def get_dialer_state(self):
         response = self.list_config_wombat(self.GET_DIALER_STATE_URL)
@@ -115,6 +115,10 @@ function wsProcess() {
         var data = e.data;
         if (data == subscribeConfirmationMessage) {
             generarZip();
+        } else if (data == 'ERROR' || data == 'CANCELADO') {
+            $('#barraProgresoZip').find('.progress-bar').text(
+                data == 'ERROR' ? gettext('Error') : gettext('Cancelado'));
+            rws.close();
         } else if (!final) {
 
             $barraProgresoCSV = $('#barraProgresoZip');
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests del modulo 'ominicontacto_app.services.asterisk.asterisk_ami'
+"""
+
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from mock import Mock, patch
+
+from asterisk.manager import ManagerMsg
+
+from django.test.utils import override_settings
+
+from ominicontacto_app.tests.utiles import OMLBaseTest
+from ominicontacto_app.services.asterisk.asterisk_ami import (
+    AMIManagerConnector, AmiManagerClient, ManagerAMI, PoolConexionesAMI)
+
+
+class ManagerAMIFalso(ManagerAMI):
+    """ Responde como Asterisk: un Originate sin Async recién responde al atenderse """
+
+    DEMORA_ORIGINATE = 5
+
+    def __init__(self):
+        super(ManagerAMIFalso, self).__init__()
+        self._connected.set()
+        self.originate_enviado = threading.Event()
+
+    def send_actions(self, acciones):
+        if acciones[0]['Action'] == 'Originate':
+            self.originate_enviado.set()
+            if 'Async' not in acciones[0]:
+                time.sleep(self.DEMORA_ORIGINATE)
+        return [ManagerMsg(['Response: Success\r\n']) for accion in acciones]
+
+
+class ManagerAMITest(OMLBaseTest):
+
+    def _crear_respuesta(self, action_id):
+        return ManagerMsg(['Response: Success\r\n', 'ActionID: {0}\r\n'.format(action_id)])
+
+    def test_envia_acciones_juntas_y_correlaciona_respuestas_por_action_id(self):
+        manager = ManagerAMI()
+        manager._sock = Mock()
+        manager._connected.set()
+        manager._response_queue.put(self._crear_respuesta('2'))
+        manager._response_queue.put(self._crear_respuesta('1'))
+
+        respuestas = manager.send_actions([
+            {'Action': 'QueueAdd', 'ActionID': '1'},
+            {'Action': 'QueueLog', 'ActionID': '2'}])
+
+        self.assertEqual(manager._sock.write.call_count, 1)
+        self.assertEqual([respuesta.get_header('ActionID') for respuesta in respuestas],
+                         ['1', '2'])
+        self.assertEqual(manager._reswaiting, [])
+
+
+class PoolConexionesAMITest(OMLBaseTest):
+
+    def setUp(self):
+        super(PoolConexionesAMITest, self).setUp()
+        PoolConexionesAMI._pool = None
+
+    def tearDown(self):
+        PoolConexionesAMI._pool = None
+        super(PoolConexionesAMITest, self).tearDown()
+
+    @patch.object(PoolConexionesAMI, '_crear_conexion')
+    def test_conexiones_sucesivas_reutilizan_la_conexion_logueada(self, _crear_conexion):
+        _crear_conexion.return_value.connected.return_value = True
+        for i in range(3):
+            connector = AMIManagerConnector()
+            self.assertFalse(connector.connect())
+            connector.disconnect()
+        self.assertEqual(_crear_conexion.call_count, 1)
+
+    @patch.object(PoolConexionesAMI, '_cerrar_conexion')
+    @patch.object(PoolConexionesAMI, '_crear_conexion')
+    def test_conexion_cortada_se_descarta(self, _crear_conexion, _cerrar_conexion):
+        _crear_conexion.return_value.connected.return_value = False
+        for i in range(2):
+            connector = AMIManagerConnector()
+            connector.connect()
+            connector.disconnect()
+        self.assertEqual(_crear_conexion.call_count, 2)
+        self.assertEqual(_cerrar_conexion.call_count, 2)
+
+    @override_settings(OML_AMI_POOL_SIZE=1, OML_AMI_POOL_TIMEOUT=1)
+    @patch.object(PoolConexionesAMI, '_crear_conexion')
+    def test_originate_no_retiene_la_conexion_mientras_suena_el_canal(self, _crear_conexion):
+        manager = ManagerAMIFalso()
+        _crear_conexion.return_value = manager
+
+        def originar():
+            client = AmiManagerClient()
+            client.connect()
+            client.originate('Local/1001@click2call/n', 'from-oml', False, {}, True,
+                             exten='1001', priority=1, timeout=45000)
+            client.disconnect()
+
+        originate = threading.Thread(target=originar)
+        originate.start()
+        manager.originate_enviado.wait(1)
+        client = AmiManagerClient()
+        self.assertFalse(client.connect())
+        client.queue_add('queue_1', 'PJSIP/1001', 0, False, 'agente')
+        client.disconnect()
+        originate.join()
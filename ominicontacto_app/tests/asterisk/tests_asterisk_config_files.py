@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests del envío de archivos a Asterisk en 'ominicontacto_app.asterisk_config'
+"""
+
+from __future__ import unicode_literals
+
+import json
+import os
+import tempfile
+
+from mock import patch
+
+from django.test.utils import override_settings
+
+from ominicontacto_app.asterisk_config import (
+    ConfigFile, SipConfigCreator, contenido_archivo_para_stream, guardar_archivo_en_redis)
+from ominicontacto_app.services.redis.redis_streams import RedisStreams
+from ominicontacto_app.tests.factories import AgenteProfileFactory
+from ominicontacto_app.tests.utiles import OMLBaseTest
+
+
+@override_settings(OML_ASTERISK_CONF_UPDATER_DELTAS=True)
+class ConfigFileTest(OMLBaseTest):
+
+    def setUp(self):
+        super(ConfigFileTest, self).setUp()
+        self.config_file = ConfigFile('/etc/asterisk/oml_test.conf')
+        self.config_file.MODULO = 'res_test.so'
+        self.connection = RedisStreams().connection
+        self._borrar_keys()
+
+    def tearDown(self):
+        self._borrar_keys()
+        super(ConfigFileTest, self).tearDown()
+
+    def _borrar_keys(self):
+        self.connection.delete(*[key.format('oml_test.conf') for key in (
+            ConfigFile.KEY_PARTES, ConfigFile.KEY_HASHES, ConfigFile.KEY_ORDEN,
+            ConfigFile.KEY_VERSION)])
+
+    def _ultimo_mensaje(self):
+        mensajes = self.connection.xrevrange(ConfigFile.STREAM, count=1)
+        return mensajes[0][0], json.loads(mensajes[0][1]['value'])
+
+    def test_primera_escritura_publica_todas_las_partes_con_su_orden(self):
+        self.assertTrue(self.config_file.write([('a', '[a]\n'), ('b', '[b]\n'), '[c]\n']))
+        __, mensaje = self._ultimo_mensaje()
+        self.assertEqual(mensaje['type'], 'CONF_DELTA')
+        self.assertEqual(mensaje['archivo'], 'oml_test.conf')
+        self.assertEqual(mensaje['modulo'], 'res_test.so')
+        self.assertEqual(mensaje['version'], 1)
+        self.assertEqual(mensaje['partes'], {'a': '[a]\n', 'b': '[b]\n', '2': '[c]\n'})
+        self.assertEqual(mensaje['orden'], ['a', 'b', '2'])
+
+    def test_escritura_sin_cambios_no_publica_mensaje(self):
+        self.config_file.write([('a', '[a]\n'), ('b', '[b]\n')])
+        id_mensaje, __ = self._ultimo_mensaje()
+        self.assertFalse(self.config_file.write([('a', '[a]\n'), ('b', '[b]\n')]))
+        self.assertEqual(self._ultimo_mensaje()[0], id_mensaje)
+
+    def test_se_publican_solo_las_partes_modificadas(self):
+        self.config_file.write([('a', '[a]\n'), ('b', '[b]\n'), ('c', '[c]\n')])
+        self.config_file.write([('a', '[a]\n'), ('b', '[b]\nx=1\n'), ('c', '[c]\n')])
+        __, mensaje = self._ultimo_mensaje()
+        self.assertEqual(mensaje['version'], 2)
+        self.assertEqual(mensaje['partes'], {'b': '[b]\nx=1\n'})
+        self.assertEqual(mensaje['eliminadas'], [])
+        self.assertNotIn('orden', mensaje)
+
+    def test_partes_eliminadas_se_publican_y_se_borran_de_redis(self):
+        self.config_file.write([('a', '[a]\n'), ('b', '[b]\n')])
+        self.config_file.write([('a', '[a]\n')])
+        __, mensaje = self._ultimo_mensaje()
+        self.assertEqual(mensaje['partes'], {})
+        self.assertEqual(mensaje['eliminadas'], ['b'])
+        self.assertEqual(mensaje['orden'], ['a'])
+        self.assertEqual(
+            self.connection.hgetall(ConfigFile.KEY_PARTES.format('oml_test.conf')),
+            {'a': '[a]\n'})
+
+    @override_settings(OML_ASTERISK_CONF_UPDATER_DELTAS=False)
+    def test_sin_deltas_se_publica_el_archivo_completo(self):
+        self.config_file.write([('a', '[a]\n'), ('b', '[b]\n')])
+        self.assertTrue(self.config_file.write([('a', '[a]\n'), ('b', '[b]\n')]))
+        __, mensaje = self._ultimo_mensaje()
+        self.assertEqual(mensaje, {
+            'archivo': 'oml_test.conf', 'content': '[a]\n[b]\n', 'type': 'CONF_FILE'})
+        self.assertFalse(
+            self.connection.exists(ConfigFile.KEY_HASHES.format('oml_test.conf')))
+
+    @patch.object(ConfigFile, 'write')
+    def test_config_sip_se_genera_por_agente(self, write):
+        agente = AgenteProfileFactory()
+        SipConfigCreator().create_config_sip()
+        claves = [clave for clave, __ in write.call_args[0][0]]
+        self.assertIn('agente-{0}'.format(agente.pk), claves)
+
+
+@override_settings(OML_ASTERISK_ARCHIVOS_TAMANO_PARTE=4)
+class GuardarArchivoEnRedisTest(OMLBaseTest):
+
+    def setUp(self):
+        super(GuardarArchivoEnRedisTest, self).setUp()
+        self.connection = RedisStreams().connection
+        descriptor, self.ruta = tempfile.mkstemp()
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(b'RIFF\x00\x01datos')
+
+    def tearDown(self):
+        os.remove(self.ruta)
+        super(GuardarArchivoEnRedisTest, self).tearDown()
+
+    def test_archivo_se_guarda_en_partes_referenciadas_por_su_contenido(self):
+        datos = guardar_archivo_en_redis(self.ruta, self.connection)
+        self.connection.delete(datos['referencia'])
+        datos = guardar_archivo_en_redis(self.ruta, self.connection)
+        self.assertEqual(datos['partes'], 3)
+        self.assertEqual(datos['tamano'], 11)
+        self.assertIn(datos['sha1'], datos['referencia'])
+        partes = self.connection.lrange(datos['referencia'], 0, -1)
+        self.assertEqual(len(partes), 3)
+        self.assertGreater(self.connection.ttl(datos['referencia']), 0)
+        self.connection.delete(datos['referencia'])
+
+    def test_archivo_ya_guardado_no_se_vuelve_a_copiar(self):
+        datos = guardar_archivo_en_redis(self.ruta, self.connection)
+        with patch.object(self.connection, 'rpush') as rpush:
+            self.assertEqual(guardar_archivo_en_redis(self.ruta, self.connection), datos)
+        rpush.assert_not_called()
+        self.connection.delete(datos['referencia'])
+
+    def test_sin_deltas_el_archivo_se_envia_en_base64(self):
+        with patch.object(self.connection, 'rpush') as rpush:
+            campos = contenido_archivo_para_stream(self.ruta, self.connection)
+        self.assertEqual(campos, {'content': 'UklGRgABZGF0b3M='})
+        rpush.assert_not_called()
+
+    @override_settings(OML_ASTERISK_CONF_UPDATER_DELTAS=True)
+    def test_con_deltas_el_archivo_se_envia_por_referencia(self):
+        campos = contenido_archivo_para_stream(self.ruta, self.connection)
+        self.assertEqual(campos['content'], '')
+        self.assertEqual(campos['tamano'], 11)
+        self.assertTrue(self.connection.exists(campos['referencia']))
+        self.connection.delete(campos['referencia'])
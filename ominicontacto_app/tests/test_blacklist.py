@@ -21,8 +21,12 @@ Tests relacionados al Blacklist
 """
 from __future__ import unicode_literals
 from mock import patch
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 
+from ominicontacto_app.models import ContactoBlacklist
+from ominicontacto_app.services.asterisk.redis_database import BlacklistFamily
+from ominicontacto_app.services.black_list import CreacionBlacklistService
 from ominicontacto_app.tests.utiles import OMLBaseTest
 from ominicontacto_app.tests.factories import BlackListFactory
 
@@ -60,9 +64,55 @@ class TestsBlacklist (OMLBaseTest):
         response = self.client.delete(url, follow=True)
         self.assertEqual(response.status_code, 200)
 
-    @patch('ominicontacto_app.services.asterisk.redis_database.BlacklistFamily.regenerar_families')
-    def test_add_contact_to_blacklist(self, regenerar_families):
+    @patch('ominicontacto_app.services.asterisk.redis_database.BlacklistFamily.agregar_telefonos')
+    def test_add_contact_to_blacklist(self, agregar_telefonos):
         url = reverse('nuevo_contacto_blacklist', args=[self.blacklist.pk])
         post_data = self._post_blacklist_contact()
         response = self.client.post(url, post_data, follow=True)
         self.assertEqual(response.status_code, 200)
+        agregar_telefonos.assert_called_once_with(['12341234'])
+
+
+class TestsSincronizacionBlacklist(OMLBaseTest):
+
+    def setUp(self, *args, **kwargs):
+        super(TestsSincronizacionBlacklist, self).setUp(*args, **kwargs)
+        self.blacklist = BlackListFactory(cantidad_contactos=0)
+        self.blacklist_family = BlacklistFamily()
+        self.blacklist_family.get_redis_connection()
+        self.redis_connection = self.blacklist_family.redis_connection
+        self.redis_connection.delete(BlacklistFamily.BLACKLIST_KEY)
+
+    def tearDown(self):
+        self.redis_connection.delete(BlacklistFamily.BLACKLIST_KEY)
+        super(TestsSincronizacionBlacklist, self).tearDown()
+
+    def test_importa_contactos_ignora_telefonos_existentes(self):
+        ContactoBlacklist.objects.create(telefono='111', black_list=self.blacklist)
+        self.blacklist.archivo_importacion = SimpleUploadedFile(
+            'blacklist.csv', b'telefono\n111\n222\n333\n222\n')
+        self.blacklist.save()
+        with patch.object(CreacionBlacklistService, 'TAMANO_LOTE', 2):
+            contactos_repetidos = CreacionBlacklistService().importa_contactos(self.blacklist)
+        self.assertTrue(contactos_repetidos)
+        self.assertEqual(sorted(self.blacklist.contactosblacklist.values_list(
+            'telefono', flat=True)), ['111', '222', '333'])
+        self.assertEqual(self.blacklist.cantidad_contactos, 2)
+
+    @patch.object(BlacklistFamily, 'TAMANO_LOTE', 2)
+    def test_regenerar_families_reemplaza_la_blacklist(self):
+        self.redis_connection.sadd(BlacklistFamily.BLACKLIST_KEY, '999')
+        for telefono in ['111', '222', '333']:
+            ContactoBlacklist.objects.create(telefono=telefono, black_list=self.blacklist)
+        self.blacklist_family.regenerar_families(self.blacklist)
+        self.assertEqual(self.redis_connection.smembers(BlacklistFamily.BLACKLIST_KEY),
+                         set(['111', '222', '333']))
+        self.assertEqual(self.redis_connection.ttl(BlacklistFamily.BLACKLIST_KEY), -1)
+        self.assertEqual(self.redis_connection.keys(
+            BlacklistFamily.BLACKLIST_KEY_TEMPORAL.format('*')), [])
+
+    def test_agregar_y_eliminar_telefonos(self):
+        self.blacklist_family.agregar_telefonos(['111', '222'])
+        self.blacklist_family.eliminar_telefonos(['111'])
+        self.assertEqual(self.redis_connection.smembers(BlacklistFamily.BLACKLIST_KEY),
+                         set(['222']))
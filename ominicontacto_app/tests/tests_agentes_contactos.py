@@ -27,7 +27,8 @@ from django.utils.translation import gettext as _
 from django.urls import reverse
 
 from ominicontacto_app.tests.factories import (CampanaFactory, ContactoFactory, QueueFactory,
-                                               QueueMemberFactory)
+                                               QueueMemberFactory, CalificacionClienteFactory,
+                                               OpcionCalificacionFactory)
 from ominicontacto_app.tests.utiles import OMLBaseTest
 from ominicontacto_app.models import AgenteEnContacto, Campana, User
 
@@ -109,6 +110,24 @@ class AgentesContactosTests(OMLBaseTest):
         self.assertEqual(json_content['recordsFiltered'], 1)
         self.assertEqual(json_content['data'][0][1], str(self.contacto_camp_dialer.telefono))
 
+    def test_api_contacto_list_pagina_y_excluye_contactos_calificados(self):
+        bd_contacto = self.campana_dialer.bd_contacto
+        contactos = [self.contacto_camp_dialer] + [
+            ContactoFactory.create(bd_contacto=bd_contacto) for i in range(3)]
+        opcion_calificacion = OpcionCalificacionFactory(campana=self.campana_dialer)
+        CalificacionClienteFactory(
+            opcion_calificacion=opcion_calificacion, contacto=contactos[1],
+            agente=self.agente_profile)
+        url = reverse(
+            'api_contactos_campana',
+            kwargs={'pk_campana': self.campana_dialer.pk})
+        response = self.client.get(url, {'start': 1, 'length': 2, 'draw': 1, 'search[value]': ''})
+        json_content = json.loads(response.content)
+        self.assertEqual(json_content['recordsTotal'], 4)
+        self.assertEqual(json_content['recordsFiltered'], 3)
+        self.assertEqual([fila[0] for fila in json_content['data']],
+                         [contactos[2].pk, contactos[3].pk])
+
     def _obtener_datos_post_adicionar_contacto(self, campana):
         contacto_nuevo = ContactoFactory.build(bd_contacto=campana.bd_contacto)
         post_data = {'telefono': contacto_nuevo.telefono}
@@ -31,7 +31,7 @@ from django.db import connections
 from ominicontacto_app.tests.factories import (CampanaFactory, ContactoFactory, QueueFactory,
                                                AgenteEnContactoFactory)
 from ominicontacto_app.tests.utiles import OMLBaseTest, PASSWORD
-from ominicontacto_app.models import AgenteEnContacto, Campana, User
+from ominicontacto_app.models import AgenteEnContacto, Campana, Contacto, User
 
 
 class AsignacionDeContactosPreviewTests(OMLBaseTest):
@@ -364,6 +364,51 @@ class AsignacionDeContactosPreviewTests(OMLBaseTest):
         id_contacto = resultado['contacto_id']
         self.assertEqual(id_contacto, agente_en_contacto1.contacto_id)
 
+    def test_pedidos_sucesivos_recorren_los_contactos_circularmente(self):
+        pk_campana = self.campana_preview.pk
+        contactos_ids = list(AgenteEnContacto.objects.filter(
+            campana_id=pk_campana).values_list('contacto_id', flat=True))
+        entregas = [AgenteEnContacto.entregar_contacto(self.agente_1, pk_campana)
+                    for i in range(3)]
+        self.assertEqual([entrega['contacto_id'] for entrega in entregas],
+                         [contactos_ids[0], contactos_ids[1], contactos_ids[0]])
+        self.assertEqual(AgenteEnContacto.objects.filter(
+            campana_id=pk_campana, estado=AgenteEnContacto.ESTADO_ENTREGADO).count(), 1)
+
+    def test_desactivacion_se_actualiza_al_modificar_contacto_y_campo_de_desactivacion(self):
+        pk_campana = self.campana_preview.pk
+        self.campana_preview.campo_desactivacion = 'dni'
+        self.campana_preview.save()
+        datos = json.loads(self.contacto_1.datos)
+        datos[2] = '0'
+        self.contacto_1.datos = json.dumps(datos)
+        self.contacto_1.save()
+        activos = AgenteEnContacto.objects.activos(pk_campana)
+        self.assertFalse(activos.filter(contacto_id=self.contacto_1.pk).exists())
+        self.assertTrue(activos.filter(contacto_id=self.contacto_2.pk).exists())
+
+        self.campana_preview.campo_desactivacion = 'apellido'
+        self.campana_preview.save()
+        AgenteEnContacto.objects.actualizar_desactivados(self.campana_preview)
+        self.assertTrue(activos.filter(contacto_id=self.contacto_1.pk).exists())
+
+    def test_establecer_valores_iniciales_inserta_agentes_en_contacto_de_a_lotes(self):
+        campana = CampanaFactory.create(
+            type=Campana.TYPE_PREVIEW, estado=Campana.ESTADO_ACTIVA)
+        ContactoFactory.create_batch(5, bd_contacto=campana.bd_contacto)
+        with patch.object(Campana, 'TAMANO_LOTE_AGENTE_EN_CONTACTO', 2):
+            campana.establecer_valores_iniciales_agente_contacto(False, False)
+        agentes_en_contacto = AgenteEnContacto.objects.filter(campana_id=campana.pk)
+        self.assertEqual(
+            sorted(agentes_en_contacto.values_list('contacto_id', flat=True)),
+            sorted(campana.bd_contacto.contactos.values_list('id', flat=True)))
+        self.assertEqual(len(set(agentes_en_contacto.values_list('orden', flat=True))),
+                         campana.bd_contacto.contactos.count())
+
+    def test_decodifica_datos_de_contacto_en_json_y_en_formato_de_lista_python(self):
+        self.assertEqual(Contacto.decodificar_datos('["Juan", "Perez"]'), ['Juan', 'Perez'])
+        self.assertEqual(Contacto.decodificar_datos(str(['Juan', 'Perez'])), ['Juan', 'Perez'])
+
     @patch('redis.Redis.hgetall')
     def test_no_se_entregan_contactos_desactivados_con_FALSE(self, hgetall):
         hgetall.return_value = {}
@@ -26,7 +26,8 @@ from ominicontacto_app.errors import OmlArchivoImportacionInvalidoError
 from ominicontacto_app.models import BaseDatosContacto, Contacto
 from ominicontacto_app.services.base_de_datos_contactos import \
     CreacionBaseDatosService, PredictorMetadataService, \
-    NoSePuedeInferirMetadataError
+    NoSePuedeInferirMetadataError, CreacionBaseDatosServiceIdExternoError, \
+    ImportadorContactosEnLotes
 from ominicontacto_app.tests.utiles import OMLBaseTest
 from ominicontacto_app.utiles import ValidadorDeNombreDeCampoExtra
 
@@ -74,6 +75,65 @@ class TestGeneraBaseDatosContacto(OMLBaseTest):
         for contacto in bd.contactos.all():
             self.assertIsNotNone(contacto.id_externo)
 
+    def _crear_bd_planilla_ejemplo_8(self):
+        bd = BaseDatosContacto(id=1)
+        bd.archivo_importacion = File(open(self.get_test_resource(
+            "planilla-ejemplo-8-ultima-celda-vacia.csv"), 'r'))
+        bd.nombre_archivo_importacion = "planilla-ejemplo-8-ultima-celda-vacia.csv"
+        bd.save()
+
+        metadata = bd.get_metadata()
+        metadata.cantidad_de_columnas = 5
+        metadata.columna_con_telefono = 0
+        metadata.columnas_con_telefono = [0]
+        metadata.nombres_de_columnas = ["telefono", "nombre", "fecha", "hora", "situacion"]
+        metadata.save()
+        return bd
+
+    def test_importa_contactos_en_lotes_reporta_progreso(self):
+        bd = self._crear_bd_planilla_ejemplo_8()
+        progreso = []
+
+        importador = ImportadorContactosEnLotes(bd, tamano_lote=2,
+                                                callback_progreso=progreso.append)
+        cantidad_importados = importador.importar(["telefono"], None)
+
+        self.assertEqual(cantidad_importados, 3)
+        self.assertEqual(progreso, [2, 3])
+        self.assertEqual(bd.contactos.count(), 3)
+        self.assertTrue(all(contacto.id_externo is None for contacto in bd.contactos.all()))
+
+    def test_importa_contactos_id_externo_repetido_no_deja_contactos(self):
+        bd = self._crear_bd_planilla_ejemplo_8()
+
+        creacion_base_de_datos_service = CreacionBaseDatosService()
+        with self.assertRaises(CreacionBaseDatosServiceIdExternoError):
+            creacion_base_de_datos_service.importa_contactos(bd, ["telefono"], 2)
+
+        self.assertEqual(bd.contactos.count(), 0)
+        self.assertEqual(BaseDatosContacto.objects.get(pk=bd.pk).cantidad_contactos, 0)
+
+    def test_importa_contactos_no_revalida_las_columnas_de_telefono(self):
+        bd = BaseDatosContacto(id=1)
+        bd.archivo_importacion = File(open(self.get_test_resource(
+            "planilla-ejemplo-1.csv"), 'r'))
+        bd.nombre_archivo_importacion = "planilla-ejemplo-1.csv"
+        bd.save()
+
+        metadata = bd.get_metadata()
+        metadata.cantidad_de_columnas = 3
+        metadata.columna_con_telefono = 0
+        # Las columnas de teléfono se infieren al subir el archivo (p.ej. admitiendo
+        # extensiones), la importación no rechaza sus valores
+        metadata.columnas_con_telefono = [0, 1]
+        metadata.nombres_de_columnas = ["telefono", "nombre", "celular"]
+        metadata.save()
+
+        importador = ImportadorContactosEnLotes(bd)
+        importador.importar(["telefono"], None)
+
+        self.assertEqual(bd.contactos.count(), 4)
+
     def test_define_base_dato_contacto(self):
         bd = BaseDatosContacto(id=1)
         bd.save()
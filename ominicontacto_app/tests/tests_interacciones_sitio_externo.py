@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests del envío de las interacciones con Sitios Externos
+"""
+
+from __future__ import unicode_literals
+
+import json
+
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from ominicontacto_app.models import InteraccionSitioExterno, SitioExterno
+from ominicontacto_app.services.sistema_externo.procesador_interacciones import (
+    ProcesadorInteraccionesSitioExterno)
+from ominicontacto_app.tests.factories import CampanaFactory, SitioExternoFactory
+from ominicontacto_app.tests.utiles import OMLBaseTest
+from ominicontacto_app.tests.wombat_falso import ServidorWombatFalso
+
+
+@override_settings(OML_SITIO_EXTERNO_ESPERA_REINTENTO=10, OML_SITIO_EXTERNO_MAX_INTENTOS=3,
+                   OML_SITIO_EXTERNO_FALLAS_CIRCUITO=2, OML_SITIO_EXTERNO_PAUSA_CIRCUITO=60)
+class ProcesadorInteraccionesSitioExternoTest(OMLBaseTest):
+
+    def setUp(self):
+        super(ProcesadorInteraccionesSitioExternoTest, self).setUp()
+        # El servidor falso de Wombat sirve como Sitio Externo
+        self.servidor = ServidorWombatFalso()
+        self.servidor.iniciar()
+        self.sitio_externo = SitioExternoFactory.create(
+            url=self.servidor.url + '/crm/', disparador=SitioExterno.SERVER,
+            metodo=SitioExterno.POST, formato=SitioExterno.JSON, objetivo=None)
+        self.campana = CampanaFactory.create(sitio_externo=self.sitio_externo)
+        self.procesador = ProcesadorInteraccionesSitioExterno()
+
+    def tearDown(self):
+        self.servidor.detener()
+        super(ProcesadorInteraccionesSitioExternoTest, self).tearDown()
+
+    def _crear_interaccion(self, **kwargs):
+        return InteraccionSitioExterno.objects.create(
+            sitio_externo=self.sitio_externo, campana=self.campana,
+            parametros=json.dumps({'id_contacto': 1}), **kwargs)
+
+    def test_envia_las_interacciones_pendientes(self):
+        interaccion = self._crear_interaccion()
+        self.assertEqual(self.procesador.procesar_pendientes(), 1)
+        interaccion.refresh_from_db()
+        self.assertEqual(interaccion.estado, InteraccionSitioExterno.ENVIADA)
+        self.assertEqual(interaccion.intentos, 1)
+        self.assertEqual(interaccion.codigo_respuesta, 200)
+        self.assertEqual(json.loads(self.servidor.pedidos[0].cuerpo), {'id_contacto': 1})
+        self.assertEqual(self.procesador.procesar_pendientes(), 0)
+
+    def test_no_envia_interacciones_con_reintento_futuro(self):
+        self._crear_interaccion(proximo_intento=timezone.now() + timezone.timedelta(minutes=1))
+        self.assertEqual(self.procesador.procesar_pendientes(), 0)
+        self.assertEqual(self.servidor.pedidos, [])
+
+    def test_error_del_sitio_reintenta_con_espera_creciente(self):
+        self.servidor.responder('crm/', 'Error', status=503)
+        interaccion = self._crear_interaccion()
+        self.procesador.procesar_pendientes()
+        interaccion.refresh_from_db()
+        self.assertEqual(interaccion.estado, InteraccionSitioExterno.PENDIENTE)
+        self.assertEqual(interaccion.intentos, 1)
+        self.assertEqual(interaccion.codigo_respuesta, 503)
+        espera = (interaccion.proximo_intento - timezone.now()).total_seconds()
+        self.assertTrue(0 < espera <= 10)
+
+        interaccion.intentos = 2
+        interaccion.proximo_intento = timezone.now()
+        interaccion.save()
+        self.procesador.procesar_pendientes()
+        interaccion.refresh_from_db()
+        self.assertEqual(interaccion.estado, InteraccionSitioExterno.FALLIDA)
+        self.assertEqual(interaccion.intentos, 3)
+
+    def test_sitio_rechaza_el_pedido_no_se_reintenta(self):
+        self.servidor.responder('crm/', 'Bad request', status=400)
+        interaccion = self._crear_interaccion()
+        self.procesador.procesar_pendientes()
+        interaccion.refresh_from_db()
+        self.assertEqual(interaccion.estado, InteraccionSitioExterno.FALLIDA)
+        self.assertEqual(interaccion.intentos, 1)
+
+    def test_sitio_que_falla_repetidamente_se_suspende(self):
+        self.servidor.responder('crm/', 'Error', status=500)
+        self._crear_interaccion()
+        self._crear_interaccion()
+        self.procesador.procesar_pendientes()
+        self.assertEqual(len(self.servidor.pedidos), 2)
+
+        interaccion = self._crear_interaccion()
+        self.assertEqual(self.procesador.procesar_pendientes(), 1)
+        self.assertEqual(len(self.servidor.pedidos), 2)
+        interaccion.refresh_from_db()
+        self.assertEqual(interaccion.estado, InteraccionSitioExterno.PENDIENTE)
+        self.assertEqual(interaccion.intentos, 0)
+        self.assertTrue(interaccion.proximo_intento > timezone.now())
+
+    def test_error_inesperado_al_enviar_falla_solo_esa_interaccion(self):
+        interaccion = self._crear_interaccion()
+        # Un formato desconocido no llega a hacer el pedido
+        self.sitio_externo.formato = None
+        self.sitio_externo.save()
+        self.assertEqual(self.procesador.procesar_pendientes(), 1)
+        interaccion.refresh_from_db()
+        self.assertEqual(interaccion.estado, InteraccionSitioExterno.FALLIDA)
+        self.assertEqual(interaccion.intentos, 1)
+        self.assertEqual(self.servidor.pedidos, [])
+
+    @override_settings(OML_SITIO_EXTERNO_CONNECT_TIMEOUT=5, OML_SITIO_EXTERNO_READ_TIMEOUT=15,
+                       OML_SITIO_EXTERNO_HILOS=16, OML_SITIO_EXTERNO_CONCURRENCIA=4)
+    def test_reserva_alcanza_para_enviar_todo_el_lote(self):
+        self.assertEqual(self.procesador._calcular_reserva(1).total_seconds(), 3 * 20)
+        self.assertEqual(self.procesador._calcular_reserva(200).total_seconds(), 52 * 20)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests del modulo 'ominicontacto_app.services.planificador_tareas'
+"""
+
+from __future__ import unicode_literals
+
+import threading
+
+from mock import patch
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from django.test.utils import override_settings
+
+from ominicontacto_app.services.planificador_tareas import (
+    PlanificadorTareas, TareaProgramada, obtener_tareas_programadas)
+from ominicontacto_app.tests.utiles import OMLBaseTest
+
+
+class PlanificadorTareasTest(OMLBaseTest):
+
+    def setUp(self):
+        super(PlanificadorTareasTest, self).setUp()
+        self.ejecuciones = []
+        self.tarea = TareaProgramada('tarea_test', 60, lambda: self.ejecuciones.append(1))
+        self.planificador = PlanificadorTareas([self.tarea])
+        self.redis_connection = self.planificador.redis_connection
+        self._limpiar_redis()
+
+    def tearDown(self):
+        self._limpiar_redis()
+        super(PlanificadorTareasTest, self).tearDown()
+
+    def _limpiar_redis(self):
+        self.redis_connection.delete(PlanificadorTareas.KEY_LOCK.format('tarea_test'),
+                                     PlanificadorTareas.KEY_METRICAS.format('tarea_test'))
+
+    def test_ejecutar_registra_metricas_y_libera_el_lock(self):
+        self.assertTrue(self.planificador.ejecutar(self.tarea))
+        self.assertTrue(self.planificador.ejecutar(self.tarea))
+        self.assertEqual(len(self.ejecuciones), 2)
+        metricas = self.planificador.obtener_metricas()['tarea_test']
+        self.assertEqual(metricas['EJECUCIONES'], '2')
+        self.assertNotIn('ERRORES', metricas)
+        self.assertIn('ULTIMA_DURACION', metricas)
+        self.assertFalse(self.redis_connection.exists(
+            PlanificadorTareas.KEY_LOCK.format('tarea_test')))
+
+    def test_no_ejecuta_la_tarea_si_otro_planificador_la_esta_ejecutando(self):
+        otro_planificador = PlanificadorTareas([self.tarea])
+        self.redis_connection.set(PlanificadorTareas.KEY_LOCK.format('tarea_test'),
+                                  otro_planificador.identificador)
+        self.assertFalse(self.planificador.ejecutar(self.tarea))
+        self.assertEqual(self.ejecuciones, [])
+
+    def test_error_en_la_tarea_se_registra_sin_detener_el_planificador(self):
+        def fallar():
+            raise ValueError('error de prueba')
+        tarea = TareaProgramada('tarea_test', 60, fallar)
+        self.assertFalse(self.planificador.ejecutar(tarea))
+        metricas = self.planificador.obtener_metricas()['tarea_test']
+        self.assertEqual(metricas['ERRORES'], '1')
+        self.assertEqual(metricas['ULTIMO_ERROR'], 'error de prueba')
+
+    def test_detener_espera_a_que_termine_la_ejecucion_en_curso(self):
+        iniciada = threading.Event()
+        continuar = threading.Event()
+
+        def tarea_lenta():
+            iniciada.set()
+            continuar.wait(5)
+            self.ejecuciones.append(1)
+        tarea = TareaProgramada('tarea_test', 0.01, tarea_lenta, jitter=0)
+        planificador = PlanificadorTareas([tarea])
+        planificador.iniciar()
+        self.assertTrue(iniciada.wait(5))
+        planificador.detener()
+        continuar.set()
+        planificador.esperar(5)
+        self.assertEqual(self.ejecuciones, [1])
+
+    def test_error_de_redis_no_termina_el_ciclo_de_la_tarea(self):
+        ejecutada_dos_veces = threading.Event()
+        tarea = TareaProgramada('tarea_test', 0.01, lambda: None, jitter=0)
+        planificador = PlanificadorTareas([tarea])
+        intentos = []
+
+        def ejecutar(tarea):
+            intentos.append(1)
+            if len(intentos) == 1:
+                raise RedisConnectionError('redis no disponible')
+            ejecutada_dos_veces.set()
+        with patch.object(planificador, 'ejecutar', side_effect=ejecutar):
+            planificador.iniciar()
+            self.assertTrue(ejecutada_dos_veces.wait(5))
+            planificador.detener()
+            planificador.esperar(5)
+
+    @override_settings(OML_PLANIFICADOR_INTERVALOS={'logout_unavailable_agents': 30,
+                                                    'actualizar_resumenes_llamadas': 0})
+    def test_obtener_tareas_programadas_segun_intervalos(self):
+        tareas = obtener_tareas_programadas()
+        self.assertEqual([(tarea.nombre, tarea.intervalo) for tarea in tareas],
+                         [('logout_unavailable_agents', 30)])
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests del profiler SQL 'slowsql.profiler'
+"""
+
+from __future__ import unicode_literals
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from ominicontacto_app.models import Campana
+from ominicontacto_app.tests.utiles import OMLBaseTest
+from slowsql.profiler import (
+    ProfilerSQL, establecer_contexto, huella, limpiar_contexto, medir_consulta,
+    obtener_resumen, reiniciar)
+
+
+@override_settings(OML_PROFILER_SQL_TASA_MUESTREO=1, OML_PROFILER_SQL_INTERVALO=3600)
+class ProfilerSQLTest(OMLBaseTest):
+
+    def setUp(self):
+        super(ProfilerSQLTest, self).setUp()
+        ProfilerSQL._profiler = None
+        reiniciar()
+
+    def tearDown(self):
+        limpiar_contexto()
+        ProfilerSQL._profiler = None
+        reiniciar()
+        super(ProfilerSQLTest, self).tearDown()
+
+    def test_huella_quita_literales_y_listas_de_parametros(self):
+        self.assertEqual(
+            huella("SELECT *  FROM t0\n WHERE id IN (%s, %s, %s) AND nombre = 'a''b' LIMIT 21"),
+            'SELECT * FROM t0 WHERE id IN (...) AND nombre = ? LIMIT ?')
+
+    def test_agrupa_las_consultas_por_contexto_y_huella(self):
+        establecer_contexto('url:campana_list')
+        with connection.execute_wrapper(medir_consulta):
+            Campana.objects.filter(pk__in=[1, 2]).count()
+            Campana.objects.filter(pk__in=[3, 4, 5]).count()
+        ProfilerSQL.obtener_profiler().enviar()
+
+        resumen = obtener_resumen(contexto='url:campana_list')
+        self.assertEqual(len(resumen), 1)
+        self.assertEqual(resumen[0]['muestras'], 2)
+        self.assertEqual(resumen[0]['cantidad'], 2)
+        self.assertIn('IN (...)', resumen[0]['sql'])
+        self.assertTrue(0 < resumen[0]['p95'] <= resumen[0]['tiempo'])
+        self.assertEqual(obtener_resumen(contexto='url:otra'), [])
+
+    @override_settings(OML_PROFILER_SQL_TASA_MUESTREO=0)
+    def test_sin_muestreo_no_se_registran_consultas(self):
+        with connection.execute_wrapper(medir_consulta):
+            Campana.objects.count()
+        ProfilerSQL.obtener_profiler().enviar()
+        self.assertEqual(obtener_resumen(), [])
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests de la publicación agrupada del progreso de las tareas
+"""
+
+from __future__ import unicode_literals
+
+import json
+
+from mock import MagicMock
+
+from ominicontacto_app.services.progreso_tareas import KEY_ESTADO, ProgresoTarea
+from ominicontacto_app.tests.utiles import OMLBaseTest
+
+
+class ProgresoTareaTest(OMLBaseTest):
+
+    def setUp(self):
+        super(ProgresoTareaTest, self).setUp()
+        self.redis_connection = MagicMock()
+        self.pipeline = self.redis_connection.pipeline.return_value
+
+    def _publicados(self):
+        return [llamada[0][1] for llamada in self.pipeline.publish.call_args_list]
+
+    def test_se_publica_solo_cuando_el_porcentaje_avanza_el_paso(self):
+        progreso = ProgresoTarea('OML:TEST', 1000, self.redis_connection, intervalo=60, paso=5)
+        progreso.iniciar()
+        for __ in range(1000):
+            progreso.avanzar()
+        self.assertEqual(self._publicados(), list(range(0, 101, 5)))
+
+    def test_el_ultimo_porcentaje_se_publica_aunque_avance_menos_que_el_paso(self):
+        progreso = ProgresoTarea('OML:TEST', 3, self.redis_connection, intervalo=60, paso=50)
+        progreso.iniciar()
+        for __ in range(3):
+            progreso.avanzar()
+        self.assertEqual(self._publicados(), [0, 66, 100])
+
+    def test_se_publica_avance_menor_al_paso_luego_del_intervalo(self):
+        progreso = ProgresoTarea('OML:TEST', 1000, self.redis_connection, intervalo=0, paso=50)
+        progreso.iniciar()
+        for __ in range(20):
+            progreso.avanzar()
+        self.assertEqual(self._publicados(), [0, 1, 2])
+
+    def test_tarea_sin_filas_publica_100_al_iniciar(self):
+        ProgresoTarea('OML:TEST', 0, self.redis_connection).iniciar()
+        self.assertEqual(self._publicados(), [100])
+
+    def test_se_guarda_el_estado_para_suscriptos_tardios(self):
+        progreso = ProgresoTarea('OML:TEST', 10, self.redis_connection, intervalo=60, paso=5)
+        progreso.iniciar()
+        progreso.avanzar(4)
+        key, estado = self.pipeline.set.call_args[0]
+        estado = json.loads(estado)
+        self.assertEqual(key, KEY_ESTADO.format('OML:TEST'))
+        self.assertEqual(estado['porcentaje'], 40)
+        self.assertEqual(estado['procesados'], 4)
+        self.assertEqual(estado['total'], 10)
+        self.assertIn('filas_por_segundo', estado)
+        self.assertIn('eta', estado)
+
+    def test_finalizar_puede_publicar_un_mensaje_en_lugar_del_porcentaje(self):
+        progreso = ProgresoTarea('OML:TEST', 1, self.redis_connection)
+        progreso.iniciar()
+        progreso.avanzar()
+        progreso.finalizar('usuario-grabaciones.zip')
+        self.assertEqual(self._publicados(), [0, 100, 'usuario-grabaciones.zip'])
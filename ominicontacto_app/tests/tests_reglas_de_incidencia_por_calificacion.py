@@ -77,9 +77,8 @@ class ReglaIncidenciaPorCalificacionTests(OMLBaseTest):
         self.assertNotIn(self.opcion_calificacion_extra.nombre, content)
 
     @patch('ominicontacto_app.services.campana_service.CampanaService.reload_campana_wombat')
-    @patch('ominicontacto_app.services.wombat_config.ConfigFile.write')
     @patch('ominicontacto_app.services.wombat_service.WombatService.update_config_wombat')
-    def test_crear_regla_impacta_wombat(self, update_config_wombat, write, reload_campana):
+    def test_crear_regla_impacta_wombat(self, update_config_wombat, reload_campana):
         url = reverse('disposition_incidence_create', kwargs={'pk_campana': self.campana.id})
         post_data = {
             'opcion_calificacion': self.opcion_calificacion_1.id, 'intento_max': 5,
@@ -87,11 +86,11 @@ class ReglaIncidenciaPorCalificacionTests(OMLBaseTest):
         }
         response = self.client.post(url, post_data, follow=True)
         self.assertEqual(response.status_code, 200)
-        update_config_wombat.assert_called_with(
-            'newcampaign_reschedule.json', 'api/edit/campaign/reschedule/?mode=E&parent={0}'.format(
-                self.campana.campaign_id_wombat))
-        write.assert_called()
-        file_data = json.loads(write.call_args[0][0])
+        update_config_wombat.assert_called()
+        config_json, url_edit = update_config_wombat.call_args[0]
+        self.assertEqual(url_edit, 'api/edit/campaign/reschedule/?mode=E&parent={0}'.format(
+            self.campana.campaign_id_wombat))
+        file_data = json.loads(config_json)
         regla = ReglaIncidenciaPorCalificacion.objects.get(
             opcion_calificacion=self.opcion_calificacion_1)
         expected_data = {
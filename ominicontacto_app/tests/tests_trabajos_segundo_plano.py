@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests de los trabajos en segundo plano y su procesador
+"""
+
+from __future__ import unicode_literals
+
+from mock import patch
+
+from django.urls import reverse
+from django.utils.timezone import now, timedelta
+
+from ominicontacto_app.models import TrabajoSegundoPlano, User
+from ominicontacto_app.services.procesador_trabajos import ProcesadorTrabajos
+from ominicontacto_app.services.progreso_tareas import KEY_ESTADO, ProgresoTarea
+from ominicontacto_app.services.trabajos_segundo_plano import (
+    CANAL_PROGRESO, KEY_CANALES, MENSAJE_CANCELADO, MENSAJE_FALLIDO, cancelar_trabajo,
+    encolar_trabajo, obtener_redis)
+from ominicontacto_app.tests.factories import CampanaFactory
+from ominicontacto_app.tests.utiles import OMLBaseTest, PASSWORD
+
+
+class TrabajosSegundoPlanoTest(OMLBaseTest):
+
+    def setUp(self):
+        super(TrabajosSegundoPlanoTest, self).setUp()
+        self.campana = CampanaFactory.create()
+        self.supervisor = self.crear_supervisor_profile(rol=User.SUPERVISOR).user
+        self.redis_connection = obtener_redis()
+        self.keys = []
+
+    def tearDown(self):
+        if self.keys:
+            self.redis_connection.delete(*self.keys)
+        super(TrabajosSegundoPlanoTest, self).tearDown()
+
+    def _encolar(self, key_task, tipo='CONTACTADOS', desde='2026-01-01T00:00:00'):
+        trabajo = encolar_trabajo(
+            tipo, key_task, usuario=self.supervisor, campana=self.campana,
+            campana_id=self.campana.pk, desde=desde, hasta='2026-01-31T23:59:59',
+            redis_connection=self.redis_connection)
+        self.keys.extend([KEY_CANALES.format(trabajo.pk),
+                          KEY_ESTADO.format(CANAL_PROGRESO.format(trabajo.pk))])
+        return trabajo
+
+    def test_pedidos_iguales_comparten_el_trabajo(self):
+        trabajo = self._encolar('OML:TEST:1')
+        self.assertEqual(self._encolar('OML:TEST:2'), trabajo)
+        self.assertEqual(TrabajoSegundoPlano.objects.count(), 1)
+        self.assertEqual(self.redis_connection.smembers(KEY_CANALES.format(trabajo.pk)),
+                         {'OML:TEST:1', 'OML:TEST:2'})
+
+    def test_pedidos_con_otro_rango_generan_otro_trabajo(self):
+        trabajo = self._encolar('OML:TEST:1')
+        otro_trabajo = self._encolar('OML:TEST:2', desde='2026-01-15T00:00:00')
+        self.assertNotEqual(otro_trabajo, trabajo)
+        self.assertEqual(otro_trabajo.salida, trabajo.salida)
+
+    @patch('redis.Redis.publish')
+    def test_se_reutiliza_el_resultado_vigente(self, publish):
+        trabajo = self._encolar('OML:TEST:1')
+        trabajo.estado = TrabajoSegundoPlano.FINALIZADO
+        trabajo.expiracion = now() + timedelta(minutes=5)
+        trabajo.save()
+        self.assertEqual(self._encolar('OML:TEST:2'), trabajo)
+        publish.assert_called_with('OML:TEST:2', 100)
+
+    def test_se_reenvia_el_mensaje_final_del_resultado_vigente(self):
+        trabajo = self._encolar('OML:TEST:1')
+        ProgresoTarea(CANAL_PROGRESO.format(trabajo.pk), 0, self.redis_connection).finalizar(
+            'grabaciones.zip')
+        trabajo.estado = TrabajoSegundoPlano.FINALIZADO
+        trabajo.expiracion = now() + timedelta(minutes=5)
+        trabajo.save()
+        with patch('redis.Redis.publish') as publish:
+            self.assertEqual(self._encolar('OML:TEST:2'), trabajo)
+        self.assertEqual([llamada[0] for llamada in publish.call_args_list],
+                         [('OML:TEST:2', 100), ('OML:TEST:2', 'grabaciones.zip')])
+
+    def test_resultado_vencido_genera_un_nuevo_trabajo(self):
+        trabajo = self._encolar('OML:TEST:1')
+        trabajo.estado = TrabajoSegundoPlano.FINALIZADO
+        trabajo.expiracion = now() - timedelta(minutes=1)
+        trabajo.save()
+        self.assertNotEqual(self._encolar('OML:TEST:2'), trabajo)
+
+    def test_trabajo_cancelado_libera_la_clave(self):
+        trabajo = self._encolar('OML:TEST:1')
+        self.assertTrue(cancelar_trabajo(trabajo))
+        self.assertFalse(cancelar_trabajo(trabajo))
+        self.assertNotEqual(self._encolar('OML:TEST:2'), trabajo)
+
+    def test_no_se_reservan_dos_trabajos_con_la_misma_salida(self):
+        trabajo = self._encolar('OML:TEST:1')
+        otro_trabajo = self._encolar('OML:TEST:2', desde='2026-01-15T00:00:00')
+        trabajo_calificados = self._encolar('OML:TEST:3', tipo='CALIFICADOS')
+        procesador = ProcesadorTrabajos(concurrencia=3, redis_connection=self.redis_connection)
+        self.assertEqual(procesador._reservar_pendiente(), trabajo)
+        self.assertEqual(procesador._reservar_pendiente(), trabajo_calificados)
+        self.assertIsNone(procesador._reservar_pendiente())
+        otro_trabajo.refresh_from_db()
+        self.assertEqual(otro_trabajo.estado, TrabajoSegundoPlano.PENDIENTE)
+
+    @patch('redis.client.Pipeline.publish')
+    def test_trabajo_finalizado_notifica_a_todos_los_suscriptos(self, publish):
+        trabajo = self._encolar('OML:TEST:1')
+        self._encolar('OML:TEST:2')
+        procesador = ProcesadorTrabajos(concurrencia=1, redis_connection=self.redis_connection)
+        procesador._reservar_pendiente()
+        procesador._finalizar(trabajo.pk)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoSegundoPlano.FINALIZADO)
+        self.assertGreater(trabajo.expiracion, now())
+        self.assertEqual(sorted(llamada[0][0] for llamada in publish.call_args_list),
+                         ['OML:TEST:1', 'OML:TEST:2'])
+
+    def test_trabajo_con_mensaje_final_no_recibe_otro_100(self):
+        trabajo = self._encolar('OML:TEST:1')
+        procesador = ProcesadorTrabajos(concurrencia=1, redis_connection=self.redis_connection)
+        procesador._reservar_pendiente()
+        ProgresoTarea(CANAL_PROGRESO.format(trabajo.pk), 0, self.redis_connection).finalizar(
+            'grabaciones.zip')
+        with patch('redis.client.Pipeline.publish') as publish:
+            procesador._finalizar(trabajo.pk)
+        publish.assert_not_called()
+
+    @patch('redis.client.Pipeline.publish')
+    def test_trabajo_fallido_notifica_a_los_suscriptos(self, publish):
+        trabajo = self._encolar('OML:TEST:1')
+        procesador = ProcesadorTrabajos(concurrencia=1, redis_connection=self.redis_connection)
+        procesador._reservar_pendiente()
+        procesador._fallar(trabajo.pk, 'Exit code 1')
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoSegundoPlano.FALLIDO)
+        publish.assert_called_once_with('OML:TEST:1', MENSAJE_FALLIDO)
+
+    @patch('redis.client.Pipeline.publish')
+    def test_trabajo_cancelado_notifica_a_los_suscriptos(self, publish):
+        trabajo = self._encolar('OML:TEST:1')
+        cancelar_trabajo(trabajo, self.redis_connection)
+        publish.assert_called_once_with('OML:TEST:1', MENSAJE_CANCELADO)
+
+    def test_trabajo_abandonado_vuelve_a_quedar_pendiente(self):
+        trabajo = self._encolar('OML:TEST:1')
+        procesador = ProcesadorTrabajos(concurrencia=1, redis_connection=self.redis_connection)
+        procesador._reservar_pendiente()
+        TrabajoSegundoPlano.objects.filter(pk=trabajo.pk).update(
+            actualizado=now() - timedelta(hours=1))
+        procesador._reencolar_abandonados()
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoSegundoPlano.PENDIENTE)
+
+    def test_api_cancela_el_trabajo(self):
+        trabajo = self._encolar('OML:TEST:1')
+        self.client.login(username=self.supervisor.username, password=PASSWORD)
+        url = reverse('api_trabajo_segundo_plano_cancelar', args=[trabajo.pk])
+        response = self.client.post(url)
+        self.assertEqual(response.json()['status'], 'OK')
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoSegundoPlano.CANCELADO)
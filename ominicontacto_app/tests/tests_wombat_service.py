@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests del modulo 'ominicontacto_app.services.wombat_service'
+"""
+
+from __future__ import unicode_literals
+
+import base64
+import json
+
+from mock import patch
+
+from django.test.utils import override_settings
+
+from ominicontacto_app.services.campana_service import (
+    CampanaService, SincronizacionListaEnCursoError, WombatDialerError)
+from ominicontacto_app.services.sincronizacion_lista_wombat import SincronizacionListaWombat
+from ominicontacto_app.services.wombat_service import ClienteWombat, WombatService
+from ominicontacto_app.tests.factories import CampanaFactory, ContactoFactory
+from ominicontacto_app.tests.utiles import OMLBaseTest
+from ominicontacto_app.tests.wombat_falso import ServidorWombatFalso
+
+
+@override_settings(OML_WOMBAT_USER='wombat_user', OML_WOMBAT_PASSWORD='wombat_pass')
+class WombatServiceTest(OMLBaseTest):
+
+    def setUp(self):
+        super(WombatServiceTest, self).setUp()
+        ClienteWombat._cliente = None
+        self.wombat = ServidorWombatFalso()
+        self.wombat.iniciar()
+        self.settings_wombat = override_settings(OML_WOMBAT_URL=self.wombat.url)
+        self.settings_wombat.enable()
+
+    def tearDown(self):
+        self.settings_wombat.disable()
+        self.wombat.detener()
+        ClienteWombat._cliente = None
+        super(WombatServiceTest, self).tearDown()
+
+    def test_post_json_envia_data_autenticado_y_devuelve_respuesta(self):
+        self.wombat.responder('api/edit/campaign/reschedule/', {'status': 'OK', 'results': []})
+        salida = WombatService().post_json(
+            'api/edit/campaign/reschedule/?mode=D&parent=1', {'statusExt': 'ext'})
+        self.assertEqual(salida, {'status': 'OK', 'results': []})
+        pedido = self.wombat.pedidos[0]
+        self.assertEqual(json.loads(pedido.data), {'statusExt': 'ext'})
+        credenciales = base64.b64encode(b'wombat_user:wombat_pass').decode('ascii')
+        self.assertEqual(pedido.headers['Authorization'], 'Basic ' + credenciales)
+
+    def test_pedidos_sucesivos_reutilizan_la_conexion(self):
+        service = WombatService()
+        for i in range(5):
+            self.assertTrue(service.set_call_ext_status(
+                '/api/calls/?op=extstatus&wombatid={0}&status=1'.format(i)))
+        self.assertEqual(len(self.wombat.pedidos), 5)
+        self.assertEqual(len(set(pedido.conexion for pedido in self.wombat.pedidos)), 1)
+
+    def test_error_de_wombat_devuelve_none(self):
+        self.wombat.responder('api/live/runs/', 'Internal error', status=500)
+        self.assertIsNone(WombatService().list_config_wombat('api/live/runs/'))
+
+    def test_wombat_no_disponible_devuelve_none(self):
+        url = self.wombat.url
+        self.wombat.detener()
+        with override_settings(OML_WOMBAT_URL=url):
+            self.assertIsNone(WombatService().list_config_wombat('api/live/runs/'))
+
+
+@patch.object(CampanaService, 'crear_lista_asociacion_campana_wombat')
+@patch.object(CampanaService, 'desasociacion_campana_wombat')
+@patch.object(CampanaService, 'remove_campana_wombat', return_value=False)
+@override_settings(OML_WOMBAT_LISTA_LOTE=2)
+class CambiarBaseCampanaWombatTest(OMLBaseTest):
+
+    def setUp(self):
+        super(CambiarBaseCampanaWombatTest, self).setUp()
+        ClienteWombat._cliente = None
+        self.campana = CampanaFactory.create()
+        self.contactos = ContactoFactory.create_batch(5, bd_contacto=self.campana.bd_contacto)
+        self.sincronizacion = SincronizacionListaWombat(self.campana.pk)
+        self.sincronizacion.redis_connection.delete(
+            self.sincronizacion.key, self.sincronizacion.key_lock)
+        self.wombat = ServidorWombatFalso()
+        self.wombat.iniciar()
+        self.settings_wombat = override_settings(OML_WOMBAT_URL=self.wombat.url)
+        self.settings_wombat.enable()
+
+    def tearDown(self):
+        self.settings_wombat.disable()
+        self.wombat.detener()
+        ClienteWombat._cliente = None
+        self.sincronizacion.redis_connection.delete(
+            self.sincronizacion.key, self.sincronizacion.key_lock)
+        super(CambiarBaseCampanaWombatTest, self).tearDown()
+
+    def test_envia_la_lista_de_a_lotes_y_registra_el_progreso(self, *args):
+        CampanaService().cambiar_base(self.campana, [], False, False, '0')
+
+        cuerpos = [pedido.cuerpo.decode('utf-8') for pedido in self.wombat.pedidos]
+        self.assertEqual(len(cuerpos), 3)
+        numeros = []
+        for cuerpo in cuerpos:
+            self.assertTrue(cuerpo.startswith('numbers=') and cuerpo.endswith('|'))
+            numeros.extend(cuerpo[len('numbers='):-1].split('|'))
+        contacto = self.contactos[0]
+        datos = json.loads(contacto.datos)
+        self.assertEqual(numeros[0], ','.join([
+            '0' + contacto.telefono, 'id_cliente:{0}'.format(contacto.pk),
+            'id_campana:{0}'.format(self.campana.pk),
+            'MULTINUM1:' + datos[3], 'MULTINUM2:' + datos[4]]))
+        self.assertEqual(len(numeros), 5)
+
+        estado = self.sincronizacion.obtener_estado()
+        self.assertEqual(estado['ESTADO'], SincronizacionListaWombat.FINALIZADA)
+        self.assertEqual(estado['TOTAL'], '5')
+        self.assertEqual(estado['ENVIADOS'], '5')
+        self.assertFalse(self.sincronizacion.en_curso())
+
+    def test_no_se_cambia_la_lista_si_hay_otra_sincronizacion_en_curso(self, *args):
+        self.assertTrue(self.sincronizacion.iniciar())
+        with self.assertRaises(SincronizacionListaEnCursoError):
+            CampanaService().cambiar_base(self.campana, [], False, False, '')
+        self.assertEqual(self.wombat.pedidos, [])
+
+    def test_cambia_la_lista_con_la_sincronizacion_iniciada_por_quien_llama(self, *args):
+        servicio = CampanaService()
+        sincronizacion = servicio.iniciar_sincronizacion_lista(self.campana)
+        with self.assertRaises(SincronizacionListaEnCursoError):
+            servicio.iniciar_sincronizacion_lista(self.campana)
+
+        servicio.cambiar_base(self.campana, [], False, False, '', sincronizacion=sincronizacion)
+        self.assertEqual(self.sincronizacion.obtener_estado()['ESTADO'],
+                         SincronizacionListaWombat.FINALIZADA)
+        self.assertFalse(self.sincronizacion.en_curso())
+
+    def test_error_al_cargar_la_lista_libera_la_sincronizacion(self, *args):
+        nombre_lista = CampanaService().obtener_nombre_lista_ascii(self.campana)
+        self.wombat.responder('api/lists/', 'Error', status=500)
+        with self.assertRaises(WombatDialerError):
+            CampanaService().cambiar_base(self.campana, [], False, False, '')
+        self.assertIn(nombre_lista, self.wombat.pedidos[0].path)
+        estado = self.sincronizacion.obtener_estado()
+        self.assertEqual(estado['ESTADO'], SincronizacionListaWombat.ERROR)
+        self.assertFalse(self.sincronizacion.en_curso())
+
+
+@override_settings(OML_WOMBAT_ESPERA_REMOCION=0.2)
+@patch.object(CampanaService, 'INTERVALO_ESPERA_REMOCION', 0.05)
+class EsperaRemocionCampanaWombatTest(OMLBaseTest):
+
+    def setUp(self):
+        super(EsperaRemocionCampanaWombatTest, self).setUp()
+        ClienteWombat._cliente = None
+        self.campana = CampanaFactory.create()
+        self.wombat = ServidorWombatFalso()
+        self.wombat.iniciar()
+        self.settings_wombat = override_settings(OML_WOMBAT_URL=self.wombat.url)
+        self.settings_wombat.enable()
+
+    def tearDown(self):
+        self.settings_wombat.disable()
+        self.wombat.detener()
+        ClienteWombat._cliente = None
+        super(EsperaRemocionCampanaWombatTest, self).tearDown()
+
+    def test_campana_que_ya_no_corre_termina_la_espera(self):
+        self.wombat.responder('api/live/runs/', {'result': {'campaigns': []}})
+        CampanaService()._esperar_remocion_campana_wombat(self.campana)
+        self.assertEqual(len(self.wombat.pedidos), 1)
+
+    def test_error_al_consultar_wombat_no_se_toma_como_remocion(self):
+        self.wombat.responder('api/live/runs/', 'Internal error', status=500)
+        with self.assertRaises(WombatDialerError):
+            CampanaService()._esperar_remocion_campana_wombat(self.campana)
+        self.assertGreater(len(self.wombat.pedidos), 1)
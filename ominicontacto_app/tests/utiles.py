@@ -45,6 +45,7 @@ from ominicontacto_app.models import (
 )
 from ominicontacto_app.tests.factories import (NombreCalificacionFactory, GrupoFactory,
                                                QueueMemberFactory)
+from ominicontacto_app.permisos import cache_permisos_oml
 from ominicontacto_app.services.audio_conversor import ConversorDeAudioService
 from mock import Mock
 
@@ -546,6 +547,8 @@ class OMLBaseTest(TestCase, OMLTestUtilsMixin):
             Group.objects.create(name=User.REFERENTE)
             Group.objects.create(name=User.AGENTE)
         call_command('actualizar_permisos')
+        # Dentro del TestCase no se ejecutan los callbacks de transaction.on_commit
+        cache_permisos_oml.invalidar()
 
         connections['replica']._orig_cursor = connections['replica'].cursor
         connections['replica'].cursor = connections['default'].cursor
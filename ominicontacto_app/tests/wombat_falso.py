@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""Servidor HTTP local que reemplaza a la API de Wombat en los tests"""
+
+from __future__ import unicode_literals
+
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+
+class PedidoWombat(object):
+
+    def __init__(self, path, headers, cuerpo, conexion):
+        self.path = path
+        self.headers = headers
+        self.cuerpo = cuerpo
+        # Puerto del cliente: identifica la conexión TCP por la que llegó el pedido
+        self.conexion = conexion
+
+    @property
+    def data(self):
+        """ Devuelve el parámetro 'data' de un cuerpo urlencoded """
+        return parse_qs(self.cuerpo.decode('utf-8'))['data'][0]
+
+
+class _HandlerWombat(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        longitud = int(self.headers.get('Content-Length', 0))
+        cuerpo = self.rfile.read(longitud)
+        servidor = self.server.servidor_wombat
+        servidor.pedidos.append(
+            PedidoWombat(self.path, self.headers, cuerpo, self.client_address[1]))
+        status, contenido = servidor.obtener_respuesta(urlsplit(self.path).path)
+        if not isinstance(contenido, str):
+            contenido = json.dumps(contenido)
+        contenido = contenido.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    do_GET = do_POST
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServerWombat(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ServidorWombatFalso(object):
+    """
+    Atiende los pedidos a la API de Wombat en un thread, registrándolos en `pedidos`.
+    Las respuestas se configuran por path con `responder`; por defecto se devuelve
+    {"status": "OK"}.
+
+    Uso:
+        with ServidorWombatFalso() as wombat:
+            with override_settings(OML_WOMBAT_URL=wombat.url):
+                ...
+    """
+
+    def __init__(self):
+        self.pedidos = []
+        self.respuestas = {}
+        self._server = _HTTPServerWombat(('127.0.0.1', 0), _HandlerWombat)
+        self._server.servidor_wombat = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}/wombat'.format(self._server.server_address[1])
+
+    def responder(self, path, contenido, status=200):
+        self.respuestas['/wombat/' + path.lstrip('/')] = (status, contenido)
+
+    def obtener_respuesta(self, path):
+        return self.respuestas.get(path.replace('//', '/'), (200, {'status': 'OK'}))
+
+    def iniciar(self):
+        self._thread.start()
+
+    def detener(self):
+        if self._thread.is_alive():
+            self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *args):
+        self.detener()
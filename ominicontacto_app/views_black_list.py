@@ -380,7 +380,7 @@ class BlacklistNuevoContactoView(CreateView):
         blacklist.cantidad_contactos += 1
         blacklist.save()
         blacklist_family = BlacklistFamily()
-        blacklist_family.regenerar_families(blacklist)
+        blacklist_family.agregar_telefonos([self.object.telefono])
         message = _("<strong>Operación Exitosa:</strong> "
                     "Se llevó a cabo con éxito la creación del contacto.")
         messages.add_message(
@@ -197,15 +197,13 @@ class CalificacionClienteFormView(FormView):
                 # Sólo disparar al recibir la llamada.
                 if en_recepcion_de_llamada:
                     servicio = InteraccionConSistemaExterno()
-                    error = servicio.ejecutar_interaccion(
+                    servicio.encolar_interaccion(
                         sitio_externo,
                         self.agente,
                         self.campana,
                         self.contacto,
                         self.call_data
                     )
-                    if error is not None:
-                        pass
             else:
                 if sitio_externo.disparador == SitioExterno.AUTOMATICO:
                     if sitio_externo.metodo == SitioExterno.GET and \
@@ -446,12 +444,13 @@ class CalificacionClienteFormView(FormView):
             self.call_data['id_calificacion'] = calificacion.id
             self.call_data['nombre_opcion_calificacion'] = \
                 calificacion.opcion_calificacion.nombre
-            servicio.ejecutar_interaccion(
+            servicio.encolar_interaccion(
                 sitio_externo,
                 self.agente,
                 calificacion.opcion_calificacion.campana,
                 self.contacto,
-                self.call_data
+                self.call_data,
+                calificacion=calificacion
             )
 
     def form_valid(self, contacto_form, calificacion_form=None):
@@ -819,12 +818,13 @@ class RespuestaFormularioCreateUpdateAgenteFormView(RespuestaFormularioCreateUpd
             call_data['id_calificacion'] = self.calificacion.id
             call_data['nombre_opcion_calificacion'] = \
                 self.calificacion.opcion_calificacion.nombre
-            servicio.ejecutar_interaccion(
+            servicio.encolar_interaccion(
                 sitio_externo,
                 self.agente,
                 self.calificacion.opcion_calificacion.campana,
                 self.contacto,
-                call_data
+                call_data,
+                calificacion=self.calificacion
             )
 
 
@@ -26,6 +26,7 @@ from __future__ import unicode_literals
 from django.utils.translation import gettext as _
 from django.utils.timezone import now
 from django.contrib import messages
+from django.db import transaction
 from django.urls import reverse
 from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import redirect
@@ -34,7 +35,8 @@ from django.views.generic import ListView, DeleteView, FormView, CreateView, Upd
 from constance import config as config_constance
 
 from ominicontacto_app.models import Campana, ReglaIncidenciaPorCalificacion, ReglasIncidencia
-from ominicontacto_app.services.campana_service import CampanaService, WombatDialerError
+from ominicontacto_app.services.campana_service import (
+    CampanaService, WombatDialerError, SincronizacionListaEnCursoError)
 from ominicontacto_app.forms import (
     UpdateBaseDatosForm, ReglaIncidenciaPorCalificacionForm, ReglasIncidenciaForm)
 from ominicontacto_app.services.wombat_service import WombatReloader
@@ -302,6 +304,18 @@ class UpdateBaseDatosDialerView(FormView):
             self.get_object(), bd_contacto)
         if error:
             return self.form_invalid(form, error=error)
+        # El lock se toma antes de modificar la campaña para que dos pedidos simultáneos no
+        # cambien la base a la vez
+        try:
+            sincronizacion = campana_service.iniciar_sincronizacion_lista(self.object)
+        except SincronizacionListaEnCursoError:
+            messages.add_message(
+                self.request,
+                messages.WARNING,
+                _('Ya se está actualizando la lista de contactos de la campaña. '
+                  'Espere a que finalice para volver a cambiar la base de datos.'),
+            )
+            return self.render_to_response(self.get_context_data())
         if self.object.bd_contacto == bd_contacto:
             message = _('Atención!\
                          Ud ha escogido la misma base de datos, corre riesgo de calificar los'
@@ -313,11 +327,28 @@ class UpdateBaseDatosDialerView(FormView):
                 message,
             )
 
-        self.object.bd_contacto = bd_contacto
-        self.object.save()
+        try:
+            self.object.bd_contacto = bd_contacto
+            self.object.save()
+        except Exception as e:
+            sincronizacion.fallar(e)
+            raise
         # realiza el cambio de la base de datos en wombat
-        campana_service.cambiar_base(self.get_object(), columnas, evitar_duplicados,
-                                     evitar_sin_telefono, prefijo_discador)
+        try:
+            campana_service.cambiar_base(self.get_object(), columnas, evitar_duplicados,
+                                         evitar_sin_telefono, prefijo_discador,
+                                         sincronizacion=sincronizacion)
+        except WombatDialerError as e:
+            # No se guarda el cambio de base de la campaña si no se pudo cambiar la lista
+            transaction.set_rollback(True)
+            message = _("<strong>¡Cuidado!</strong> "
+                        "con el siguiente error: ") + "{0} .".format(e)
+            messages.add_message(
+                self.request,
+                messages.WARNING,
+                message,
+            )
+            return redirect(self.get_success_url())
         message = _('Operación Exitosa!\
                      Se llevó a cabo con éxito el cambio de base de datos.')
 
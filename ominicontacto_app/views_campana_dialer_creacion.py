@@ -127,9 +127,9 @@ class CampanaDialerCreateView(CampanaDialerMixin, SessionWizardView):
         evitar_sin_telefono = sincronizar_form.cleaned_data.get('evitar_sin_telefono')
         prefijo_discador = sincronizar_form.cleaned_data.get('prefijo_discador')
         service_base = SincronizarBaseDatosContactosService()
-        # Crea un achivo con la lista de contactos para importar a wombat
-        service_base.crear_lista(campana, evitar_duplicados,
-                                 evitar_sin_telefono, prefijo_discador)
+        # Obtiene la lista de contactos para importar a wombat
+        lista_contactos = service_base.crear_lista(campana, evitar_duplicados,
+                                                   evitar_sin_telefono, prefijo_discador)
         campana_service = CampanaService()
         # crear campana en wombat
         campana_service.crear_campana_wombat(campana)
@@ -147,7 +147,7 @@ class CampanaDialerCreateView(CampanaDialerMixin, SessionWizardView):
         campana_service.crear_endpoint_asociacion_campana_wombat(
             campana)
         # crea lista en wombat
-        campana_service.crear_lista_contactos_wombat(campana)
+        campana_service.crear_lista_contactos_wombat(campana, lista_contactos)
         # asocia lista a campana en wombat
         campana_service.crear_lista_asociacion_campana_wombat(campana)
 
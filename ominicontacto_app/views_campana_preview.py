@@ -565,6 +565,7 @@ class OrdenarAsignacionContactosView(FormView):
         campana = Campana.objects.get(pk=pk_campana)
         campana.campo_desactivacion = campo_desactivacion
         campana.save()
+        AgenteEnContacto.objects.actualizar_desactivados(campana)
 
         bd_contacto = campana.bd_contacto
         nombres_columnas_datos = bd_contacto.get_metadata().nombres_de_columnas_de_datos
@@ -599,6 +600,7 @@ class DescargarOrdenAgentesEnContactosView(View):
         campana = Campana.objects.get(pk=pk_campana)
         campana.campo_desactivacion = campo_desactivacion
         campana.save()
+        AgenteEnContacto.objects.actualizar_desactivados(campana)
 
         bd_contacto = campana.bd_contacto
         nombres_columnas_datos = bd_contacto.get_metadata().nombres_de_columnas_de_datos
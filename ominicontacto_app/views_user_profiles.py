@@ -30,6 +30,7 @@ from django.utils.translation import gettext as _
 from django.contrib import messages
 from django.contrib.auth.models import Group
 from django.contrib.auth import login
+from django.db import transaction
 from django.db.models import Q
 from django.db.models import Value as V
 from django.db.models.functions import Concat
@@ -48,7 +49,7 @@ from ominicontacto_app.forms import (
 from ominicontacto_app.models import (
     SupervisorProfile, AgenteProfile, ClienteWebPhoneProfile, User, QueueMember, Grupo,
 )
-from ominicontacto_app.permisos import PermisoOML
+from ominicontacto_app.permisos import PermisoOML, cache_permisos_oml
 from ominicontacto_app.services.asterisk.redis_database import AgenteFamily
 
 from ominicontacto_app.views_queue_member import activar_cola, remover_agente_cola_asterisk
@@ -467,6 +468,7 @@ class SupervisorProfileUpdateView(FormView):
         self.profile.is_administrador = rol.name == User.ADMINISTRADOR
         self.profile.is_customer = rol.name == User.REFERENTE
         self.profile.user.groups.set([rol])
+        transaction.on_commit(cache_permisos_oml.invalidar)
         self.profile.save()
         return super(SupervisorProfileUpdateView, self).form_valid(form)
 
@@ -28,6 +28,10 @@ class RecicladoAppConfig(AppConfig):
              'roles': ['Administrador', 'Gerente', 'Supervisor', ]},
             {'nombre': 'reciclar_campana_preview',
              'roles': ['Administrador', 'Gerente', 'Supervisor', ]},
+            {'nombre': 'reciclado_en_curso_dialer',
+             'roles': ['Administrador', 'Gerente', 'Supervisor', ]},
+            {'nombre': 'reciclado_en_curso_preview',
+             'roles': ['Administrador', 'Gerente', 'Supervisor', ]},
         ]
 
     informacion_de_permisos = {
@@ -35,4 +39,8 @@ class RecicladoAppConfig(AppConfig):
             {'descripcion': _('Reciclado de campañas Dialer'), 'version': '1.7.0'},
         'reciclar_campana_preview':
             {'descripcion': _('Reciclado de campañas Preview'), 'version': '1.8.0'},
+        'reciclado_en_curso_dialer':
+            {'descripcion': _('Avance del reciclado de campañas Dialer'), 'version': '1.29.0'},
+        'reciclado_en_curso_preview':
+            {'descripcion': _('Avance del reciclado de campañas Preview'), 'version': '1.29.0'},
     }
@@ -24,10 +24,11 @@ contactados(hoy en dia por las calificaciones(calificacioncliente))
 """
 
 from django.utils.translation import gettext as _
-from django.db import connection
-from django.db.models import Count
-from ominicontacto_app.models import Campana, CalificacionCliente
-from reportes_app.models import LlamadaLog
+from django.db import transaction
+from django.db.models import Count, Q
+from ominicontacto_app.models import Campana
+from ominicontacto_app.services.progreso_tareas import ProgresoTarea
+from reportes_app.models import ContactacionCampana
 
 
 class EstadisticasContactacion():
@@ -63,65 +64,27 @@ class EstadisticasContactacion():
     }
     AGENTE_NO_CALIFICO = 20
 
-    def _contabilizar_llamados_no_calificados(self, count_estados, campana, contactados):
-        # Calculo cantidad de Llamados Contactados No Calificados
-        id_calificados = CalificacionCliente.objects.filter(
-            opcion_calificacion__campana_id=campana.id,
-            contacto__bd_contacto=campana.bd_contacto).values_list('contacto_id', flat=True)
-        no_calificados = contactados.exclude(contacto_id__in=id_calificados).count()
+    def _contabilizar_llamados_no_calificados(self, count_estados, contactaciones):
+        # Calculo cantidad de Contactos Contactados No Calificados
+        no_calificados = contactaciones.filter(
+            contactado=True, opcion_calificacion_id__isnull=True).count()
         if no_calificados > 0:
             estado = _(u"Agente no califico")
             id_estado = EstadisticasContactacion.AGENTE_NO_CALIFICO
             cantidad_contactacion = CantidadContactacion(id_estado, estado, no_calificados)
             count_estados.update({id_estado: cantidad_contactacion})
 
-    def _contabilizar_llamados_no_contactados(self, count_estados, campana, contactados,
-                                              ids_contactos_base_actual):
-        # Cantidades de llamados no contactados por EVENTO FINAL
-        # Asumo que Los logs con mayor id son los mas nuevos
-        # Solo filtrar logs de contactos de la base actual no contactados
-        # Los logs son posteriores a la fecha de alta de la base de datos de contactos
-        contactos_ids = set(ids_contactos_base_actual).difference(set(contactados))
-        if len(contactos_ids) == 0:
-            return
-        filtro_contactos = "AND contacto_id in ('"
-        filtro_contactos += "','".join([str(x) for x in contactos_ids])
-        filtro_contactos += "')"
-        if campana.type == Campana.TYPE_DIALER:
-            campana_tipo = Campana.TYPE_DIALER
-        if campana.type == Campana.TYPE_PREVIEW:
-            campana_tipo = Campana.TYPE_PREVIEW
-
-        params = {'campana_id': campana.id,
-                  'fecha_alta': campana.bd_contacto.fecha_alta,
-                  'tipo_campana': campana_tipo,
-                  'filtro_contactos': filtro_contactos, }
-        sql = """
-        SELECT r1.event, COUNT(r1.event)
-            FROM "reportes_app_llamadalog" r1
-            INNER JOIN (
-                SELECT contacto_id, MAX(id) AS id__max
-                FROM "reportes_app_llamadalog"
-                WHERE campana_id = {campana_id} AND
-                      time >= '{fecha_alta}' AND
-                      tipo_llamada = {tipo_campana} AND
-                      tipo_campana = {tipo_campana} {filtro_contactos}
-                GROUP BY contacto_id
-            ) r2
-            ON r1.id = r2.id__max
-            GROUP BY r1.event
-        """.format(**params)
-
-        cursor = connection.cursor()
-        cursor.execute(sql)
-        values = cursor.fetchall()
-        for evento, cantidad in values:
-            # Me interesan solo los contactos cuya ultima conexion ha fallado.
-            if evento in EstadisticasContactacion.MAP_ESTADO_ID:
-                id_estado = EstadisticasContactacion.MAP_ESTADO_ID[evento]
-                estado = EstadisticasContactacion.TXT_ESTADO[id_estado]
-                cantidad_contactacion = CantidadContactacion(id_estado, estado, cantidad)
-                count_estados.update({id_estado: cantidad_contactacion})
+    def _contabilizar_llamados_no_contactados(self, count_estados, contactaciones):
+        # Cantidades de contactos no contactados por el evento de su último intento
+        cantidades = contactaciones.filter(
+            contactado=False,
+            ultimo_evento__in=list(EstadisticasContactacion.MAP_ESTADO_ID)).values(
+                'ultimo_evento').annotate(cantidad=Count('id')).order_by()
+        for cantidad in cantidades:
+            id_estado = EstadisticasContactacion.MAP_ESTADO_ID[cantidad['ultimo_evento']]
+            estado = EstadisticasContactacion.TXT_ESTADO[id_estado]
+            cantidad_contactacion = CantidadContactacion(id_estado, estado, cantidad['cantidad'])
+            count_estados.update({id_estado: cantidad_contactacion})
 
     def obtener_cantidad_no_contactados(self, campana):
         """
@@ -133,23 +96,9 @@ class EstadisticasContactacion():
         # no llamados     No tienen ni DIAL
 
         count_estados = {}
-
-        if campana.type == Campana.TYPE_DIALER:
-            campana_tipo = Campana.TYPE_DIALER
-        if campana.type == Campana.TYPE_PREVIEW:
-            campana_tipo = Campana.TYPE_PREVIEW
-
-        ids_contactos_base_actual = campana.bd_contacto.contactos.values_list('id', flat=True)
-        contactados = LlamadaLog.objects.filter(campana_id=campana.id,
-                                                tipo_campana=campana_tipo,
-                                                tipo_llamada=campana_tipo,
-                                                contacto_id__in=ids_contactos_base_actual,
-                                                event='CONNECT').values_list('contacto_id',
-                                                                             flat=True)
-
-        self._contabilizar_llamados_no_calificados(count_estados, campana, contactados)
-        self._contabilizar_llamados_no_contactados(
-            count_estados, campana, contactados, ids_contactos_base_actual)
+        contactaciones = ContactacionCampana.objects.de_campana(campana)
+        self._contabilizar_llamados_no_calificados(count_estados, contactaciones)
+        self._contabilizar_llamados_no_contactados(count_estados, contactaciones)
 
         return count_estados
 
@@ -213,33 +162,60 @@ class RecicladorContactosCampanaDIALER():
     reciclado de campana de dialer que se realice.
     Únicamente reciclará contactos de la base de datos de contactos actual
     (si fue reciclada sobre la misma campaña no será la original)
+    Los contactos se seleccionan con querysets y se copian a la base reciclada con
+    INSERT ... SELECT, sin traerlos a memoria.
     """
 
     def obtener_contactos_reciclados(self, campana, reciclado_calificacion,
                                      reciclado_no_contactacion):
         """
-        Este método se encarga de iterar sobre los tipos de reciclado que
+        Este método se encarga de combinar los tipos de reciclado que
         se indiquen aplicar en el reciclado de campana. Según el tipo de
-        reciclado se invoca al método adecuado para llevar a cabo la consulta
-        correspondiente, y en caso de que sea mas de uno se sumarizan las
-        mismas.
+        reciclado se invoca al método adecuado para obtener la consulta
+        correspondiente, y en caso de que sea mas de uno se unen las mismas.
+        Si la campaña está pausada se incluyen los contactos que aún no fueron llamados.
+        """
+        consultas = [consulta for consulta in self._obtener_consultas_reciclado(
+            campana, reciclado_calificacion, reciclado_no_contactacion).values()
+            if consulta is not None]
+        if not consultas:
+            return campana.bd_contacto.contactos.none()
+        filtro = Q(id__in=consultas[0].values('id'))
+        for consulta in consultas[1:]:
+            filtro |= Q(id__in=consulta.values('id'))
+        return campana.bd_contacto.contactos.filter(filtro)
+
+    def obtener_cantidades_reciclado(self, campana, reciclado_calificacion,
+                                     reciclado_no_contactacion):
         """
-        contactos_reciclados = set()
+        Devuelve la cantidad de contactos a reciclar por tipo de reciclado y el total (un
+        contacto puede estar en más de un tipo), contándolos en la base de datos.
+        """
+        cantidades = {}
+        for tipo, consulta in self._obtener_consultas_reciclado(
+                campana, reciclado_calificacion, reciclado_no_contactacion).items():
+            cantidades[tipo] = 0 if consulta is None else consulta.count()
+        cantidades['total'] = self.obtener_contactos_reciclados(
+            campana, reciclado_calificacion, reciclado_no_contactacion).count()
+        return cantidades
+
+    def _obtener_consultas_reciclado(self, campana, reciclado_calificacion,
+                                     reciclado_no_contactacion):
+        consultas = {'calificados': None, 'no_contactados': None, 'no_llamados': None}
         if reciclado_calificacion:
-            contactos_reciclados.update(self._obtener_contactos_calificados(
-                campana, reciclado_calificacion))
+            consultas['calificados'] = self._obtener_contactos_calificados(
+                campana, reciclado_calificacion)
         if reciclado_no_contactacion:
-            contactos_reciclados.update(self._obtener_contactos_no_contactados(
-                campana, reciclado_no_contactacion))
-        return contactos_reciclados
+            consultas['no_contactados'] = self._obtener_contactos_no_contactados(
+                campana, reciclado_no_contactacion)
+        # Si quiero reciclar una campana activa puede existir contactos que no fueron llamados
+        if campana.estado == Campana.ESTADO_PAUSADA:
+            consultas['no_llamados'] = self._obtener_contactos_no_llamados(campana)
+        return consultas
 
     def _obtener_contactos_no_llamados(self, campana):
-        llamadas = LlamadaLog.objects.filter(campana_id=campana.id, contacto_id__isnull=False,
-                                             time__gte=campana.bd_contacto.fecha_alta)
-        contacto_ids = llamadas.values_list('contacto_id', flat=True).distinct()
-        queryset_no_llamados = campana.bd_contacto.contactos.exclude(id__in=contacto_ids)
-        contactos_no_llamados = [no_llamado for no_llamado in queryset_no_llamados]
-        return contactos_no_llamados
+        llamados = ContactacionCampana.objects.llamados(campana).values('contacto_id')
+        return campana.bd_contacto.contactos.exclude(id__in=llamados)
 
     def _obtener_contactos_calificados(self, campana, reciclado_calificacion):
         """
@@ -247,12 +223,9 @@ class RecicladorContactosCampanaDIALER():
             calificaciones seleccionada
             Sólo contactos que pertenecen a la base de datos de contacto actual.
         """
-        calificaciones_query = campana.obtener_calificaciones().filter(
-            opcion_calificacion__in=reciclado_calificacion,
-            contacto__bd_contacto=campana.bd_contacto).distinct()
-
-        contactos = [calificacion.contacto for calificacion in calificaciones_query]
-        return contactos
+        calificados = campana.obtener_calificaciones().filter(
+            opcion_calificacion__in=reciclado_calificacion).values('contacto_id')
+        return campana.bd_contacto.contactos.filter(id__in=calificados)
 
     def _obtener_contactos_no_contactados(self, campana, reciclado_no_contactacion):
         """
@@ -260,91 +233,58 @@ class RecicladorContactosCampanaDIALER():
              acuerdo a los estados seleccionados
 
         """
-        ids_contactos_base_actual = campana.bd_contacto.contactos.values_list('id', flat=True)
-        id_contactos = []
         filtrar_no_calificados = False
-        filtro_eventos = ''
+        eventos = []
         for evento_id in reciclado_no_contactacion:
             evento_id = int(evento_id)
             if evento_id == EstadisticasContactacion.AGENTE_NO_CALIFICO:
                 filtrar_no_calificados = True
             else:
-                evento = EstadisticasContactacion.MAP_ID_ESTADO[evento_id]
-                if filtro_eventos:
-                    filtro_eventos += ","
-                filtro_eventos += "'%s'" % evento
-
-        if campana.type == Campana.TYPE_DIALER:
-            campana_tipo = Campana.TYPE_DIALER
-        if campana.type == Campana.TYPE_PREVIEW:
-            campana_tipo = Campana.TYPE_PREVIEW
-
-        contactados = LlamadaLog.objects.filter(campana_id=campana.id,
-                                                tipo_campana=campana_tipo,
-                                                tipo_llamada=campana_tipo,
-                                                contacto_id__in=ids_contactos_base_actual,
-                                                time__gte=campana.bd_contacto.fecha_alta,
-                                                event='CONNECT').values_list('contacto_id',
-                                                                             flat=True)
+                eventos.append(EstadisticasContactacion.MAP_ID_ESTADO[evento_id])
 
+        filtros = []
         # Filtrar los contactos Llamados no Calificados
         if filtrar_no_calificados:
-            id_calificados = CalificacionCliente.objects.filter(
-                opcion_calificacion__campana_id=campana.id,
-                contacto__bd_contacto=campana.bd_contacto).values_list('contacto_id', flat=True)
-            no_calificados = contactados.exclude(contacto_id__in=id_calificados)
-            id_contactos += no_calificados
-
-        # Filtrar los llamados no contactados (solo contactos de la base actual)
-        if filtro_eventos:
-            contactos_no_contactados = set(ids_contactos_base_actual).difference(set(contactados))
-            if len(contactos_no_contactados) < 1:
-                return []
-            filtro_contactos = "AND contacto_id IN ('"
-            filtro_contactos += "','".join([str(x) for x in contactos_no_contactados])
-            filtro_contactos += "')"
-
-            params = {'campana_id': campana.id,
-                      'fecha_alta': campana.bd_contacto.fecha_alta,
-                      'tipo_campana': campana_tipo,
-                      'filtro_contactos': filtro_contactos,
-                      'filtro_eventos': filtro_eventos}
-            sql = """
-            SELECT r1.contacto_id
-                FROM "reportes_app_llamadalog" r1
-                INNER JOIN (
-                    SELECT contacto_id, MAX(id) AS id__max
-                    FROM "reportes_app_llamadalog"
-                    WHERE campana_id = {campana_id} AND
-                          time > '{fecha_alta}' AND
-                          tipo_llamada = {tipo_campana} AND
-                          tipo_campana = {tipo_campana} {filtro_contactos}
-                    GROUP BY contacto_id
-                ) r2
-                ON r1.id = r2.id__max
-                WHERE event IN ({filtro_eventos})
-            """.format(**params)
-
-            cursor = connection.cursor()
-            cursor.execute(sql)
-            values = cursor.fetchall()
-            id_contactos += [x[0] for x in values]
+            filtros.append(Q(contactado=True, opcion_calificacion_id__isnull=True))
+        # Filtrar los llamados no contactados según el evento de su último intento
+        if eventos:
+            filtros.append(Q(contactado=False, ultimo_evento__in=eventos))
+        if not filtros:
+            return campana.bd_contacto.contactos.none()
+        filtro = filtros[0]
+        for otro_filtro in filtros[1:]:
+            filtro |= otro_filtro
+        id_contactos = ContactacionCampana.objects.de_campana(campana).filter(filtro).values(
+            'contacto_id')
 
         return campana.bd_contacto.contactos.filter(id__in=id_contactos)
 
     def reciclar(self, campana, reciclado_calificacion, reciclado_no_contactacion):
+        """
+        Crea la BaseDatosContacto reciclada y le copia los contactos seleccionados.
+        """
+        bd_contacto_reciclada = campana.bd_contacto.copia_para_reciclar()
+        self.generar_contactos_reciclados(
+            campana, bd_contacto_reciclada, reciclado_calificacion, reciclado_no_contactacion)
+        return bd_contacto_reciclada
 
-        # Obtener los contactos reciclados
+    def generar_contactos_reciclados(self, campana, bd_contacto_reciclada,
+                                     reciclado_calificacion, reciclado_no_contactacion,
+                                     key_task=None):
+        """
+        Copia los contactos reciclados a `bd_contacto_reciclada` y la define. Si se indica
+        `key_task` se publica el avance de la copia.
+        """
         contactos_reciclados = self.obtener_contactos_reciclados(
             campana, reciclado_calificacion, reciclado_no_contactacion)
-
-        # Si quiero reciclar una campana activa puede existir contactos que no fueron llamados
-        if campana.estado == Campana.ESTADO_PAUSADA:
-            contactos_no_llamados = self._obtener_contactos_no_llamados(campana)
-            contactos_reciclados.update(contactos_no_llamados)
-
-        # Creamos la instancia de BaseDatosContacto para el reciclado.
-        bd_contacto_reciclada = campana.bd_contacto.copia_para_reciclar()
-        bd_contacto_reciclada.genera_contactos(contactos_reciclados)
-        bd_contacto_reciclada.define()
-        return bd_contacto_reciclada
+        progreso = None
+        if key_task is not None:
+            progreso = ProgresoTarea(key_task, contactos_reciclados.count())
+            progreso.iniciar()
+        with transaction.atomic():
+            # Si el trabajo se reintenta la base puede tener contactos de la copia anterior
+            bd_contacto_reciclada.elimina_contactos()
+            bd_contacto_reciclada.copiar_contactos(contactos_reciclados, progreso)
+            bd_contacto_reciclada.define()
+        if progreso is not None:
+            progreso.finalizar()
@@ -0,0 +1,46 @@
+/* Copyright (C) 2018 Freetech Solutions
+
+ This file is part of OMniLeads
+
+ This program is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Lesser General Public License version 3, as published by
+ the Free Software Foundation.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Lesser General Public License for more details.
+
+ You should have received a copy of the GNU Lesser General Public License
+ along with this program.  If not, see http://www.gnu.org/licenses/.
+
+*/
+
+// Estados de TrabajoSegundoPlano
+var ESTADOS_ACTIVOS = [1, 2];
+var FINALIZADO = 3;
+
+function consultarReciclado($barra) {
+    $.get($barra.data('url-trabajo'), function(trabajo) {
+        if (trabajo.estado == FINALIZADO) {
+            // La vista completa el reciclado con el POST del formulario
+            $('#form_reciclado').submit();
+            return;
+        }
+        if (ESTADOS_ACTIVOS.indexOf(trabajo.estado) < 0) {
+            // La vista informa el error
+            window.location.reload(true);
+            return;
+        }
+        $barra.css('width', trabajo.progreso + '%');
+        $barra.text(trabajo.progreso + '%');
+        setTimeout(function() { consultarReciclado($barra); }, 2000);
+    });
+}
+
+$(function() {
+    var $barra = $('#barra_reciclado');
+    if ($barra.length) {
+        consultarReciclado($barra);
+    }
+});
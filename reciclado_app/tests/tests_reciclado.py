@@ -22,18 +22,22 @@ Tests del metodo 'ominicontacto_app.models'
 
 from __future__ import unicode_literals
 
+import json
 import random
 
 from mock import patch
 
 from django.db import connections
 from django.db.models import Count
-from ominicontacto_app.tests.utiles import OMLBaseTest
-from ominicontacto_app.models import CalificacionCliente
+from django.urls import reverse
+from ominicontacto_app.tests.utiles import OMLBaseTest, PASSWORD
+from ominicontacto_app.models import (
+    BaseDatosContacto, CalificacionCliente, Campana, TrabajoSegundoPlano)
 from ominicontacto_app.services.audio_conversor import ConversorDeAudioService
 from reciclado_app.resultado_contactacion import (
     EstadisticasContactacion, RecicladorContactosCampanaDIALER
 )
+from reciclado_app.views import RecicladoCampanaDialerMixin
 from reportes_app.models import LlamadaLog
 from reportes_app.tests.utiles import GeneradorDeLlamadaLogs
 
@@ -196,4 +200,79 @@ class RecicladoTest(OMLBaseTest):
             estado = random.choice(self.estados)
             generador.generar_log(self.campana_2, False, estado, contacto.telefono, None, contacto)
         contactos_no_llamados = reciclador._obtener_contactos_no_llamados(self.campana_2)
-        self.assertEqual(len(contactos_no_llamados), 80)
+        self.assertEqual(contactos_no_llamados.count(), 80)
+
+    def _obtener_no_calificados(self):
+        calificados = self.campana.obtener_calificaciones().values('contacto_id')
+        return set(LlamadaLog.objects.filter(event='CONNECT').exclude(
+            contacto_id__in=calificados).values_list('contacto_id', flat=True))
+
+    @patch.object(BaseDatosContacto, 'TAMANO_LOTE_COPIA_CONTACTOS', 7)
+    def test_reciclar_copia_los_contactos_seleccionados_a_una_nueva_base(self):
+        self._generar_llamadas_y_calificaciones(self.estados)
+        opcion_calificacion = self.campana.opciones_calificacion.first()
+        calificados = set(self.campana.obtener_calificaciones().filter(
+            opcion_calificacion=opcion_calificacion).values_list('contacto_id', flat=True))
+        esperados = self.campana.bd_contacto.contactos.filter(
+            id__in=calificados | self._obtener_no_calificados())
+
+        reciclador = RecicladorContactosCampanaDIALER()
+        bd_contacto_reciclada = reciclador.reciclar(
+            self.campana, [opcion_calificacion.id],
+            [EstadisticasContactacion.AGENTE_NO_CALIFICO])
+
+        self.assertEqual(bd_contacto_reciclada.estado, BaseDatosContacto.ESTADO_DEFINIDA)
+        self.assertEqual(bd_contacto_reciclada.cantidad_contactos, esperados.count())
+        self.assertEqual(
+            sorted(bd_contacto_reciclada.contactos.values_list('telefono', 'datos')),
+            sorted(esperados.values_list('telefono', 'datos')))
+
+    def test_cantidades_reciclado_por_tipo(self):
+        self._generar_llamadas_y_calificaciones(self.estados)
+        self.campana.estado = Campana.ESTADO_PAUSADA
+        self.campana.save()
+        opcion_calificacion = self.campana.opciones_calificacion.first()
+        reciclado_no_contactacion = [EstadisticasContactacion.AGENTE_NO_CALIFICO]
+        reciclador = RecicladorContactosCampanaDIALER()
+
+        cantidades = reciclador.obtener_cantidades_reciclado(
+            self.campana, [opcion_calificacion.id], reciclado_no_contactacion)
+
+        self.assertEqual(cantidades['calificados'], self.campana.obtener_calificaciones().filter(
+            opcion_calificacion=opcion_calificacion).count())
+        self.assertEqual(cantidades['no_contactados'], len(self._obtener_no_calificados()))
+        self.assertEqual(cantidades['no_llamados'],
+                         reciclador._obtener_contactos_no_llamados(self.campana).count())
+        self.assertEqual(cantidades['total'], reciclador.obtener_contactos_reciclados(
+            self.campana, [opcion_calificacion.id], reciclado_no_contactacion).count())
+
+    @patch.object(RecicladoCampanaDialerMixin, '_reciclar_misma_campana',
+                  return_value='campana_dialer_update')
+    def test_reciclado_se_aplica_con_post_segun_la_opcion_guardada_en_el_trabajo(
+            self, _reciclar_misma_campana):
+        bd_contacto_reciclada = self.campana.bd_contacto.copia_para_reciclar()
+        parametros = {
+            'campana_id': self.campana.pk, 'bd_contacto_id': bd_contacto_reciclada.pk,
+            'reciclado_calificacion': [], 'reciclado_no_contactacion': [],
+            'reciclado_radio': 'misma_campana'}
+        trabajo = TrabajoSegundoPlano.objects.create(
+            tipo='RECICLADO', clave='RECICLADO:test', salida='RECICLADO:test',
+            parametros=json.dumps(parametros), campana=self.campana,
+            estado=TrabajoSegundoPlano.FINALIZADO)
+        administrador = self.crear_administrador()
+        self.client.login(username=administrador.username, password=PASSWORD)
+        url = reverse('reciclado_en_curso_dialer', kwargs={
+            'pk_campana': self.campana.pk, 'pk_trabajo': trabajo.pk})
+
+        self.client.get(url)
+        self.campana.refresh_from_db()
+        self.assertNotEqual(self.campana.bd_contacto, bd_contacto_reciclada)
+        _reciclar_misma_campana.assert_not_called()
+
+        response = self.client.post(url)
+        self.campana.refresh_from_db()
+        self.assertEqual(self.campana.bd_contacto, bd_contacto_reciclada)
+        _reciclar_misma_campana.assert_called_once()
+        self.assertRedirects(
+            response, reverse('campana_dialer_update', kwargs={'pk_campana': self.campana.pk}),
+            fetch_redirect_response=False)
@@ -27,4 +27,10 @@ urlpatterns = [
     re_path(r'^reciclar/(?P<pk_campana>\d+)/preview/$',
             login_required(views.ReciclarCampanaPreviewFormView.as_view()),
             name='reciclar_campana_preview'),
+    re_path(r'^reciclar/(?P<pk_campana>\d+)/dialer/trabajo/(?P<pk_trabajo>\d+)/$',
+            login_required(views.RecicladoEnCursoDialerView.as_view()),
+            name='reciclado_en_curso_dialer'),
+    re_path(r'^reciclar/(?P<pk_campana>\d+)/preview/trabajo/(?P<pk_trabajo>\d+)/$',
+            login_required(views.RecicladoEnCursoPreviewView.as_view()),
+            name='reciclado_en_curso_preview'),
 ]
@@ -22,21 +22,27 @@ from __future__ import unicode_literals
 
 from django.urls import reverse
 from django.contrib import messages
-from django.shortcuts import HttpResponseRedirect
+from django.db import transaction
+from django.shortcuts import HttpResponseRedirect, get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from ominicontacto_app.errors import OmlRecicladoCampanaError
-from django.views.generic import FormView
-from ominicontacto_app.models import Campana
+from django.views.generic import FormView, TemplateView
+from ominicontacto_app.models import BaseDatosContacto, Campana, TrabajoSegundoPlano
 from reciclado_app.forms import RecicladoForm
 from reciclado_app.resultado_contactacion import (
     EstadisticasContactacion, RecicladorContactosCampanaDIALER)
-from ominicontacto_app.services.campana_service import CampanaService
+from ominicontacto_app.services.campana_service import CampanaService, WombatDialerError
+from ominicontacto_app.services.sincronizacion_lista_wombat import SincronizacionListaWombat
+from ominicontacto_app.services.trabajos_segundo_plano import encolar_trabajo
 
 import logging as logging_
 
 
 logger = logging_.getLogger(__name__)
 
+# key_task del reciclado: la página de avance consulta el estado del trabajo a la API
+KEY_RECICLADO = 'OML:RECICLADO:{0}'
+
 
 class ReciclarCampanaMixin(object):
 
@@ -75,15 +81,79 @@ class ReciclarCampanaMixin(object):
             return self.form_invalid(form)
 
         campana = Campana.objects.get(pk=self.kwargs['pk_campana'])
-        reciclador = RecicladorContactosCampanaDIALER()
-        bd_contacto_reciclada = reciclador.reciclar(
-            campana, reciclado_calificacion, reciclado_no_contactacion)
+        if reciclado_radio == 'misma_campana' and SincronizacionListaWombat(campana.pk).en_curso():
+            message = _(u'Ya se está actualizando la lista de contactos de la campaña.')
+            messages.add_message(self.request, messages.WARNING, message)
+            return self.form_invalid(form)
+        bd_contacto_reciclada = campana.bd_contacto.copia_para_reciclar()
+        trabajo = encolar_trabajo(
+            'RECICLADO', KEY_RECICLADO.format(bd_contacto_reciclada.pk),
+            usuario=self.request.user, campana=campana, campana_id=campana.pk,
+            bd_contacto_id=bd_contacto_reciclada.pk,
+            reciclado_calificacion=reciclado_calificacion,
+            reciclado_no_contactacion=reciclado_no_contactacion,
+            reciclado_radio=reciclado_radio)
+        return HttpResponseRedirect(reverse(self.url_reciclado_en_curso, kwargs={
+            'pk_campana': campana.pk, 'pk_trabajo': trabajo.pk}))
+
+    def get_context_data(self, **kwargs):
+        context = super(ReciclarCampanaMixin, self).get_context_data(**kwargs)
+        estadisticas = EstadisticasContactacion()
+        campana = Campana.objects.get(pk=self.kwargs['pk_campana'])
+        contactados = estadisticas.obtener_cantidad_calificacion(campana)
+        contactados_choice = [(contactacion.id, contactacion.nombre, contactacion.cantidad)
+                              for contactacion in contactados]
+        no_contactados = estadisticas.obtener_cantidad_no_contactados(campana)
+        no_contactados_choice = [(value.id, value.nombre, value.cantidad)
+                                 for key, value in no_contactados.items()]
+        context['contactados'] = contactados_choice
+        context['no_contactados'] = no_contactados_choice
+        return context
+
+
+class RecicladoEnCursoMixin(object):
+    """
+    Muestra el avance del trabajo que genera la base de datos reciclada y, cuando termina,
+    recicla la campaña con ella al recibir el POST con el que se confirma.
+    """
+    template_name = 'reciclado_en_curso.html'
+
+    def dispatch(self, request, *args, **kwargs):
+        self.campana = get_object_or_404(Campana, pk=self.kwargs['pk_campana'])
+        self.trabajo = get_object_or_404(
+            TrabajoSegundoPlano, pk=self.kwargs['pk_trabajo'], tipo='RECICLADO',
+            campana=self.campana)
+        return super(RecicladoEnCursoMixin, self).dispatch(request, *args, **kwargs)
+
+    def _redireccionar_error(self):
+        message = _(u'<strong>Operación Errónea!</strong> \
+                    No se pudo reciclar la Campana.')
+        messages.add_message(self.request, messages.ERROR, message)
+        return HttpResponseRedirect(reverse(self.url_listado))
+
+    def get(self, request, *args, **kwargs):
+        if self.trabajo.esta_activo() or self.trabajo.estado == TrabajoSegundoPlano.FINALIZADO:
+            return super(RecicladoEnCursoMixin, self).get(request, *args, **kwargs)
+        return self._redireccionar_error()
+
+    def post(self, request, *args, **kwargs):
+        if self.trabajo.esta_activo():
+            return HttpResponseRedirect(request.path)
+        if self.trabajo.estado != TrabajoSegundoPlano.FINALIZADO:
+            return self._redireccionar_error()
+        parametros = self.trabajo.get_parametros()
+        bd_contacto_reciclada = BaseDatosContacto.objects.get(
+            pk=parametros['bd_contacto_id'])
+        reciclado_radio = parametros.get('reciclado_radio')
         if reciclado_radio == 'nueva_campaña':
+            if bd_contacto_reciclada.campanas.exists():
+                # Ya se creó la campaña reciclada con esta base
+                return HttpResponseRedirect(reverse(self.url_listado))
             try:
                 # Intenta reciclar la campana con el tipo de reciclado
                 # seleccionado.
                 campana_reciclada = Campana.objects.reciclar_campana(
-                    campana, bd_contacto_reciclada)
+                    self.campana, bd_contacto_reciclada)
             except OmlRecicladoCampanaError:
 
                 message = _(u'<strong>Operación Errónea!</strong>\
@@ -94,49 +164,44 @@ class ReciclarCampanaMixin(object):
                     messages.ERROR,
                     message,
                 )
-                return self.form_invalid(form)
+                return HttpResponseRedirect(reverse(self.url_listado))
 
-            crea_campana_template = self._reciclar_crear_nueva_campana(campana_reciclada, campana)
+            crea_campana_template = self._reciclar_crear_nueva_campana(
+                campana_reciclada, self.campana)
             return HttpResponseRedirect(crea_campana_template)
         elif reciclado_radio == 'misma_campana':
-            campana.update_basedatoscontactos(bd_contacto_reciclada)
-            update_campana = self._reciclar_misma_campana(campana)
-            return HttpResponseRedirect(reverse(update_campana, kwargs={"pk_campana": campana.pk}))
+            if self.campana.bd_contacto_id != bd_contacto_reciclada.pk:
+                self.campana.update_basedatoscontactos(bd_contacto_reciclada)
+                try:
+                    update_campana = self._reciclar_misma_campana(self.campana)
+                except WombatDialerError as e:
+                    # No se guarda el cambio de base de la campaña si no se pudo cambiar la lista
+                    transaction.set_rollback(True)
+                    message = _("<strong>¡Cuidado!</strong> "
+                                "con el siguiente error: ") + "{0} .".format(e)
+                    messages.add_message(self.request, messages.WARNING, message)
+                    return HttpResponseRedirect(reverse(self.url_listado))
+            else:
+                update_campana = self.url_actualizar_campana
+            return HttpResponseRedirect(
+                reverse(update_campana, kwargs={"pk_campana": self.campana.pk}))
+        return HttpResponseRedirect(reverse(self.url_listado))
 
     def get_context_data(self, **kwargs):
-        context = super(ReciclarCampanaMixin, self).get_context_data(**kwargs)
-        estadisticas = EstadisticasContactacion()
-        campana = Campana.objects.get(pk=self.kwargs['pk_campana'])
-        contactados = estadisticas.obtener_cantidad_calificacion(campana)
-        contactados_choice = [(contactacion.id, contactacion.nombre, contactacion.cantidad)
-                              for contactacion in contactados]
-        no_contactados = estadisticas.obtener_cantidad_no_contactados(campana)
-        no_contactados_choice = [(value.id, value.nombre, value.cantidad)
-                                 for key, value in no_contactados.items()]
-        context['contactados'] = contactados_choice
-        context['no_contactados'] = no_contactados_choice
+        context = super(RecicladoEnCursoMixin, self).get_context_data(**kwargs)
+        parametros = self.trabajo.get_parametros()
+        context['campana'] = self.campana
+        context['trabajo'] = self.trabajo
+        context['cantidades'] = RecicladorContactosCampanaDIALER().obtener_cantidades_reciclado(
+            self.campana, parametros['reciclado_calificacion'],
+            parametros['reciclado_no_contactacion'])
         return context
 
 
-class ReciclarCampanaDialerFormView(ReciclarCampanaMixin, FormView):
-    """
-    Esta vista muestra los distintos tipo de reciclados de las campanas
-    dialer
-    """
-    def dispatch(self, request, *args, **kwargs):
-        form = self.get_form_kwargs()
-        contactados = form.get('reciclado_choice')
-        no_contactados = form.get('no_contactados_choice')
-        campana = Campana.objects.get(pk=self.kwargs['pk_campana'])
-        if campana.estado not in [Campana.ESTADO_FINALIZADA, Campana.ESTADO_PAUSADA]:
-            message = _(u'Solo se pueden reciclar campañas activas o pausadas.')
-            messages.add_message(self.request, messages.WARNING, message)
-            return HttpResponseRedirect(reverse('campana_dialer_list'))
-        if not (contactados or no_contactados) and campana.estado != Campana.ESTADO_FINALIZADA:
-            message = _(u'Esta campaña no se puede reciclar.')
-            messages.add_message(self.request, messages.WARNING, message)
-            return HttpResponseRedirect(reverse('campana_dialer_list'))
-        return super(ReciclarCampanaMixin, self).dispatch(request, *args, **kwargs)
+class RecicladoCampanaDialerMixin(object):
+    url_listado = 'campana_dialer_list'
+    url_actualizar_campana = 'campana_dialer_update'
+    url_reciclado_en_curso = 'reciclado_en_curso_dialer'
 
     def _reciclar_crear_nueva_campana(self, campana_reciclada, campana):
         if campana.estado != Campana.ESTADO_FINALIZADA:
@@ -158,11 +223,39 @@ class ReciclarCampanaDialerFormView(ReciclarCampanaMixin, FormView):
         return update_campana
 
 
-class ReciclarCampanaPreviewFormView(ReciclarCampanaMixin, FormView):
+class ReciclarCampanaDialerFormView(RecicladoCampanaDialerMixin, ReciclarCampanaMixin, FormView):
     """
     Esta vista muestra los distintos tipo de reciclados de las campanas
-    preview
+    dialer
+    """
+    def dispatch(self, request, *args, **kwargs):
+        form = self.get_form_kwargs()
+        contactados = form.get('reciclado_choice')
+        no_contactados = form.get('no_contactados_choice')
+        campana = Campana.objects.get(pk=self.kwargs['pk_campana'])
+        if campana.estado not in [Campana.ESTADO_FINALIZADA, Campana.ESTADO_PAUSADA]:
+            message = _(u'Solo se pueden reciclar campañas activas o pausadas.')
+            messages.add_message(self.request, messages.WARNING, message)
+            return HttpResponseRedirect(reverse('campana_dialer_list'))
+        if not (contactados or no_contactados) and campana.estado != Campana.ESTADO_FINALIZADA:
+            message = _(u'Esta campaña no se puede reciclar.')
+            messages.add_message(self.request, messages.WARNING, message)
+            return HttpResponseRedirect(reverse('campana_dialer_list'))
+        return super(ReciclarCampanaMixin, self).dispatch(request, *args, **kwargs)
+
+
+class RecicladoEnCursoDialerView(RecicladoCampanaDialerMixin, RecicladoEnCursoMixin,
+                                 TemplateView):
+    """
+    Esta vista muestra el avance del reciclado de una campana dialer
     """
+
+
+class RecicladoCampanaPreviewMixin(object):
+    url_listado = 'campana_preview_list'
+    url_actualizar_campana = 'campana_preview_update'
+    url_reciclado_en_curso = 'reciclado_en_curso_preview'
+
     def _reciclar_crear_nueva_campana(self, campana_reciclada, campana):
         crea_campana_template = reverse("campana_preview_template_create_campana",
                                         kwargs={"pk_campana_template": campana_reciclada.pk,
@@ -175,3 +268,18 @@ class ReciclarCampanaPreviewFormView(ReciclarCampanaMixin, FormView):
         campana.save()
         campana.establecer_valores_iniciales_agente_contacto(False, False)
         return update_campana
+
+
+class ReciclarCampanaPreviewFormView(RecicladoCampanaPreviewMixin, ReciclarCampanaMixin,
+                                     FormView):
+    """
+    Esta vista muestra los distintos tipo de reciclados de las campanas
+    preview
+    """
+
+
+class RecicladoEnCursoPreviewView(RecicladoCampanaPreviewMixin, RecicladoEnCursoMixin,
+                                  TemplateView):
+    """
+    Esta vista muestra el avance del reciclado de una campana preview
+    """
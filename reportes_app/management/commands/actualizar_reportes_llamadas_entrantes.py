@@ -31,9 +31,17 @@ class Command(BaseCommand):
 
     help = 'Calcula y carga en Redis los datos del reporte de llamadas entrantes.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--regenerar', action='store_true',
+                            help='Recalcula el dia completo en lugar de sumar solo los '
+                                 'logs nuevos desde la ultima actualizacion.')
+
     def handle(self, *args, **options):
         family = ReporteLlamadasEntranteFamily()
         try:
-            family.regenerar_families()
+            if options['regenerar']:
+                family.regenerar_families()
+            else:
+                family.actualizar_families()
         except Exception as e:
             logger.error('Fallo del comando: {0}'.format(e))
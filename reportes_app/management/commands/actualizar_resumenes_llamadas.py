@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import logging
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import get_current_timezone, make_aware
+
+from reportes_app.services.resumen_llamadas_service import ConsolidadorResumenLlamadas
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Consolida los LlamadaLog de las horas cerradas en los resúmenes horarios y diarios.
+    """
+
+    help = 'Consolida los LlamadaLog de las horas cerradas en los resumenes de llamadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=str,
+                            help='Fecha (YYYY-MM-DD) a partir de la cual volver a consolidar.')
+
+    def handle(self, *args, **options):
+        consolidador = ConsolidadorResumenLlamadas()
+        try:
+            if options['desde']:
+                desde = make_aware(datetime.strptime(options['desde'], '%Y-%m-%d'),
+                                   get_current_timezone())
+                consolidador.regenerar(desde)
+            else:
+                consolidador.consolidar()
+        except Exception as e:
+            logger.error('Fallo del comando: {0}'.format(e))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+import logging
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reportes_app.services.ingesta_queue_log import IngestorQueueLog
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Procesa los queue_log nuevos por lotes hasta recibir SIGTERM o SIGINT. Mientras el
+    trigger de queue_log esté habilitado sólo sigue su avance.
+    """
+
+    help = u"Genera los logs de llamadas y de actividad de agentes a partir de queue_log."
+
+    def add_arguments(self, parser):
+        grupo = parser.add_mutually_exclusive_group()
+        grupo.add_argument('--deshabilitar-trigger', action='store_true',
+                           dest='deshabilitar_trigger',
+                           help=u"Elimina el trigger de queue_log para usar la ingesta por lotes")
+        grupo.add_argument('--habilitar-trigger', action='store_true',
+                           dest='habilitar_trigger',
+                           help=u"Procesa los queue_log pendientes y vuelve a crear el trigger")
+
+    def handle(self, *args, **options):
+        ingestor = IngestorQueueLog()
+        if options['deshabilitar_trigger']:
+            ingestor.deshabilitar_trigger()
+            return
+        if options['habilitar_trigger']:
+            ingestor.habilitar_trigger()
+            return
+
+        detenido = []
+
+        def detener(signum, frame):
+            logger.info('Deteniendo la ingesta de queue_log')
+            detenido.append(signum)
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+        while not detenido:
+            close_old_connections()
+            try:
+                procesados = ingestor.procesar()
+            except Exception as e:
+                logger.exception('Error procesando queue_log: {0}'.format(e))
+                procesados = 0
+            if procesados < ingestor.tamano_lote:
+                time.sleep(settings.OML_INGESTA_QUEUE_LOG_ESPERA)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from django.db import migrations, models
+
+
+def campos_resumen():
+    return [
+        ('id', models.AutoField(auto_created=True, primary_key=True,
+                                serialize=False, verbose_name='ID')),
+        ('campana_id', models.IntegerField(blank=True, null=True)),
+        ('tipo_campana', models.IntegerField(blank=True, null=True)),
+        ('tipo_llamada', models.IntegerField(blank=True, null=True)),
+        ('agente_id', models.IntegerField(blank=True, null=True)),
+        ('event', models.CharField(blank=True, max_length=32, null=True)),
+        ('cantidad', models.IntegerField(default=0)),
+        ('duracion_llamada', models.BigIntegerField(default=0)),
+        ('bridge_wait_time', models.BigIntegerField(default=0)),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes_app', '0008_transferenciaaencuestalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsolidacionResumenLlamadaLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('hasta', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenDiarioLlamadaLog',
+            fields=campos_resumen() + [
+                ('fecha', models.DateField(db_index=True)),
+            ],
+            options={
+                'index_together': {('fecha', 'campana_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenHorarioLlamadaLog',
+            fields=campos_resumen() + [
+                ('hora', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'index_together': {('hora', 'campana_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+from __future__ import unicode_literals
+
+import os
+
+from django.db import migrations, models
+
+
+def ejecutar_sql(schema_editor, nombre):
+    tmp_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # reportes_app
+    ruta = os.path.join(tmp_dir, 'sql', 'plpgsql', nombre)
+    assert os.path.exists(ruta)
+    sql = open(ruta, 'r', encoding='utf-8').read()
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(sql)
+
+
+def crear_triggers(apps, schema_editor):
+    ejecutar_sql(schema_editor, 'contactacion_campana.sql')
+    # Estado inicial a partir de los logs y calificaciones existentes
+    ejecutar_sql(schema_editor, 'regenerar_contactacion_campana.sql')
+
+
+def borrar_triggers(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "DROP TRIGGER IF EXISTS trigger_contactacion_campana_llamadalog "
+            "ON reportes_app_llamadalog")
+        cursor.execute(
+            "DROP TRIGGER IF EXISTS trigger_contactacion_campana_calificacion "
+            "ON ominicontacto_app_calificacioncliente")
+        cursor.execute("DROP FUNCTION IF EXISTS contactacion_campana_llamadalog()")
+        cursor.execute("DROP FUNCTION IF EXISTS contactacion_campana_calificacion()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes_app', '0009_resumenes_llamadalog'),
+        ('ominicontacto_app', '0107_trabajosegundoplano'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactacionCampana',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('campana_id', models.IntegerField()),
+                ('contacto_id', models.IntegerField()),
+                ('intentos', models.IntegerField(default=0)),
+                ('ultimo_intento', models.DateTimeField(blank=True, null=True)),
+                ('contactado', models.BooleanField(default=False)),
+                ('ultimo_evento', models.CharField(blank=True, max_length=32, null=True)),
+                ('fecha_ultimo_evento', models.DateTimeField(blank=True, null=True)),
+                ('opcion_calificacion_id', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('campana_id', 'contacto_id')},
+                'index_together': {('campana_id', 'ultimo_evento')},
+            },
+        ),
+        migrations.RunPython(crear_triggers, borrar_triggers),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes_app', '0010_contactacioncampana'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestaQueueLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True,
+                                        serialize=False, verbose_name='ID')),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        # Los queue_log existentes ya los procesó el trigger
+        migrations.RunSQL(
+            "INSERT INTO reportes_app_ingestaqueuelog (id, ultimo_id) "
+            "SELECT 1, COALESCE(MAX(id), 0) FROM queue_log",
+            migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes_app', '0011_ingestaqueuelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consolidacionresumenllamadalog',
+            name='ultimo_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        # Los logs existentes ya fueron considerados por la consolidación
+        migrations.RunSQL(
+            "UPDATE reportes_app_consolidacionresumenllamadalog SET ultimo_id = "
+            "(SELECT COALESCE(MAX(id), 0) FROM reportes_app_llamadalog)",
+            migrations.RunSQL.noop),
+    ]
@@ -20,11 +20,11 @@ from __future__ import unicode_literals
 
 from django.utils.timezone import now, timedelta
 from ominicontacto_app.utiles import crear_segmento_grabaciones_url, datetime_hora_maxima_dia, \
-    datetime_hora_minima_dia, fecha_local
+    datetime_hora_minima_dia, fecha_local, fecha_hora_local
 import urllib.parse
 from django.db import models, connection
-from django.db.models import Count, Q, Sum
-from django.db.models.functions import TruncDate
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
 from django.core.exceptions import SuspiciousOperation
 from django.utils.translation import gettext as _
 from django.conf import settings
@@ -105,32 +105,20 @@ class LlamadaLogManager(models.Manager):
     def obtener_agentes_campanas_total(self, eventos, fecha_desde, fecha_hasta, agentes,
                                        campanas):
         """
-        Query que sumariza por agente y campaña la cantidad y duración de
-        llamadas para los eventos indicados.
+        Sumariza por agente y campaña la cantidad y duración de llamadas para los eventos
+        indicados. Devuelve tuplas (agente_id, campana_id, duración total, cantidad).
         """
 
         if fecha_desde and fecha_hasta:
             fecha_desde = datetime_hora_minima_dia(fecha_desde)
             fecha_hasta = datetime_hora_maxima_dia(fecha_hasta)
 
-        cursor = connection.cursor()
-        sql = """select agente_id, campana_id, SUM(duracion_llamada::integer), Count(*)
-                 from reportes_app_llamadalog where time between %(fecha_desde)s and
-                 %(fecha_hasta)s and event = ANY(%(eventos)s) and agente_id = ANY(%(agentes)s)
-                 and campana_id = ANY(%(campanas)s) GROUP BY agente_id, campana_id order by
-                 agente_id, campana_id
-        """
-        params = {
-            'fecha_desde': fecha_desde,
-            'fecha_hasta': fecha_hasta,
-            'eventos': eventos,
-            'agentes': agentes,
-            'campanas': [campana.id for campana in campanas],
-        }
-
-        cursor.execute(sql, params)
-        values = cursor.fetchall()
-        return values
+        totales = ResumenHorarioLlamadaLog.objects.obtener_totales(
+            fecha_desde, fecha_hasta, ['agente_id', 'campana_id'],
+            event__in=eventos, agente_id__in=agentes,
+            campana_id__in=[campana.id for campana in campanas])
+        return sorted((total['agente_id'], total['campana_id'], total['duracion_total'],
+                       total['cantidad_total']) for total in totales)
 
     def obtener_count_agente(self):
         try:
@@ -317,22 +305,38 @@ class LlamadaLogManager(models.Manager):
             ),
         ).only("id").distinct("contacto_id").count()
 
-    def cantidad_llamadas_rechazadas_fecha(self, agente_id, fecha_inferior, fecha_superior):
+    def _cantidades_rechazos_por_agente(self, logs, agentes_ids, fecha_inferior, fecha_superior):
         fecha_desde = datetime_hora_minima_dia(fecha_inferior)
         fecha_hasta = datetime_hora_maxima_dia(fecha_superior)
-        return self.filter(agente_id=agente_id, agente_extra_id=agente_id,
-                           time__gte=fecha_desde, time__lte=fecha_hasta,
-                           event__in=LlamadaLog.EVENTOS_REJECT).exclude(campana_id='0').count()
-
-    def cantidad_llamadas_no_atendidas_fecha(self, agente_id, fecha_inferior, fecha_superior):
-        fecha_desde = datetime_hora_minima_dia(fecha_inferior)
-        fecha_hasta = datetime_hora_maxima_dia(fecha_superior)
-        return self.filter(
-            agente_id=agente_id,
-            agente_extra_id=-1,
-            time__gte=fecha_desde,
-            time__lte=fecha_hasta,
-            event__in=LlamadaLog.EVENTOS_REJECT).exclude(campana_id='0').count()
+        resultados = logs.filter(
+            agente_id__in=agentes_ids, time__gte=fecha_desde, time__lte=fecha_hasta,
+            event__in=LlamadaLog.EVENTOS_REJECT).exclude(campana_id='0') \
+            .values_list('agente_id').annotate(cantidad=Count('id')).order_by()
+        return dict(resultados)
+
+    def cantidad_llamadas_rechazadas_por_agente(self, agentes_ids, fecha_inferior,
+                                                fecha_superior):
+        """ Devuelve un dict {agente_id: cantidad} de las llamadas rechazadas por cada agente """
+        logs = self.filter(agente_extra_id=F('agente_id'))
+        return self._cantidades_rechazos_por_agente(
+            logs, agentes_ids, fecha_inferior, fecha_superior)
+
+    def cantidad_llamadas_no_atendidas_por_agente(self, agentes_ids, fecha_inferior,
+                                                  fecha_superior):
+        """ Devuelve un dict {agente_id: cantidad} de las llamadas no atendidas por cada agente """
+        logs = self.filter(agente_extra_id=-1)
+        return self._cantidades_rechazos_por_agente(
+            logs, agentes_ids, fecha_inferior, fecha_superior)
+
+    def obtener_logs_llamadas_con_hold(self, agentes_ids, fecha_desde, fecha_hasta):
+        """
+        Devuelve ordenados por fecha los logs de los agentes correspondientes a llamadas
+        en las que hicieron HOLD dentro del período.
+        """
+        logs = self.using('replica').filter(
+            agente_id__in=agentes_ids, time__range=(fecha_desde, fecha_hasta))
+        callids_con_hold = logs.filter(event='HOLD').values('callid')
+        return logs.filter(callid__in=callids_con_hold).order_by('time', 'id')
 
 
 class LlamadaLog(models.Model):
@@ -564,3 +568,222 @@ class TransferenciaAEncuestaLog(models.Model):
     campana_id = models.IntegerField(db_index=True, blank=True, null=True)
     encuesta_id = models.IntegerField(db_index=True, blank=True, null=True)
     callid = models.CharField(db_index=True, max_length=32, blank=True, null=True)
+
+
+def truncar_hora(fecha_hora):
+    """ Devuelve el comienzo de la hora local de fecha_hora """
+    return fecha_hora_local(fecha_hora).replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hora(fecha_hora):
+    """ Devuelve el comienzo de la primera hora local que no empieza antes de fecha_hora """
+    hora = truncar_hora(fecha_hora)
+    if hora < fecha_hora:
+        hora += timedelta(hours=1)
+    return hora
+
+
+class ResumenLlamadaLogManager(models.Manager):
+    """
+    Combina los resúmenes ya consolidados con los LlamadaLog del período todavía abierto.
+    """
+
+    TOTALES = ('cantidad_total', 'duracion_total', 'bridge_wait_time_total')
+
+    def obtener_consolidado_hasta(self, using='default'):
+        consolidacion = ConsolidacionResumenLlamadaLog.objects.using(using).first()
+        if consolidacion is None:
+            return None
+        return consolidacion.hasta
+
+    def obtener_totales(self, desde, hasta, campos, por_fecha=False, using='default', **filtros):
+        """
+        Devuelve una lista de diccionarios con los totales de llamadas entre desde y hasta
+        (inclusive) agrupados por `campos` (y por 'fecha' local si por_fecha es True):
+        - cantidad_total: cantidad de logs
+        - duracion_total: suma de duracion_llamada
+        - bridge_wait_time_total: suma de bridge_wait_time
+        Las horas y días completos ya consolidados se leen de los resúmenes, y el resto de
+        LlamadaLog. Los filtros deben ser sobre campos comunes a LlamadaLog y a los resúmenes.
+        """
+        campos = list(campos)
+        consolidado_hasta = self.obtener_consolidado_hasta(using)
+        inicio_resumen = ceil_hora(desde)
+        fin_resumen = truncar_hora(hasta + timedelta(microseconds=1))
+        if consolidado_hasta is not None:
+            fin_resumen = min(fin_resumen, consolidado_hasta)
+
+        if consolidado_hasta is None or fin_resumen <= inicio_resumen:
+            consultas = [self._totales_de_logs(desde, hasta, campos, por_fecha, using, filtros,
+                                               incluir_hasta=True)]
+        else:
+            consultas = [
+                self._totales_de_logs(desde, inicio_resumen, campos, por_fecha, using, filtros),
+                self._totales_de_logs(fin_resumen, hasta, campos, por_fecha, using, filtros,
+                                      incluir_hasta=True),
+            ]
+            consultas.extend(self._totales_de_resumenes(
+                inicio_resumen, fin_resumen, campos, por_fecha, using, filtros))
+
+        if por_fecha:
+            campos = campos + ['fecha']
+        totales = {}
+        for consulta in consultas:
+            for fila in consulta:
+                clave = tuple(fila[campo] for campo in campos)
+                if clave not in totales:
+                    totales[clave] = dict(fila)
+                else:
+                    for total in self.TOTALES:
+                        totales[clave][total] += fila[total]
+        return list(totales.values())
+
+    def _totales_de_logs(self, desde, hasta, campos, por_fecha, using, filtros,
+                         incluir_hasta=False):
+        logs = LlamadaLog.objects.using(using).filter(time__gte=desde, **filtros)
+        if incluir_hasta:
+            logs = logs.filter(time__lte=hasta)
+        elif desde >= hasta:
+            return []
+        else:
+            logs = logs.filter(time__lt=hasta)
+        if por_fecha:
+            logs = logs.annotate(fecha=TruncDate('time'))
+            campos = campos + ['fecha']
+        return logs.values(*campos).order_by().annotate(
+            cantidad_total=Count('id'),
+            duracion_total=Coalesce(Sum('duracion_llamada'), 0),
+            bridge_wait_time_total=Coalesce(Sum('bridge_wait_time'), 0))
+
+    def _totales_de_resumenes(self, desde, hasta, campos, por_fecha, using, filtros):
+        """ Usa los resúmenes diarios para los días completos y los horarios para el resto """
+        primer_dia = fecha_local(desde)
+        if datetime_hora_minima_dia(primer_dia) < desde:
+            primer_dia += timedelta(days=1)
+        ultimo_dia = fecha_local(hasta)
+        inicio_dias = datetime_hora_minima_dia(primer_dia)
+        fin_dias = datetime_hora_minima_dia(ultimo_dia)
+
+        consultas = []
+        rangos_horarios = [(desde, hasta)]
+        if inicio_dias < fin_dias:
+            rangos_horarios = [(desde, inicio_dias), (fin_dias, hasta)]
+            diarios = ResumenDiarioLlamadaLog.objects.using(using).filter(
+                fecha__gte=primer_dia, fecha__lt=ultimo_dia, **filtros)
+            campos_diarios = campos + ['fecha'] if por_fecha else campos
+            consultas.append(self._sumar(diarios.values(*campos_diarios)))
+
+        for inicio, fin in rangos_horarios:
+            if inicio < fin:
+                horarios = self.using(using).filter(hora__gte=inicio, hora__lt=fin, **filtros)
+                if por_fecha:
+                    horarios = horarios.annotate(fecha=TruncDate('hora')).values(
+                        *(campos + ['fecha']))
+                else:
+                    horarios = horarios.values(*campos)
+                consultas.append(self._sumar(horarios))
+        return consultas
+
+    def _sumar(self, resumenes):
+        return resumenes.order_by().annotate(
+            cantidad_total=Sum('cantidad'),
+            duracion_total=Sum('duracion_llamada'),
+            bridge_wait_time_total=Sum('bridge_wait_time'))
+
+
+class AbstractResumenLlamadaLog(models.Model):
+    """
+    Totales de LlamadaLog agrupados por campaña, agente, tipo de llamada y evento.
+    """
+    campana_id = models.IntegerField(blank=True, null=True)
+    tipo_campana = models.IntegerField(blank=True, null=True)
+    tipo_llamada = models.IntegerField(blank=True, null=True)
+    agente_id = models.IntegerField(blank=True, null=True)
+    event = models.CharField(max_length=32, blank=True, null=True)
+    cantidad = models.IntegerField(default=0)
+    duracion_llamada = models.BigIntegerField(default=0)
+    bridge_wait_time = models.BigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ResumenHorarioLlamadaLog(AbstractResumenLlamadaLog):
+    """ Totales de LlamadaLog por hora local (horas ya cerradas) """
+
+    objects = ResumenLlamadaLogManager()
+
+    hora = models.DateTimeField(db_index=True)
+
+    class Meta:
+        index_together = [('hora', 'campana_id')]
+
+
+class ResumenDiarioLlamadaLog(AbstractResumenLlamadaLog):
+    """ Totales de LlamadaLog por día local, calculados a partir de los horarios """
+
+    fecha = models.DateField(db_index=True)
+
+    class Meta:
+        index_together = [('fecha', 'campana_id')]
+
+
+class ConsolidacionResumenLlamadaLog(models.Model):
+    """
+    Registro único con el final (exclusive) del período cuyos LlamadaLog ya están
+    consolidados en los resúmenes, y el id del último LlamadaLog considerado, para
+    detectar los logs que llegan tarde a horas ya consolidadas.
+    """
+    hasta = models.DateTimeField()
+    ultimo_id = models.BigIntegerField(default=0)
+
+
+class IngestaQueueLog(models.Model):
+    """
+    Registro único con el id del último queue_log procesado por la ingesta de queue_log
+    (ver services/ingesta_queue_log.py). Mientras el trigger de queue_log está habilitado
+    sólo sigue su avance.
+    """
+    ultimo_id = models.BigIntegerField(default=0)
+
+
+class ContactacionCampanaManager(models.Manager):
+
+    def de_campana(self, campana, using='default'):
+        """ Estados de los contactos de la base de datos actual de la campaña """
+        return self.using(using).filter(
+            campana_id=campana.id,
+            contacto_id__in=campana.bd_contacto.contactos.using(using).values('id'))
+
+    def llamados(self, campana, using='default'):
+        """ Estados de los contactos con al menos un intento de llamada en la campaña """
+        return self.de_campana(campana, using).filter(
+            Q(intentos__gt=0) | Q(contactado=True) | Q(ultimo_evento__isnull=False))
+
+
+class ContactacionCampana(models.Model):
+    """
+    Resultado de la gestión de cada contacto en cada campaña. Lo mantienen los triggers
+    sobre LlamadaLog y CalificacionCliente (ver sql/plpgsql/contactacion_campana.sql), de modo
+    que los reportes y el reciclado no recorren los logs de la campaña.
+    """
+
+    # Eventos que actualizan el último resultado (EVENTOS_NO_CONEXION + EVENTOS_FIN_CONEXION)
+    EVENTOS_RESULTADO = LlamadaLog.EVENTOS_NO_CONEXION + tuple(LlamadaLog.EVENTOS_FIN_CONEXION)
+
+    objects = ContactacionCampanaManager()
+
+    campana_id = models.IntegerField()
+    contacto_id = models.IntegerField()
+    # Cantidad de DIAL y fecha del último
+    intentos = models.IntegerField(default=0)
+    ultimo_intento = models.DateTimeField(blank=True, null=True)
+    # Si alguna vez se conectó con un agente (CONNECT o ANSWER)
+    contactado = models.BooleanField(default=False)
+    ultimo_evento = models.CharField(max_length=32, blank=True, null=True)
+    fecha_ultimo_evento = models.DateTimeField(blank=True, null=True)
+    opcion_calificacion_id = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        unique_together = [('campana_id', 'contacto_id')]
+        index_together = [('campana_id', 'ultimo_evento')]
@@ -53,6 +53,7 @@ class ReporteAgentes(object):
         self.datos_agentes = {}
         self.tiempos = []
         self.user = user
+        self.lista_pausas = None
 
     def devuelve_reporte_agentes(self, agentes, fecha_inicio, fecha_fin):
         fecha_inicio = datetime_hora_minima_dia(fecha_inicio)
@@ -62,7 +63,7 @@ class ReporteAgentes(object):
         self.calcula_total_intentos_fallidos(agentes, fecha_inicio, fecha_fin)
         self.calcula_llamadas_entrantes_no_atendidas(agentes, fecha_inicio, fecha_fin)
         self.calcula_llamadas_entrantes_rechazadas(agentes, fecha_inicio, fecha_fin)
-        self._genera_tiempos_totales_agentes()
+        self._genera_tiempos_totales_agentes(fecha_inicio, fecha_fin)
         dict_agentes_llamadas = self._obtener_total_agentes_tipo_llamada(fecha_inicio, fecha_fin)
         return {
             'fecha_desde': fecha_inicio,
@@ -102,7 +103,7 @@ class ReporteAgentes(object):
                 self.datos_agentes[agente_id].obtener_tiempo_total_llamada_campana(
                     campana, log, transferencias)
 
-        self._genera_tiempos_totales_agentes()
+        self._genera_tiempos_totales_agentes(fecha_inicio, fecha_fin)
         if len(self.tiempos) == 0:
             return AgenteTiemposReporte(agente.id, 0, 0, 0, 0, 0, 0, 0, 0, 0)
 
@@ -134,7 +135,7 @@ class ReporteAgentes(object):
         totales_llamadas = LlamadaLog.objects.obtener_agentes_campanas_total(
             eventos_llamadas, fecha_inferior, fecha_superior, list(agentes_dict.keys()),
             campanas)
-        lista_pausas = list(Pausa.objects.all())
+        lista_pausas = self._obtener_pausas()
         campanas_ids = campanas.values_list('id', flat=True)
         cantidades_transferencias = LlamadaLog.objects. \
             obtener_cantidades_de_transferencias_recibidas(
@@ -159,7 +160,7 @@ class ReporteAgentes(object):
         agentes_dict = {agente.id: agente for agente in agentes}
         logs_time = LlamadaLog.objects.obtener_count_evento_agente(
             eventos_llamadas, fecha_inferior, fecha_superior, list(agentes_dict.keys()))
-        lista_pausas = list(Pausa.objects.all())
+        lista_pausas = self._obtener_pausas()
         fecha_limite = min(now(), fecha_superior)
         for log in logs_time:
             agente_id = int(log[0])
@@ -170,22 +171,36 @@ class ReporteAgentes(object):
             self.datos_agentes[agente_id].intentos_fallidos += int(log[1])
 
     def calcula_llamadas_entrantes_rechazadas(self, agentes, fecha_inferior, fecha_superior):
-        for agente in agentes:
-            total_call_rejets = LlamadaLog.objects.\
-                cantidad_llamadas_rechazadas_fecha(agente.id, fecha_inferior, fecha_superior)
-            if total_call_rejets:
-                self.datos_agentes[agente.id].entrantes_rechazadas += total_call_rejets
+        agentes_dict = {agente.id: agente for agente in agentes}
+        cantidades = LlamadaLog.objects.cantidad_llamadas_rechazadas_por_agente(
+            list(agentes_dict.keys()), fecha_inferior, fecha_superior)
+        for agente_id, cantidad in cantidades.items():
+            datos_agente = self._obtener_datos_agente(agentes_dict[agente_id], fecha_superior)
+            datos_agente.entrantes_rechazadas += cantidad
 
     def calcula_llamadas_entrantes_no_atendidas(self, agentes, fecha_inferior, fecha_superior):
-        for agente in agentes:
-            total_call = LlamadaLog.objects.\
-                cantidad_llamadas_no_atendidas_fecha(agente.id, fecha_inferior, fecha_superior)
-            if total_call:
-                self.datos_agentes[agente.id].entrantes_no_atendidas += total_call
-
-    def _genera_tiempos_totales_agentes(self):
+        agentes_dict = {agente.id: agente for agente in agentes}
+        cantidades = LlamadaLog.objects.cantidad_llamadas_no_atendidas_por_agente(
+            list(agentes_dict.keys()), fecha_inferior, fecha_superior)
+        for agente_id, cantidad in cantidades.items():
+            datos_agente = self._obtener_datos_agente(agentes_dict[agente_id], fecha_superior)
+            datos_agente.entrantes_no_atendidas += cantidad
+
+    def _obtener_datos_agente(self, agente, fecha_superior):
+        if agente.id not in self.datos_agentes:
+            self.datos_agentes[agente.id] = ActividadAgente(
+                agente, min(now(), fecha_superior), lista_pausas=self._obtener_pausas())
+        return self.datos_agentes[agente.id]
+
+    def _obtener_pausas(self):
+        if self.lista_pausas is None:
+            self.lista_pausas = list(Pausa.objects.all())
+        return self.lista_pausas
+
+    def _genera_tiempos_totales_agentes(self, fecha_inicio, fecha_fin):
+        logs_hold = self._cargar_logs_hold_agentes(fecha_inicio, fecha_fin)
         for agente in self.datos_agentes.values():
-            agente.calcula_totales()
+            agente.calcula_totales(logs_hold.get(agente.agente.id, []))
             self.tiempos.append(AgenteTiemposReporte(
                 agente.agente, agente.tiempo_sesion,
                 agente.tiempo_pausa,
@@ -193,6 +208,16 @@ class ReporteAgentes(object):
                 agente.tiempo_hold, agente.transferidas_a_agente, agente.entrantes_no_atendidas,
                 agente.entrantes_rechazadas))
 
+    def _cargar_logs_hold_agentes(self, fecha_inicio, fecha_fin):
+        """ Logs de las llamadas con HOLD de todos los agentes del reporte, por agente """
+        logs_por_agente = {}
+        logs = LlamadaLog.objects.obtener_logs_llamadas_con_hold(
+            list(self.datos_agentes.keys()), datetime_hora_minima_dia(fecha_inicio),
+            datetime_hora_maxima_dia(fecha_fin))
+        for log in logs:
+            logs_por_agente.setdefault(log.agente_id, []).append(log)
+        return logs_por_agente
+
     def _genera_tiempo_total_llamada_campana(self):
         res = []
         for agente in self.datos_agentes.values():
@@ -202,7 +227,7 @@ class ReporteAgentes(object):
     def _procesa_tiempos_pausa(self, agentes, fecha_inicio, fecha_fin):
         agentes_dict = {agente.id: agente for agente in agentes}
         logs_agentes = self._cargar_logs_agentes(list(agentes_dict.keys()), fecha_inicio, fecha_fin)
-        lista_pausas = list(Pausa.objects.all())
+        lista_pausas = self._obtener_pausas()
         fecha_limite = min(now(), fecha_fin)
         for agente_id, fecha, event, pausa_id in logs_agentes[::-1]:
             datos_agente_actual = self.datos_agentes.setdefault(
@@ -224,13 +249,14 @@ class ReporteAgentes(object):
         dict_agentes_llamadas = {}
         agente_ids = self.datos_agentes.keys()
         agentes_tipo_llamadas = self._obtener_llamadas_agente(agente_ids, fecha_inicio, fecha_fin)
+        totales_llamadas = self._totales_llamadas(agente_ids, fecha_inicio, fecha_fin)
         dict_agentes_llamadas['nombres_agentes'] = []
         dict_agentes_llamadas['total_agentes'] = []
         for datos_agente in self.datos_agentes.values():
             dict_agentes_llamadas['nombres_agentes'].append(
                 datos_agente.agente.user.get_full_name())
             dict_agentes_llamadas['total_agentes'].append(
-                self._total_llamadas(datos_agente.agente.pk, fecha_inicio, fecha_fin))
+                totales_llamadas.get(datos_agente.agente.pk, 0))
         dict_agentes_llamadas['total_agente_dialer'] = self. \
             _obtener_cantidad_por_tipo_de_llamada(
             agentes_tipo_llamadas, agente_ids, Campana.TYPE_DIALER)
@@ -293,17 +319,14 @@ class ReporteAgentes(object):
 
         return adicionar_render_unicode(barra_agente_total)
 
-    def _total_llamadas(self, agente_id, fecha_inferior, fecha_superior):
+    def _totales_llamadas(self, agente_ids, fecha_inferior, fecha_superior):
         eventos_llamadas = list(LlamadaLog.EVENTOS_INICIO_CONEXION)
 
         llamadas = LlamadaLog.objects.obtener_count_agente().filter(
             time__range=(fecha_inferior, fecha_superior),
-            agente_id=agente_id,
+            agente_id__in=agente_ids,
             event__in=eventos_llamadas).exclude(campana_id=0, event__in=('BT-ANSWER', 'CT-ACCEPT'))
-        total = 0
-        for llamada in llamadas:
-            total = llamada['cantidad']
-        return total
+        return {llamada['agente_id']: llamada['cantidad'] for llamada in llamadas}
 
     def _obtener_transferidas_a_encuesta(self, agente_ids, fecha_inicio, fecha_fin):
         transferencias = TransferenciaAEncuestaLog.objects.filter(agente_id__in=agente_ids,
@@ -366,11 +389,12 @@ class ActividadAgente(object):
 
         self._procesa_pausa_log(event, time, pausa_id)
 
-    def calcula_totales(self):
+    def calcula_totales(self, logs_hold=None):
         self._totaliza_pausas()
         self._totaliza_sesiones()
         if self.sesiones != []:
-            self._procesa_tiempo_hold(self.sesiones[0].fecha_inicio, self.sesiones[-1].fecha_fin)
+            self._procesa_tiempo_hold(
+                self.sesiones[0].fecha_inicio, self.sesiones[-1].fecha_fin, logs_hold)
 
     def obtener_tiempo_total_llamada_campana(self, campana, log, transferencias):
         DURACION = 2
@@ -446,35 +470,36 @@ class ActividadAgente(object):
             self.pausas.append(PausaAgente(
                 pausa_id, self.pausas_por_id[str(pausa_id)], fecha_inicio=time))
 
-    def _procesa_tiempo_hold(self, fecha_inicio, fecha_fin):
+    def _procesa_tiempo_hold(self, fecha_inicio, fecha_fin, logs_hold=None):
         fecha_superior = datetime_hora_maxima_dia(fecha_fin)
         fecha_inferior = datetime_hora_minima_dia(fecha_inicio)
-        logs = [hold for hold in LlamadaLog.objects.using('replica')
-                .filter(agente_id=self.agente.id, event='HOLD', time__range=(fecha_inferior,
-                                                                             fecha_superior))]
-        for log in logs:
-            inicio_hold = log.time
-            callid = log.callid
-            holdid = log.id
-            unholds = LlamadaLog.objects.using('replica')\
-                .filter(agente_id=self.agente.id, callid=callid,
-                        event='UNHOLD',
-                        time__range=(log.time, fecha_superior)).order_by('time').first()
-            if unholds:
-                # Si existen varios unhold dentro de una llamada se elige el primero
-                fin_hold = unholds.time
-            else:
-                # Si se corta la llamada sin haber podido hacer unhold o por otro motivo
-                log_llamada = LlamadaLog.objects.using('replica')\
-                    .filter(agente_id=self.agente.id, callid=callid,
-                            time__range=(inicio_hold, fecha_superior))\
-                    .exclude(id=holdid).order_by('time').first()
-                if log_llamada and log_llamada.event != 'HOLD':
-                    fin_hold = log_llamada.time
+        if logs_hold is None:
+            logs_hold = LlamadaLog.objects.obtener_logs_llamadas_con_hold(
+                [self.agente.id], fecha_inferior, fecha_superior)
+        logs_por_callid = {}
+        for log in logs_hold:
+            if fecha_inferior <= log.time <= fecha_superior:
+                logs_por_callid.setdefault(log.callid, []).append(log)
+
+        for logs_llamada in logs_por_callid.values():
+            for log in logs_llamada:
+                if log.event != 'HOLD':
+                    continue
+                inicio_hold = log.time
+                posteriores = [log_posterior for log_posterior in logs_llamada
+                               if log_posterior.time >= inicio_hold and log_posterior.id != log.id]
+                unholds = [log_posterior for log_posterior in posteriores
+                           if log_posterior.event == 'UNHOLD']
+                if unholds:
+                    # Si existen varios unhold dentro de una llamada se elige el primero
+                    fin_hold = unholds[0].time
+                elif posteriores and posteriores[0].event != 'HOLD':
+                    # Si se corta la llamada sin haber podido hacer unhold o por otro motivo
+                    fin_hold = posteriores[0].time
                 else:
                     fin_hold = now() \
                         if datetime_hora_maxima_dia(fecha_superior) >= now() else fecha_superior
-            self.tiempo_hold += fin_hold - inicio_hold
+                self.tiempo_hold += fin_hold - inicio_hold
 
 
 class BaseActividadAgente(object):
@@ -264,11 +264,13 @@ class ReporteDiarioAgentesFamily(AbstractRedisChanelPublisher):
         return "OML:AGENT_REPORT:CURRENT_DAY_STATS"
 
     def regenerar_families(self):
-        """regenera la family"""
-        self._delete_tree_family()
+        """
+        Publica las estadísticas del día de cada agente.
+        Los canales pub/sub no dejan keys en Redis, por lo que no hay nada que eliminar antes
+        de publicar (recorrer el keyspace con SCAN en cada ejecución no tenía efecto).
+        """
         self._create_families()
 
     def regenerar_family(self, family_member):
         """regenera una family"""
-        self.delete_family(family_member)
         self._create_family(family_member)
@@ -23,8 +23,7 @@ from django.utils.translation import gettext as _
 from django.utils.encoding import force_text
 
 from ominicontacto_app.models import Campana
-from ominicontacto_app.utiles import fecha_hora_local
-from reportes_app.models import LlamadaLog
+from reportes_app.models import LlamadaLog, ResumenHorarioLlamadaLog
 from reportes_app.utiles import (
     ESTILO_AMARILLO_VERDE_ROJO, ESTILO_AZUL_VIOLETA_NARANJA_CELESTE, ESTILO_VERDE_AZUL,
     ESTILO_ROJO_VERDE_GRIS_NEGRO, ESTILO_VERDE_GRIS_NEGRO_ROJO, ESTILO_VERDE_ROJO
@@ -134,13 +133,33 @@ CAMPANA_TYPES = {
 }
 
 
+CAMPOS_TOTALES = ('campana_id', 'tipo_campana', 'tipo_llamada', 'event')
+
+
+class TotalDeLlamadas(object):
+    """
+    Cantidad de logs de llamadas de una fecha con el mismo evento, campaña y tipos.
+    Se contabiliza igual que un LlamadaLog pero sumando `cantidad` en lugar de 1.
+    """
+
+    def __init__(self, total):
+        self.campana_id = total['campana_id']
+        self.tipo_campana = total['tipo_campana']
+        self.tipo_llamada = total['tipo_llamada']
+        self.event = total['event']
+        self.fecha = total['fecha']
+        self.cantidad = total['cantidad_total']
+        self.bridge_wait_time = total['bridge_wait_time_total']
+
+
 class ReporteDeLlamadas(object):
 
     def __init__(self, desde, hasta, incluir_finalizadas, user):
         self.campanas = self._campanas_implicadas(user, incluir_finalizadas)
         campanas_ids = self.campanas.values_list('id', flat=True)
-        self.logs = LlamadaLog.objects.using('replica')\
-            .filter(time__gte=desde, time__lte=hasta, campana_id__in=campanas_ids)
+        self.totales = ResumenHorarioLlamadaLog.objects.obtener_totales(
+            desde, hasta, CAMPOS_TOTALES, por_fecha=True, using='replica',
+            campana_id__in=list(campanas_ids))
 
         self._inicializar_conteo_de_estadisticas(desde, hasta)
 
@@ -229,8 +248,9 @@ class ReporteDeLlamadas(object):
         self.estadisticas_por_fecha['tipos_de_llamada_por_campana'][tipo][campana.id] = {}
 
     def _contabilizar_estadisticas(self):
-        for log in self.logs:
-            fecha = fecha_hora_local(log.time).strftime('%d-%m-%Y')
+        for total in self.totales:
+            log = TotalDeLlamadas(total)
+            fecha = log.fecha.strftime('%d-%m-%Y')
             tipo_campana = str(log.tipo_campana)
             tipo_llamada = str(log.tipo_llamada)
             if tipo_llamada == str(LLAMADA_TRANSF_INTERNA):
@@ -261,67 +281,67 @@ class ReporteDeLlamadas(object):
     def _contabilizar_total_llamadas_procesadas(self, log):
         if log.event == 'DIAL' or (log.event in ['ENTERQUEUE', 'ABANDONWEL'] and
                                    log.tipo_campana == Campana.TYPE_ENTRANTE):
-            self.estadisticas['total_llamadas_procesadas'] += 1
+            self.estadisticas['total_llamadas_procesadas'] += log.cantidad
         #  Contabilizar solo llamadas transferidas a OTRA CAMPAÑA: ENTERQUEUE-TRANSFER
         if log.event == 'ENTERQUEUE-TRANSFER':
-            self.estadisticas['total_llamadas_procesadas'] += 1
+            self.estadisticas['total_llamadas_procesadas'] += log.cantidad
 
     def _contabilizar_llamada_por_tipo(self, estadisticas_tipo, log):
         # Contabilizar solo llamadas transferidas a OTRA CAMPAÑA: ENTERQUEUE-TRANSFER
         if log.tipo_llamada == LLAMADA_TRANSF_INTERNA:
             if log.event == 'ENTERQUEUE-TRANSFER':
-                estadisticas_tipo['total'] += 1
+                estadisticas_tipo['total'] += log.cantidad
             elif log.event == 'CONNECT':
-                estadisticas_tipo['transferidas_atendidas'] += 1
+                estadisticas_tipo['transferidas_atendidas'] += log.cantidad
         elif log.event == 'CAMPT-FAIL':
-            estadisticas_tipo['transferidas_no_atendidas'] += 1
+            estadisticas_tipo['transferidas_no_atendidas'] += log.cantidad
         elif log.event == 'DIAL':
             if not log.tipo_llamada == Campana.TYPE_ENTRANTE:
-                estadisticas_tipo['total'] += 1
+                estadisticas_tipo['total'] += log.cantidad
         elif log.event == 'ENTERQUEUE':
             if log.tipo_llamada == Campana.TYPE_ENTRANTE:
-                estadisticas_tipo['total'] += 1
+                estadisticas_tipo['total'] += log.cantidad
         elif log.event == 'ANSWER':
             if log.tipo_llamada in LLAMADAS_DE_AGENTE:
-                estadisticas_tipo['conectadas'] += 1
+                estadisticas_tipo['conectadas'] += log.cantidad
             elif log.tipo_llamada == Campana.TYPE_DIALER:
-                estadisticas_tipo['atendidas'] += 1
+                estadisticas_tipo['atendidas'] += log.cantidad
         elif log.event == 'CONNECT':
             if log.tipo_llamada == Campana.TYPE_ENTRANTE:
-                estadisticas_tipo['atendidas'] += 1
+                estadisticas_tipo['atendidas'] += log.cantidad
         elif log.event == 'EXITWITHTIMEOUT':
             if log.tipo_llamada == Campana.TYPE_DIALER:
-                estadisticas_tipo['perdidas'] += 1
+                estadisticas_tipo['perdidas'] += log.cantidad
             elif log.tipo_llamada == Campana.TYPE_ENTRANTE:
-                estadisticas_tipo['expiradas'] += 1
+                estadisticas_tipo['expiradas'] += log.cantidad
         elif log.event == 'ABANDON':
             if log.tipo_llamada == Campana.TYPE_DIALER:
-                estadisticas_tipo['perdidas'] += 1
+                estadisticas_tipo['perdidas'] += log.cantidad
             if log.tipo_llamada == Campana.TYPE_ENTRANTE:
-                estadisticas_tipo['abandonadas'] += 1
+                estadisticas_tipo['abandonadas'] += log.cantidad
         elif log.event == 'ABANDONWEL':
             # solo las campañas entrantes tienen este evento
             assert log.tipo_llamada == Campana.TYPE_ENTRANTE
-            estadisticas_tipo['total'] += 1
-            estadisticas_tipo['abandonadas_anuncio'] += 1
+            estadisticas_tipo['total'] += log.cantidad
+            estadisticas_tipo['abandonadas_anuncio'] += log.cantidad
         elif log.event in LlamadaLog.EVENTOS_NO_CONTACTACION:
             if log.tipo_llamada in LLAMADAS_DE_AGENTE:
-                estadisticas_tipo['no_conectadas'] += 1
+                estadisticas_tipo['no_conectadas'] += log.cantidad
             elif log.tipo_llamada == Campana.TYPE_DIALER:
-                estadisticas_tipo['no_atendidas'] += 1
+                estadisticas_tipo['no_atendidas'] += log.cantidad
 
     def _contabilizar_llamadas_por_campana(self, log):
         estadisticas_campana = self.estadisticas['llamadas_por_campana'][log.campana_id]
         if log.event == 'DIAL':
-            estadisticas_campana['total'] += 1
+            estadisticas_campana['total'] += log.cantidad
             if log.tipo_llamada in LLAMADAS_MANUALES:
-                estadisticas_campana['manuales'] += 1
+                estadisticas_campana['manuales'] += log.cantidad
         elif log.event in ['ENTERQUEUE', 'ABANDONWEL']:
             if log.tipo_campana == Campana.TYPE_ENTRANTE:
-                estadisticas_campana['total'] += 1
+                estadisticas_campana['total'] += log.cantidad
         elif log.event == 'ENTERQUEUE-TRANSFER':
             # assert(log.tipo_campana == Campana.TYPE_ENTRANTE, 'Transfiere a campaña no entrante?')
-            estadisticas_campana['total'] += 1
+            estadisticas_campana['total'] += log.cantidad
 
     def _contabilizar_tipos_de_llamada_por_campana(self, estadisticas_campana, log):
         if log.tipo_campana == Campana.TYPE_MANUAL:
@@ -337,60 +357,60 @@ class ReporteDeLlamadas(object):
         if not log.tipo_campana == Campana.TYPE_MANUAL and log.tipo_llamada in LLAMADAS_MANUALES:
             self._contabilizar_tipos_de_llamada_manual(datos_campana, log)
         if log.event == 'DIAL':
-            datos_campana['efectuadas'] += 1
+            datos_campana['efectuadas'] += log.cantidad
         elif log.event == 'ANSWER':
-            datos_campana['conectadas'] += 1
+            datos_campana['conectadas'] += log.cantidad
             datos_campana['t_espera_conexion'] += log.bridge_wait_time
         elif log.event in LlamadaLog.EVENTOS_NO_CONTACTACION:
-            datos_campana['no_conectadas'] += 1
+            datos_campana['no_conectadas'] += log.cantidad
             datos_campana['t_espera_conexion'] += log.bridge_wait_time
 
     def _contabilizar_tipos_de_llamada_por_campana_dialer(self, datos_campana, log):
         if log.tipo_llamada in LLAMADAS_MANUALES:
             self._contabilizar_tipos_de_llamada_manual(datos_campana, log)
         elif log.event == 'DIAL':
-            datos_campana['efectuadas'] += 1
+            datos_campana['efectuadas'] += log.cantidad
         elif log.event == 'ANSWER':
-            datos_campana['atendidas'] += 1
+            datos_campana['atendidas'] += log.cantidad
             datos_campana['t_espera_atencion'] += log.bridge_wait_time
         elif log.event == 'CONNECT':
-            datos_campana['conectadas'] += 1
+            datos_campana['conectadas'] += log.cantidad
             datos_campana['t_espera_conexion'] += log.bridge_wait_time
         elif log.event == 'EXITWITHTIMEOUT':
-            datos_campana['expiradas'] += 1
+            datos_campana['expiradas'] += log.cantidad
         elif log.event == 'ABANDON':
-            datos_campana['abandonadas'] += 1
+            datos_campana['abandonadas'] += log.cantidad
             datos_campana['t_abandono'] += log.bridge_wait_time
 
     def _contabilizar_tipos_de_llamada_por_campana_entrante(self, datos_campana, log):
         if log.tipo_llamada in LLAMADAS_MANUALES:
             self._contabilizar_tipos_de_llamada_manual(datos_campana, log)
         elif log.event == 'ENTERQUEUE':
-            datos_campana['recibidas'] += 1
+            datos_campana['recibidas'] += log.cantidad
         elif log.event == 'ENTERQUEUE-TRANSFER':
-            datos_campana['recibidas'] += 1
-            datos_campana['recibidas_transferencias'] += 1
+            datos_campana['recibidas'] += log.cantidad
+            datos_campana['recibidas_transferencias'] += log.cantidad
         elif log.event == 'CONNECT':
-            datos_campana['atendidas'] += 1
+            datos_campana['atendidas'] += log.cantidad
             datos_campana['t_espera_conexion'] += log.bridge_wait_time
         elif log.event == 'EXITWITHTIMEOUT':
-            datos_campana['expiradas'] += 1
+            datos_campana['expiradas'] += log.cantidad
         elif log.event == 'ABANDON':
-            datos_campana['abandonadas'] += 1
+            datos_campana['abandonadas'] += log.cantidad
             datos_campana['t_abandono'] += log.bridge_wait_time
         elif log.event == 'ABANDONWEL':
-            datos_campana['recibidas'] += 1
-            datos_campana['abandonadas_anuncio'] += 1
+            datos_campana['recibidas'] += log.cantidad
+            datos_campana['abandonadas_anuncio'] += log.cantidad
             datos_campana['t_abandono'] += log.bridge_wait_time
 
     def _contabilizar_tipos_de_llamada_manual(self, datos_campana, log):
         if log.event == 'DIAL':
-            datos_campana['efectuadas_manuales'] += 1
+            datos_campana['efectuadas_manuales'] += log.cantidad
         elif log.event == 'ANSWER':
-            datos_campana['conectadas_manuales'] += 1
+            datos_campana['conectadas_manuales'] += log.cantidad
             datos_campana['t_espera_conexion_manuales'] += log.bridge_wait_time
         elif log.event in LlamadaLog.EVENTOS_NO_CONTACTACION:
-            datos_campana['no_conectadas_manuales'] += 1
+            datos_campana['no_conectadas_manuales'] += log.cantidad
             datos_campana['t_espera_conexion_manuales'] += log.bridge_wait_time
 
     def _aplicar_promedios_a_tiempos(self):
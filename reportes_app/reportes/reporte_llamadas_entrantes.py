@@ -26,6 +26,8 @@ from reportes_app.models import LlamadaLog
 from ominicontacto_app.utiles import datetime_hora_maxima_dia, datetime_hora_minima_dia
 from ominicontacto_app.models import CalificacionCliente, Campana, OpcionCalificacion
 from ominicontacto_app.services.asterisk.redis_database import AbstractRedisFamily
+from reportes_app.reportes.supervision_incremental import (
+    FamilySupervisionIncrementalMixin, filtrar_rango_de_ids)
 
 import logging as _logging
 
@@ -46,7 +48,13 @@ class ReporteDeLLamadasEntrantesDeSupervision(object):
     EVENTOS_LLAMADA = ['ENTERQUEUE', 'ENTERQUEUE-TRANSFER', 'CONNECT', 'EXITWITHTIMEOUT', 'ABANDON',
                        'ABANDONWEL']
 
-    def __init__(self):
+    def __init__(self, id_log_desde=None, id_log_hasta=None):
+        """
+        Los parámetros id_log_desde e id_log_hasta restringen los logs de llamadas a
+        contabilizar, para calcular solo los incrementos desde la última actualización.
+        """
+        self.id_log_desde = id_log_desde
+        self.id_log_hasta = id_log_hasta
         query_campanas = Campana.objects.obtener_actuales().filter(type=Campana.TYPE_ENTRANTE)
         self.campanas = {}
         for campana in query_campanas:
@@ -70,11 +78,12 @@ class ReporteDeLLamadasEntrantesDeSupervision(object):
             self._contabilizar_tipos_de_llamada_por_campana(estadisticas_campana, log)
 
     def _obtener_logs_de_llamadas(self):
-        return LlamadaLog.objects.using('replica').filter(time__gte=self.desde,
+        logs = LlamadaLog.objects.using('replica').filter(time__gte=self.desde,
                                                           time__lte=self.hasta,
                                                           campana_id__in=self.campanas.keys(),
                                                           event__in=self.EVENTOS_LLAMADA,
                                                           tipo_llamada=LlamadaLog.LLAMADA_ENTRANTE)
+        return filtrar_rango_de_ids(logs, self.id_log_desde, self.id_log_hasta)
 
     def _inicializar_conteo_de_campana(self, campana):
         datos_campana = self.INICIALES.copy()
@@ -193,13 +202,25 @@ class ReporteDeLLamadasEntrantesDeSupervision(object):
             self.estadisticas[campana_id]['llamadas_en_espera'] = llamadas_en_cola_campana
 
 
-class ReporteLlamadasEntranteFamily(AbstractRedisFamily):
+class ReporteLlamadasEntranteFamily(FamilySupervisionIncrementalMixin, AbstractRedisFamily):
+    CONTADORES = ('llamadas_atendidas', 'llamadas_abandonadas', 'llamadas_expiradas',
+                  'tiempo_acumulado_abandonadas', 'tiempo_acumulado_espera')
+    NOMBRE_MARCA = 'OML:SUPERVISION_WATERMARK:CAMPAIGN'
 
     def _create_dict(self, family_member):
         return family_member[1]
 
+    def _crear_reporte(self, id_log_desde=None, id_log_hasta=None):
+        return ReporteDeLLamadasEntrantesDeSupervision(id_log_desde, id_log_hasta)
+
+    def _crear_variables(self, campana_id, datos):
+        return self._create_dict((campana_id, datos))
+
+    def _get_nombre_family_campana(self, campana_id):
+        return self._get_nombre_family((campana_id, None))
+
     def _obtener_todos(self):
-        reporte = ReporteDeLLamadasEntrantesDeSupervision()
+        reporte = self._crear_reporte()
         return [(campana_id, datos) for campana_id, datos in reporte.estadisticas.items()]
 
     def _get_nombre_family(self, family_member):
@@ -208,11 +229,6 @@ class ReporteLlamadasEntranteFamily(AbstractRedisFamily):
     def get_nombre_families(self):
         return "OML:SUPERVISION_CAMPAIGN"
 
-    def regenerar_families(self):
-        """regenera la family"""
-        self._delete_tree_family()
-        self._create_families()
-
     def regenerar_family(self, family_member):
         """regenera una family"""
         self.delete_family(family_member)
@@ -24,6 +24,8 @@ from django.db.models import Count
 import json
 
 from ominicontacto_app.services.asterisk.redis_database import AbstractRedisFamily
+from reportes_app.reportes.supervision_incremental import (
+    FamilySupervisionIncrementalMixin, filtrar_rango_de_ids)
 from ominicontacto_app.models import CalificacionCliente, Campana, OpcionCalificacion
 from reportes_app.models import LlamadaLog
 
@@ -38,7 +40,13 @@ class ReporteDeLLamadasSalientesDeSupervision(object):
     }
     EVENTOS_LLAMADA = ('DIAL', 'ANSWER') + LlamadaLog.EVENTOS_NO_CONEXION
 
-    def __init__(self):
+    def __init__(self, id_log_desde=None, id_log_hasta=None):
+        """
+        Los parámetros id_log_desde e id_log_hasta restringen los logs de llamadas a
+        contabilizar, para calcular solo los incrementos desde la última actualización.
+        """
+        self.id_log_desde = id_log_desde
+        self.id_log_hasta = id_log_hasta
         query_campanas = Campana.objects.obtener_all_dialplan_asterisk().filter(
             type__in=[Campana.TYPE_PREVIEW, Campana.TYPE_MANUAL])
         self.campanas = {}
@@ -53,11 +61,12 @@ class ReporteDeLLamadasSalientesDeSupervision(object):
         self._calcular_porcentaje_objetivo()
 
     def _obtener_logs_de_llamadas(self):
-        return LlamadaLog.objects.using('replica')\
+        logs = LlamadaLog.objects.using('replica')\
             .filter(time__gte=self.desde,
                     time__lte=self.hasta,
                     campana_id__in=self.campanas.keys(),
                     event__in=self.EVENTOS_LLAMADA)
+        return filtrar_rango_de_ids(logs, self.id_log_desde, self.id_log_hasta)
 
     def _inicializar_conteo_de_campana(self, campana):
         datos_campana = self.INICIALES.copy()
@@ -122,7 +131,10 @@ class ReporteDeLLamadasSalientesDeSupervision(object):
             datos_campana['conectadas'] += 1
 
 
-class ReporteLlamadasSalienteFamily(AbstractRedisFamily):
+class ReporteLlamadasSalienteFamily(FamilySupervisionIncrementalMixin, AbstractRedisFamily):
+    CONTADORES = ('efectuadas', 'conectadas', 'no_conectadas')
+    NOMBRE_MARCA = 'OML:SUPERVISION_WATERMARK:SALIENTE'
+    ESTADISTICAS_EN_JSON = True
 
     def _create_dict(self, datos_saliente):
         dict_saliente = {
@@ -154,8 +166,17 @@ class ReporteLlamadasSalienteFamily(AbstractRedisFamily):
             campana_id = familia_member[0]
             self._create_family(campana_id, familia_member[1])
 
+    def _crear_reporte(self, id_log_desde=None, id_log_hasta=None):
+        return ReporteDeLLamadasSalientesDeSupervision(id_log_desde, id_log_hasta)
+
+    def _crear_variables(self, campana_id, datos):
+        return self._create_dict(datos)
+
+    def _get_nombre_family_campana(self, campana_id):
+        return self._get_nombre_family(campana_id)
+
     def _obtener_todos(self):
-        reporte = ReporteDeLLamadasSalientesDeSupervision()
+        reporte = self._crear_reporte()
         return [(campana_id, datos) for campana_id, datos in reporte.estadisticas.items()]
 
     def get_value(self, campana, key):
@@ -182,11 +203,6 @@ class ReporteLlamadasSalienteFamily(AbstractRedisFamily):
         except (RedisError) as e:
             raise e
 
-    def regenerar_families(self):
-        """regenera la family"""
-        self._delete_tree_family()
-        self._create_families()
-
     # def regenerar_family(self, campana):
     # Necesitaria correr el reporte para regenerarla
     #     """regenera una family"""
@@ -26,6 +26,8 @@ from ominicontacto_app.utiles import datetime_hora_maxima_dia, datetime_hora_min
 from ominicontacto_app.models import CalificacionCliente, Campana, OpcionCalificacion
 
 from reportes_app.models import LlamadaLog
+from reportes_app.reportes.supervision_incremental import (
+    FamilySupervisionIncrementalMixin, filtrar_rango_de_ids)
 from reportes_app.services.redis_service import RedisService
 
 import logging as _logging
@@ -40,7 +42,13 @@ logger = _logging.getLogger(__name__)
 
 
 class ReporteDeLlamadasDeSupervision(object):
-    def __init__(self, user_supervisor=None):
+    def __init__(self, user_supervisor=None, id_log_desde=None, id_log_hasta=None):
+        """
+        Los parámetros id_log_desde e id_log_hasta restringen los logs de llamadas a
+        contabilizar, para calcular solo los incrementos desde la última actualización.
+        """
+        self.id_log_desde = id_log_desde
+        self.id_log_hasta = id_log_hasta
         if user_supervisor:
             query_campanas = self._obtener_campanas(user_supervisor)
         else:
@@ -263,8 +271,9 @@ class ReporteDeLLamadasDialerDeSupervision(ReporteDeLlamadasDeSupervision):
     }
     EVENTOS_LLAMADA = ('DIAL', 'CONNECT', 'ANSWER') + LlamadaLog.EVENTOS_NO_CONEXION
 
-    def __init__(self):
-        super(ReporteDeLLamadasDialerDeSupervision, self).__init__()
+    def __init__(self, id_log_desde=None, id_log_hasta=None):
+        super(ReporteDeLLamadasDialerDeSupervision, self).__init__(
+            id_log_desde=id_log_desde, id_log_hasta=id_log_hasta)
         self._contabilizar_llamadas_pendientes()
         self._contabilizar_llamadas_en_curso()
 
@@ -275,11 +284,12 @@ class ReporteDeLLamadasDialerDeSupervision(ReporteDeLlamadasDeSupervision):
             .filter(estado__in=[Campana.ESTADO_ACTIVA, Campana.ESTADO_PAUSADA])
 
     def _obtener_logs_de_llamadas(self):
-        return LlamadaLog.objects.using('replica').filter(time__gte=self.desde,
+        logs = LlamadaLog.objects.using('replica').filter(time__gte=self.desde,
                                                           time__lte=self.hasta,
                                                           campana_id__in=self.campanas.keys(),
                                                           tipo_llamada=Campana.TYPE_DIALER,
                                                           event__in=self.EVENTOS_LLAMADA)
+        return filtrar_rango_de_ids(logs, self.id_log_desde, self.id_log_hasta)
 
     def _contabilizar_tipos_de_llamada_por_campana(self, datos_campana, log):
         if log.event == 'DIAL':
@@ -333,10 +343,17 @@ class ReporteDeLLamadasDialerDeSupervision(ReporteDeLlamadasDeSupervision):
         cursor.execute(sql, params)
         values = cursor.fetchall()
         for campana_id, cantidad in values:
+            # En modo incremental solo están las campañas con logs nuevos
+            if campana_id not in self.estadisticas:
+                self._inicializar_conteo_de_campana(campana_id)
             self.estadisticas[campana_id]['canales_discando'] = cantidad
 
 
-class ReporteLlamadasDialersFamily(AbstractRedisFamily):
+class ReporteLlamadasDialersFamily(FamilySupervisionIncrementalMixin, AbstractRedisFamily):
+    CONTADORES = ('efectuadas', 'atendidas', 'no_atendidas', 'contestadores',
+                  'conectadas_perdidas')
+    NOMBRE_MARCA = 'OML:SUPERVISION_WATERMARK:DIALER'
+    ESTADISTICAS_EN_JSON = True
 
     def _create_dict(self, datos_reporte):
         dict_reporte = {
@@ -368,8 +385,22 @@ class ReporteLlamadasDialersFamily(AbstractRedisFamily):
             campana_id = familia_member[0]
             self._create_family(campana_id, familia_member[1])
 
+    def _crear_reporte(self, id_log_desde=None, id_log_hasta=None):
+        return ReporteDeLLamadasDialerDeSupervision(id_log_desde, id_log_hasta)
+
+    def _crear_variables(self, campana_id, datos):
+        return self._create_dict(datos)
+
+    def _datos_iniciales(self, reporte, campana):
+        datos = super(ReporteLlamadasDialersFamily, self)._datos_iniciales(reporte, campana)
+        datos['status'] = campana.estado
+        return datos
+
+    def _get_nombre_family_campana(self, campana_id):
+        return self._get_nombre_family(campana_id)
+
     def _obtener_todos(self):
-        reporte = ReporteDeLLamadasDialerDeSupervision()
+        reporte = self._crear_reporte()
         return [(campana_id, datos) for campana_id, datos in reporte.estadisticas.items()]
 
     def get_value(self, campana, key):
@@ -396,11 +427,6 @@ class ReporteLlamadasDialersFamily(AbstractRedisFamily):
         except (RedisError) as e:
             raise e
 
-    def regenerar_families(self):
-        """regenera la family"""
-        self._delete_tree_family()
-        self._create_families()
-
     # def regenerar_family(self, campana):
     # Necesitaria correr el reporte para regenerarla
     #     """regenera una family"""
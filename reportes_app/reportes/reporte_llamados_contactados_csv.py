@@ -31,8 +31,8 @@ import time
 import redis
 
 from django.conf import settings
+from django.db.models import Q
 from django.utils.encoding import force_text
-from django.core.paginator import Paginator
 
 from django.utils.translation import gettext as _
 from django.utils.timezone import localtime, timedelta
@@ -42,6 +42,7 @@ from ominicontacto_app.utiles import crear_archivo_en_media_root
 from ominicontacto_app.models import (
     BaseDatosContacto, Campana, Contacto, OpcionCalificacion, HistoricalCalificacionCliente)
 from ominicontacto_app.services.estadisticas_campana import EstadisticasBaseCampana
+from ominicontacto_app.services.progreso_tareas import ProgresoTarea
 
 from reportes_app.models import LlamadaLog
 
@@ -72,6 +73,33 @@ class ReporteCSV:
         port=settings.CONSTANCE_REDIS_CONNECTION['port'],
         decode_responses=True)
 
+    # Cantidad de logs de llamadas que se leen por consulta
+    TAMANO_LOTE_LOGS = 2000
+
+    def _iterar_lotes_logs(self, logs_llamadas):
+        """
+        Recorre los logs de a lotes ordenados por (time, id) descendente. Cada lote se obtiene
+        a partir de la clave del último log del lote anterior (keyset), evitando los OFFSET
+        que se vuelven más lentos a medida que se avanza en las páginas.
+        """
+        logs_llamadas = logs_llamadas.order_by('-time', '-id')
+        lote = list(logs_llamadas[:self.TAMANO_LOTE_LOGS])
+        while lote:
+            yield lote
+            if len(lote) < self.TAMANO_LOTE_LOGS:
+                break
+            ultimo = lote[-1]
+            lote = list(logs_llamadas.filter(
+                Q(time__lt=ultimo.time) | Q(time=ultimo.time, id__lt=ultimo.id))[
+                    :self.TAMANO_LOTE_LOGS])
+
+    def _obtener_contactos_lote(self, contactos, lote):
+        """ Devuelve un diccionario con los contactos referenciados por los logs del lote """
+        ids_contactos = set(log.contacto_id for log in lote if log.contacto_id is not None)
+        if not ids_contactos:
+            return {}
+        return {contacto.pk: contacto for contacto in contactos.filter(id__in=ids_contactos)}
+
     def _obtener_datos_contacto(self, contacto_id, campos_contacto, contactos_dict):
         contacto = contactos_dict.get(contacto_id, -1)
         if contacto != -1:
@@ -96,39 +124,32 @@ class ReporteContactadosCSV(EstadisticasBaseCampana, ReporteCSV):
         self.fecha_hasta = fecha_hasta
         self._inicializar_valores_estadisticas()
         self._inicializar_respuestas_formulario_gestion_historicas()
-        self.contactos_dict = {contacto.pk: contacto
-                               for contacto in self.campana.bd_contacto.contactos.all()}
+        self.contactos_dict = {}
         self.campos_contacto_datos = self.bd_metadata.nombres_de_columnas
-        self.datos = []
         self.campos_formulario_opciones = {}
         self.posiciones_opciones = {}
-        self._escribir_encabezado()
+        self.key_task = key_task
+        # Las filas se generan a medida que se escriben en el archivo
+        self.datos = self._generar_filas()
+
+    def _generar_filas(self):
+        yield self._escribir_encabezado()
 
         logs_llamadas = self._obtener_logs_de_llamadas() \
                             .filter(event__in=LlamadaLog.EVENTOS_FIN_CONEXION) \
                             .exclude(agente_id=-1)
 
-        numero_logs_llamadas = logs_llamadas.count()
-        if numero_logs_llamadas == 0:
-            porcentaje_inicial = 100
-        else:
-            porcentaje_inicial = 0
-        self.redis_connection.publish(key_task, porcentaje_inicial)  # percentage of task completed
+        progreso = ProgresoTarea(self.key_task, logs_llamadas.count(), self.redis_connection)
+        progreso.iniciar()
 
         callids_analizados = set()
-        i = 0
-        last_percentage = porcentaje_inicial
-        paginator = Paginator(logs_llamadas, 2000)
-        for page_number in paginator.page_range:
-            page = paginator.page(page_number)
-            for log_llamada in page:
-                i += 1
-                percentage = int((i / numero_logs_llamadas) * 100)
-                if (percentage - last_percentage) >= 10:
-                    self.redis_connection.publish(key_task, percentage)
-                    last_percentage = percentage
-
+        contactos_bd = self.campana.bd_contacto.contactos.all()
+        for lote in self._iterar_lotes_logs(logs_llamadas):
+            self.contactos_dict = self._obtener_contactos_lote(contactos_bd, lote)
+            for log_llamada in lote:
+                progreso.avanzar()
                 callid = log_llamada.callid
+                fila = None
                 try:
                     if callid not in callids_analizados:
                         calificacion_historica = self \
@@ -142,14 +163,16 @@ class ReporteContactadosCSV(EstadisticasBaseCampana, ReporteCSV):
                                                   calificacion_historica.observaciones
                                                   .replace('\r\n', ' '),
                                                   calificacion_historica.agente]
-                        self._escribir_linea_log(
+                        fila = self._escribir_linea_log(
                             log_llamada, datos_calificacion, calificacion_historica)
                         callids_analizados.add(callid)
                 except Exception as e:
                     logger.error("Error generando fila csv: " + e.__str__())
+                if fila is not None:
+                    yield fila
         # Forzar el cierre de la conexión del WS
         time.sleep(1)
-        self.redis_connection.publish(key_task, 100)
+        progreso.finalizar()
 
     def _obtener_datos_contacto_contactados(self, llamada_log, calificacion, datos_contacto):
         tel_status = _('Fuera de base')
@@ -195,8 +218,7 @@ class ReporteContactadosCSV(EstadisticasBaseCampana, ReporteCSV):
                         nombre = campo.nombre_campo
                         encabezado.append(nombre)
 
-        lista_datos_utf8 = [force_text(item) for item in encabezado]
-        self.datos.append(lista_datos_utf8)
+        return [force_text(item) for item in encabezado]
 
     def _escribir_linea_log(self, llamada_log, datos_calificacion, calificacion):
         datos_contacto = [''] * len(self.campos_contacto_datos)
@@ -251,8 +273,7 @@ class ReporteContactadosCSV(EstadisticasBaseCampana, ReporteCSV):
                 for campo in campos:
                     registro.append(datos.get(campo.nombre_campo, '').replace('\r\n', ' '))
 
-        lista_datos_utf8 = [force_text(item) for item in registro]
-        self.datos.append(lista_datos_utf8)
+        return [force_text(item) for item in registro]
 
 
 class ReporteCalificadosCSV(EstadisticasBaseCampana, ReporteCSV):
@@ -263,36 +284,34 @@ class ReporteCalificadosCSV(EstadisticasBaseCampana, ReporteCSV):
         self.fecha_desde = fecha_desde
         self.fecha_hasta = fecha_hasta
         self._inicializar_valores_estadisticas()
-        self.contactos_dict = {contacto.pk: contacto
-                               for contacto in self.campana.bd_contacto.contactos.all()}
         self.campos_contacto_datos = self.bd_metadata.nombres_de_columnas
-        self.datos = []
         self.campos_formularios_opciones = {}
         self.posiciones_opciones = {}
-        self._escribir_encabezado()
+        self.key_task = key_task
+        # Las filas se generan a medida que se escriben en el archivo
+        self.datos = self._generar_filas()
+
+    def _generar_filas(self):
+        yield self._escribir_encabezado()
 
         logs_llamadas = self._obtener_logs_de_llamadas()
 
-        numero_logs_llamadas = logs_llamadas.count()
-        if numero_logs_llamadas == 0:
-            porcentaje_inicial = 100
-        else:
-            porcentaje_inicial = 0
+        progreso = ProgresoTarea(self.key_task, logs_llamadas.count(), self.redis_connection)
         calificaciones_analizadas = set()
-        self.redis_connection.publish(key_task, porcentaje_inicial)  # percentage of task completed
-        for i, log_llamada in enumerate(logs_llamadas, start=1):
-            percentage = int((i / numero_logs_llamadas) * 100)
-            self.redis_connection.publish(key_task, percentage)
-            callid = log_llamada.callid
-            calificacion_historica = self.calificaciones_historicas_dict.get(callid, False)
-            calificacion_final = self.calificaciones_finales_dict.get(callid, False)
-            if campana.es_entrante:
-                calificacion = calificacion_historica
-            else:
-                calificacion = calificacion_final
-            if calificacion and (calificacion.pk not in calificaciones_analizadas):
-                self._escribir_linea_calificacion(calificacion, log_llamada)
-                calificaciones_analizadas.add(calificacion.pk)
+        progreso.iniciar()
+        for lote in self._iterar_lotes_logs(logs_llamadas):
+            for log_llamada in lote:
+                progreso.avanzar()
+                callid = log_llamada.callid
+                calificacion_historica = self.calificaciones_historicas_dict.get(callid, False)
+                calificacion_final = self.calificaciones_finales_dict.get(callid, False)
+                if self.campana.es_entrante:
+                    calificacion = calificacion_historica
+                else:
+                    calificacion = calificacion_final
+                if calificacion and (calificacion.pk not in calificaciones_analizadas):
+                    yield self._escribir_linea_calificacion(calificacion, log_llamada)
+                    calificaciones_analizadas.add(calificacion.pk)
 
     def _escribir_encabezado(self):
         # Creamos encabezado
@@ -320,8 +339,7 @@ class ReporteCalificadosCSV(EstadisticasBaseCampana, ReporteCSV):
                     for campo in campos:
                         nombre = campo.nombre_campo
                         encabezado.append(nombre)
-        lista_datos_utf8 = [force_text(item) for item in encabezado]
-        self.datos.append(lista_datos_utf8)
+        return [force_text(item) for item in encabezado]
 
     def _escribir_linea_calificacion(self, calificacion_val, log_llamada):
         lista_opciones = []
@@ -384,8 +402,7 @@ class ReporteCalificadosCSV(EstadisticasBaseCampana, ReporteCSV):
                 lista_opciones.append(
                     datos.get(campo.nombre_campo, '').replace('\r\n', ' '))
 
-        lista_datos_utf8 = [force_text(item) for item in lista_opciones]
-        self.datos.append(lista_datos_utf8)
+        return [force_text(item) for item in lista_opciones]
 
 
 class ReporteNoAtendidosCSV(EstadisticasBaseCampana, ReporteCSV):
@@ -395,26 +412,28 @@ class ReporteNoAtendidosCSV(EstadisticasBaseCampana, ReporteCSV):
         self.fecha_hasta = fecha_hasta
         self.bd_metadata = self.campana.bd_contacto.get_metadata()
         self.campos_contacto = self.bd_metadata.nombres_de_columnas
-        self.datos = []
-        self.contactos_dict = {contacto.pk: contacto
-                               for contacto in self.campana.bd_contacto.contactos.all()}
+        self.contactos_dict = {}
+        self.contactos_anteriores = {}
         self.agentes_dict = {}
         self._inicializar_valores_agentes()
-        self._escribir_encabezado()
-        logs_llamadas = self._obtener_logs_de_llamadas()
+        self.nombres_bases = {base.id: str(base) for base in BaseDatosContacto.objects.all()}
+        self.key_task = key_task
+        # Las filas se generan a medida que se escriben en el archivo
+        self.datos = self._generar_filas()
 
-        self.inicializar_datos_contacto_base_anterior(logs_llamadas)
+    def _generar_filas(self):
+        yield self._escribir_encabezado()
+        logs_llamadas = self._obtener_logs_de_llamadas()
 
-        numero_logs_llamadas = logs_llamadas.count()
-        if numero_logs_llamadas == 0:
-            porcentaje_inicial = 100
-        else:
-            porcentaje_inicial = 0
-        self.redis_connection.publish(key_task, porcentaje_inicial)  # percentage of task completed
-        for i, log_llamada in enumerate(logs_llamadas, start=1):
-            percentage = int((i / numero_logs_llamadas) * 100)
-            self.redis_connection.publish(key_task, percentage)
-            self._escribir_linea_log(log_llamada, self.contactos_dict, self.agentes_dict)
+        progreso = ProgresoTarea(self.key_task, logs_llamadas.count(), self.redis_connection)
+        progreso.iniciar()
+        for lote in self._iterar_lotes_logs(logs_llamadas):
+            self.inicializar_datos_contactos_lote(lote)
+            for log_llamada in lote:
+                progreso.avanzar()
+                fila = self._escribir_linea_log(log_llamada, self.contactos_dict, self.agentes_dict)
+                if fila is not None:
+                    yield fila
 
     def _escribir_encabezado(self):
         encabezado = []
@@ -428,8 +447,7 @@ class ReporteNoAtendidosCSV(EstadisticasBaseCampana, ReporteCSV):
         encabezado.append(_("id base de datos"))
         encabezado.append(_("base de datos"))
 
-        lista_datos_utf8 = [force_text(item) for item in encabezado]
-        self.datos.append(lista_datos_utf8)
+        return [force_text(item) for item in encabezado]
 
     def _escribir_linea_log(self, log_no_contactado, contactos_dict, agentes_dict):
         lista_opciones = []
@@ -465,17 +483,23 @@ class ReporteNoAtendidosCSV(EstadisticasBaseCampana, ReporteCSV):
             lista_opciones.append(bd_contacto)
 
             # --- Finalmente, escribimos la linea
-            lista_datos_utf8 = [force_text(item) for item in lista_opciones]
-            self.datos.append(lista_datos_utf8)
-
-    def inicializar_datos_contacto_base_anterior(self, logs_llamadas):
-        id_contactos_anteriores = set(logs_llamadas.values_list('contacto_id', flat=True))
-        id_contactos_anteriores.difference_update(self.contactos_dict.keys())
-        contactos_anteriores = Contacto.objects.filter(id__in=id_contactos_anteriores)
-        self.contactos_anteriores = {
-            contacto.pk: contacto for contacto in contactos_anteriores}
-
-        self.nombres_bases = {base.id: str(base) for base in BaseDatosContacto.objects.all()}
+            return [force_text(item) for item in lista_opciones]
+
+    def inicializar_datos_contactos_lote(self, lote):
+        """
+        Carga los contactos referenciados por los logs del lote, separando los de la base
+        actual de la campaña de los de bases anteriores
+        """
+        contactos = self._obtener_contactos_lote(
+            Contacto.objects.select_related('bd_contacto'), lote)
+        bd_contacto_id = self.campana.bd_contacto_id
+        self.contactos_dict = {}
+        self.contactos_anteriores = {}
+        for contacto_id, contacto in contactos.items():
+            if contacto.bd_contacto_id == bd_contacto_id:
+                self.contactos_dict[contacto_id] = contacto
+            else:
+                self.contactos_anteriores[contacto_id] = contacto
 
     def _obtener_datos_contacto_anterior(self, contacto_id):
         contacto = self.contactos_anteriores.get(contacto_id, -1)
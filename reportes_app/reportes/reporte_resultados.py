@@ -21,10 +21,9 @@ from __future__ import unicode_literals
 from collections import OrderedDict
 from django.core.paginator import Paginator
 from django.utils.translation import gettext_lazy as _
-from django.db import connection
-from ominicontacto_app.models import CalificacionCliente, Campana, AgenteEnContacto
+from ominicontacto_app.models import Campana, AgenteEnContacto, OpcionCalificacion
 from reportes_app.reportes.reporte_llamados_contactados_csv import NO_CONECTADO_DESCRIPCION
-from reportes_app.models import LlamadaLog
+from reportes_app.models import ContactacionCampana, LlamadaLog
 
 
 class ReporteDeResultadosDeCampana(object):
@@ -44,8 +43,10 @@ class ReporteDeResultadosDeCampana(object):
         contactos_ids = self._inicializar_datos_de_contactacion(contactos)
         # Si no hay contactos originarios el reporte quedará vacío.
         if len(contactos_ids) > 0:
-            calificados_ids = self._registrar_calificaciones(contactos_ids)
-            self._registrar_no_calificados(contactos_ids, calificados_ids)
+            if not self.is_paginated:
+                # Se filtra con una subconsulta en lugar de la lista de todos los ids
+                contactos_ids = contactos.using('replica').values('id')
+            self._registrar_contactaciones(contactos_ids)
 
     def obtener_contactos(self, todos_contactos):
         contactos = self.campana.bd_contacto.contactos.order_by("id")
@@ -77,55 +78,20 @@ class ReporteDeResultadosDeCampana(object):
             }
         return ids
 
-    def _registrar_calificaciones(self, contactos_ids):
-        calificaciones = CalificacionCliente.objects.using('replica').filter(
-            opcion_calificacion__campana=self.campana,
-            contacto_id__in=contactos_ids)
-        calificados_ids = []
-        for calificacion in calificaciones:
-            contacto_id = calificacion.contacto_id
-            calificados_ids.append(contacto_id)
-            nombre = calificacion.opcion_calificacion.nombre
-            self.contactaciones[contacto_id]['calificacion'] = nombre
-        return calificados_ids
-
-    def _registrar_no_calificados(self, contactos_ids, calificados_ids):
-        # Ver como fue la contactacion. Si fue o no contactado.
-        filtro_contactos = " AND contacto_id IN ('"
-        filtro_contactos += "','".join([str(x) for x in contactos_ids])
-        filtro_contactos += "')"
-        filtro_calificados = ''
-        if len(calificados_ids) > 0:
-            filtro_calificados = " AND contacto_id NOT IN ('"
-            filtro_calificados += "','".join([str(x) for x in calificados_ids])
-            filtro_calificados += "')"
-        filtro_eventos = " AND event IN ('"
-        filtro_eventos += "','".join(LlamadaLog.EVENTOS_NO_CONEXION)
-        filtro_eventos += "','"
-        filtro_eventos += "','".join(LlamadaLog.EVENTOS_FIN_CONEXION)
-        filtro_eventos += "')"
-        params = {'campana_id': self.campana.id,
-                  'filtro_contactos': filtro_contactos,
-                  'filtro_calificados': filtro_calificados,
-                  'filtro_eventos': filtro_eventos}
-        # TODO: Filtrar eventos de LLamada log q indiquen finalizacion de llamada o intento
-        sql = """
-            SELECT contacto_id, event
-            FROM (
-                SELECT id, campana_id, event, numero_marcado, contacto_id, "time",
-                       max("time") OVER (PARTITION BY contacto_id) max_my_date
-                FROM public.reportes_app_llamadalog
-                WHERE campana_id = {campana_id} AND contacto_id != -1
-                {filtro_contactos}{filtro_calificados}{filtro_eventos}
-            ) sub_query
-            WHERE "time" = max_my_date """.format(**params)
-
-        cursor = connection.cursor()
-        cursor.execute(sql)
-        values = cursor.fetchall()
-        for contacto_id, evento in values:
-            descripcion = self._get_descripcion_evento(evento)
-            self.contactaciones[contacto_id]['contactacion'] = descripcion
+    def _registrar_contactaciones(self, contactos_ids):
+        """ Registra la calificación, o si no fue calificado el último resultado de llamada """
+        nombres_opciones = dict(OpcionCalificacion.objects.using('replica').filter(
+            campana=self.campana).values_list('id', 'nombre'))
+        contactaciones = ContactacionCampana.objects.using('replica').filter(
+            campana_id=self.campana.id, contacto_id__in=contactos_ids).values_list(
+                'contacto_id', 'opcion_calificacion_id', 'ultimo_evento')
+        for contacto_id, opcion_calificacion_id, evento in contactaciones:
+            if opcion_calificacion_id is not None:
+                nombre = nombres_opciones.get(opcion_calificacion_id)
+                self.contactaciones[contacto_id]['calificacion'] = nombre
+            elif evento is not None:
+                descripcion = self._get_descripcion_evento(evento)
+                self.contactaciones[contacto_id]['contactacion'] = descripcion
 
     def _get_descripcion_evento(self, evento):
         if evento in LlamadaLog.EVENTOS_NO_CONEXION:
@@ -113,10 +113,19 @@ class ReporteSupervisoresFamily(AbstractRedisFamily):
 
     def regenerar_families(self):
         """regenera la family"""
-        # Precalculo el resultado para que no quede vacio redis mientras calcula
+        # Precalculo el resultado y reemplazo las families en una transacción para que no
+        # queden vacías en redis mientras se regeneran
         self.reporte_resultado = self._obtener_resultado()
-        self._delete_tree_family()
-        self._create_families()
+        redis_connection = self.get_redis_connection()
+        keys_previas = list(redis_connection.scan_iter(self.get_nombre_families() + ':*'))
+        pipeline = redis_connection.pipeline(transaction=True)
+        if keys_previas:
+            pipeline.delete(*keys_previas)
+        for family_member in self.reporte_resultado:
+            variables = self._create_dict(family_member)
+            if variables:
+                pipeline.hset(self._get_nombre_family(family_member), mapping=variables)
+        pipeline.execute()
 
     def regenerar_family(self, family_member):
         """regenera una family"""
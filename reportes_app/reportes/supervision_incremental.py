@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Actualización incremental de las families de supervisión de llamadas en Redis.
+
+En lugar de recalcular el día completo en cada ejecución se contabilizan solo los LlamadaLog
+con id mayor a la última marca procesada, y se suman atómicamente a los contadores guardados
+en Redis. La regeneración completa se hace al cambiar el día (reconciliación nocturna) o a
+pedido.
+"""
+
+from __future__ import unicode_literals
+
+import json
+import logging as _logging
+import time
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils.encoding import force_text
+from django.utils.timezone import now
+
+from ominicontacto_app.utiles import fecha_local
+from reportes_app.models import LlamadaLog
+
+logger = _logging.getLogger(__name__)
+
+
+# Suma los contadores a los campos del hash y pisa el resto de los valores.
+# ARGV[1]: '1' si la campaña tuvo actividad, ARGV[2]: contadores, ARGV[3]: demas valores.
+# Si el hash no existe y la campaña no tuvo actividad, no se crea.
+LUA_ACTUALIZAR_CAMPOS = """
+if redis.call('EXISTS', KEYS[1]) == 0 and ARGV[1] == '0' then
+    return 0
+end
+for campo, valor in pairs(cjson.decode(ARGV[2])) do
+    redis.call('HINCRBY', KEYS[1], campo, valor)
+end
+for campo, valor in pairs(cjson.decode(ARGV[3])) do
+    redis.call('HSET', KEYS[1], campo, valor)
+end
+return 1
+"""
+
+# Igual que LUA_ACTUALIZAR_CAMPOS pero para families que guardan las estadísticas como un json
+# en el campo ESTADISTICAS.
+# ARGV[2]: nombres de los contadores, ARGV[3]: ESTADISTICAS con los contadores como
+# incrementos, ARGV[4]: demas campos del hash.
+LUA_ACTUALIZAR_ESTADISTICAS_JSON = """
+local previas = redis.call('HGET', KEYS[1], 'ESTADISTICAS')
+if not previas and ARGV[1] == '0' then
+    return 0
+end
+local estadisticas = cjson.decode(ARGV[3])
+if previas then
+    previas = cjson.decode(previas)
+    for _, campo in ipairs(cjson.decode(ARGV[2])) do
+        estadisticas[campo] = (tonumber(previas[campo]) or 0) + (tonumber(estadisticas[campo]) or 0)
+    end
+end
+for campo, valor in pairs(cjson.decode(ARGV[4])) do
+    redis.call('HSET', KEYS[1], campo, valor)
+end
+redis.call('HSET', KEYS[1], 'ESTADISTICAS', cjson.encode(estadisticas))
+return 1
+"""
+
+
+def filtrar_rango_de_ids(logs, id_log_desde=None, id_log_hasta=None):
+    """ Restringe los logs a los de id en el rango (id_log_desde, id_log_hasta] """
+    if id_log_desde is not None:
+        logs = logs.filter(id__gt=id_log_desde)
+    if id_log_hasta is not None:
+        logs = logs.filter(id__lte=id_log_hasta)
+    return logs
+
+
+class FamilySupervisionIncrementalMixin(object):
+    """
+    Mixin para las families de supervisión (AbstractRedisFamily) calculadas con LlamadaLog.
+    La clase que lo utilice debe definir:
+    - CONTADORES: campos que se acumulan a partir de los logs de llamadas.
+    - NOMBRE_MARCA: key de Redis donde se guarda el último LlamadaLog procesado.
+    - _crear_reporte(id_log_desde, id_log_hasta): reporte con 'campanas' y 'estadisticas'.
+    - _crear_variables(campana_id, datos): valores del hash de la campaña.
+    - _get_nombre_family_campana(campana_id)
+    """
+    CONTADORES = ()
+    NOMBRE_MARCA = None
+    ESTADISTICAS_EN_JSON = False
+    VENTANA_IDS_REGENERACION = 1000
+    _hueco = None
+
+    def _crear_reporte(self, id_log_desde=None, id_log_hasta=None):
+        raise (NotImplementedError())
+
+    def _crear_variables(self, campana_id, datos):
+        raise (NotImplementedError())
+
+    def _get_nombre_family_campana(self, campana_id):
+        raise (NotImplementedError())
+
+    def _datos_iniciales(self, reporte, campana):
+        datos = reporte.INICIALES.copy()
+        datos['nombre'] = force_text(campana.nombre)
+        return datos
+
+    def _obtener_ultimo_id_log(self, id_log_desde, marca=None):
+        """
+        Devuelve el mayor id de LlamadaLog hasta el cual los ids son consecutivos desde
+        id_log_desde. Un id faltante puede ser un insert todavía no confirmado (o no replicado),
+        por lo que se espera OML_SUPERVISION_ESPERA_HUECO segundos antes de saltearlo; si no
+        los logs confirmados tarde quedarían detrás de la marca y no se contabilizarían nunca.
+        """
+        self._hueco = None
+        ids = LlamadaLog.objects.using('replica').filter(id__gt=id_log_desde).order_by(
+            'id').values_list('id', flat=True)
+        ultimo_id = id_log_desde
+        for id_log in ids.iterator():
+            if id_log != ultimo_id + 1 and not self._hueco_vencido(ultimo_id + 1, marca):
+                break
+            ultimo_id = id_log
+        return ultimo_id
+
+    def _hueco_vencido(self, id_faltante, marca):
+        marca = marca or {}
+        if marca.get('hueco') == str(id_faltante):
+            inicio_hueco = float(marca['inicio_hueco'])
+        else:
+            inicio_hueco = time.time()
+        self._hueco = (id_faltante, inicio_hueco)
+        vencido = time.time() - inicio_hueco >= settings.OML_SUPERVISION_ESPERA_HUECO
+        if vencido:
+            self._hueco = None
+        return vencido
+
+    def _fecha_actual(self):
+        return fecha_local(now()).isoformat()
+
+    def _obtener_marca(self):
+        """ Devuelve la marca del último log procesado hoy, o None si hay que regenerar """
+        marca = self.get_redis_connection().hgetall(self.NOMBRE_MARCA)
+        if not marca or marca.get('fecha') != self._fecha_actual():
+            return None
+        return marca
+
+    def _guardar_marca(self, pipeline, ultimo_id):
+        pipeline.hset(self.NOMBRE_MARCA, mapping={'fecha': self._fecha_actual(), 'id': ultimo_id})
+        if self._hueco is None:
+            pipeline.hdel(self.NOMBRE_MARCA, 'hueco', 'inicio_hueco')
+        else:
+            pipeline.hset(self.NOMBRE_MARCA, mapping={'hueco': self._hueco[0],
+                                                      'inicio_hueco': self._hueco[1]})
+
+    def regenerar_families(self):
+        """
+        Recalcula el día completo y reemplaza las families en una transacción de Redis,
+        para que no queden vacías mientras se generan.
+        """
+        # Solo los ids más recientes pueden tener inserts sin confirmar
+        id_maximo = LlamadaLog.objects.using('replica').aggregate(Max('id'))['id__max'] or 0
+        ultimo_id = self._obtener_ultimo_id_log(
+            max(id_maximo - self.VENTANA_IDS_REGENERACION, 0))
+        reporte = self._crear_reporte(id_log_hasta=ultimo_id)
+
+        redis_connection = self.get_redis_connection()
+        keys_previas = list(redis_connection.scan_iter(self.get_nombre_families() + ':*'))
+        pipeline = redis_connection.pipeline(transaction=True)
+        if keys_previas:
+            pipeline.delete(*keys_previas)
+        for campana_id, datos in reporte.estadisticas.items():
+            pipeline.hset(self._get_nombre_family_campana(campana_id),
+                          mapping=self._crear_variables(campana_id, datos))
+        self._guardar_marca(pipeline, ultimo_id)
+        pipeline.execute()
+
+    def actualizar_families(self):
+        """
+        Suma a las families los logs registrados desde la última actualización.
+        Si no hay marca del día actual se regeneran las families completas.
+        """
+        marca = self._obtener_marca()
+        if marca is None:
+            logger.info('{0}: sin marca del dia actual, se regeneran las families'.format(
+                self.get_nombre_families()))
+            return self.regenerar_families()
+
+        id_log_desde = int(marca['id'])
+        ultimo_id = self._obtener_ultimo_id_log(id_log_desde, marca)
+        reporte = self._crear_reporte(id_log_desde=id_log_desde, id_log_hasta=ultimo_id)
+
+        redis_connection = self.get_redis_connection()
+        if self.ESTADISTICAS_EN_JSON:
+            script = redis_connection.register_script(LUA_ACTUALIZAR_ESTADISTICAS_JSON)
+        else:
+            script = redis_connection.register_script(LUA_ACTUALIZAR_CAMPOS)
+        pipeline = redis_connection.pipeline(transaction=True)
+        for campana_id, campana in reporte.campanas.items():
+            tuvo_actividad = campana_id in reporte.estadisticas
+            if tuvo_actividad:
+                datos = reporte.estadisticas[campana_id]
+            else:
+                datos = self._datos_iniciales(reporte, campana)
+            script(keys=[self._get_nombre_family_campana(campana_id)],
+                   args=self._argumentos_script(campana_id, datos, tuvo_actividad),
+                   client=pipeline)
+        self._guardar_marca(pipeline, ultimo_id)
+        pipeline.execute()
+
+    def _argumentos_script(self, campana_id, datos, tuvo_actividad):
+        actividad = '1' if tuvo_actividad else '0'
+        if self.ESTADISTICAS_EN_JSON:
+            variables = self._crear_variables(campana_id, datos)
+            estadisticas = variables.pop('ESTADISTICAS')
+            return [actividad, json.dumps(self.CONTADORES), estadisticas, json.dumps(variables)]
+
+        contadores = {}
+        valores = {}
+        for campo, valor in self._crear_variables(campana_id, datos).items():
+            if campo in self.CONTADORES:
+                contadores[campo] = valor
+            else:
+                valores[campo] = valor
+        return [actividad, json.dumps(contadores), json.dumps(valores)]
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Ingesta por lotes de los logs que Asterisk escribe en queue_log.
+
+Reemplaza al trigger plperl `insert_queue_log_ominicontacto_queue_log()` (ver
+sql/plperl): en lugar de procesar cada fila dentro del insert de Asterisk, el comando
+ingestar_queue_log lee los queue_log nuevos por id, los convierte en LlamadaLog y
+ActividadAgenteLog con las mismas reglas del trigger, los inserta en bulk y publica los
+eventos en un stream de Redis para los consumidores en tiempo real.
+Sólo uno de los dos mecanismos puede estar activo: mientras exista el trigger la ingesta
+únicamente sigue su avance.
+"""
+
+from __future__ import unicode_literals
+
+import logging as _logging
+import os
+import time
+
+import redis
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from reportes_app.models import ActividadAgenteLog, IngestaQueueLog, LlamadaLog, QueueLog
+
+logger = _logging.getLogger(__name__)
+
+TRIGGER_QUEUE_LOG = 'trigger_queue_log'
+
+LOG_AGENTE = 'agente'
+LOG_LLAMADA = 'llamada'
+LOG_TRANSFERENCIA = 'transferencia'
+
+EVENTOS_AGENTE = ('ADDMEMBER', 'REMOVEMEMBER', 'PAUSEALL', 'UNPAUSEALL')
+
+EVENTOS_LLAMADAS = (
+    'DIAL', 'ANSWER', 'CONNECT', 'COMPLETEAGENT', 'COMPLETEOUTNUM', 'ENTERQUEUE',
+    'EXITWITHTIMEOUT', 'ABANDON', 'NOANSWER', 'CANCEL', 'BUSY', 'CHANUNAVAIL', 'OTHER', 'FAIL',
+    'AMD', 'BLACKLIST', 'RINGNOANSWER', 'NONDIALPLAN', 'CONGESTION', 'ABANDONWEL',
+)
+
+EVENTOS_TRANSFERENCIAS = (
+    'BT-TRY', 'BT-ANSWER', 'BT-BUSY', 'BT-CANCEL', 'BT-CHANUNAVAIL', 'BT-CONGESTION',
+    'BT-ABANDON', 'BT-NOANSWER', 'CAMPT-TRY', 'CAMPT-FAIL', 'CAMPT-COMPLETE',
+    'ENTERQUEUE-TRANSFER', 'CT-TRY', 'CT-ANSWER', 'CT-ACCEPT', 'CT-COMPLETE', 'CT-DISCARD',
+    'CT-BUSY', 'CT-CANCEL', 'CT-CHANUNAVAIL', 'CT-CONGESTION', 'BTOUT-TRY', 'BTOUT-ANSWER',
+    'BTOUT-BUSY', 'BTOUT-CANCEL', 'BTOUT-CONGESTION', 'BTOUT-CHANUNAVAIL', 'BTOUT-ABANDON',
+    'BTOUT-NONDIALPLAN', 'CTOUT-TRY', 'CTOUT-ANSWER', 'CTOUT-ACCEPT', 'CTOUT-COMPLETE',
+    'CTOUT-DISCARD', 'CTOUT-BUSY', 'CTOUT-CANCEL', 'CTOUT-CHANUNAVAIL', 'CTOUT-CONGESTION',
+    'CTOUT-NONDIALPLAN', 'COMPLETE-CTOUT', 'COMPLETE-CT', 'COMPLETE-BT', 'COMPLETE-BTOUT',
+    'COMPLETE-CAMPT', 'CT-ABANDON', 'ABANDON-CT', 'CTOUT-ABANDON', 'ABANDON-CTOUT',
+)
+
+# Tabla de búsqueda del tipo de log que genera cada evento (el resto se descarta)
+TIPO_LOG_EVENTO = dict(
+    [(evento, LOG_AGENTE) for evento in EVENTOS_AGENTE] +
+    [(evento, LOG_LLAMADA) for evento in EVENTOS_LLAMADAS] +
+    [(evento, LOG_TRANSFERENCIA) for evento in EVENTOS_TRANSFERENCIAS])
+
+# Contenido del campo 'agent' de las transferencias según el evento
+TRANSFERENCIA_AGENTE_EXTRA = 'agente_extra'  # agente_id_origen - id_agente_origen
+TRANSFERENCIA_CAMPANA_EXTRA = 'campana_extra'  # agente_id - id_camp_destino
+TRANSFERENCIA_A_COLA = 'a_cola'  # id_camp_origen - id_agente_origen (en data4, data5)
+TRANSFERENCIA_NUMERO_EXTRA = 'numero_extra'  # agente_id_origen - nro_telefono_destino
+TRANSFERENCIA_NUMERO = 'numero'  # nro_telefono_destino
+FORMATO_TRANSFERENCIA = dict(
+    [(evento, TRANSFERENCIA_AGENTE_EXTRA) for evento in ('BT-TRY', 'CAMPT-COMPLETE', 'CT-TRY')] +
+    [('CAMPT-TRY', TRANSFERENCIA_CAMPANA_EXTRA), ('ENTERQUEUE-TRANSFER', TRANSFERENCIA_A_COLA)] +
+    [(evento, TRANSFERENCIA_NUMERO_EXTRA) for evento in ('BTOUT-TRY', 'CTOUT-TRY')] +
+    [(evento, TRANSFERENCIA_NUMERO) for evento in (
+        'BTOUT-ANSWER', 'BTOUT-BUSY', 'BTOUT-CANCEL', 'BTOUT-CONGESTION', 'BTOUT-CHANUNAVAIL',
+        'BTOUT-ABANDON', 'CTOUT-ANSWER', 'CTOUT-ACCEPT', 'CTOUT-DISCARD', 'CTOUT-BUSY',
+        'CTOUT-CANCEL', 'CTOUT-CHANUNAVAIL', 'CTOUT-CONGESTION', 'COMPLETE-BTOUT',
+        'COMPLETE-CTOUT', 'CTOUT-ABANDON', 'BTOUT-NONDIALPLAN', 'CTOUT-NONDIALPLAN')])
+
+CAMPOS_QUEUE_LOG = ('id', 'time', 'callid', 'queuename', 'agent', 'event',
+                    'data1', 'data2', 'data3', 'data4', 'data5')
+
+
+def _es_entero(valor):
+    """ Igual que is_number del trigger: un entero sin signo '+' ni ceros a la izquierda """
+    try:
+        return str(int(valor)) == str(valor)
+    except (TypeError, ValueError):
+        return False
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parsear_fecha(valor):
+    try:
+        fecha = parse_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if fecha is not None and is_naive(fecha):
+        # Asterisk registra la hora local
+        fecha = make_aware(fecha)
+    return fecha
+
+
+def _parsear_transferencia(event, agent, data4, data5):
+    """ Devuelve (agente_id, agente_extra_id, campana_extra_id, numero_extra) """
+    valores = agent.split('-')
+    valor_1 = valores[0]
+    valor_2 = valores[1] if len(valores) > 1 else None
+    formato = FORMATO_TRANSFERENCIA.get(event)
+    if formato == TRANSFERENCIA_AGENTE_EXTRA:
+        return valor_1, _entero(valor_2), -1, '-1'
+    if formato == TRANSFERENCIA_CAMPANA_EXTRA:
+        return valor_1, -1, _entero(valor_2), '-1'
+    if formato == TRANSFERENCIA_A_COLA:
+        return data5, -1, _entero(data4), '-1'
+    if formato == TRANSFERENCIA_NUMERO_EXTRA:
+        return valor_1, -1, -1, valor_2
+    if formato == TRANSFERENCIA_NUMERO:
+        return '-1', -1, -1, valor_1
+    # Un solo valor con el id del agente
+    return valor_1, -1, -1, '-1'
+
+
+def parsear_queue_log(fila):
+    """
+    Convierte una fila de queue_log (diccionario con CAMPOS_QUEUE_LOG) en los campos de un
+    ActividadAgenteLog o un LlamadaLog con las reglas del trigger plperl.
+    Devuelve (tipo de log, campos) o None si la fila no genera un log.
+    """
+    event = fila['event']
+    tipo_log = TIPO_LOG_EVENTO.get(event)
+    if tipo_log is None:
+        return None
+    fecha = _parsear_fecha(fila['time'])
+    if fecha is None:
+        logger.warning('queue_log {0} con fecha inválida: {1}'.format(fila['id'], fila['time']))
+        return None
+
+    if tipo_log == LOG_AGENTE:
+        # Los logs de actividad de los agentes se registran con queuename 'ALL'
+        if fila['queuename'] != 'ALL' or not _es_entero(fila['agent']):
+            return None
+        return LOG_AGENTE, {
+            'time': fecha,
+            'agente_id': int(fila['agent']),
+            'event': event,
+            'pausa_id': fila['data1'],
+        }
+
+    if fila['queuename']:
+        # <id-campana>-<tipo-campana>-<tipo-llamada>
+        datos_cola = [_entero(valor) for valor in fila['queuename'].split('-')[:3]]
+        campana_id, tipo_campana, tipo_llamada = datos_cola + [None] * (3 - len(datos_cola))
+    else:
+        campana_id, tipo_campana, tipo_llamada = (-1, -1, -1)
+    if tipo_log == LOG_TRANSFERENCIA:
+        agente_id, agente_extra_id, campana_extra_id, numero_extra = _parsear_transferencia(
+            event, fila['agent'], fila['data4'], fila['data5'])
+    else:
+        agente_id, agente_extra_id, campana_extra_id, numero_extra = (
+            fila['agent'], -1, -1, '-1')
+    if not _es_entero(agente_id):
+        return None
+    return LOG_LLAMADA, {
+        'time': fecha,
+        'callid': fila['callid'],
+        'campana_id': campana_id,
+        'tipo_campana': tipo_campana,
+        'tipo_llamada': tipo_llamada,
+        'agente_id': int(agente_id),
+        'event': event,
+        'numero_marcado': fila['data1'],
+        'contacto_id': _entero(fila['data2']),
+        'bridge_wait_time': _entero(fila['data3']),
+        'duracion_llamada': _entero(fila['data4']),
+        'archivo_grabacion': fila['data5'],
+        'agente_extra_id': agente_extra_id,
+        'campana_extra_id': campana_extra_id,
+        'numero_extra': numero_extra,
+    }
+
+
+class IngestorQueueLog(object):
+    """
+    Procesa los queue_log nuevos de a lotes. El id del último procesado se guarda en
+    IngestaQueueLog, bloqueado durante cada lote, de modo que dos ingestores no procesan
+    los mismos logs.
+    """
+
+    MODELOS = {LOG_AGENTE: ActividadAgenteLog, LOG_LLAMADA: LlamadaLog}
+    # Stream en el que se publican los logs generados
+    KEY_EVENTOS = 'OML:QUEUE_LOG:EVENTOS'
+
+    def __init__(self, tamano_lote=None, redis_connection=None):
+        self.tamano_lote = tamano_lote or settings.OML_INGESTA_QUEUE_LOG_LOTE
+        if redis_connection is None:
+            redis_connection = redis.Redis(
+                host=settings.REDIS_HOSTNAME,
+                port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+                decode_responses=True)
+        self.redis_connection = redis_connection
+        # Primer id faltante que se está esperando y desde cuándo
+        self._hueco = None
+        self._inicio_hueco = None
+
+    def procesar(self):
+        """ Procesa un lote y devuelve la cantidad de queue_log procesados """
+        with transaction.atomic():
+            ingesta = self._bloquear_ingesta()
+            if self.trigger_habilitado():
+                # El trigger procesa los logs: sólo se sigue su avance
+                ultimo_id = QueueLog.objects.aggregate(Max('id'))['id__max'] or 0
+                if ultimo_id > ingesta.ultimo_id:
+                    ingesta.ultimo_id = ultimo_id
+                    ingesta.save(update_fields=['ultimo_id'])
+                return 0
+            procesados, logs = self._procesar_lote(ingesta)
+        self._publicar(logs)
+        return procesados
+
+    def trigger_habilitado(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_trigger WHERE tgname = %s AND tgrelid = 'queue_log'::regclass",
+                [TRIGGER_QUEUE_LOG])
+            return cursor.fetchone() is not None
+
+    def deshabilitar_trigger(self):
+        """ Elimina el trigger de queue_log: la ingesta procesa los logs que lleguen luego """
+        with transaction.atomic():
+            ingesta = self._bloquear_ingesta()
+            with connection.cursor() as cursor:
+                # Se impiden los inserts en queue_log hasta fijar el último id del trigger
+                cursor.execute("LOCK TABLE queue_log IN SHARE ROW EXCLUSIVE MODE")
+                cursor.execute("DROP TRIGGER IF EXISTS {0} ON queue_log".format(
+                    TRIGGER_QUEUE_LOG))
+            ingesta.ultimo_id = QueueLog.objects.aggregate(Max('id'))['id__max'] or 0
+            ingesta.save(update_fields=['ultimo_id'])
+        logger.info('Trigger de queue_log deshabilitado desde el id {0}'.format(
+            ingesta.ultimo_id))
+
+    def habilitar_trigger(self):
+        """ Procesa los queue_log pendientes y vuelve a crear el trigger de queue_log """
+        logs = []
+        with transaction.atomic():
+            ingesta = self._bloquear_ingesta()
+            with connection.cursor() as cursor:
+                cursor.execute("LOCK TABLE queue_log IN SHARE ROW EXCLUSIVE MODE")
+            # Sin inserts en curso no hay huecos que esperar
+            procesados = True
+            while procesados:
+                procesados, logs_lote = self._procesar_lote(ingesta, esperar_huecos=False)
+                logs.extend(logs_lote)
+            ruta = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'sql', 'plperl', 'trigger_queue_log.sql')
+            with connection.cursor() as cursor:
+                cursor.execute("DROP TRIGGER IF EXISTS {0} ON queue_log".format(
+                    TRIGGER_QUEUE_LOG))
+                cursor.execute(open(ruta, 'r', encoding='utf-8').read())
+        self._publicar(logs)
+        logger.info('Trigger de queue_log habilitado desde el id {0}'.format(ingesta.ultimo_id))
+
+    def _bloquear_ingesta(self):
+        IngestaQueueLog.objects.get_or_create(id=1)
+        return IngestaQueueLog.objects.select_for_update().get(id=1)
+
+    def _procesar_lote(self, ingesta, esperar_huecos=True):
+        filas = QueueLog.objects.filter(id__gt=ingesta.ultimo_id).order_by('id').values(
+            *CAMPOS_QUEUE_LOG)[:self.tamano_lote]
+        procesables = []
+        siguiente_id = ingesta.ultimo_id + 1
+        for fila in filas:
+            if fila['id'] != siguiente_id and esperar_huecos and \
+                    not self._hueco_vencido(siguiente_id):
+                # El insert del id faltante puede no estar confirmado todavía
+                break
+            procesables.append(fila)
+            siguiente_id = fila['id'] + 1
+        if not procesables:
+            return 0, []
+
+        logs = {LOG_AGENTE: [], LOG_LLAMADA: []}
+        for fila in procesables:
+            log = parsear_queue_log(fila)
+            if log is not None:
+                logs[log[0]].append(log[1])
+        for tipo_log, campos_logs in logs.items():
+            if campos_logs:
+                self._insertar(self.MODELOS[tipo_log], campos_logs)
+        ingesta.ultimo_id = procesables[-1]['id']
+        ingesta.save(update_fields=['ultimo_id'])
+        return len(procesables), [(tipo_log, campos) for tipo_log, campos_logs in logs.items()
+                                  for campos in campos_logs]
+
+    def _hueco_vencido(self, id_faltante):
+        if self._hueco != id_faltante:
+            self._hueco = id_faltante
+            self._inicio_hueco = time.monotonic()
+        return time.monotonic() - self._inicio_hueco >= settings.OML_INGESTA_QUEUE_LOG_ESPERA_HUECO
+
+    def _insertar(self, modelo, campos_logs):
+        try:
+            with transaction.atomic():
+                modelo.objects.bulk_create([modelo(**campos) for campos in campos_logs])
+        except DatabaseError:
+            # Como el trigger, se descartan los logs que no se pueden insertar
+            for campos in campos_logs:
+                try:
+                    with transaction.atomic():
+                        modelo.objects.create(**campos)
+                except DatabaseError as e:
+                    logger.error('Error {0} insertando {1}: {2}'.format(
+                        e, modelo.__name__, campos))
+
+    def _publicar(self, logs):
+        if not logs:
+            return
+        try:
+            pipeline = self.redis_connection.pipeline(transaction=False)
+            for tipo_log, campos in logs:
+                evento = {'tipo': tipo_log, 'time': campos['time'].isoformat()}
+                for campo, valor in campos.items():
+                    if campo != 'time':
+                        evento[campo] = '' if valor is None else valor
+                pipeline.xadd(self.KEY_EVENTOS, evento,
+                              maxlen=settings.OML_INGESTA_QUEUE_LOG_MAXLEN, approximate=True)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning('No se pudieron publicar los logs de queue_log: {0}'.format(e))
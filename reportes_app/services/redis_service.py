@@ -29,21 +29,17 @@ class RedisService(object):
 
     def obtener_estadisticas_campanas_entrantes(self, campanas_id_list):
         estadisticas = {}
-        campanas_keys = self._obtener_lista_keys("OML:SUPERVISION_CAMPAIGN:*")
-        prefix_len = len("OML:SUPERVISION_CAMPAIGN:")
-        for campana_r in campanas_keys:
-            campana_id = campana_r[prefix_len:]
-            if int(campana_id) in campanas_id_list:
-                estadisticas.update(self._obtener_estadisticas_campana(campana_r))
+        campanas_id_list = list(campanas_id_list)
+        pipeline = self.redis_connection.pipeline(transaction=False)
+        for campana_id in campanas_id_list:
+            pipeline.hgetall("OML:SUPERVISION_CAMPAIGN:{0}".format(campana_id))
+        for campana_id, campana_info in zip(campanas_id_list, pipeline.execute()):
+            estadisticas.update(self._obtener_estadisticas_campana(campana_id, campana_info))
         return estadisticas
 
-    def _obtener_lista_keys(self, pattern):
-        return self.redis_connection.keys(pattern)
-
-    def _obtener_estadisticas_campana(self, redis_key):
+    def _obtener_estadisticas_campana(self, campana_id, campana_info):
         estadistica_campana = {}
-        campana_info = self.redis_connection.hgetall(redis_key)
-        campana_id = int(redis_key.split(':')[-1])
+        campana_id = int(campana_id)
         atendidas = int(campana_info.get('llamadas_atendidas', 0))
         abandonadas = int(campana_info.get('llamadas_abandonadas', 0))
         expiradas = int(campana_info.get('llamadas_expiradas', 0))
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Consolidación de los LlamadaLog de las horas ya cerradas en los resúmenes horarios y diarios.
+"""
+
+from __future__ import unicode_literals
+
+import logging as _logging
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncHour
+from django.utils.timezone import now, timedelta
+
+from ominicontacto_app.utiles import datetime_hora_minima_dia, fecha_local
+from reportes_app.models import (
+    LlamadaLog, ConsolidacionResumenLlamadaLog, ResumenHorarioLlamadaLog, ResumenDiarioLlamadaLog,
+    truncar_hora)
+
+logger = _logging.getLogger(__name__)
+
+CAMPOS_AGRUPAMIENTO = ('campana_id', 'tipo_campana', 'tipo_llamada', 'agente_id', 'event')
+
+
+class ConsolidadorResumenLlamadas(object):
+    """
+    Mantiene actualizados los resúmenes de LlamadaLog. Cada ejecución consolida las horas
+    cerradas desde la última consolidación, de a un día por transacción, y vuelve a consolidar
+    las horas ya cerradas que recibieron logs nuevos (con id mayor al último considerado).
+    """
+
+    # Tiempo que se espera luego del fin de una hora para considerarla cerrada
+    MARGEN_CIERRE = timedelta(minutes=5)
+
+    # Los ids más recientes se vuelven a revisar en la ejecución siguiente, porque un insert
+    # con id menor al último leído puede confirmarse después
+    VENTANA_IDS_TARDIOS = 1000
+
+    def consolidar(self, hasta=None):
+        if hasta is None:
+            hasta = now() - self.MARGEN_CIERRE
+        hasta = truncar_hora(hasta)
+        ultimo_id = LlamadaLog.objects.aggregate(Max('id'))['id__max'] or 0
+        consolidacion = ConsolidacionResumenLlamadaLog.objects.first()
+        if consolidacion is not None:
+            self._consolidar_logs_tardios(consolidacion, ultimo_id)
+        desde = self._obtener_inicio()
+        if desde is None:
+            return
+        while desde < hasta:
+            fin = min(datetime_hora_minima_dia(fecha_local(desde) + timedelta(days=1)), hasta)
+            self._consolidar_periodo(desde, fin)
+            desde = fin
+        ConsolidacionResumenLlamadaLog.objects.filter(id=1).update(ultimo_id=ultimo_id)
+
+    def regenerar(self, desde):
+        """ Vuelve a consolidar a partir de la hora de `desde` """
+        desde = truncar_hora(desde)
+        consolidacion = ConsolidacionResumenLlamadaLog.objects.first()
+        if consolidacion is not None and consolidacion.hasta > desde:
+            consolidacion.hasta = desde
+            consolidacion.save()
+        self.consolidar()
+
+    def _obtener_inicio(self):
+        consolidacion = ConsolidacionResumenLlamadaLog.objects.first()
+        if consolidacion is not None:
+            return consolidacion.hasta
+        primer_log = LlamadaLog.objects.aggregate(Min('time'))['time__min']
+        if primer_log is None:
+            return None
+        return truncar_hora(primer_log)
+
+    def _consolidar_logs_tardios(self, consolidacion, ultimo_id):
+        """ Vuelve a consolidar las horas cerradas que recibieron logs desde la última vez """
+        horas = LlamadaLog.objects.filter(
+            id__gt=consolidacion.ultimo_id - self.VENTANA_IDS_TARDIOS, id__lte=ultimo_id,
+            time__lt=consolidacion.hasta).annotate(hora=TruncHour('time')) \
+            .values_list('hora', flat=True).order_by('hora').distinct()
+        for hora in horas:
+            self._consolidar_hora(hora)
+
+    @transaction.atomic
+    def _consolidar_hora(self, hora):
+        ResumenHorarioLlamadaLog.objects.filter(hora=hora).delete()
+        self._resumir_logs(hora, hora + timedelta(hours=1))
+        self._recalcular_dia(fecha_local(hora))
+        logger.debug('Resumenes de llamadas consolidados nuevamente para {0}'.format(hora))
+
+    @transaction.atomic
+    def _consolidar_periodo(self, desde, hasta):
+        ResumenHorarioLlamadaLog.objects.filter(hora__gte=desde).delete()
+        self._resumir_logs(desde, hasta)
+        self._recalcular_dia(fecha_local(desde))
+        ConsolidacionResumenLlamadaLog.objects.update_or_create(id=1, defaults={'hasta': hasta})
+        logger.info('Resumenes de llamadas consolidados hasta {0}'.format(hasta))
+
+    def _resumir_logs(self, desde, hasta):
+        totales = LlamadaLog.objects.filter(time__gte=desde, time__lt=hasta) \
+            .annotate(hora=TruncHour('time')).values('hora', *CAMPOS_AGRUPAMIENTO).order_by() \
+            .annotate(cantidad_total=Count('id'),
+                      duracion_total=Coalesce(Sum('duracion_llamada'), 0),
+                      bridge_wait_time_total=Coalesce(Sum('bridge_wait_time'), 0))
+        ResumenHorarioLlamadaLog.objects.bulk_create(
+            [ResumenHorarioLlamadaLog(hora=total['hora'], **self._valores_resumen(total))
+             for total in totales])
+
+    def _recalcular_dia(self, fecha):
+        inicio = datetime_hora_minima_dia(fecha)
+        fin = datetime_hora_minima_dia(fecha + timedelta(days=1))
+        ResumenDiarioLlamadaLog.objects.filter(fecha=fecha).delete()
+        totales = ResumenHorarioLlamadaLog.objects.filter(hora__gte=inicio, hora__lt=fin) \
+            .annotate(fecha=TruncDate('hora')).values('fecha', *CAMPOS_AGRUPAMIENTO).order_by() \
+            .annotate(cantidad_total=Sum('cantidad'),
+                      duracion_total=Sum('duracion_llamada'),
+                      bridge_wait_time_total=Sum('bridge_wait_time'))
+        ResumenDiarioLlamadaLog.objects.bulk_create(
+            [ResumenDiarioLlamadaLog(fecha=total['fecha'], **self._valores_resumen(total))
+             for total in totales])
+
+    def _valores_resumen(self, total):
+        valores = {campo: total[campo] for campo in CAMPOS_AGRUPAMIENTO}
+        valores['cantidad'] = total['cantidad_total']
+        valores['duracion_llamada'] = total['duracion_total']
+        valores['bridge_wait_time'] = total['bridge_wait_time_total']
+        return valores
@@ -0,0 +1,92 @@
+-- Mantiene reportes_app_contactacioncampana a medida que llegan LlamadaLog y
+-- CalificacionCliente. Los eventos deben coincidir con los de ContactacionCampana:
+--   intentos / ultimo_intento:  'DIAL'
+--   contactado:                 LlamadaLog.EVENTOS_INICIO_CONEXION_AGENTE
+--   ultimo_evento:              LlamadaLog.EVENTOS_NO_CONEXION + LlamadaLog.EVENTOS_FIN_CONEXION
+
+CREATE OR REPLACE FUNCTION contactacion_campana_llamadalog() RETURNS trigger AS $$
+BEGIN
+    -- Trigger por sentencia: un insert de varios logs actualiza cada contacto una sola vez
+    INSERT INTO reportes_app_contactacioncampana AS cc (
+        campana_id, contacto_id, intentos, ultimo_intento, contactado,
+        ultimo_evento, fecha_ultimo_evento, opcion_calificacion_id)
+    SELECT campana_id, contacto_id,
+           COUNT(*) FILTER (WHERE event = 'DIAL'),
+           MAX("time") FILTER (WHERE event = 'DIAL'),
+           COALESCE(BOOL_OR(event IN ('CONNECT', 'ANSWER')), false),
+           (ARRAY_AGG(event ORDER BY "time" DESC, id DESC) FILTER (WHERE event IN (
+               'NOANSWER', 'CANCEL', 'BUSY', 'CHANUNAVAIL', 'FAIL', 'OTHER', 'BLACKLIST',
+               'CONGESTION', 'NONDIALPLAN', 'ABANDON', 'EXITWITHTIMEOUT', 'AMD', 'ABANDONWEL',
+               'COMPLETEAGENT', 'COMPLETEOUTNUM', 'BT-TRY', 'COMPLETE-BT', 'CAMPT-COMPLETE',
+               'CAMPT-FAIL', 'COMPLETE-CAMPT', 'CT-COMPLETE', 'COMPLETE-CT', 'ABANDON-CT',
+               'BTOUT-TRY', 'CTOUT-COMPLETE')))[1],
+           MAX("time") FILTER (WHERE event IN (
+               'NOANSWER', 'CANCEL', 'BUSY', 'CHANUNAVAIL', 'FAIL', 'OTHER', 'BLACKLIST',
+               'CONGESTION', 'NONDIALPLAN', 'ABANDON', 'EXITWITHTIMEOUT', 'AMD', 'ABANDONWEL',
+               'COMPLETEAGENT', 'COMPLETEOUTNUM', 'BT-TRY', 'COMPLETE-BT', 'CAMPT-COMPLETE',
+               'CAMPT-FAIL', 'COMPLETE-CAMPT', 'CT-COMPLETE', 'COMPLETE-CT', 'ABANDON-CT',
+               'BTOUT-TRY', 'CTOUT-COMPLETE')),
+           NULL
+    FROM nuevos_logs
+    WHERE campana_id IS NOT NULL AND contacto_id IS NOT NULL AND contacto_id != -1 AND event IN (
+        'DIAL', 'CONNECT', 'ANSWER',
+        'NOANSWER', 'CANCEL', 'BUSY', 'CHANUNAVAIL', 'FAIL', 'OTHER', 'BLACKLIST',
+        'CONGESTION', 'NONDIALPLAN', 'ABANDON', 'EXITWITHTIMEOUT', 'AMD', 'ABANDONWEL',
+        'COMPLETEAGENT', 'COMPLETEOUTNUM', 'BT-TRY', 'COMPLETE-BT', 'CAMPT-COMPLETE',
+        'CAMPT-FAIL', 'COMPLETE-CAMPT', 'CT-COMPLETE', 'COMPLETE-CT', 'ABANDON-CT',
+        'BTOUT-TRY', 'CTOUT-COMPLETE')
+    GROUP BY campana_id, contacto_id
+    -- Mismo orden de bloqueo en inserts concurrentes
+    ORDER BY campana_id, contacto_id
+    ON CONFLICT (campana_id, contacto_id) DO UPDATE SET
+        intentos = cc.intentos + EXCLUDED.intentos,
+        ultimo_intento = GREATEST(cc.ultimo_intento, EXCLUDED.ultimo_intento),
+        contactado = cc.contactado OR EXCLUDED.contactado,
+        ultimo_evento = CASE
+            WHEN EXCLUDED.fecha_ultimo_evento IS NOT NULL AND (
+                cc.fecha_ultimo_evento IS NULL OR
+                EXCLUDED.fecha_ultimo_evento >= cc.fecha_ultimo_evento)
+            THEN EXCLUDED.ultimo_evento
+            ELSE cc.ultimo_evento END,
+        fecha_ultimo_evento = GREATEST(cc.fecha_ultimo_evento, EXCLUDED.fecha_ultimo_evento);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION contactacion_campana_calificacion() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE reportes_app_contactacioncampana AS cc SET opcion_calificacion_id = NULL
+        FROM ominicontacto_app_opcioncalificacion AS opcion
+        WHERE opcion.id = OLD.opcion_calificacion_id AND cc.campana_id = opcion.campana_id
+              AND cc.contacto_id = OLD.contacto_id
+              AND cc.opcion_calificacion_id = OLD.opcion_calificacion_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO reportes_app_contactacioncampana AS cc (
+            campana_id, contacto_id, intentos, ultimo_intento, contactado,
+            ultimo_evento, fecha_ultimo_evento, opcion_calificacion_id)
+        SELECT opcion.campana_id, NEW.contacto_id, 0, NULL, false, NULL, NULL, opcion.id
+        FROM ominicontacto_app_opcioncalificacion AS opcion
+        WHERE opcion.id = NEW.opcion_calificacion_id
+        ON CONFLICT (campana_id, contacto_id) DO UPDATE SET
+            opcion_calificacion_id = EXCLUDED.opcion_calificacion_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_contactacion_campana_llamadalog ON reportes_app_llamadalog;
+CREATE TRIGGER trigger_contactacion_campana_llamadalog
+AFTER INSERT ON reportes_app_llamadalog
+REFERENCING NEW TABLE AS nuevos_logs
+FOR EACH STATEMENT
+EXECUTE PROCEDURE contactacion_campana_llamadalog();
+
+DROP TRIGGER IF EXISTS trigger_contactacion_campana_calificacion
+    ON ominicontacto_app_calificacioncliente;
+CREATE TRIGGER trigger_contactacion_campana_calificacion
+AFTER INSERT OR DELETE OR UPDATE OF opcion_calificacion_id, contacto_id
+ON ominicontacto_app_calificacioncliente
+FOR EACH ROW
+EXECUTE PROCEDURE contactacion_campana_calificacion();
@@ -0,0 +1,37 @@
+-- Vuelve a calcular reportes_app_contactacioncampana a partir de todos los LlamadaLog y
+-- CalificacionCliente (ver contactacion_campana.sql).
+
+TRUNCATE reportes_app_contactacioncampana;
+
+INSERT INTO reportes_app_contactacioncampana (
+    campana_id, contacto_id, intentos, ultimo_intento, contactado,
+    ultimo_evento, fecha_ultimo_evento, opcion_calificacion_id)
+SELECT campana_id, contacto_id,
+       COUNT(*) FILTER (WHERE event = 'DIAL'),
+       MAX("time") FILTER (WHERE event = 'DIAL'),
+       COALESCE(BOOL_OR(event IN ('CONNECT', 'ANSWER')), false),
+       (ARRAY_AGG(event ORDER BY "time" DESC, id DESC) FILTER (WHERE event != 'DIAL'
+            AND event NOT IN ('CONNECT', 'ANSWER')))[1],
+       MAX("time") FILTER (WHERE event != 'DIAL' AND event NOT IN ('CONNECT', 'ANSWER')),
+       NULL
+FROM reportes_app_llamadalog
+WHERE campana_id IS NOT NULL AND contacto_id IS NOT NULL AND contacto_id != -1 AND event IN (
+    'DIAL', 'CONNECT', 'ANSWER',
+    'NOANSWER', 'CANCEL', 'BUSY', 'CHANUNAVAIL', 'FAIL', 'OTHER', 'BLACKLIST',
+    'CONGESTION', 'NONDIALPLAN', 'ABANDON', 'EXITWITHTIMEOUT', 'AMD', 'ABANDONWEL',
+    'COMPLETEAGENT', 'COMPLETEOUTNUM', 'BT-TRY', 'COMPLETE-BT', 'CAMPT-COMPLETE',
+    'CAMPT-FAIL', 'COMPLETE-CAMPT', 'CT-COMPLETE', 'COMPLETE-CT', 'ABANDON-CT',
+    'BTOUT-TRY', 'CTOUT-COMPLETE')
+GROUP BY campana_id, contacto_id;
+
+INSERT INTO reportes_app_contactacioncampana AS cc (
+    campana_id, contacto_id, intentos, ultimo_intento, contactado,
+    ultimo_evento, fecha_ultimo_evento, opcion_calificacion_id)
+SELECT DISTINCT ON (opcion.campana_id, calificacion.contacto_id)
+       opcion.campana_id, calificacion.contacto_id, 0, NULL, false, NULL, NULL, opcion.id
+FROM ominicontacto_app_calificacioncliente AS calificacion
+INNER JOIN ominicontacto_app_opcioncalificacion AS opcion
+    ON opcion.id = calificacion.opcion_calificacion_id
+ORDER BY opcion.campana_id, calificacion.contacto_id, calificacion.id DESC
+ON CONFLICT (campana_id, contacto_id) DO UPDATE SET
+    opcion_calificacion_id = EXCLUDED.opcion_calificacion_id;
@@ -71,6 +71,10 @@ function exportarReporteCSV(sufijoUrl, $csvDescarga, urlExportacion, $barraProgr
         if (data == subscribeConfirmationMessage) {
             generarReporteCSV(urlExportacion, $csvDescarga, sufijoUrl, start, end,
                 $barraProgresoCSV, campanaId, taskId);
+        } else if (data == 'ERROR' || data == 'CANCELADO') {
+            $barraProgresoCSV.find('.progress-bar').text(
+                data == 'ERROR' ? gettext('Error') : gettext('Cancelado'));
+            rws.close();
         } else {
             $barraProgresoCSV.find('.progress-bar').width(data + '%');
             $barraProgresoCSV.find('.progress-bar').text(data + '%');
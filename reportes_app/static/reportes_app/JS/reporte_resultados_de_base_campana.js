@@ -77,6 +77,10 @@ function exportarReporteCSV(sufijoUrl, $csvDescarga, urlExportacion,
                 taskId,
                 allData
             );
+        } else if (data == 'ERROR' || data == 'CANCELADO') {
+            $barraProgresoCSV.find('.progress-bar').text(
+                data == 'ERROR' ? gettext('Error') : gettext('Cancelado'));
+            rws.close();
         } else {
             $barraProgresoCSV.find('.progress-bar').width(data + '%');
             $barraProgresoCSV.find('.progress-bar').text(data + '%');
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests del estado de contactación por contacto y campaña mantenido por los triggers
+"""
+
+from __future__ import unicode_literals
+
+from mock import patch
+
+from django.utils.timezone import now, timedelta
+
+from ominicontacto_app.models import CalificacionCliente
+from ominicontacto_app.services.audio_conversor import ConversorDeAudioService
+from ominicontacto_app.tests.factories import OpcionCalificacionFactory
+from ominicontacto_app.tests.utiles import OMLBaseTest
+from reportes_app.models import ContactacionCampana
+from reportes_app.tests.utiles import GeneradorDeLlamadaLogs
+
+
+class ContactacionCampanaTest(OMLBaseTest):
+
+    @patch.object(ConversorDeAudioService, '_convertir_audio')
+    def setUp(self, _convertir_audio):
+        super(ContactacionCampanaTest, self).setUp()
+        base_datos = self.crear_base_datos_contacto(cant_contactos=2)
+        self.campana = self.crear_campana_dialer(bd_contactos=base_datos)
+        self.agente = self.crear_agente_profile(self.crear_user_agente())
+        self.contacto = base_datos.contactos.first()
+        self.generador = GeneradorDeLlamadaLogs()
+
+    def _generar_log(self, finalizacion, time, agente=None):
+        self.generador.generar_log(self.campana, False, finalizacion, self.contacto.telefono,
+                                   agente, self.contacto, 1, 1, time=time)
+
+    def _obtener_contactacion(self):
+        return ContactacionCampana.objects.get(
+            campana_id=self.campana.id, contacto_id=self.contacto.id)
+
+    def test_los_logs_actualizan_intentos_y_ultimo_evento(self):
+        hace_una_hora = now() - timedelta(hours=1)
+        self._generar_log('BUSY', hace_una_hora)
+        self._generar_log('NOANSWER', now())
+        contactacion = self._obtener_contactacion()
+        self.assertEqual(contactacion.intentos, 2)
+        self.assertFalse(contactacion.contactado)
+        self.assertEqual(contactacion.ultimo_evento, 'NOANSWER')
+
+    def test_un_log_anterior_no_reemplaza_el_ultimo_evento(self):
+        self._generar_log('NOANSWER', now())
+        self._generar_log('BUSY', now() - timedelta(hours=1))
+        self.assertEqual(self._obtener_contactacion().ultimo_evento, 'NOANSWER')
+
+    def test_llamada_conectada_marca_el_contacto_como_contactado(self):
+        self._generar_log('NOANSWER', now() - timedelta(hours=1))
+        self._generar_log('COMPLETEOUTNUM', now(), self.agente)
+        contactacion = self._obtener_contactacion()
+        self.assertTrue(contactacion.contactado)
+        self.assertEqual(contactacion.ultimo_evento, 'COMPLETEOUTNUM')
+
+    def test_la_calificacion_actualiza_la_opcion_del_contacto(self):
+        self._generar_log('COMPLETEOUTNUM', now(), self.agente)
+        opcion_1 = OpcionCalificacionFactory.create(campana=self.campana)
+        opcion_2 = OpcionCalificacionFactory.create(campana=self.campana)
+        self.crear_calificacion_cliente(self.agente, self.contacto, opcion_1)
+        calificacion = CalificacionCliente.objects.get(contacto=self.contacto)
+        self.assertEqual(self._obtener_contactacion().opcion_calificacion_id, opcion_1.id)
+        calificacion.opcion_calificacion = opcion_2
+        calificacion.save()
+        self.assertEqual(self._obtener_contactacion().opcion_calificacion_id, opcion_2.id)
+        calificacion.delete()
+        contactacion = self._obtener_contactacion()
+        self.assertIsNone(contactacion.opcion_calificacion_id)
+        self.assertTrue(contactacion.contactado)
+
+    def test_contactos_no_llamados(self):
+        self._generar_log('NOANSWER', now())
+        llamados = ContactacionCampana.objects.llamados(self.campana)
+        self.assertEqual(list(llamados.values_list('contacto_id', flat=True)),
+                         [self.contacto.id])
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Copyright (C) 2018 Freetech Solutions
+
+# This file is part of OMniLeads
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3, as published by
+# the Free Software Foundation.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see http://www.gnu.org/licenses/.
+#
+
+"""
+Tests de la ingesta por lotes de queue_log
+"""
+
+from __future__ import unicode_literals
+
+from unittest import skipIf
+
+from mock import MagicMock
+
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+
+from ominicontacto_app.tests.utiles import OMLBaseTest
+from reportes_app.models import ActividadAgenteLog, IngestaQueueLog, LlamadaLog, QueueLog
+from reportes_app.services.ingesta_queue_log import (
+    LOG_AGENTE, LOG_LLAMADA, IngestorQueueLog, parsear_queue_log)
+
+
+def _fila_queue_log(event, queuename='1-2-3', agent='5', data1='3511234567', data2='10',
+                    data3='4', data4='60', data5='grabacion.mp3', id=1):
+    return {'id': id, 'time': '2021-01-01 10:00:00.000000', 'callid': '1609506000.1',
+            'queuename': queuename, 'agent': agent, 'event': event, 'data1': data1,
+            'data2': data2, 'data3': data3, 'data4': data4, 'data5': data5}
+
+
+class ParseoQueueLogTest(OMLBaseTest):
+
+    def test_log_de_llamada(self):
+        tipo_log, campos = parsear_queue_log(_fila_queue_log('CONNECT'))
+        self.assertEqual(tipo_log, LOG_LLAMADA)
+        self.assertEqual((campos['campana_id'], campos['tipo_campana'], campos['tipo_llamada']),
+                         (1, 2, 3))
+        self.assertEqual(campos['agente_id'], 5)
+        self.assertEqual(campos['contacto_id'], 10)
+        self.assertEqual(campos['duracion_llamada'], 60)
+        self.assertEqual(campos['numero_extra'], '-1')
+        self.assertFalse(timezone.is_naive(campos['time']))
+
+    def test_log_de_llamada_sin_cola_usa_valores_de_error(self):
+        __, campos = parsear_queue_log(_fila_queue_log('DIAL', queuename=''))
+        self.assertEqual((campos['campana_id'], campos['tipo_campana'], campos['tipo_llamada']),
+                         (-1, -1, -1))
+
+    def test_log_con_agente_invalido_se_descarta(self):
+        self.assertIsNone(parsear_queue_log(_fila_queue_log('DIAL', agent='')))
+
+    def test_evento_no_logueable_se_descarta(self):
+        self.assertIsNone(parsear_queue_log(_fila_queue_log('NO_LOGUEAR')))
+
+    def test_log_de_actividad_de_agente(self):
+        tipo_log, campos = parsear_queue_log(
+            _fila_queue_log('PAUSEALL', queuename='ALL', data1='3'))
+        self.assertEqual(tipo_log, LOG_AGENTE)
+        self.assertEqual(campos['agente_id'], 5)
+        self.assertEqual(campos['pausa_id'], '3')
+
+    def test_transferencias(self):
+        __, campos = parsear_queue_log(_fila_queue_log('BT-TRY', agent='5-7'))
+        self.assertEqual((campos['agente_id'], campos['agente_extra_id']), (5, 7))
+        __, campos = parsear_queue_log(_fila_queue_log('CAMPT-TRY', agent='5-8'))
+        self.assertEqual((campos['agente_id'], campos['campana_extra_id']), (5, 8))
+        __, campos = parsear_queue_log(
+            _fila_queue_log('ENTERQUEUE-TRANSFER', agent='', data4='8', data5='7'))
+        self.assertEqual((campos['agente_id'], campos['campana_extra_id']), (7, 8))
+        __, campos = parsear_queue_log(_fila_queue_log('BTOUT-TRY', agent='5-3517654321'))
+        self.assertEqual((campos['agente_id'], campos['numero_extra']), (5, '3517654321'))
+        __, campos = parsear_queue_log(_fila_queue_log('BTOUT-ANSWER', agent='3517654321'))
+        self.assertEqual((campos['agente_id'], campos['numero_extra']), (-1, '3517654321'))
+
+
+@skipIf(hasattr(settings, 'DESHABILITAR_MIGRACIONES_EN_TESTS') and
+        settings.DESHABILITAR_MIGRACIONES_EN_TESTS,
+        'Sin migraciones no existe la tabla ´queue_log´')
+# Los ids de queue_log de otros tests (revertidos) dejan huecos que no hay que esperar
+@override_settings(OML_INGESTA_QUEUE_LOG_ESPERA_HUECO=0)
+class IngestorQueueLogTest(OMLBaseTest):
+
+    def setUp(self):
+        super(IngestorQueueLogTest, self).setUp()
+        self.redis_connection = MagicMock()
+        self.ingestor = IngestorQueueLog(tamano_lote=10, redis_connection=self.redis_connection)
+
+    def _crear_queue_log(self, event, queuename='1-2-3', agent='5'):
+        fila = _fila_queue_log(event, queuename=queuename, agent=agent)
+        del fila['id']
+        return QueueLog.objects.create(**fila)
+
+    def test_con_el_trigger_habilitado_solo_se_sigue_su_avance(self):
+        queue_log = self._crear_queue_log('CONNECT')
+        self.assertEqual(self.ingestor.procesar(), 0)
+        self.assertEqual(LlamadaLog.objects.count(), 1)
+        self.assertEqual(IngestaQueueLog.objects.get().ultimo_id, queue_log.id)
+
+    def test_ingesta_por_lotes_con_el_trigger_deshabilitado(self):
+        self.ingestor.deshabilitar_trigger()
+        self.assertFalse(self.ingestor.trigger_habilitado())
+        for __ in range(12):
+            self._crear_queue_log('DIAL')
+        self._crear_queue_log('PAUSEALL', queuename='ALL')
+        self._crear_queue_log('NO_LOGUEAR')
+
+        self.assertEqual(self.ingestor.procesar(), 10)
+        self.assertEqual(self.ingestor.procesar(), 4)
+        self.assertEqual(self.ingestor.procesar(), 0)
+        self.assertEqual(LlamadaLog.objects.filter(event='DIAL').count(), 12)
+        self.assertEqual(ActividadAgenteLog.objects.filter(event='PAUSEALL').count(), 1)
+        pipeline = self.redis_connection.pipeline.return_value
+        self.assertEqual(pipeline.xadd.call_count, 13)
+
+    def test_habilitar_trigger_procesa_los_pendientes(self):
+        self.ingestor.deshabilitar_trigger()
+        self._crear_queue_log('CONNECT')
+        self.ingestor.habilitar_trigger()
+        self.assertTrue(self.ingestor.trigger_habilitado())
+        self.assertEqual(LlamadaLog.objects.count(), 1)
+        self._crear_queue_log('CONNECT')
+        self.assertEqual(LlamadaLog.objects.count(), 2)
@@ -27,7 +27,10 @@ from ominicontacto_app.models import Campana
 from ominicontacto_app.tests.factories import SupervisorProfileFactory, AgenteProfileFactory,\
     CampanaFactory, ContactoFactory, UserFactory
 
+from reportes_app.models import LlamadaLog, ResumenDiarioLlamadaLog, ResumenHorarioLlamadaLog, \
+    truncar_hora
 from reportes_app.reportes.reporte_llamadas import ReporteDeLlamadas
+from reportes_app.services.resumen_llamadas_service import ConsolidadorResumenLlamadas
 from reportes_app.tests.utiles import GeneradorDeLlamadaLogs
 from django.db import connections
 
@@ -724,3 +727,66 @@ class DatosPorFechaReporteLlamadasTests(BaseReporteDeLlamadasTests):
         self.assertEqual(datos_hoy['atendidas'], 3)
         self.assertEqual(datos_hoy['recibidas'], 3)
         self.assertEqual(datos_hoy['t_espera_conexion'], 6)
+
+
+class ResumenesReporteLlamadasTests(BaseReporteDeLlamadasTests):
+
+    def _generar_llamadas(self):
+        generador = GeneradorDeLlamadaLogs()
+        for i in range(3):
+            generador.generar_log(self.entrante, False, 'COMPLETEAGENT', '123', self.agente1,
+                                  bridge_wait_time=4, duracion_llamada=10, time=self.durante)
+            generador.generar_log(self.manual, True, 'BUSY', '123', self.agente2,
+                                  bridge_wait_time=5, time=self.durante)
+        generador.generar_log(self.dialer, False, 'COMPLETEAGENT', '123', self.agente1,
+                              bridge_wait_time=2, duracion_llamada=30)
+        generador.generar_log(self.preview, False, 'COMPLETEOUTNUM', '123', self.agente2,
+                              contacto=self.contacto_p, bridge_wait_time=3, duracion_llamada=20)
+
+    def test_reporte_con_resumenes_consolidados_coincide_con_logs(self):
+        self._generar_llamadas()
+        self.hasta = fecha_hora_local(now())
+        reporte_logs = ReporteDeLlamadas(self.desde, self.hasta, True, self.supervisor.user)
+
+        ConsolidadorResumenLlamadas().consolidar(hasta=self.hasta + timedelta(hours=1))
+        self.assertTrue(ResumenHorarioLlamadaLog.objects.exists())
+        self.assertTrue(ResumenDiarioLlamadaLog.objects.exists())
+        reporte_resumenes = ReporteDeLlamadas(self.desde, self.hasta, True, self.supervisor.user)
+
+        self.assertEqual(reporte_logs.estadisticas, reporte_resumenes.estadisticas)
+        self.assertEqual(reporte_logs.estadisticas_por_fecha,
+                         reporte_resumenes.estadisticas_por_fecha)
+
+    def test_totales_agentes_campanas_con_resumenes_coinciden_con_logs(self):
+        self._generar_llamadas()
+        agentes = [self.agente1.id, self.agente2.id]
+        eventos = list(LlamadaLog.EVENTOS_FIN_CONEXION) + ['BUSY']
+        fecha_hasta = fecha_hora_local(now())
+        totales_logs = LlamadaLog.objects.obtener_agentes_campanas_total(
+            eventos, self.desde, fecha_hasta, agentes, self.campanas)
+
+        ConsolidadorResumenLlamadas().consolidar(hasta=fecha_hasta)
+        totales_resumenes = LlamadaLog.objects.obtener_agentes_campanas_total(
+            eventos, self.desde, fecha_hasta, agentes, self.campanas)
+
+        self.assertEqual(len(totales_logs), 4)
+        self.assertEqual(totales_logs, totales_resumenes)
+
+    def test_consolidar_incluye_logs_tardios_de_horas_ya_consolidadas(self):
+        self._generar_llamadas()
+        fecha_hasta = fecha_hora_local(now())
+        consolidador = ConsolidadorResumenLlamadas()
+        consolidador.consolidar(hasta=fecha_hasta)
+
+        # Log de una hora ya consolidada que llega luego de la consolidación
+        GeneradorDeLlamadaLogs().generar_log(self.manual, True, 'BUSY', '123', self.agente2,
+                                             bridge_wait_time=5, time=self.durante)
+        consolidador.consolidar(hasta=fecha_hasta)
+
+        cantidad_logs = LlamadaLog.objects.filter(time__lt=truncar_hora(fecha_hasta)).count()
+        self.assertEqual(
+            sum(ResumenHorarioLlamadaLog.objects.values_list('cantidad', flat=True)),
+            cantidad_logs)
+        self.assertEqual(
+            sum(ResumenDiarioLlamadaLog.objects.values_list('cantidad', flat=True)),
+            cantidad_logs)
@@ -15,15 +15,18 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see http://www.gnu.org/licenses/.
 #
+from ominicontacto_app.services.asterisk.redis_database import RegistroAgentes
 from ominicontacto_app.services.asterisk.supervisor_activity import SupervisorActivityAmiManager
 from ominicontacto_app.models import Campana, OpcionCalificacion
 from mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.db import connections
+from django.db.models import Max
 
 import json
 
+from reportes_app.models import LlamadaLog
 from reportes_app.reportes.reporte_llamadas_supervision import (
     ReporteDeLLamadasEntrantesDeSupervision
 )
@@ -69,13 +72,13 @@ class ReporteDeLLamadasEntrantesDeSupervisionTest(TestCase):
         connections['replica'].cursor = connections['replica']._orig_cursor
         super(ReporteDeLLamadasEntrantesDeSupervisionTest, self).tearDown()
 
-    @patch('redis.Redis.keys')
+    @patch.object(RegistroAgentes, 'obtener_datos_agentes')
     @patch.object(RedisService, 'obtener_estadisticas_campanas_entrantes')
-    def test_reporte_vacio(self, obtener_estadisticas_campanas_entrantes, keys):
+    def test_reporte_vacio(self, obtener_estadisticas_campanas_entrantes, obtener_datos_agentes):
         obtener_estadisticas_campanas_entrantes.return_value = {}
-        keys.return_value = []
+        obtener_datos_agentes.return_value = []
         reporte = ReporteDeLLamadasEntrantesDeSupervision(self.supervisor.user)
-        keys.assert_called()
+        obtener_datos_agentes.assert_called()
         self.assertNotIn(self.entrante1.id, reporte.estadisticas)
         self.assertNotIn(self.entrante2.id, reporte.estadisticas)
 
@@ -259,6 +262,39 @@ class ReporteDeLLamadasSalientesDeSupervisionTest(TestCase):
         self.assertEqual(reporte.estadisticas[self.preview.id]['gestiones'], 0)
         self.assertNotIn(self.dialer.id, reporte.estadisticas)
 
+    def test_contabiliza_solo_logs_posteriores_a_la_marca(self):
+        self.generador.generar_log(self.manual, False, 'COMPLETEAGENT', '35100001111',
+                                   agente=self.agente1, contacto=None, bridge_wait_time=-1,
+                                   duracion_llamada=10, archivo_grabacion='', time=None)
+        ultimo_id = LlamadaLog.objects.aggregate(Max('id'))['id__max']
+        self.generador.generar_log(self.manual, False, 'BUSY', '35100001112',
+                                   agente=self.agente1, contacto=None, bridge_wait_time=-1,
+                                   duracion_llamada=10, archivo_grabacion='', time=None)
+        reporte = ReporteDeLLamadasSalientesDeSupervision(id_log_desde=ultimo_id)
+        self.assertEqual(reporte.estadisticas[self.manual.id]['efectuadas'], 1)
+        self.assertEqual(reporte.estadisticas[self.manual.id]['conectadas'], 0)
+        self.assertEqual(reporte.estadisticas[self.manual.id]['no_conectadas'], 1)
+        reporte = ReporteDeLLamadasSalientesDeSupervision(id_log_hasta=ultimo_id)
+        self.assertEqual(reporte.estadisticas[self.manual.id]['efectuadas'], 1)
+        self.assertEqual(reporte.estadisticas[self.manual.id]['conectadas'], 1)
+
+    def test_marca_no_avanza_sobre_ids_faltantes_hasta_vencer_la_espera(self):
+        for numero in ('35100001111', '35100001112', '35100001113'):
+            self.generador.generar_log(self.manual, False, 'BUSY', numero,
+                                       agente=self.agente1, contacto=None, bridge_wait_time=-1,
+                                       duracion_llamada=10, archivo_grabacion='', time=None)
+        ids = list(LlamadaLog.objects.order_by('id').values_list('id', flat=True))
+        # Simula un insert todavía no confirmado en el medio
+        LlamadaLog.objects.filter(id=ids[1]).delete()
+        family = ReporteLlamadasSalienteFamily()
+
+        with override_settings(OML_SUPERVISION_ESPERA_HUECO=60):
+            self.assertEqual(family._obtener_ultimo_id_log(ids[0] - 1), ids[0])
+            self.assertEqual(family._hueco[0], ids[1])
+        with override_settings(OML_SUPERVISION_ESPERA_HUECO=0):
+            self.assertEqual(family._obtener_ultimo_id_log(ids[0] - 1), ids[-1])
+            self.assertIsNone(family._hueco)
+
     def test_contabiliza_efectuadas_no_conectadas(self):
         self.generador.generar_log(self.manual, False, 'BUSY', '35100001111',
                                    agente=self.agente1, contacto=None, bridge_wait_time=-1,
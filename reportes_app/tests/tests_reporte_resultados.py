@@ -20,7 +20,6 @@
 
 from __future__ import unicode_literals
 
-from mock import patch
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.utils.crypto import get_random_string
@@ -33,7 +32,7 @@ from reportes_app.reportes.reporte_resultados import (
 from reportes_app.tests.tests_reportes_campanas import BaseTestDeReportes
 # Ominicontacto APP
 from ominicontacto_app.tests.utiles import OMLBaseTest, PASSWORD
-from ominicontacto_app.models import Campana
+from ominicontacto_app.models import Campana, TrabajoSegundoPlano
 
 
 class APITest(OMLBaseTest):
@@ -117,8 +116,7 @@ class ReporteDeResultadosTests(APITest, BaseTestDeReportes):
         reporte_5 = ReporteDeResultadosDeCampana(self.campana_activa, page_number=1, page_size=5)
         self.assertGreaterEqual(5, len(reporte_5.contactaciones.values()))
 
-    @patch('threading.Thread')
-    def test_generar_resultados_de_base_csv(self, Thread):
+    def test_generar_resultados_de_base_csv(self):
         self.client.login(username='sup1', password=PASSWORD)
         url = reverse('api_exportar_csv_resultados_base_contactados')
         taskId = self.post_data['taskId']
@@ -133,13 +131,14 @@ class ReporteDeResultadosTests(APITest, BaseTestDeReportes):
             follow=True,
             format='json'
         )
-        Thread.assert_called()
         self.assertEqual(response.status_code, 200)
         response_json = response.json()
+        trabajo = TrabajoSegundoPlano.objects.get(pk=response_json.pop('trabajo_id'))
+        self.assertEqual(trabajo.tipo, 'RESULTADOS_BASE')
+        self.assertEqual(trabajo.get_parametros()['all_data'], False)
         self.assertEqual(response_json, self.response_ok)
 
-    @patch('threading.Thread')
-    def test_generar_todos_resultados_de_base_csv(self, Thread):
+    def test_generar_todos_resultados_de_base_csv(self):
         self.client.login(username='sup1', password=PASSWORD)
         url = reverse('api_exportar_csv_resultados_base_contactados')
         taskId = self.post_data['taskId']
@@ -154,7 +153,9 @@ class ReporteDeResultadosTests(APITest, BaseTestDeReportes):
             follow=True,
             format='json'
         )
-        Thread.assert_called()
         self.assertEqual(response.status_code, 200)
         response_json = response.json()
+        trabajo = TrabajoSegundoPlano.objects.get(pk=response_json.pop('trabajo_id'))
+        self.assertEqual(trabajo.tipo, 'RESULTADOS_BASE')
+        self.assertEqual(trabajo.get_parametros()['all_data'], True)
         self.assertEqual(response_json, self.response_ok)
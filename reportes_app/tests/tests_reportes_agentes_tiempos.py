@@ -24,6 +24,8 @@ from __future__ import unicode_literals, division
 
 from mock import patch
 
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from ominicontacto_app.tests.utiles import OMLBaseTest
 from reportes_app.tests.utiles import GeneradorDeLlamadaLogs
@@ -1035,3 +1037,52 @@ class ReportesAgenteTiemposTest(OMLBaseTest):
         for agente in agentes_tiempo:
             self.assertEqual((fecha_superior - t_hold).total_seconds(),
                              agente.tiempo_hold.total_seconds())
+
+    def _generar_actividad_llamadas_agente(self, agente, inicio_sesion):
+        generador = GeneradorDeLlamadaLogs()
+        generador.generar_log(self.preview, False, 'COMPLETEAGENT', '123',
+                              agente, self.contacto_p, duracion_llamada=58)
+        hold = LlamadaLogFactory(agente_id=agente.id, event='HOLD',
+                                 time=inicio_sesion + timezone.timedelta(minutes=15))
+        LlamadaLogFactory(agente_id=agente.id, event='UNHOLD', callid=hold.callid,
+                          time=inicio_sesion + timezone.timedelta(minutes=20))
+        LlamadaLogFactory(agente_id=agente.id, agente_extra_id=agente.id, event='RINGNOANSWER',
+                          campana_id=self.entrante.id,
+                          time=inicio_sesion + timezone.timedelta(minutes=30))
+        LlamadaLogFactory(agente_id=agente.id, agente_extra_id=-1, event='RINGNOANSWER',
+                          campana_id=self.entrante.id,
+                          time=inicio_sesion + timezone.timedelta(minutes=40))
+
+    def _contar_consultas_reporte_agentes(self):
+        agentes = AgenteProfile.objects.obtener_activos().select_related('user')
+        fecha_hoy = timezone.now() + timezone.timedelta(days=1)
+        fecha_ayer = fecha_hoy - timezone.timedelta(days=2)
+        # Algunas consultas del reporte se hacen sobre la replica
+        with CaptureQueriesContext(connections['default']) as consultas_default, \
+                CaptureQueriesContext(connections['replica']) as consultas_replica:
+            reporte = ReporteAgentes(self.user_supervisor).devuelve_reporte_agentes(
+                agentes, fecha_ayer, fecha_hoy)
+        return {'default': len(consultas_default), 'replica': len(consultas_replica)}, reporte
+
+    def test_reporte_agentes_cantidad_de_consultas_no_depende_de_cantidad_de_agentes(self):
+        self._generar_actividad_llamadas_agente(self.agente, self.inicio_sesion_agente.time)
+        self._generar_actividad_llamadas_agente(self.agente1, self.inicio_sesion_agente1.time)
+        cantidad_consultas, _ = self._contar_consultas_reporte_agentes()
+
+        for i in range(5):
+            agente = self.crear_agente_profile()
+            ActividadAgenteLogFactory.create(
+                event='ADDMEMBER', agente_id=agente.id, time=self.inicio_sesion_agente.time)
+            ActividadAgenteLogFactory.create(
+                event='REMOVEMEMBER', agente_id=agente.id, time=self.fin_sesion_agente.time,
+                pausa_id='')
+            self._generar_actividad_llamadas_agente(agente, self.inicio_sesion_agente.time)
+        cantidad_consultas_mas_agentes, reporte = self._contar_consultas_reporte_agentes()
+
+        self.assertEqual(cantidad_consultas['default'], cantidad_consultas_mas_agentes['default'])
+        self.assertEqual(cantidad_consultas['replica'], cantidad_consultas_mas_agentes['replica'])
+        self.assertEqual(len(reporte['agentes_tiempos']), 7)
+        for tiempos_agente in reporte['agentes_tiempos']:
+            self.assertEqual(tiempos_agente.tiempo_hold, timezone.timedelta(minutes=5))
+            self.assertEqual(tiempos_agente.cantidad_entrantes_no_atendidas, 1)
+            self.assertEqual(tiempos_agente.cantidad_entrantes_rechazadas, 1)
@@ -526,7 +526,7 @@ class ReportesCampanasTests(BaseTestDeReportes):
         reporte_contactados_csv = ReporteContactadosCSV(
             self.campana_activa, key_task, fecha_desde, fecha_hasta)
         # muestra el histórico de contactados (aqui cuenta la linea de header)
-        self.assertEqual(len(reporte_contactados_csv.datos), 4)
+        self.assertEqual(len(list(reporte_contactados_csv.datos)), 4)
 
     @patch('redis.Redis.publish')
     @patch.object(ReporteCampanaPDFService, 'crea_reporte_pdf')
@@ -545,7 +545,23 @@ class ReportesCampanasTests(BaseTestDeReportes):
         reporte_contactados_csv = ReporteContactadosCSV(
             self.campana_activa, key_task, fecha_desde, fecha_hasta)
         # muestra el histórico de contactados (aqui cuenta la linea de header)
-        self.assertEqual(len(reporte_contactados_csv.datos), 5)
+        self.assertEqual(len(list(reporte_contactados_csv.datos)), 5)
+
+    @patch('redis.Redis.publish')
+    def test_reporte_contactados_recorre_logs_en_lotes_sin_repetir_filas(self, publish):
+        key_task = 'key_task'
+        hoy_ahora = fecha_hora_local(timezone.now())
+        fecha_desde = datetime_hora_minima_dia_utc(hoy_ahora)
+        fecha_hasta = datetime_hora_maxima_dia_utc(hoy_ahora)
+        reporte_contactados_csv = ReporteContactadosCSV(
+            self.campana_activa, key_task, fecha_desde, fecha_hasta)
+        filas = list(reporte_contactados_csv.datos)
+        with patch.object(ReporteContactadosCSV, 'TAMANO_LOTE_LOGS', 1):
+            reporte_en_lotes_csv = ReporteContactadosCSV(
+                self.campana_activa, key_task, fecha_desde, fecha_hasta)
+            filas_en_lotes = list(reporte_en_lotes_csv.datos)
+        self.assertTrue(len(filas) > 2)
+        self.assertEqual(filas_en_lotes, filas)
 
     @patch.object(ReporteCampanaPDFService, 'crea_reporte_pdf')
     @patch.object(Bar, 'render_to_png')
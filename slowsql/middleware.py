@@ -0,0 +1,22 @@
+from django.urls import Resolver404
+
+from slowsql.profiler import establecer_contexto, limpiar_contexto
+from utiles_globales import request_url_name
+
+
+class ProfilerSQLMiddleware:
+    """ Asocia las consultas SQL de cada request al nombre de su URL """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            url_name = request_url_name(request)
+        except Resolver404:
+            url_name = None
+        establecer_contexto('url:{0}'.format(url_name))
+        try:
+            return self.get_response(request)
+        finally:
+            limpiar_contexto()
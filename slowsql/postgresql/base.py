@@ -1,8 +1,10 @@
 from django.db.backends.postgresql import base
 
+from slowsql.profiler import medir_consulta
+
 
 class DatabaseWrapper(base.DatabaseWrapper):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.force_debug_cursor = True
+        self.execute_wrappers.append(medir_consulta)
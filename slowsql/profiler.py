@@ -0,0 +1,201 @@
+"""
+Profiler de consultas SQL por muestreo.
+
+Mide una fracción de las consultas (OML_PROFILER_SQL_TASA_MUESTREO) y las agrupa por contexto
+(nombre de URL o comando de manage.py) y por huella (el SQL sin literales). Cada proceso acumula
+en memoria y cada OML_PROFILER_SQL_INTERVALO segundos suma lo acumulado en Redis, de donde lo
+lee el comando resumen_profiler_sql.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+
+import redis
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_CONSULTAS = 'OML:PROFILER_SQL:CONSULTAS'
+KEY_CONSULTA = 'OML:PROFILER_SQL:CONSULTA:{0}'
+KEY_DURACIONES = 'OML:PROFILER_SQL:DURACIONES:{0}'
+# Los datos de consultas que dejan de ejecutarse expiran solos
+EXPIRACION = 24 * 60 * 60
+
+_LITERALES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    # Listas de valores de largo variable, como las de IN (...)
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+@lru_cache(maxsize=2048)
+def huella(sql):
+    """ Devuelve el SQL sin literales ni parámetros, para agrupar consultas equivalentes """
+    for expresion, reemplazo in _LITERALES:
+        sql = expresion.sub(reemplazo, sql)
+    return sql.strip()
+
+
+_contexto = threading.local()
+
+
+@lru_cache(maxsize=1)
+def _contexto_proceso():
+    if len(sys.argv) > 1 and os.path.basename(sys.argv[0]) == 'manage.py':
+        return 'comando:{0}'.format(sys.argv[1])
+    return 'proceso:{0}'.format(os.path.basename(sys.argv[0]) if sys.argv else '')
+
+
+def establecer_contexto(contexto):
+    _contexto.valor = contexto
+
+
+def limpiar_contexto():
+    _contexto.valor = None
+
+
+def obtener_contexto():
+    contexto = getattr(_contexto, 'valor', None)
+    return contexto if contexto is not None else _contexto_proceso()
+
+
+def percentil(duraciones, porcentaje):
+    if not duraciones:
+        return 0
+    duraciones = sorted(duraciones)
+    indice = int(round(porcentaje / 100.0 * (len(duraciones) - 1)))
+    return duraciones[indice]
+
+
+def obtener_redis():
+    return redis.Redis(
+        host=settings.REDIS_HOSTNAME,
+        port=settings.CONSTANCE_REDIS_CONNECTION['port'],
+        decode_responses=True)
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """ Execute wrapper que mide por muestreo las consultas de las conexiones """
+    if random.random() >= settings.OML_PROFILER_SQL_TASA_MUESTREO:
+        return execute(sql, params, many, context)
+    inicio = time.monotonic()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ProfilerSQL.obtener_profiler().registrar(
+            obtener_contexto(), sql, time.monotonic() - inicio)
+
+
+class ProfilerSQL(object):
+    """ Acumula las mediciones del proceso y las envía periódicamente a Redis """
+
+    _profiler = None
+
+    @classmethod
+    def obtener_profiler(cls):
+        """ Un profiler por proceso: lo acumulado no se comparte con los procesos hijos """
+        if cls._profiler is None or cls._profiler.pid != os.getpid():
+            cls._profiler = cls()
+            atexit.register(cls._profiler.enviar)
+        return cls._profiler
+
+    def __init__(self, redis_connection=None):
+        self.pid = os.getpid()
+        self.tasa = settings.OML_PROFILER_SQL_TASA_MUESTREO
+        self.intervalo = settings.OML_PROFILER_SQL_INTERVALO
+        self.max_muestras = settings.OML_PROFILER_SQL_MUESTRAS
+        self._redis_connection = redis_connection
+        self._lock = threading.Lock()
+        self._consultas = {}
+        self._ultimo_envio = time.monotonic()
+
+    def registrar(self, contexto, sql, duracion):
+        clave = (contexto, huella(sql))
+        with self._lock:
+            consulta = self._consultas.get(clave)
+            if consulta is None:
+                consulta = self._consultas[clave] = [0, 0.0, []]
+            consulta[0] += 1
+            consulta[1] += duracion
+            if len(consulta[2]) < self.max_muestras:
+                consulta[2].append(duracion)
+        if time.monotonic() - self._ultimo_envio >= self.intervalo:
+            self.enviar()
+
+    def enviar(self):
+        """ Suma en Redis lo acumulado desde el último envío """
+        with self._lock:
+            consultas, self._consultas = self._consultas, {}
+            self._ultimo_envio = time.monotonic()
+        if not consultas:
+            return
+        if self._redis_connection is None:
+            self._redis_connection = obtener_redis()
+        pipeline = self._redis_connection.pipeline(transaction=False)
+        for (contexto, sql), (cantidad, tiempo, duraciones) in consultas.items():
+            id_consulta = hashlib.sha1(
+                '{0}\n{1}'.format(contexto, sql).encode('utf-8')).hexdigest()[:16]
+            key_consulta = KEY_CONSULTA.format(id_consulta)
+            key_duraciones = KEY_DURACIONES.format(id_consulta)
+            pipeline.sadd(KEY_CONSULTAS, id_consulta)
+            pipeline.hset(key_consulta, mapping={'contexto': contexto, 'sql': sql})
+            pipeline.hincrby(key_consulta, 'muestras', cantidad)
+            # Estimación de la cantidad y el tiempo totales a partir de la muestra
+            pipeline.hincrbyfloat(key_consulta, 'cantidad', cantidad / self.tasa)
+            pipeline.hincrbyfloat(key_consulta, 'tiempo', tiempo / self.tasa)
+            pipeline.lpush(key_duraciones, *duraciones)
+            pipeline.ltrim(key_duraciones, 0, self.max_muestras - 1)
+            pipeline.expire(key_consulta, EXPIRACION)
+            pipeline.expire(key_duraciones, EXPIRACION)
+        pipeline.expire(KEY_CONSULTAS, EXPIRACION)
+        try:
+            pipeline.execute()
+        except redis.exceptions.RedisError as e:
+            logger.warning('No se pudieron guardar los datos del profiler SQL: {0}'.format(e))
+
+
+def obtener_resumen(redis_connection=None, contexto=None):
+    """
+    Devuelve las consultas registradas ordenadas por tiempo total estimado, con contexto, sql,
+    muestras, cantidad y tiempo estimados, y percentil 95 de la duración.
+    """
+    if redis_connection is None:
+        redis_connection = obtener_redis()
+    resumen = []
+    for id_consulta in redis_connection.smembers(KEY_CONSULTAS):
+        consulta = redis_connection.hgetall(KEY_CONSULTA.format(id_consulta))
+        if not consulta or (contexto is not None and consulta['contexto'] != contexto):
+            continue
+        duraciones = [float(duracion) for duracion in
+                      redis_connection.lrange(KEY_DURACIONES.format(id_consulta), 0, -1)]
+        resumen.append({
+            'contexto': consulta['contexto'],
+            'sql': consulta['sql'],
+            'muestras': int(consulta['muestras']),
+            'cantidad': float(consulta['cantidad']),
+            'tiempo': float(consulta['tiempo']),
+            'p95': percentil(duraciones, 95),
+        })
+    resumen.sort(key=lambda consulta: consulta['tiempo'], reverse=True)
+    return resumen
+
+
+def reiniciar(redis_connection=None):
+    if redis_connection is None:
+        redis_connection = obtener_redis()
+    for id_consulta in redis_connection.smembers(KEY_CONSULTAS):
+        redis_connection.delete(
+            KEY_CONSULTA.format(id_consulta), KEY_DURACIONES.format(id_consulta))
+    redis_connection.delete(KEY_CONSULTAS)